@@ -0,0 +1,386 @@
+"""Micro benchmarks of the game library."""
+
+import argparse
+import copy
+import random
+import sys
+import time
+import timeit
+import chess_game
+import engine
+import evaluation
+import figures
+import mailbox88
+import perft
+from chess_game import Game, BitboardGame
+
+
+def deepcopy_game(player):
+    """
+    Creates game the way Game() did before the start template was added.
+
+    Figures are deep-copied one by one, then board and all possible
+    moves are rebuilt. Kept as the baseline of the construction benchmark.
+
+    Parameters
+    ----------
+    player : str
+        color of the figures the player plays with
+        ('w' - white, 'b' - black)
+
+    Returns
+    -------
+    Game
+        game at the start position
+    """
+    game = Game(player)
+    game.white_figures = [copy.deepcopy(fig)
+                          for fig in chess_game.WHITE_START_FIGURES]
+    game.black_figures = [copy.deepcopy(fig)
+                          for fig in chess_game.BLACK_START_FIGURES]
+    game.update_board()
+    game.update_possible_moves()
+    game.hash = game.compute_hash()
+    return game
+
+
+CONSTRUCTORS = (
+    ('deepcopy', deepcopy_game),
+    ('Game', Game),
+    ('BitboardGame', BitboardGame),
+)
+
+
+def calls_per_second(function, seconds=1.0):
+    """
+    Measures how many times per second function can be called.
+
+    Parameters
+    ----------
+    function : callable
+        function without arguments to call
+    seconds : float
+        minimal time to spend measuring (default 1.0)
+
+    Returns
+    -------
+    float
+        number of calls per second
+    """
+    calls = 0
+    batch = 1
+    start = time.perf_counter()
+    while True:
+        for _ in range(batch):
+            function()
+        calls += batch
+        spent = time.perf_counter() - start
+        if spent >= seconds:
+            return calls / spent
+        batch *= 2
+
+
+def construction_report(seconds=1.0, out=sys.stdout):
+    """
+    Measures games constructed per second by each of CONSTRUCTORS.
+
+    Parameters
+    ----------
+    seconds : float
+        time to spend on each constructor (default 1.0)
+    out : file
+        stream the report is printed to (default sys.stdout)
+
+    Returns
+    -------
+    dictionary
+        dictionary with keys - constructor names and values - games
+        constructed per second
+    """
+    rates = {}
+    for name, constructor in CONSTRUCTORS:
+        rates[name] = calls_per_second(lambda: constructor('w'), seconds)
+        print('{:<14} {:>10.0f} games/s'.format(name, rates[name]), file=out)
+    return rates
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Returns memory taken by the object and everything it refers to.
+
+    Lists, tuples, sets, dictionaries and attributes of objects (both
+    __dict__ and __slots__) are followed, classes are not. Each object
+    is counted once.
+
+    Parameters
+    ----------
+    obj : object
+        object to measure
+    seen : set
+        ids of objects already counted (default empty)
+
+    Returns
+    -------
+    int
+        size in bytes
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, type):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen)
+                    for key, value in obj.items())
+    else:
+        if hasattr(obj, '__dict__'):
+            size += deep_sizeof(obj.__dict__, seen)
+        for cls in type(obj).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                if hasattr(obj, name):
+                    size += deep_sizeof(getattr(obj, name), seen)
+    return size
+
+
+def memory_report(out=sys.stdout):
+    """
+    Measures memory taken by a game and time of figure attribute access.
+
+    Parameters
+    ----------
+    out : file
+        stream the report is printed to (default sys.stdout)
+
+    Returns
+    -------
+    dictionary
+        dictionary with keys 'game', 'figures' - bytes taken by a new
+        Game and by its figures and 'access' - nanoseconds to read x, y
+        and label of a figure
+    """
+    game = Game('w')
+    fig = game.white_figures[0]
+    number = 100000
+    report = {
+        'game': deep_sizeof(game),
+        'figures': deep_sizeof(game.white_figures + game.black_figures),
+        'access': timeit.timeit('fig.x, fig.y, fig.label',
+                                globals={'fig': fig},
+                                number=number) / number * 1e9,
+    }
+    print('Game           {:>10} bytes'.format(report['game']), file=out)
+    print('figures        {:>10} bytes'.format(report['figures']), file=out)
+    print('x, y, label    {:>10.1f} ns'.format(report['access']), file=out)
+    return report
+
+
+def list_board_moves(game):
+    """
+    Generates pseudo-legal moves of active player on list-of-lists board.
+
+    Parameters
+    ----------
+    game : Game
+        game to generate moves in
+
+    Returns
+    -------
+    list
+        list of tuples (figure, target squares)
+    """
+    moving_figures = (game.white_figures if game.current_player == 'w'
+                      else game.black_figures)
+    board = game.board
+    return [(fig, fig.get_targets(board)) for fig in moving_figures]
+
+
+def movegen_report(seconds=1.0, out=sys.stdout):
+    """
+    Measures pseudo-legal move generation on both board formats.
+
+    Figures on list-of-lists board of Game and 0x88 mailbox of
+    mailbox88.Position generate moves of perft.LEGACY_POSITIONS.
+
+    Parameters
+    ----------
+    seconds : float
+        time to spend on each board of each position (default 1.0)
+    out : file
+        stream the report is printed to (default sys.stdout)
+
+    Returns
+    -------
+    dictionary
+        dictionary with keys - position names and values - tuples of
+        moves generated per second on list and on mailbox board
+    """
+    rates = {}
+    for name, fen, _ in perft.POSITIONS:
+        if name not in perft.LEGACY_POSITIONS:
+            continue
+        game = Game.from_fen(fen)
+        position = mailbox88.Position.from_fen(fen)
+        moves = len(position.generate_moves())
+        rates[name] = (
+                moves * calls_per_second(lambda: list_board_moves(game),
+                                         seconds),
+                moves * calls_per_second(position.generate_moves, seconds))
+        print('{:<10} list {:>10.0f} moves/s  mailbox {:>10.0f} moves/s'
+              .format(name, *rates[name]), file=out)
+    return rates
+
+
+def record_game(plies=80, seed=0):
+    """
+    Plays random legal moves from the start position.
+
+    Parameters
+    ----------
+    plies : int
+        maximum number of moves (default 80)
+    seed : int
+        seed of the random moves (default 0)
+
+    Returns
+    -------
+    list
+        moves in the form of the server game story ('e2e4:')
+    """
+    rng = random.Random(seed)
+    game = Game('w')
+    names = figures.SQUARE_NAMES
+    story = []
+    for _ in range(plies):
+        moves = game.legal_moves()
+        if not moves:
+            break
+        move = rng.choice(moves)
+        story.append(names[move & 63] + names[move >> 6 & 63] + ':')
+        game.move_from_server(story[-1][:2], story[-1][2:4])
+    return story
+
+
+def replay_report(seconds=1.0, out=sys.stdout):
+    """
+    Measures games replayed per second move by move and by Game.replay.
+
+    Parameters
+    ----------
+    seconds : float
+        time to spend on each way (default 1.0)
+    out : file
+        stream the report is printed to (default sys.stdout)
+
+    Returns
+    -------
+    dictionary
+        dictionary with keys - ways of replay and values - games
+        replayed per second
+    """
+    story = record_game()
+
+    def move_by_move():
+        game = Game('w')
+        for move in story:
+            game.move_from_server(move[:2], move[2:4])
+
+    ways = (('move_from_server', move_by_move),
+            ('untrusted', lambda: Game('w').replay(story, False)),
+            ('trusted', lambda: Game('w').replay(story)))
+    rates = {}
+    for name, function in ways:
+        rates[name] = calls_per_second(function, seconds)
+        print('{:<16} {:>8.1f} games/s ({} moves)'
+              .format(name, rates[name], len(story)), file=out)
+    return rates
+
+
+def evaluation_report(seconds=1.0, out=sys.stdout):
+    """
+    Measures evaluations per second by Game.evaluate and from scratch.
+
+    Parameters
+    ----------
+    seconds : float
+        time to spend on each way of each position (default 1.0)
+    out : file
+        stream the report is printed to (default sys.stdout)
+
+    Returns
+    -------
+    dictionary
+        dictionary with keys - position names and values - tuples of
+        evaluations per second by incremental terms and from scratch
+    """
+    rates = {}
+    for name, fen, _ in perft.POSITIONS:
+        game = Game.from_fen(fen)
+        rates[name] = (
+                calls_per_second(game.evaluate, seconds),
+                calls_per_second(lambda: evaluation.blend(
+                        *game.compute_eval_terms()), seconds))
+        print('{:<10} incremental {:>10.0f}/s  scratch {:>10.0f}/s'
+              .format(name, *rates[name]), file=out)
+    return rates
+
+
+def search_report(seconds=1.0, out=sys.stdout):
+    """
+    Measures nodes per second of the alpha-beta search.
+
+    Parameters
+    ----------
+    seconds : float
+        time budget of the search in each position (default 1.0)
+    out : file
+        stream the report is printed to (default sys.stdout)
+
+    Returns
+    -------
+    dictionary
+        dictionary with keys - position names and values - tuples of
+        nodes per second and depth of the last completed iteration
+    """
+    rates = {}
+    for name, fen, _ in perft.POSITIONS:
+        result = engine.Engine().search(Game.from_fen(fen), seconds)
+        rates[name] = (result.nodes / result.seconds, result.depth)
+        print('{:<10} {:>10.0f} nodes/s  depth {}'
+              .format(name, *rates[name]), file=out)
+    return rates
+
+
+def main(argv=None):
+    """
+    Runs benchmark command line interface.
+
+    Parameters
+    ----------
+    argv : list
+        command line arguments (default sys.argv[1:])
+
+    Returns
+    -------
+    int
+        exit status
+    """
+    parser = argparse.ArgumentParser(
+            description='Micro benchmarks of the game library.')
+    parser.add_argument('--seconds', type=float, default=1.0,
+                        help='time to spend on each measurement '
+                             '(default 1.0)')
+    args = parser.parse_args(argv)
+    construction_report(args.seconds)
+    memory_report()
+    movegen_report(args.seconds)
+    replay_report(args.seconds)
+    evaluation_report(args.seconds)
+    search_report(args.seconds)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1035 @@
+"""Bitboard position backend for the chess game library."""
+
+import figures
+import zobrist
+
+WHITE = 0
+BLACK = 1
+COLORS = ('w', 'b')
+
+PAWN = 0
+KNIGHT = 1
+BISHOP = 2
+ROOK = 3
+QUEEN = 4
+KING = 5
+
+EMPTY = -1
+
+LABELS = ('Pw', 'KNw', 'Bw', 'Rw', 'Qw', 'Kw',
+          'Pb', 'KNb', 'Bb', 'Rb', 'Qb', 'Kb')
+VALUES = (1, 3, 3, 5, 8, 0)
+
+FULL = 0xFFFFFFFFFFFFFFFF
+RANK_3 = 0xFF << 16
+RANK_6 = 0xFF << 40
+PROMOTION_RANKS = 0xFF | 0xFF << 56
+
+SQUARE_NAMES = figures.SQUARE_NAMES
+
+FEN_LETTERS = 'PNBRQKpnbrqk'
+FEN_CASTLING = 'KQkq'
+PROMOTION_LETTERS = ('', 'n', 'b', 'r', 'q')
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+CASTLE_WHITE_KING = 1
+CASTLE_WHITE_QUEEN = 2
+CASTLE_BLACK_KING = 4
+CASTLE_BLACK_QUEEN = 8
+CASTLE_ALL = 15
+
+CASTLING_MASK = [CASTLE_ALL] * 64
+CASTLING_MASK[0] &= ~CASTLE_WHITE_QUEEN
+CASTLING_MASK[7] &= ~CASTLE_WHITE_KING
+CASTLING_MASK[4] &= ~(CASTLE_WHITE_KING | CASTLE_WHITE_QUEEN)
+CASTLING_MASK[56] &= ~CASTLE_BLACK_QUEEN
+CASTLING_MASK[63] &= ~CASTLE_BLACK_KING
+CASTLING_MASK[60] &= ~(CASTLE_BLACK_KING | CASTLE_BLACK_QUEEN)
+
+# the same position for the third time is a draw
+REPETITION_COUNT = 3
+# fifty moves of each side without capture or pawn move is a draw
+FIFTY_MOVES_PLIES = 100
+
+FLAG_CAPTURE = 1
+FLAG_DOUBLE_PUSH = 2
+FLAG_EN_PASSANT = 4
+FLAG_CASTLING = 8
+
+NORTH = 0
+EAST = 1
+NORTH_EAST = 2
+NORTH_WEST = 3
+SOUTH = 4
+WEST = 5
+SOUTH_WEST = 6
+SOUTH_EAST = 7
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (-1, 1),
+              (0, -1), (-1, 0), (-1, -1), (1, -1))
+
+
+def _leaper_table(offsets):
+    """
+    Builds table of target squares for a figure making fixed jumps.
+
+    Parameters
+    ----------
+    offsets : tuple
+        tuple of (dx, dy) jumps of the figure
+
+    Returns
+    -------
+    list
+        list (len 64) of bitboards of squares reachable from each square
+    """
+    table = []
+    for sq in range(64):
+        x, y = sq % 8, sq // 8
+        mask = 0
+        for dx, dy in offsets:
+            if -1 < x + dx < 8 and -1 < y + dy < 8:
+                mask |= 1 << (sq + dx + dy * 8)
+        table.append(mask)
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_table(((2, 1), (2, -1), (-2, -1), (-2, 1),
+                                (1, 2), (1, -2), (-1, -2), (-1, 2)))
+KING_ATTACKS = _leaper_table(((0, 1), (1, 1), (1, 0), (1, -1),
+                              (0, -1), (-1, -1), (-1, 0), (-1, 1)))
+PAWN_ATTACKS = (_leaper_table(((-1, 1), (1, 1))),
+                _leaper_table(((-1, -1), (1, -1))))
+
+
+def _ray_table(dx, dy):
+    """
+    Builds table of rays going from each square in one direction.
+
+    Parameters
+    ----------
+    dx : int
+        step of the ray along the rank (-1, 0 or 1)
+    dy : int
+        step of the ray along the file (-1, 0 or 1)
+
+    Returns
+    -------
+    list
+        list (len 64) of bitboards of squares from each square
+        (not including it) to the edge of the board
+    """
+    table = []
+    for sq in range(64):
+        x, y = sq % 8 + dx, sq // 8 + dy
+        mask = 0
+        while -1 < x < 8 and -1 < y < 8:
+            mask |= 1 << (y * 8 + x)
+            x += dx
+            y += dy
+        table.append(mask)
+    return table
+
+
+# RAYS[direction][sq], directions NORTH to NORTH_WEST go to greater squares
+RAYS = [_ray_table(dx, dy) for dx, dy in DIRECTIONS]
+ROOK_RAYS = ((RAYS[NORTH], RAYS[EAST]), (RAYS[SOUTH], RAYS[WEST]))
+BISHOP_RAYS = ((RAYS[NORTH_EAST], RAYS[NORTH_WEST]),
+               (RAYS[SOUTH_WEST], RAYS[SOUTH_EAST]))
+ROOK_MASKS = [RAYS[NORTH][sq] | RAYS[EAST][sq] | RAYS[SOUTH][sq]
+              | RAYS[WEST][sq] for sq in range(64)]
+BISHOP_MASKS = [RAYS[NORTH_EAST][sq] | RAYS[NORTH_WEST][sq]
+                | RAYS[SOUTH_WEST][sq] | RAYS[SOUTH_EAST][sq]
+                for sq in range(64)]
+
+# BETWEEN[sq1][sq2] - squares strictly between, LINE[sq1][sq2] - whole
+# line through both squares (both are 0 if squares are not on one line)
+BETWEEN = [[0] * 64 for sq in range(64)]
+LINE = [[0] * 64 for sq in range(64)]
+for _sq in range(64):
+    for _direction in range(8):
+        _line = (RAYS[_direction][_sq] | RAYS[_direction ^ 4][_sq]
+                 | 1 << _sq)
+        for _to_sq in range(64):
+            if RAYS[_direction][_sq] >> _to_sq & 1:
+                BETWEEN[_sq][_to_sq] = (RAYS[_direction][_sq]
+                                        ^ RAYS[_direction][_to_sq]
+                                        ^ 1 << _to_sq)
+                LINE[_sq][_to_sq] = _line
+
+
+def encode_move(from_sq, to_sq, promotion=0, flags=0):
+    """
+    Packs move into int.
+
+    Parameters
+    ----------
+    from_sq : int
+        square the figure moves from (0 to 63)
+    to_sq : int
+        square the figure moves to (0 to 63)
+    promotion : int
+        type of figure the pawn is promoted to (0 if none)
+    flags : int
+        combination of FLAG_* constants
+
+    Returns
+    -------
+    int
+        packed move
+    """
+    return from_sq | to_sq << 6 | promotion << 12 | flags << 15
+
+
+def move_to_text(move):
+    """
+    Returns move in coordinate notation.
+
+    Parameters
+    ----------
+    move : int
+        packed move
+
+    Returns
+    -------
+    str
+        move like 'e2e4' or 'e7e8q' for promotions
+    """
+    return (SQUARE_NAMES[move & 63] + SQUARE_NAMES[move >> 6 & 63]
+            + PROMOTION_LETTERS[move >> 12 & 7])
+
+
+def format_fen(squares, side, castling, ep_square, halfmove_clock=0,
+               fullmove_number=1):
+    """
+    Returns Forsyth-Edwards Notation string of the position.
+
+    Parameters
+    ----------
+    squares : list
+        list (len 64) of figure codes (color * 6 + type, EMPTY if none)
+    side : int
+        color to move (WHITE or BLACK)
+    castling : int
+        castling rights (combination of CASTLE_* constants)
+    ep_square : int
+        square a pawn can capture en passant to (-1 if none)
+    halfmove_clock : int
+        number of plies since last capture or pawn move (default 0)
+    fullmove_number : int
+        number of the move, starts at 1 and grows after Black's move
+        (default 1)
+
+    Returns
+    -------
+    str
+        FEN string
+    """
+    rows = []
+    for y in range(7, -1, -1):
+        row = ''
+        empty = 0
+        for code in squares[y * 8:y * 8 + 8]:
+            if code == EMPTY:
+                empty += 1
+            else:
+                row += (str(empty) if empty else '') + FEN_LETTERS[code]
+                empty = 0
+        rows.append(row + (str(empty) if empty else ''))
+    return '{} {} {} {} {} {}'.format(
+            '/'.join(rows), COLORS[side],
+            ''.join(FEN_CASTLING[i] for i in range(4) if castling >> i & 1)
+            or '-',
+            SQUARE_NAMES[ep_square] if ep_square >= 0 else '-',
+            halfmove_clock, fullmove_number)
+
+
+def _slider_attacks(sq, occupied, rays):
+    """Returns squares attacked along positive and negative rays."""
+    attacks = 0
+    positive, negative = rays
+    for table in positive:
+        ray = table[sq]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= table[(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for table in negative:
+        ray = table[sq]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= table[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+def rook_attacks(sq, occupied):
+    """
+    Returns bitboard of squares attacked by Rook.
+
+    Parameters
+    ----------
+    sq : int
+        square the figure stays at
+    occupied : int
+        bitboard of all figures on the board
+
+    Returns
+    -------
+    int
+        bitboard of attacked squares (including first blocker in each ray)
+    """
+    return _slider_attacks(sq, occupied, ROOK_RAYS)
+
+
+def bishop_attacks(sq, occupied):
+    """
+    Returns bitboard of squares attacked by Bishop.
+
+    Parameters
+    ----------
+    sq : int
+        square the figure stays at
+    occupied : int
+        bitboard of all figures on the board
+
+    Returns
+    -------
+    int
+        bitboard of attacked squares (including first blocker in each ray)
+    """
+    return _slider_attacks(sq, occupied, BISHOP_RAYS)
+
+
+def iter_squares(bb):
+    """
+    Yields indexes of set bits of the bitboard.
+
+    Parameters
+    ----------
+    bb : int
+        bitboard
+
+    Yields
+    ------
+    int
+        square index (0 to 63)
+    """
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+class Position():
+    """
+    A class used to present chess position as a set of bitboards.
+
+    Square index is y * 8 + x, where x and y are the figures module
+    coordinates, so a1 is 0, h1 is 7 and h8 is 63.
+
+    Attributes
+    ----------
+    pieces : list
+        two lists (white, black) of six bitboards, one per figure type
+    occupancy : list
+        bitboards of all white and all black figures
+    occupied : int
+        bitboard of all figures on the board
+    squares : list
+        list (len 64) of figure codes (color * 6 + type, EMPTY if none)
+    side : int
+        color to move (WHITE or BLACK)
+    castling : int
+        castling rights (combination of CASTLE_* constants)
+    ep_square : int
+        square a pawn can capture en passant to (-1 if none)
+    halfmove_clock : int
+        number of plies since last capture or pawn move
+    fullmove_number : int
+        number of the move, starts at 1 and grows after Black's move
+    hash : int
+        Zobrist key of the position, updated incrementally
+    history : list
+        stack of undo records used by unmake_move
+    repetitions : dict
+        dictionary with keys - hashes of the positions since the start
+        and values - how many times they occured
+    debug_hash : bool
+        if True, hash is checked against compute_hash() after each
+        make_move and unmake_move (default False)
+
+    Methods
+    -------
+    initial()
+        return position at the beginning of the game
+    from_fen(fen)
+        return position described by FEN string
+    to_fen()
+        return FEN string of the position
+    put_piece(sq, code)
+        put figure with code on square sq
+    remove_piece(sq)
+        remove figure from square sq
+    compute_hash()
+        return Zobrist key of the position computed from scratch
+    king_square(color)
+        return square of the color King
+    attackers(sq, color, occupied)
+        return bitboard of color figures attacking square sq
+    is_attacked(sq, color)
+        check if square sq is attacked by color figures
+    in_check()
+        check if the side to move is under check
+    pins(king)
+        return pin rays of figures pinned to the King of the side to move
+    generate_moves(from_sq)
+        return list of pseudo-legal moves
+    legal_moves(from_sq)
+        return list of legal moves filtered by checkers and pins
+    find_move(from_sq, to_sq, promotion)
+        return legal move from from_sq to to_sq (None if impossible)
+    make_move(move)
+        make move and push undo record
+    unmake_move()
+        take back the last move
+    is_checkmate()
+        check if the side to move is checkmated
+    is_stalemate()
+        check if the side to move is stalemated
+    is_repetition()
+        check if the position occured REPETITION_COUNT times
+    is_fifty_moves()
+        check if halfmove clock reached FIFTY_MOVES_PLIES
+    is_draw()
+        check if the game is drawn by stalemate, repetition or fifty-move
+        rule
+    perft(depth)
+        return number of leaf nodes of legal move tree of given depth
+    perft_divide(depth)
+        return perft(depth - 1) after each legal move
+    to_board()
+        return board as list of lists of figure labels
+    """
+
+    debug_hash = False
+
+    def __init__(self):
+        """Init of Position class (empty board, white to move)."""
+        self.pieces = [[0] * 6, [0] * 6]
+        self.occupancy = [0, 0]
+        self.occupied = 0
+        self.squares = [EMPTY] * 64
+        self.side = WHITE
+        self.castling = 0
+        self.ep_square = -1
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.hash = 0
+        self.history = []
+        self.repetitions = {}
+
+    @classmethod
+    def initial(cls):
+        """Returns position at the beginning of the game."""
+        position = cls()
+        order = (ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK)
+        for x in range(8):
+            position.put_piece(x, order[x])
+            position.put_piece(8 + x, PAWN)
+            position.put_piece(48 + x, 6 + PAWN)
+            position.put_piece(56 + x, 6 + order[x])
+        position.castling = CASTLE_ALL
+        position.hash = position.compute_hash()
+        position.repetitions = {position.hash: 1}
+        return position
+
+    @classmethod
+    def from_fen(cls, fen):
+        """
+        Returns position described by Forsyth-Edwards Notation string.
+
+        Parameters
+        ----------
+        fen : str
+            FEN string, halfmove clock and move number fields are optional
+
+        Returns
+        -------
+        Position
+            position described by fen
+
+        Raises
+        ------
+        ValueError
+            if fen is not valid FEN string
+        """
+        fields = fen.split()
+        rows = fields[0].split('/') if fields else []
+        if len(fields) < 4 or len(rows) != 8:
+            raise ValueError('invalid FEN: {!r}'.format(fen))
+
+        position = cls()
+        for y, row in zip(range(7, -1, -1), rows):
+            x = 0
+            for char in row:
+                if char in '12345678':
+                    x += int(char)
+                elif char in FEN_LETTERS and x < 8:
+                    position.put_piece(y * 8 + x, FEN_LETTERS.index(char))
+                    x += 1
+                else:
+                    x = 9
+                    break
+            if x != 8:
+                raise ValueError('invalid FEN: {!r}'.format(fen))
+
+        if fields[1] not in COLORS:
+            raise ValueError('invalid FEN: {!r}'.format(fen))
+        position.side = COLORS.index(fields[1])
+        if fields[2] != '-':
+            for char in fields[2]:
+                if char not in FEN_CASTLING:
+                    raise ValueError('invalid FEN: {!r}'.format(fen))
+                position.castling |= 1 << FEN_CASTLING.index(char)
+        if fields[3] != '-':
+            if fields[3] not in SQUARE_NAMES:
+                raise ValueError('invalid FEN: {!r}'.format(fen))
+            position.ep_square = SQUARE_NAMES.index(fields[3])
+        if len(fields) > 4:
+            if not fields[4].isdigit():
+                raise ValueError('invalid FEN: {!r}'.format(fen))
+            position.halfmove_clock = int(fields[4])
+        if len(fields) > 5:
+            if not fields[5].isdigit() or fields[5] == '0':
+                raise ValueError('invalid FEN: {!r}'.format(fen))
+            position.fullmove_number = int(fields[5])
+        position.hash = position.compute_hash()
+        position.repetitions = {position.hash: 1}
+        return position
+
+    def to_fen(self):
+        """Returns Forsyth-Edwards Notation string of the position."""
+        return format_fen(self.squares, self.side, self.castling,
+                          self.ep_square, self.halfmove_clock,
+                          self.fullmove_number)
+
+    def put_piece(self, sq, code):
+        """
+        Puts figure on empty square.
+
+        Parameters
+        ----------
+        sq : int
+            square index (0 to 63)
+        code : int
+            figure code (color * 6 + type)
+        """
+        bit = 1 << sq
+        color = code // 6
+        self.pieces[color][code % 6] |= bit
+        self.occupancy[color] |= bit
+        self.occupied |= bit
+        self.squares[sq] = code
+        self.hash ^= zobrist.PIECE_KEYS[code][sq]
+
+    def remove_piece(self, sq):
+        """
+        Removes figure from square.
+
+        Parameters
+        ----------
+        sq : int
+            square index (0 to 63)
+
+        Returns
+        -------
+        int
+            code of removed figure
+        """
+        code = self.squares[sq]
+        bit = 1 << sq
+        color = code // 6
+        self.pieces[color][code % 6] ^= bit
+        self.occupancy[color] ^= bit
+        self.occupied ^= bit
+        self.squares[sq] = EMPTY
+        self.hash ^= zobrist.PIECE_KEYS[code][sq]
+        return code
+
+    def _move_piece(self, from_sq, to_sq):
+        """Moves figure from from_sq to empty to_sq."""
+        code = self.squares[from_sq]
+        bits = 1 << from_sq | 1 << to_sq
+        color = code // 6
+        self.pieces[color][code % 6] ^= bits
+        self.occupancy[color] ^= bits
+        self.occupied ^= bits
+        self.squares[from_sq] = EMPTY
+        self.squares[to_sq] = code
+        keys = zobrist.PIECE_KEYS[code]
+        self.hash ^= keys[from_sq] ^ keys[to_sq]
+
+    def compute_hash(self):
+        """Returns Zobrist key of the position computed from scratch."""
+        return zobrist.compute_hash(
+                [(code, sq) for sq, code in enumerate(self.squares)
+                 if code != EMPTY],
+                self.side == BLACK, self.castling, self.ep_square)
+
+    def king_square(self, color):
+        """Returns square of the color King (-1 if there is no King)."""
+        return self.pieces[color][KING].bit_length() - 1
+
+    def attackers(self, sq, color, occupied=None):
+        """
+        Returns figures attacking square.
+
+        Parameters
+        ----------
+        sq : int
+            square index (0 to 63)
+        color : int
+            color of attacking figures
+        occupied : int
+            bitboard of figures blocking sliding figures
+            (default is all figures on the board)
+
+        Returns
+        -------
+        int
+            bitboard of color figures attacking square sq
+        """
+        pieces = self.pieces[color]
+        if occupied is None:
+            occupied = self.occupied
+        diagonal = pieces[BISHOP] | pieces[QUEEN]
+        straight = pieces[ROOK] | pieces[QUEEN]
+        return ((PAWN_ATTACKS[color ^ 1][sq] & pieces[PAWN])
+                | (KNIGHT_ATTACKS[sq] & pieces[KNIGHT])
+                | (KING_ATTACKS[sq] & pieces[KING])
+                | (bishop_attacks(sq, occupied) & diagonal)
+                | (rook_attacks(sq, occupied) & straight))
+
+    def is_attacked(self, sq, color):
+        """Returns True if square sq is attacked by color figures."""
+        return self.attackers(sq, color) != 0
+
+    def in_check(self):
+        """Returns True if the side to move is under check."""
+        king = self.king_square(self.side)
+        return king >= 0 and self.is_attacked(king, self.side ^ 1)
+
+    def pins(self, king):
+        """
+        Finds figures of the side to move pinned to their King.
+
+        Parameters
+        ----------
+        king : int
+            square of the King of the side to move
+
+        Returns
+        -------
+        dictionary
+            dictionary with keys - squares of pinned figures and values -
+            bitboards of squares from the King to the pinning figure
+            (including the latter) the pinned figure can move to
+        """
+        pins = {}
+        own = self.occupancy[self.side]
+        occupied = self.occupied
+        enemy = self.pieces[self.side ^ 1]
+        snipers = ((ROOK_MASKS[king] & (enemy[ROOK] | enemy[QUEEN]))
+                   | (BISHOP_MASKS[king] & (enemy[BISHOP] | enemy[QUEEN])))
+        for sniper in iter_squares(snipers):
+            line = BETWEEN[king][sniper]
+            blockers = line & occupied
+            if blockers & own and not blockers & (blockers - 1):
+                pins[blockers.bit_length() - 1] = line | 1 << sniper
+        return pins
+
+    def generate_moves(self, from_sq=None):
+        """
+        Returns pseudo-legal moves of the side to move.
+
+        Parameters
+        ----------
+        from_sq : int
+            if given, only moves of the figure at this square are
+            generated
+
+        Returns
+        -------
+        list
+            list of packed moves, King may be left under attack
+        """
+        moves = []
+        side = self.side
+        pieces = self.pieces[side]
+        own = self.occupancy[side]
+        enemy = self.occupancy[side ^ 1]
+        empty = ~self.occupied & FULL
+        origins = FULL if from_sq is None else 1 << from_sq
+
+        pawns = pieces[PAWN] & origins
+        if side == WHITE:
+            forward = 8
+            single = (pawns << 8) & empty
+            double = ((single & RANK_3) << 8) & empty
+        else:
+            forward = -8
+            single = (pawns >> 8) & empty
+            double = ((single & RANK_6) >> 8) & empty
+        for to_sq in iter_squares(single):
+            self._add_pawn_move(moves, to_sq - forward, to_sq, 0)
+        for to_sq in iter_squares(double):
+            moves.append(encode_move(to_sq - 2 * forward, to_sq,
+                                     0, FLAG_DOUBLE_PUSH))
+        pawn_attacks = PAWN_ATTACKS[side]
+        ep_bit = 1 << self.ep_square if self.ep_square >= 0 else 0
+        for from_sq in iter_squares(pawns):
+            attacks = pawn_attacks[from_sq]
+            for to_sq in iter_squares(attacks & enemy):
+                self._add_pawn_move(moves, from_sq, to_sq, FLAG_CAPTURE)
+            if attacks & ep_bit:
+                moves.append(encode_move(from_sq, self.ep_square, 0,
+                                         FLAG_CAPTURE | FLAG_EN_PASSANT))
+
+        occupied = self.occupied
+        for ptype in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            for from_sq in iter_squares(pieces[ptype] & origins):
+                if ptype == KNIGHT:
+                    targets = KNIGHT_ATTACKS[from_sq]
+                elif ptype == KING:
+                    targets = KING_ATTACKS[from_sq]
+                elif ptype == BISHOP:
+                    targets = bishop_attacks(from_sq, occupied)
+                elif ptype == ROOK:
+                    targets = rook_attacks(from_sq, occupied)
+                else:
+                    targets = (bishop_attacks(from_sq, occupied)
+                               | rook_attacks(from_sq, occupied))
+                targets &= ~own
+                for to_sq in iter_squares(targets & enemy):
+                    moves.append(encode_move(from_sq, to_sq,
+                                             0, FLAG_CAPTURE))
+                for to_sq in iter_squares(targets & empty):
+                    moves.append(encode_move(from_sq, to_sq))
+
+        if pieces[KING] & origins:
+            self._add_castlings(moves)
+        return moves
+
+    def _add_pawn_move(self, moves, from_sq, to_sq, flags):
+        """Appends pawn move, expanded to promotions on the last rank."""
+        if (1 << to_sq) & PROMOTION_RANKS:
+            for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                moves.append(encode_move(from_sq, to_sq, promotion, flags))
+        else:
+            moves.append(encode_move(from_sq, to_sq, 0, flags))
+
+    def _add_castlings(self, moves):
+        """Appends castlings allowed by rights, free and safe path."""
+        side = self.side
+        if side == WHITE:
+            king_side, queen_side, king = (CASTLE_WHITE_KING,
+                                           CASTLE_WHITE_QUEEN, 4)
+        else:
+            king_side, queen_side, king = (CASTLE_BLACK_KING,
+                                           CASTLE_BLACK_QUEEN, 60)
+        if not self.castling & (king_side | queen_side):
+            return
+        enemy = side ^ 1
+        if self.is_attacked(king, enemy):
+            return
+        occupied = self.occupied
+        if (self.castling & king_side
+                and not occupied & (0b11 << (king + 1))
+                and not self.is_attacked(king + 1, enemy)
+                and not self.is_attacked(king + 2, enemy)):
+            moves.append(encode_move(king, king + 2, 0, FLAG_CASTLING))
+        if (self.castling & queen_side
+                and not occupied & (0b111 << (king - 3))
+                and not self.is_attacked(king - 1, enemy)
+                and not self.is_attacked(king - 2, enemy)):
+            moves.append(encode_move(king, king - 2, 0, FLAG_CASTLING))
+
+    def legal_moves(self, from_sq=None):
+        """
+        Returns legal moves of the side to move.
+
+        Parameters
+        ----------
+        from_sq : int
+            if given, only moves of the figure at this square are
+            generated and checked
+
+        Returns
+        -------
+        list
+            list of packed moves which do not leave own King under attack
+        """
+        side = self.side
+        enemy = side ^ 1
+        king = self.king_square(side)
+        if king < 0:
+            return self.generate_moves(from_sq)
+
+        checkers = self.attackers(king, enemy)
+        if checkers & (checkers - 1):
+            targets = 0
+        elif checkers:
+            targets = checkers | BETWEEN[king][checkers.bit_length() - 1]
+        else:
+            targets = FULL
+        pins = self.pins(king)
+        without_king = self.occupied ^ 1 << king
+
+        legal = []
+        for move in self.generate_moves(from_sq):
+            start = move & 63
+            to_sq = move >> 6 & 63
+            if start == king:
+                if (move >> 15 & FLAG_CASTLING
+                        or not self.attackers(to_sq, enemy, without_king)):
+                    legal.append(move)
+            elif move >> 15 & FLAG_EN_PASSANT:
+                # the captured pawn may uncover the King along the rank
+                self.make_move(move)
+                if not self.is_attacked(king, enemy):
+                    legal.append(move)
+                self.unmake_move()
+            elif (targets >> to_sq & 1
+                    and (start not in pins or pins[start] >> to_sq & 1)):
+                legal.append(move)
+        return legal
+
+    def find_move(self, from_sq, to_sq, promotion=QUEEN):
+        """
+        Returns legal move between two squares.
+
+        Parameters
+        ----------
+        from_sq : int
+            square the figure moves from
+        to_sq : int
+            square the figure moves to
+        promotion : int
+            type of figure the pawn is promoted to (default QUEEN)
+
+        Returns
+        -------
+        int
+            packed legal move
+        None
+            if there is no such legal move
+        """
+        for move in self.legal_moves(from_sq):
+            if move >> 6 & 63 == to_sq and move >> 12 & 7 in (0, promotion):
+                return move
+        return None
+
+    def make_move(self, move):
+        """
+        Makes move and pushes undo record to history.
+
+        Parameters
+        ----------
+        move : int
+            packed pseudo-legal move
+
+        Returns
+        -------
+        int
+            code of captured figure (EMPTY if nothing was captured)
+        """
+        from_sq = move & 63
+        to_sq = move >> 6 & 63
+        promotion = move >> 12 & 7
+        flags = move >> 15
+        side = self.side
+
+        key = self.hash
+        ep_key = zobrist.ep_key(self.ep_square, self.pieces[side][PAWN])
+        captured = self.squares[to_sq]
+        if flags & FLAG_EN_PASSANT:
+            captured = self.remove_piece(to_sq - 8 if side == WHITE
+                                         else to_sq + 8)
+        elif captured != EMPTY:
+            self.remove_piece(to_sq)
+        self.history.append((move, captured, self.castling,
+                             self.ep_square, self.halfmove_clock, key))
+
+        moving = self.squares[from_sq]
+        self._move_piece(from_sq, to_sq)
+        if promotion:
+            self.remove_piece(to_sq)
+            self.put_piece(to_sq, side * 6 + promotion)
+        if flags & FLAG_CASTLING:
+            if to_sq > from_sq:
+                self._move_piece(from_sq + 3, from_sq + 1)
+            else:
+                self._move_piece(from_sq - 4, from_sq - 1)
+
+        castling = self.castling
+        self.castling &= CASTLING_MASK[from_sq] & CASTLING_MASK[to_sq]
+        key = (self.hash ^ zobrist.SIDE_KEY ^ zobrist.CASTLING_KEYS[castling]
+               ^ zobrist.CASTLING_KEYS[self.castling] ^ ep_key)
+        if flags & FLAG_DOUBLE_PUSH:
+            self.ep_square = (from_sq + to_sq) // 2
+            key ^= zobrist.ep_key(self.ep_square,
+                                  self.pieces[side ^ 1][PAWN])
+        else:
+            self.ep_square = -1
+        self.hash = key
+        self.repetitions[key] = self.repetitions.get(key, 0) + 1
+        if moving % 6 == PAWN or captured != EMPTY:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        self.fullmove_number += side
+        self.side = side ^ 1
+        if self.debug_hash:
+            self._verify_hash()
+        return captured
+
+    def unmake_move(self):
+        """
+        Takes back the last made move.
+
+        Returns
+        -------
+        int
+            packed move which was taken back
+        """
+        if self.repetitions[self.hash] > 1:
+            self.repetitions[self.hash] -= 1
+        else:
+            del self.repetitions[self.hash]
+        move, captured, castling, ep_square, halfmove_clock, key = (
+                self.history.pop())
+        from_sq = move & 63
+        to_sq = move >> 6 & 63
+        flags = move >> 15
+        side = self.side ^ 1
+        self.side = side
+        self.fullmove_number -= side
+
+        if move >> 12 & 7:
+            self.remove_piece(to_sq)
+            self.put_piece(to_sq, side * 6 + PAWN)
+        self._move_piece(to_sq, from_sq)
+        if flags & FLAG_CASTLING:
+            if to_sq > from_sq:
+                self._move_piece(from_sq + 1, from_sq + 3)
+            else:
+                self._move_piece(from_sq - 1, from_sq - 4)
+        if flags & FLAG_EN_PASSANT:
+            self.put_piece(to_sq - 8 if side == WHITE else to_sq + 8,
+                           captured)
+        elif captured != EMPTY:
+            self.put_piece(to_sq, captured)
+
+        self.castling = castling
+        self.ep_square = ep_square
+        self.halfmove_clock = halfmove_clock
+        self.hash = key
+        if self.debug_hash:
+            self._verify_hash()
+        return move
+
+    def _verify_hash(self):
+        """Raises RuntimeError if hash differs from compute_hash()."""
+        if self.hash != self.compute_hash():
+            raise RuntimeError('Zobrist key {:016x} differs from {:016x}'
+                               .format(self.hash, self.compute_hash()))
+
+    def is_checkmate(self):
+        """Returns True if the side to move is checkmated."""
+        return self.in_check() and not self.legal_moves()
+
+    def is_stalemate(self):
+        """Returns True if the side to move is stalemated."""
+        return not self.in_check() and not self.legal_moves()
+
+    def is_repetition(self):
+        """Returns True if the position occured REPETITION_COUNT times."""
+        return self.repetitions.get(self.hash, 0) >= REPETITION_COUNT
+
+    def is_fifty_moves(self):
+        """Returns True if halfmove clock reached FIFTY_MOVES_PLIES."""
+        return self.halfmove_clock >= FIFTY_MOVES_PLIES
+
+    def is_draw(self):
+        """
+        Returns True if the game is drawn in the position.
+
+        It is drawn if the side to move is stalemated, or the position
+        is repeated or fifty moves passed and it isn't checkmated.
+        """
+        if self.is_repetition() or self.is_fifty_moves():
+            return not self.is_checkmate()
+        return self.is_stalemate()
+
+    def perft(self, depth):
+        """
+        Counts leaf nodes of the legal move tree.
+
+        Parameters
+        ----------
+        depth : int
+            depth of the tree in plies
+
+        Returns
+        -------
+        int
+            number of positions reachable in exactly depth plies
+        """
+        if depth == 0:
+            return 1
+        moves = self.legal_moves()
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            self.make_move(move)
+            nodes += self.perft(depth - 1)
+            self.unmake_move()
+        return nodes
+
+    def perft_divide(self, depth):
+        """
+        Counts leaf nodes of the legal move tree per first move.
+
+        Parameters
+        ----------
+        depth : int
+            depth of the tree in plies (at least 1)
+
+        Returns
+        -------
+        dictionary
+            dictionary with keys - moves in coordinate notation and
+            values - perft(depth - 1) of the position after the move
+        """
+        divide = {}
+        for move in self.legal_moves():
+            self.make_move(move)
+            divide[move_to_text(move)] = self.perft(depth - 1)
+            self.unmake_move()
+        return dict(sorted(divide.items()))
+
+    def to_board(self):
+        """
+        Returns board in the Game.board format.
+
+        Returns
+        -------
+        list
+            list (len 8) of lists (len 8) where each element is string
+            (' ' if there is no figure and figure label otherwise)
+        """
+        squares = self.squares
+        return [[' ' if squares[y * 8 + x] == EMPTY
+                 else LABELS[squares[y * 8 + x]]
+                 for y in range(8)] for x in range(8)]
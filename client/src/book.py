@@ -0,0 +1,403 @@
+"""Opening book of the engine in memory-mapped binary file."""
+
+import argparse
+import bisect
+import mmap
+import os
+import pickle
+import random
+import struct
+import sys
+import engine
+import figures
+from chess_game import Game, parse_move
+from zobrist import table_key
+
+# header of the book: magic and number of entries
+HEADER = struct.Struct('>8sQ')
+MAGIC = b'CHSBOOK1'
+# entry of the book: key of the position, packed move, weight and
+# number of games the move was played in
+ENTRY = struct.Struct('>QHHI')
+MAX_WEIGHT = 0xffff
+MAX_GAMES = 0xffffffff
+
+# moves of the game longer than this aren't put into the book
+DEFAULT_PLIES = 20
+# weights the move gets for the result of the game for its player
+WIN_WEIGHT = 2
+DRAW_WEIGHT = 1
+UNKNOWN_WEIGHT = 1
+
+# results of the game in the collection
+RESULTS = {'1-0': 'w', '0-1': 'b', '1/2-1/2': 'draw', '*': None}
+
+BOOK_VARIABLE = 'CHESS_BOOK'
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), 'opening.book')
+
+
+class _Keys():
+    """Sequence of position keys of the book entries for bisect."""
+
+    def __init__(self, buffer, entries):
+        self._buffer = buffer
+        self._entries = entries
+
+    def __len__(self):
+        return self._entries
+
+    def __getitem__(self, index):
+        return ENTRY.unpack_from(self._buffer,
+                                 HEADER.size + index * ENTRY.size)[0]
+
+
+class OpeningBook():
+    """
+    A class used to look up moves of the position in the opening book.
+
+    The book file is a header and entries sorted by 64-bit key of the
+    position (zobrist.table_key of Game.position_key()), entries of
+    the same position are sorted by weight descending. The file is
+    mapped to memory and searched by bisection, so the book opens at
+    once whatever its size is, and processes reading one book share
+    its pages in the page cache.
+
+    Attributes
+    ----------
+    path : str
+        path of the book file
+    entries : int
+        number of entries (position and move) in the book
+
+    Methods
+    -------
+    probe(game)
+        return legal moves of the book in the game position
+    choose(game, rng)
+        return random move of the book by weights
+    close()
+        unmap the book file
+    """
+
+    def __init__(self, path):
+        """
+        Init of OpeningBook class.
+
+        Parameters
+        ----------
+        path : str
+            path of the book file written by write_book
+
+        Raises
+        ------
+        ValueError
+            if the file isn't an opening book
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError('{} is not an opening book'.format(path))
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.entries = HEADER.unpack_from(self._map)
+        if (magic != MAGIC
+                or size != HEADER.size + self.entries * ENTRY.size):
+            self._map.close()
+            raise ValueError('{} is not an opening book'.format(path))
+        self._keys = _Keys(self._map, self.entries)
+
+    def __len__(self):
+        """Returns number of entries in the book."""
+        return self.entries
+
+    def __enter__(self):
+        """Returns the book itself for with statement."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Closes the book at the end of with statement."""
+        self.close()
+
+    def probe(self, game):
+        """
+        Returns legal moves of the book in the game position.
+
+        Moves are checked against legal moves of the position, so
+        entries of another position with the same key are skipped.
+
+        Parameters
+        ----------
+        game : Game
+            game to look up the position of
+
+        Returns
+        -------
+        list
+            tuples of move in the form 'e2e4', weight and number of
+            games, by weight descending
+        """
+        key = table_key(game.position_key())
+        index = bisect.bisect_left(self._keys, key)
+        legal = set(game.iter_legal_moves())
+        moves = []
+        while index < self.entries:
+            entry = ENTRY.unpack_from(self._map,
+                                      HEADER.size + index * ENTRY.size)
+            if entry[0] != key:
+                break
+            if entry[1] in legal:
+                moves.append((engine.move_name(entry[1]), entry[2],
+                              entry[3]))
+            index += 1
+        return moves
+
+    def choose(self, game, rng=random):
+        """
+        Returns random move of the book in the game position by weights.
+
+        Parameters
+        ----------
+        game : Game
+            game to look up the position of
+        rng : random.Random
+            source of random numbers (default random module)
+
+        Returns
+        -------
+        str
+            move in the form 'e2e4' (None if the position isn't in the
+            book)
+        """
+        moves = self.probe(game)
+        if not moves:
+            return None
+        return rng.choices([move for move, _, _ in moves],
+                           [weight for _, weight, _ in moves])[0]
+
+    def close(self):
+        """Unmaps the book file."""
+        self._map.close()
+
+
+def open_book(path=None):
+    """
+    Opens the opening book if it exists.
+
+    Parameters
+    ----------
+    path : str
+        path of the book file (default value of CHESS_BOOK environment
+        variable or DEFAULT_PATH if it isn't set)
+
+    Returns
+    -------
+    OpeningBook
+        the book (None if there is no book file)
+    """
+    if path is None:
+        path = os.environ.get(BOOK_VARIABLE, DEFAULT_PATH)
+    if not os.path.isfile(path):
+        return None
+    return OpeningBook(path)
+
+
+def count_moves(games, max_plies=DEFAULT_PLIES):
+    """
+    Counts weights of the moves made in the positions of the games.
+
+    The move gets WIN_WEIGHT if its player won the game, DRAW_WEIGHT
+    for a draw, UNKNOWN_WEIGHT if the result is unknown and nothing if
+    the player lost. The game is counted up to the first impossible
+    move.
+
+    Parameters
+    ----------
+    games : iterable
+        tuples of moves accepted by parse_move and the result - 'w' or
+        'b' for the winner, 'draw' or None if it is unknown
+    max_plies : int
+        number of the first moves of each game counted
+        (default DEFAULT_PLIES)
+
+    Returns
+    -------
+    dictionary
+        dictionary with keys - tuples of position key and packed move
+        and values - lists of weight and number of games
+    """
+    counts = {}
+    for moves, result in games:
+        game = Game('w')
+        game.move_cache = None
+        plies = 0
+        for move in moves:
+            coordinates = parse_move(move)
+            if coordinates is None:
+                continue
+            if plies >= max_plies or coordinates[1] not in figures.SQUARES:
+                break
+            packed = (figures.SQUARES[coordinates[0]]
+                      | figures.SQUARES[coordinates[1]] << 6)
+            if packed not in game.iter_legal_moves():
+                break
+            if result is None:
+                weight = UNKNOWN_WEIGHT
+            elif result == 'draw':
+                weight = DRAW_WEIGHT
+            else:
+                weight = WIN_WEIGHT if result == game.current_player else 0
+            count = counts.setdefault(
+                    (table_key(game.position_key()), packed), [0, 0])
+            count[0] += weight
+            count[1] += 1
+            game.make_packed_move(packed)
+            plies += 1
+    return counts
+
+
+def history_games(history):
+    """
+    Returns games of the server history for count_moves.
+
+    Parameters
+    ----------
+    history : list
+        GameHistory.history of the server - lists of players, result
+        (name of the winner or 'draw') and story of the game
+
+    Returns
+    -------
+    list
+        tuples of moves and result ('w', 'b', 'draw' or None)
+    """
+    games = []
+    for player1, player2, result, story in history:
+        if not story:
+            continue
+        white = story[0][0]
+        if result == 'draw':
+            winner = 'draw'
+        elif result == white:
+            winner = 'w'
+        elif result in (player1, player2):
+            winner = 'b'
+        else:
+            winner = None
+        games.append(([move for _, move in story], winner))
+    return games
+
+
+def read_games(lines):
+    """
+    Returns games of the collection for count_moves.
+
+    Each line is a game: moves in the form 'e2e4' separated by spaces
+    and optionally the result '1-0', '0-1', '1/2-1/2' or '*'. Move
+    numbers like '1.' are skipped, lines starting with '#' are
+    comments.
+
+    Parameters
+    ----------
+    lines : iterable
+        lines of the collection
+
+    Returns
+    -------
+    list
+        tuples of moves and result ('w', 'b', 'draw' or None)
+    """
+    games = []
+    for line in lines:
+        words = line.split()
+        if not words or words[0].startswith('#'):
+            continue
+        result = None
+        if words[-1] in RESULTS:
+            result = RESULTS[words.pop()]
+        games.append(([word for word in words
+                       if parse_move(word) is not None], result))
+    return games
+
+
+def write_book(path, counts):
+    """
+    Writes the opening book file.
+
+    Moves which got no weight aren't written.
+
+    Parameters
+    ----------
+    path : str
+        path of the book file
+    counts : dictionary
+        count_moves result
+
+    Returns
+    -------
+    int
+        number of entries written
+    """
+    entries = sorted(((key, -weight, move, games)
+                      for (key, move), (weight, games) in counts.items()
+                      if weight > 0))
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, len(entries)))
+        for key, weight, move, games in entries:
+            file.write(ENTRY.pack(key, move, min(-weight, MAX_WEIGHT),
+                                  min(games, MAX_GAMES)))
+    return len(entries)
+
+
+def main(argv=None):
+    """
+    Runs opening book command line interface.
+
+    Parameters
+    ----------
+    argv : list
+        command line arguments (default sys.argv[1:])
+
+    Returns
+    -------
+    int
+        exit status
+    """
+    parser = argparse.ArgumentParser(
+            description='Build or probe the opening book.')
+    parser.add_argument('--book', default=DEFAULT_PATH,
+                        help='path of the book file (default {})'
+                             .format(DEFAULT_PATH))
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='build the book of games')
+    build.add_argument('--history', action='append', default=[],
+                       help='game history dump of the server')
+    build.add_argument('--games', action='append', default=[],
+                       help='collection of games, one game per line')
+    build.add_argument('--plies', type=int, default=DEFAULT_PLIES,
+                       help='moves of each game put into the book '
+                            '(default {})'.format(DEFAULT_PLIES))
+    probe = commands.add_parser('probe', help='print moves of the book')
+    probe.add_argument('moves', nargs='*',
+                       help='moves made from the start position')
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        games = []
+        for path in args.history:
+            with open(path, 'rb') as file:
+                games += history_games(pickle.load(file))
+        for path in args.games:
+            with open(path) as file:
+                games += read_games(file)
+        entries = write_book(args.book, count_moves(games, args.plies))
+        print('{} games, {} entries'.format(len(games), entries))
+        return 0
+    game = Game('w')
+    game.replay(args.moves, trusted=False)
+    with OpeningBook(args.book) as book:
+        for move, weight, games in book.probe(game):
+            print('{} weight {:>5} games {:>5}'.format(move, weight, games))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,11 +6,17 @@ import threading
 import readline
 import socket
 import shlex
-from chess_game import Game
+from chess_game import new_game, Game, MOVE_ILLEGAL, MOVE_CHECKMATE
+from chess_game import DRAW_KINDS
+from figures import SQUARE_NAMES
 from internationalization import _
 from server_answer import server_answer
+from book import open_book
+import engine
 import locale
 
+HINT_SECONDS = 1.0
+
 
 class chess_client(cmd.Cmd):
     """
@@ -44,10 +50,16 @@ class chess_client(cmd.Cmd):
         Send play request or accept play request
     complete_play(self, text: str, line: str, begidx: int, endidx: int) -> list
         Complete play command
+    print_play_answer(self, answer: str) -> None
+        Start the game if server started it and print server answer
+    do_play_computer(self, arg: str) -> None
+        Start game with the computer
     do_move(self, arg: str) -> None
         Make a move in chess play
     complete_move(self, text: str, line: str, begidx: int, endidx: int) -> list
         Complete move command
+    do_hint(self, arg: str) -> None
+        Print move suggested by the opening book or the engine
     do_draw(self, arg) -> None
         Send draw request or agree with draw
     complete_draw(self, text: str, line: str, begidx: itn, endidx: int) -> list
@@ -80,6 +92,7 @@ class chess_client(cmd.Cmd):
         self.name = ""
         self.game = None
         self.draw_request = False
+        self.book = open_book()
 
     def request_num(self) -> int:
         """
@@ -399,15 +412,48 @@ class chess_client(cmd.Cmd):
             self.write_to_server("play " + arg[0], num)
             self.wait_request_ans(num)
             if self.request[num]:
-                if "start_game" in self.request[num]:
-                    color = int(self.request[num].split()[-1][0])
-                    msg = self.request[num].split()[0]
-                    color = "w" if not color else "b"
-                    self.game = Game(color)
-                    print(_(server_answer[msg]).format(color))
-                    print(self.game.get_board())
-                else:
-                    print(_(server_answer[self.request[num]]))
+                self.print_play_answer(self.request[num])
+
+    def print_play_answer(self, answer: str) -> None:
+        """
+        Start the game if server started it and print server answer.
+
+        Parameters
+        ----------
+        answer : str
+            Answer of the server to play request
+        """
+        if "start_game" in answer:
+            color = int(answer.split()[-1][0])
+            msg = answer.split()[0]
+            color = "w" if not color else "b"
+            self.game = new_game(color)
+            print(_(server_answer[msg]).format(color))
+            print(self.game.get_board())
+        else:
+            print(_(server_answer[answer]))
+
+    def do_play_computer(self, arg: str) -> None:
+        """
+        Start game with the computer.
+
+        Parameters
+        ----------
+        arg : str
+            May contain seconds the computer thinks on each move
+        """
+        arg = shlex.split(arg)
+        if len(arg) > 1:
+            print(_("More arguments"))
+        elif arg and not arg[0].replace(".", "", 1).isdigit():
+            print(_("Incorrect argument"))
+        else:
+            num = self.request_num()
+            self.request[num] = None
+            self.write_to_server(" ".join(["play_computer"] + arg), num)
+            self.wait_request_ans(num)
+            if self.request[num]:
+                self.print_play_answer(self.request[num])
 
     def complete_play(
             self, text: str, line: str, begidx: int, endidx: int) -> list:
@@ -469,14 +515,15 @@ class chess_client(cmd.Cmd):
         else:
             move = [arg[0][0:2], arg[0][2:4]]
 
-            if not self.game.isPossibleMove(move[0], move[1]):
+            kind = self.game.classify_move(move[0], move[1])[0]
+            if kind == MOVE_ILLEGAL:
                 print(_("It is impossiple move"))
                 return
 
             msg = "ok"
-            if self.game.isWinMove(move[0], move[1]):
+            if kind == MOVE_CHECKMATE:
                 msg = "win"
-            if self.game.isDrawMove(move[0], move[1]):
+            elif kind in DRAW_KINDS:
                 msg = "draw"
 
             self.game.move(move[0], move[1])
@@ -515,17 +562,47 @@ class chess_client(cmd.Cmd):
         Returns
         -------
         list
-            Possible moves with the current start
+            Legal moves with the current start
         """
         words = (line[:endidx] + ".").split()
         complition = []
         match len(words):
             case 2:
-                for start, ends in self.game.get_possible_moves().items():
-                    for end in ends:
-                        complition.append(start+end)
+                if self.game is None or not self.game.isMyMove():
+                    return []
+                for start in SQUARE_NAMES:
+                    if start.startswith(text[:2]):
+                        for end in self.game.legal_moves_from(start):
+                            complition.append(start+end)
 
-        return [c for c in complition if c.startswith(text)]
+        return sorted(c for c in complition if c.startswith(text))
+
+    def do_hint(self, arg: str) -> None:
+        """
+        Print move suggested by the opening book or the engine.
+
+        Parameters
+        ----------
+        arg : str
+            May contain seconds the engine thinks if the position isn't
+            in the opening book
+        """
+        arg = shlex.split(arg)
+        if self.game is None:
+            print(_("You dont play now"))
+        elif not self.game.isMyMove():
+            print(_("Now not you move"))
+        elif len(arg) > 1:
+            print(_("More arguments"))
+        elif arg and not arg[0].replace(".", "", 1).isdigit():
+            print(_("Incorrect argument"))
+        else:
+            game = self.game
+            if not isinstance(game, Game):
+                game = Game.from_fen(game.to_fen(), game.player)
+            seconds = float(arg[0]) if arg else HINT_SECONDS
+            move = engine.best_move(game, seconds, book=self.book)
+            print(_("Hint: {}").format(move))
 
     def do_draw(self, arg: str) -> None:
         """
@@ -663,7 +740,7 @@ class chess_client(cmd.Cmd):
                     msg = data.split()[0]
                     color = "w" if not color else "b"
                     msg = _(server_answer[msg]).format(color)
-                    self.game = Game(color)
+                    self.game = new_game(color)
                     board = self.game.get_board()
                     print(f"\n{msg}\n{board}\n{self.prompt}" +
                           f"{readline.get_line_buffer()}", end="", flush=True)
@@ -707,7 +784,7 @@ class chess_client(cmd.Cmd):
                 else:
                     if "opponent_refused_draw" in data:
                         self.draw_request = False
-                    if data == "draw":
+                    if data in ("draw", "computer_error"):
                         self.game = None
                         self.draw_request = False
                     data = _(server_answer[data])
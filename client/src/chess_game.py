@@ -1,7 +1,13 @@
 """Client-side chess game library."""
 
-import copy
+import collections
+import os
+import sys
 import figures
+import bitboard
+import evaluation
+import mailbox88
+import zobrist
 
 
 WHITE_START_FIGURES = ([figures.King(4, 0, 'w'), figures.Queen(3, 0, 'w')]
@@ -17,6 +23,42 @@ BLACK_START_FIGURES = ([figures.King(4, 7, 'b'), figures.Queen(3, 7, 'b')]
 
 EMPTY_BOARD = [[' ' for i in range(8)] for j in range(8)]
 
+LABEL_CODES = {label: code for code, label in enumerate(bitboard.LABELS)}
+
+
+def _start_template():
+    """Returns start board, hash and evaluation terms, fills start moves."""
+    board = [line[:] for line in EMPTY_BOARD]
+    for fig in WHITE_START_FIGURES + BLACK_START_FIGURES:
+        board[fig.x][fig.y] = fig.label
+    for fig in WHITE_START_FIGURES + BLACK_START_FIGURES:
+        fig.update_possible_moves(board)
+    pieces = [(LABEL_CODES[fig.label], fig.y * 8 + fig.x)
+              for fig in WHITE_START_FIGURES + BLACK_START_FIGURES]
+    key = zobrist.compute_hash(pieces, False, bitboard.CASTLE_ALL, -1)
+    return (tuple(tuple(line) for line in board), key,
+            evaluation.compute_terms(pieces))
+
+
+# start figures keep their possible moves, so Game() only copies them
+START_BOARD, START_HASH, START_EVAL_TERMS = _start_template()
+
+# figure classes by bitboard figure type and order of figures in Game lists
+FIGURE_CLASSES = (figures.Pawn, figures.Knight, figures.Bishop,
+                  figures.Rook, figures.Queen, figures.King)
+FIGURE_ORDER = (figures.King, figures.Queen, figures.Rook,
+                figures.Knight, figures.Bishop, figures.Pawn)
+
+MOVE_ILLEGAL = 'illegal'
+MOVE_NORMAL = 'normal'
+MOVE_CHECK = 'check'
+MOVE_CHECKMATE = 'checkmate'
+MOVE_STALEMATE = 'stalemate'
+MOVE_REPETITION = 'repetition'
+MOVE_FIFTY_MOVES = 'fifty moves'
+# kinds of moves which end the game in a draw
+DRAW_KINDS = (MOVE_STALEMATE, MOVE_REPETITION, MOVE_FIFTY_MOVES)
+
 BOARD_TEMPLATE_WHITE = """
    a    b    c    d    e    f    g    h
  ┌────┬────┬────┬────┬────┬────┬────┬────┐
@@ -61,6 +103,258 @@ BOARD_TEMPLATE_BLACK = """
 """
 
 
+def format_board(board, player):
+    """
+    Returns board as string in "pretty" format.
+
+    Parameters
+    ----------
+    board : list
+        list (len 8) of lists (len 8) of figure labels
+    player : str
+        color of the figures the player plays with, the board is shown
+        from this side ('w' - white, 'b' - black)
+
+    Returns
+    -------
+    str
+        board filled into BOARD_TEMPLATE_WHITE or BOARD_TEMPLATE_BLACK
+    """
+    if player == 'w':
+        return BOARD_TEMPLATE_WHITE.format(*[board[i][j]
+                                           for j in range(7, -1, -1)
+                                           for i in range(8)])
+    else:
+        return BOARD_TEMPLATE_BLACK.format(*[board[7 - i][7 - j]
+                                           for j in range(7, -1, -1)
+                                           for i in range(8)])
+
+
+def parse_move(move):
+    """
+    Returns coordinates of recorded move.
+
+    Parameters
+    ----------
+    move : str or tuple
+        move in the form of the server ('e2e4' followed by ':' and
+        the result of the game if it is over) or tuple of human-like
+        coordinates ('e2', 'e4')
+
+    Returns
+    -------
+    tuple
+        human-like coordinates of the ceils figure is moved from and to
+    None
+        if the record isn't a move ('give_up', 'draw')
+    """
+    if not isinstance(move, str):
+        return tuple(move)
+    move = move.split(':')[0]
+    if len(move) != 4 or move[:2] not in figures.SQUARES:
+        return None
+    return move[:2], move[2:]
+
+
+def replay_moves(moves, make, snapshot, plies=()):
+    """
+    Makes recorded moves in a game.
+
+    Parameters
+    ----------
+    moves : iterable
+        moves accepted by parse_move, records which aren't moves are
+        skipped
+    make : callable
+        function making the move given coordinates, returns False if
+        the move is impossible
+    snapshot : callable
+        function returning snapshot of the position
+    plies : collection
+        numbers of moves made after which snapshot is saved
+        (0 is the position before the first move)
+
+    Returns
+    -------
+    dict
+        dictionary with keys - plies and values - snapshots
+
+    Raises
+    ------
+    ValueError
+        if the move is impossible
+    """
+    snapshots = {}
+    ply = 0
+    if ply in plies:
+        snapshots[ply] = snapshot()
+    for move in moves:
+        coordinates = parse_move(move)
+        if coordinates is None:
+            continue
+        if not make(*coordinates):
+            raise ValueError('impossible move {}{} after {} moves'
+                             .format(coordinates[0], coordinates[1], ply))
+        ply += 1
+        if ply in plies:
+            snapshots[ply] = snapshot()
+    return snapshots
+
+
+def draw_by_rules(position, kind):
+    """
+    Returns kind of the position corrected by draw rules.
+
+    Parameters
+    ----------
+    position : Game, bitboard.Position or mailbox88.Position
+        position with is_repetition() and is_fifty_moves() methods
+    kind : str
+        MOVE_NORMAL, MOVE_CHECK, MOVE_CHECKMATE or MOVE_STALEMATE
+        for the side to move
+
+    Returns
+    -------
+    str
+        MOVE_REPETITION or MOVE_FIFTY_MOVES if the game isn't over
+        by checkmate or stalemate but is drawn by these rules,
+        kind otherwise
+    """
+    if kind in (MOVE_NORMAL, MOVE_CHECK):
+        if position.is_repetition():
+            return MOVE_REPETITION
+        if position.is_fifty_moves():
+            return MOVE_FIFTY_MOVES
+    return kind
+
+
+class MoveCache():
+    """
+    A class used to present LRU cache of analysed positions.
+
+    Keys are position keys (Zobrist hash and whatever else the legal
+    moves depend on), values are tuples describing the position. Memory
+    taken by the values is estimated on put and the least recently used
+    entries are evicted when it exceeds the cap.
+
+    Attributes
+    ----------
+    max_bytes : int
+        memory cap in bytes
+    size : int
+        estimated memory taken by the cached entries
+    hits : int
+        number of get calls which found the key
+    misses : int
+        number of get calls which didn't find the key
+    evictions : int
+        number of entries evicted to fit into max_bytes
+
+    Methods
+    -------
+    get(key)
+        return cached value (None if not cached)
+    put(key, value)
+        cache value
+    clear()
+        remove all entries and reset counters
+    stats()
+        return dictionary of counters
+    """
+
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        """
+        Init of MoveCache class.
+
+        Parameters
+        ----------
+        max_bytes : int
+            memory cap in bytes (default 16 MiB)
+        """
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self.clear()
+
+    def __len__(self):
+        """Returns number of cached entries."""
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns cached value and marks it as recently used.
+
+        Parameters
+        ----------
+        key : hashable
+            position key
+
+        Returns
+        -------
+        tuple
+            cached value (None if key is not cached)
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value):
+        """
+        Caches value evicting least recently used entries if needed.
+
+        Parameters
+        ----------
+        key : hashable
+            position key
+        value : tuple
+            tuple of containers describing the position
+        """
+        size = self.ENTRY_OVERHEAD
+        for item in value:
+            size += sys.getsizeof(item)
+            if isinstance(item, dict):
+                size += sum(sys.getsizeof(items) for items in item.values())
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+        self._entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes and self._entries:
+            self.size -= self._entries.popitem(last=False)[1][1]
+            self.evictions += 1
+
+    def clear(self):
+        """Removes all entries and resets counters."""
+        self._entries.clear()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """
+        Returns cache counters.
+
+        Returns
+        -------
+        dictionary
+            dictionary with keys 'entries', 'size', 'max_bytes', 'hits',
+            'misses' and 'evictions'
+        """
+        return {'entries': len(self._entries), 'size': self.size,
+                'max_bytes': self.max_bytes, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions}
+
+
+# shared by all games of the process
+MOVE_CACHE = MoveCache()
+
+
 class Game():
     """
     A class used to present chess game.
@@ -80,51 +374,140 @@ class Game():
         color of the figures which turn now ('w' - white, 'b' - black)
     score : int
         score advantage if game (score > 0 for white and score < 0 for black)
+    en_passant : tuple
+        coordinates of the ceil passed by the last two-ceil pawn move
+        (None if the last move was not such a move)
+    castling : int
+        castling rights (combination of bitboard.CASTLE_* constants)
+    hash : int
+        Zobrist key of the position, updated incrementally by make_move
+        and unmake_move
+    eval_terms : tuple
+        middlegame and endgame scores for White and game phase (see
+        evaluation module), updated incrementally by make_move and
+        unmake_move
+    fullmove_number : int
+        number of the move, starts at 1 and grows after Black's move
+    halfmove_clock : int
+        number of moves since the last capture or pawn move
+    repetitions : dict
+        dictionary with keys - hashes of the positions since the game
+        start (or from_fen, restore) and values - how many times they
+        occured, updated by make_move and unmake_move
     moves_history : list
         list of tuples of tuples - start and end coordinates of moves in game
+    undo_stack : list
+        stack of undo records of made moves, used by unmake_move
+    dirty_squares : set
+        squares whose occupation changed since possible moves were
+        updated last time
+    dirty_figures : set
+        figures which were moved or put back since possible moves were
+        updated last time
+    debug_hash : bool
+        if True, hash is checked against compute_hash() after each
+        make_move and unmake_move (default False)
+    incremental_moves : bool
+        if True, handle_move and cancel_move update possible moves of
+        the dirty figures only, otherwise of all figures (default True)
+    debug_moves : bool
+        if True, possible moves are checked against the ones of all
+        figures after each incremental update (default False)
+    move_cache : MoveCache
+        cache of legal moves, status and possible moves of positions,
+        shared by all games (default MOVE_CACHE, None disables caching)
 
     Methods
     -------
+    from_fen(fen, player)
+        return game set up to the position described by FEN string
+    to_fen()
+        return FEN string of the position
+    snapshot()
+        return immutable value describing the position
+    restore(snapshot)
+        set up the position saved by snapshot()
     get_possible_moves()
         return dictionary with keys - coordinates of figures on
         player's side and values - list of ceils where those figures can move
     update_possible_moves()
         update possible_moves attribute of each figure in
         white_figures and black_figures lists
+    update_dirty_possible_moves()
+        update possible_moves attribute of figures affected by moves
+        made since the last update
     get_board()
         return board as string in "pretty" format
     update_board()
         updates board attribute
     print_board()
         print board in "pretty" format
-    cancel_move(x1, y1, x2, y2, moving_figures, fixed_figures, eated_figure)
-        cancel move from (x1, y1) to (x2, y2)
-    is_check_move(x1, x2, y1, y2, moving_figures, fixed_figures, eated_figure)
-        check if move from (x1, y1) to (x2, y2) led to check
-    is_draw(moving_figures, fixed_figures)
-        check if it is draw situation
+    compute_hash()
+        return Zobrist key of the position computed from scratch
+    compute_eval_terms()
+        return evaluation terms of the position computed from scratch
+    evaluate()
+        return evaluation of the position for active player
+    make_move(x1, y1, x2, y2)
+        move figure from (x1, y1) to (x2, y2) without any checks
+    make_packed_move(move)
+        make_move given packed move from_sq | to_sq << 6
+    unmake_move()
+        take back the last move made by make_move
+    is_king_attacked(color)
+        check if King of color is under attack
+    iter_legal_moves(square)
+        yield moves which don't leave King of active player attacked
+    has_legal_move()
+        check if active player has move which doesn't leave King attacked
+    legal_moves_from(coordinate)
+        yield ceils the figure can move to without leaving King attacked
+    legal_moves()
+        return list of moves which don't leave King of active player attacked
+    position_key()
+        return key of the position for move_cache and search tables
+    position_status()
+        return MOVE_NORMAL, MOVE_CHECK, MOVE_CHECKMATE or MOVE_STALEMATE
+        for active player
+    perft(depth)
+        return number of leaf nodes of legal move tree of given depth
+    perft_divide(depth)
+        return perft(depth - 1) after each legal move
+    is_repetition()
+        check if the position occured bitboard.REPETITION_COUNT times
+    is_fifty_moves()
+        check if halfmove clock reached bitboard.FIFTY_MOVES_PLIES
+    is_draw()
+        check if active player is stalemated or the game is drawn by
+        repetition or fifty-move rule
     isDrawMove(coordinate_1, coordinate_2)
         check if suggested move will lead to draw
     isWinMove(coordinate_1, coordinate_2)
         check if suddested move will lead to checkmate
     is_checkmate()
-        check if any King is checkmated
-    handle_roque(x1, y1, x2, y2, moving_figures)
-        handle roque from (x1, y1) to (x2, y2)
-    handle_en_passant(x1, y1, x2, y2, moving_figures, fixed_figures)
-        handle en passant from (x1, y1) to (x2, y2)
-    handle_en_passant_roque(x1, y1, x2, y2, moving_figures, fixed_figures)
-        handle roque or en passant from (x1, y1) to (x2, y2)
-    handle_move(x1, y1, x2, y2, moving_figures, fixed_figures)
+        check if active player is checkmated
+    classify_move(coordinate_1, coordinate_2)
+        check if suggested move is legal and what it leads to
+    handle_move(x1, y1, x2, y2)
         handle move from (x1, y1) to (x2, y2)
+    cancel_move()
+        cancel the last move
     move(coordinate_1, coordinate_2)
         handle move from (x1, y1) to (x2, y2)
     move_from_server(coordinate_1, coordinate_2)
         handle forced move from (x1, y1) to (x2, y2)
+    replay(moves, trusted, plies)
+        make recorded moves, skipping checks if they are trusted
     get_score()
         return your score advantage
     """
 
+    debug_hash = False
+    debug_attacks = False
+    incremental_moves = True
+    debug_moves = False
+    move_cache = MOVE_CACHE
+
     def __init__(self, player):
         """
         Init of Pawn class.
@@ -135,20 +518,170 @@ class Game():
             color of the figures the player plays with
             ('w' - white, 'b' - black)
         """
-        self.white_figures = [copy.deepcopy(WHITE_START_FIGURES[i])
-                              for i in range(len(WHITE_START_FIGURES))]
-        self.black_figures = [copy.deepcopy(BLACK_START_FIGURES[i])
-                              for i in range(len(BLACK_START_FIGURES))]
+        self.white_figures = [fig.copy() for fig in WHITE_START_FIGURES]
+        self.black_figures = [fig.copy() for fig in BLACK_START_FIGURES]
+        self.board = [list(line) for line in START_BOARD]
 
         self.score = 0
-
-        self.update_board()
-        self.update_possible_moves()
+        self.en_passant = None
+        self.castling = bitboard.CASTLE_ALL
+        self.fullmove_number = 1
+        self.halfmove_clock = 0
 
         self.moves_history = []
+        self.undo_stack = []
+        self.dirty_squares = set()
+        self.dirty_figures = set()
+        self.attacks = None
+        self.attack_counts = None
+        self.attack_map = None
 
         self.current_player = 'w'
         self.player = player
+        self.hash = START_HASH
+        self.repetitions = {START_HASH: 1}
+        self.eval_terms = START_EVAL_TERMS
+
+    @classmethod
+    def from_fen(cls, fen, player='w'):
+        """
+        Creates game set up to the position described by FEN string.
+
+        Figures get the flags the legacy rules need: King hasn't moved
+        if it stays at its start ceil and its side has any castling
+        right, Rook hasn't moved if the right of its corner is kept and
+        Pawn has moved for two ceils if en passant ceil is behind it.
+
+        Parameters
+        ----------
+        fen : str
+            FEN string of the position
+        player : str
+            color of the figures the player plays with
+            ('w' - white, 'b' - black, default 'w')
+
+        Returns
+        -------
+        Game
+            game at the position, with empty history
+
+        Raises
+        ------
+        ValueError
+            if fen is not valid FEN string or a side has no King
+            or more than one King
+        """
+        position = bitboard.Position.from_fen(fen)
+        rights = position.castling
+        ep_square = position.ep_square
+        sides = ([], [])
+        for sq, code in enumerate(position.squares):
+            if code == bitboard.EMPTY:
+                continue
+            x, y = sq % 8, sq // 8
+            color = bitboard.COLORS[code // 6]
+            fig = FIGURE_CLASSES[code % 6](x, y, color)
+            home = 0 if color == 'w' else 7
+            side_rights = rights >> (code // 6 * 2) & 3
+            if isinstance(fig, figures.King):
+                fig.has_moved = (x, y) != (4, home) or not side_rights
+            elif isinstance(fig, figures.Rook):
+                fig.has_moved = not (
+                        y == home and (x == 7 and side_rights & 1
+                                       or x == 0 and side_rights & 2))
+            elif isinstance(fig, figures.Pawn) and ep_square >= 0:
+                fig.has_moved_two = sq == ep_square + (
+                        8 if color == 'w' else -8)
+            sides[code // 6].append(fig)
+        for side in sides:
+            if [type(fig) for fig in side].count(figures.King) != 1:
+                raise ValueError('invalid FEN: {!r}'.format(fen))
+            side.sort(key=lambda fig: (FIGURE_ORDER.index(type(fig)),
+                                       fig.y * 8 + fig.x))
+
+        game = cls(player)
+        game.white_figures, game.black_figures = sides
+        game.update_board()
+        game.update_possible_moves()
+        game.score = (sum(fig.value for fig in sides[0])
+                      - sum(fig.value for fig in sides[1]))
+        game.castling = rights
+        game.en_passant = (None if ep_square < 0
+                           else (ep_square % 8, ep_square // 8))
+        game.fullmove_number = position.fullmove_number
+        game.halfmove_clock = position.halfmove_clock
+        game.current_player = bitboard.COLORS[position.side]
+        game.hash = game.compute_hash()
+        game.repetitions = {game.hash: 1}
+        game.eval_terms = game.compute_eval_terms()
+        return game
+
+    def to_fen(self):
+        """
+        Returns Forsyth-Edwards Notation string of the position.
+
+        Returns
+        -------
+        str
+            FEN string
+        """
+        squares = [bitboard.EMPTY] * 64
+        for fig in self.white_figures + self.black_figures:
+            squares[fig.y * 8 + fig.x] = LABEL_CODES[fig.label]
+        return bitboard.format_fen(
+                squares, bitboard.COLORS.index(self.current_player),
+                self.castling,
+                -1 if self.en_passant is None
+                else self.en_passant[1] * 8 + self.en_passant[0],
+                self.halfmove_clock, self.fullmove_number)
+
+    def snapshot(self):
+        """
+        Returns immutable value describing the position.
+
+        Costs the same for any length of the game: only figures,
+        active player, castling, en passant, score, hash, move number
+        and halfmove clock are saved, moves_history, undo_stack and
+        repetitions are not.
+
+        Returns
+        -------
+        tuple
+            value to pass to restore()
+        """
+        return (tuple(fig.get_state() for fig in self.white_figures),
+                tuple(fig.get_state() for fig in self.black_figures),
+                self.current_player, self.castling, self.en_passant,
+                self.score, self.hash, self.fullmove_number,
+                self.halfmove_clock)
+
+    def restore(self, snapshot):
+        """
+        Sets up the position saved by snapshot().
+
+        Figures are created anew, so the snapshot can be restored many
+        times and in any game. undo_stack is cleared, repetitions start
+        anew from the position, moves_history is kept as it is.
+
+        Parameters
+        ----------
+        snapshot : tuple
+            value returned by snapshot()
+        """
+        (white, black, self.current_player, self.castling, self.en_passant,
+         self.score, self.hash, self.fullmove_number,
+         self.halfmove_clock) = snapshot
+        self.white_figures = [figures.Figure.from_state(state)
+                              for state in white]
+        self.black_figures = [figures.Figure.from_state(state)
+                              for state in black]
+        self.update_board()
+        self.undo_stack = []
+        self.repetitions = {self.hash: 1}
+        self.eval_terms = self.compute_eval_terms()
+        self.dirty_squares = set()
+        self.dirty_figures = set()
+        self.attacks = None
 
     def get_possible_moves(self):
         """
@@ -160,25 +693,78 @@ class Game():
             dictionary with keys - coordinates of figures on player's
             side and values - list of ceils where those figures can move
         """
-        possible_moves = {}
-
-        if self.current_player == 'w' and self.player == 'w':
-            for fig in self.white_figures:
-                possible_moves[figures.coordinates_to_human((fig.x, fig.y))] = (
-                        fig.get_possible_moves(self.board))
-            return dict(sorted(possible_moves.items()))
-        elif self.current_player == 'b' and self.player == 'b':
-            for fig in self.black_figures:
-                possible_moves[figures.coordinates_to_human((fig.x, fig.y))] = (
-                        fig.get_possible_moves(self.board))
-            return dict(sorted(possible_moves.items()))
-        else:
+        if self.current_player != self.player:
             return []
+        return {start: list(ends)
+                for start, ends in self._analyse()[2].items()}
 
     def update_possible_moves(self):
         """Updates all figures in game possible_moves attributes."""
         for fig in self.white_figures + self.black_figures:
             fig.update_possible_moves(self.board)
+        self.dirty_squares.clear()
+        self.dirty_figures.clear()
+
+    def update_dirty_possible_moves(self):
+        """
+        Updates possible_moves attributes of figures affected by moves.
+
+        Moves made and taken back since the last update leave their
+        squares in dirty_squares and their figures in dirty_figures.
+        Beside the dirty figures, possible moves can change only for
+        figures attacking a dirty square (sliding figures included, as
+        their rays are cut at the first figure), pawns pushing to it or
+        standing beside it (legacy en passant) and Kings (roques).
+
+        Returns
+        -------
+        int
+            number of figures whose possible moves were updated
+        """
+        if self.attacks is None:
+            self._build_attacks()
+        board = self.board
+        placed = {fig.y * 8 + fig.x: fig
+                  for fig in self.white_figures + self.black_figures}
+        dirty = self.dirty_figures
+        attack_map = self.attack_map
+        for sq in self.dirty_squares:
+            dirty.update(attack_map[sq])
+            for watcher in figures.PAWN_WATCHERS[sq]:
+                fig = placed.get(watcher)
+                if isinstance(fig, figures.Pawn):
+                    dirty.add(fig)
+        dirty.add(self.white_figures[0])
+        dirty.add(self.black_figures[0])
+        updated = 0
+        for fig in dirty:
+            if placed.get(fig.y * 8 + fig.x) is fig:
+                fig.update_possible_moves(board)
+                updated += 1
+        self.dirty_squares.clear()
+        dirty.clear()
+        if self.debug_moves:
+            self._verify_possible_moves()
+        return updated
+
+    def _verify_possible_moves(self):
+        """Raises RuntimeError if possible moves differ from computed."""
+        for fig in self.white_figures + self.black_figures:
+            possible_moves = fig.possible_moves
+            fig.update_possible_moves(self.board)
+            if possible_moves != fig.possible_moves:
+                raise RuntimeError(
+                        'possible moves of {} at {} differ from computed '
+                        'ones'.format(fig.label,
+                                      figures.SQUARE_NAMES[fig.y * 8
+                                                           + fig.x]))
+
+    def _refresh_possible_moves(self):
+        """Updates possible moves the way incremental_moves selects."""
+        if self.incremental_moves:
+            self.update_dirty_possible_moves()
+        else:
+            self.update_possible_moves()
 
     def update_board(self):
         """Updates board attribute based on each figure in game coordinate."""
@@ -188,25 +774,11 @@ class Game():
 
     def get_board(self):
         """Returns board as string in "pretty" format."""
-        self.update_board()
-        if self.player == 'w':
-            return BOARD_TEMPLATE_WHITE.format(*[self.board[i][j]
-                                               for j in range(7, -1, -1)
-                                               for i in range(8)])
-        else:
-            return BOARD_TEMPLATE_BLACK.format(*[self.board[7 - i][7 - j]
-                                               for j in range(7, -1, -1)
-                                               for i in range(8)])
+        return format_board(self.board, self.player)
 
     def print_board(self):
         """Prints board in "pretty" format."""
-        self.update_board()
-        if self.player == 'w':
-            print(BOARD_TEMPLATE_WHITE.format(*[self.board[i][j]
-                  for j in range(7, -1, -1) for i in range(8)]))
-        else:
-            print(BOARD_TEMPLATE_BLACK.format(*[self.board[7 - i][7 - j]
-                  for j in range(7, -1, -1) for i in range(8)]))
+        print(format_board(self.board, self.player))
 
     def isMyMove(self):
         """Returns True if it is the player's turn, False otherwise."""
@@ -216,399 +788,865 @@ class Game():
             return False
 
     def isPossibleMove(self, coordinate_1, coordinate_2):
-        """Returns True if suggested move is possible, False otherwise."""
-        d = self.get_possible_moves()
-        if coordinate_1 in list(d.keys()) and coordinate_2 in d[coordinate_1]:
-            return True
-        else:
+        """
+        Returns True if suggested move is legal, False otherwise.
+
+        Moves of the figure are taken from iter_legal_moves, so the move
+        which leaves the King attacked isn't possible.
+        """
+        if not self.isMyMove():
+            return False
+        sq1 = figures.SQUARES.get(coordinate_1)
+        sq2 = figures.SQUARES.get(coordinate_2)
+        if sq1 is None or sq2 is None:
             return False
+        return any(move >> 6 == sq2 for move in self.iter_legal_moves(sq1))
+
+    def compute_hash(self):
+        """Returns Zobrist key of the position computed from scratch."""
+        return zobrist.compute_hash(
+                [(LABEL_CODES[fig.label], fig.y * 8 + fig.x)
+                 for fig in self.white_figures + self.black_figures],
+                self.current_player == 'b', self.castling,
+                -1 if self.en_passant is None
+                else self.en_passant[1] * 8 + self.en_passant[0])
+
+    def _ep_key(self, player):
+        """Returns zobrist.ep_key of en passant ceil for player to move."""
+        if self.en_passant is None:
+            return 0
+        x, y = self.en_passant
+        pushed = y + 1 if y < 4 else y - 1
+        label = 'Pw' if player == 'w' else 'Pb'
+        pawns = 0
+        for x1 in (x - 1, x + 1):
+            if 0 <= x1 < 8 and self.board[x1][pushed] == label:
+                pawns |= 1 << pushed * 8 + x1
+        return zobrist.ep_key(y * 8 + x, pawns)
+
+    def compute_eval_terms(self):
+        """Returns evaluation terms of the position computed from scratch."""
+        return evaluation.compute_terms(
+                (LABEL_CODES[fig.label], fig.y * 8 + fig.x)
+                for fig in self.white_figures + self.black_figures)
+
+    def evaluate(self):
+        """
+        Returns evaluation of the position for active player.
+
+        Material and piece-square terms are kept up to date by
+        make_move and unmake_move, so the call only blends them by game
+        phase and costs the same for any position.
+
+        Returns
+        -------
+        int
+            score in centipawns, positive if active player is better
+        """
+        score = evaluation.blend(*self.eval_terms)
+        return score if self.current_player == 'w' else -score
+
+    def _verify_hash(self):
+        """Raises RuntimeError if hash differs from compute_hash()."""
+        if self.hash != self.compute_hash():
+            raise RuntimeError('Zobrist key {:016x} differs from {:016x}'
+                               .format(self.hash, self.compute_hash()))
+
+    def _side_figures(self, color):
+        """Returns figures of color and figures of the opposite color."""
+        if color == 'w':
+            return self.white_figures, self.black_figures
+        else:
+            return self.black_figures, self.white_figures
+
+    @staticmethod
+    def _find_figure(figures_list, x, y):
+        """Returns index of figure staying at (x, y), None if not found."""
+        for i in range(len(figures_list)):
+            if figures_list[i].x == x and figures_list[i].y == y:
+                return i
+        return None
 
-    def cancel_move(self, x1, y1, x2, y2,
-                    moving_figures, fixed_figures, eated_figure=None):
+    def make_move(self, x1, y1, x2, y2):
         """
-        Moves the figure back and recovers eated figure.
+        Moves figure of active player from (x1, y1) to (x2, y2).
+
+        The move isn't checked. Board, figure lists, castling and
+        en passant flags, score and active player are updated in place
+        and undo record is pushed to undo_stack.
 
         Parameters
         ----------
         x1 : int
-            first coordinate of ceil where figure was moved from
+            first coordinate of ceil where figure whould be moved from
         y1 : int
-            second coordinate of ceil where figure was moved from
+            second coordinate of ceil where figure should be moved from
         x2 : int
-            first coordinate of ceil where figure was moved to
+            first coordinate of ceil where figure should be moved to
         y2 : int
-            second coordinate of ceil where figure was moved to
-        moving_figures : list
-            list of figures of player whose turn was it
-        fixed_figures : list
-            list of figures of the opposite player
-        eated_figure
-            Figure which was eated in this turn (None if any figure was eated)
-        """
-        if ((self.board[x2][y2] == 'Kw' or self.board[x2][y2] == 'Kb') and
-                abs(x2 - x1) == 2):
-            for fig in moving_figures:
-                if x2 == 6 and fig.x == 5 and fig.label[0] == 'R':
-                    fig.x = 7
-                    break
-                elif x2 == 2 and fig.x == 3 and fig.label[0] == 'R':
-                    fig.x = 0
-                    break
+            second coordinate of ceil where figure should be moved to
+
+        Returns
+        -------
+        Figure
+            Figure which was eated during the move (None if no figure
+            was eated)
+        """
+        moving_figures, fixed_figures = self._side_figures(
+                self.current_player)
+        board = self.board
+        fig = moving_figures[self._find_figure(moving_figures, x1, y1)]
+        ep_key = self._ep_key(self.current_player)
+
+        eated_index = None
+        if board[x2][y2] != ' ':
+            eated_index = self._find_figure(fixed_figures, x2, y2)
+        elif isinstance(fig, figures.Pawn) and x1 != x2:
+            eated_index = self._find_figure(fixed_figures, x2, y1)
+        eated_figure = None
+        if eated_index is not None:
+            eated_figure = fixed_figures.pop(eated_index)
+            board[eated_figure.x][eated_figure.y] = ' '
+
+        rook = None
+        if isinstance(fig, figures.Pawn):
+            flag = fig.has_moved_two
+            if abs(y2 - y1) == 2:
+                fig.has_moved_two = True
+        else:
+            flag = getattr(fig, 'has_moved', None)
+            if flag is not None:
+                fig.has_moved = True
+            if isinstance(fig, figures.King) and abs(x2 - x1) == 2:
+                rook = moving_figures[self._find_figure(
+                        moving_figures, 7 if x2 == 6 else 0, y1)]
+
+        record = (fig, x1, y1, eated_figure, eated_index, rook, flag,
+                  self.score, self.en_passant, self.castling, self.hash,
+                  self.halfmove_clock, self.eval_terms)
+
+        sq1 = y1 * 8 + x1
+        sq2 = y2 * 8 + x2
+        code = LABEL_CODES[fig.label]
+        keys = zobrist.PIECE_KEYS[code]
+        key = self.hash ^ zobrist.SIDE_KEY ^ keys[sq1] ^ keys[sq2]
+        middlegame, endgame, phase = self.eval_terms
+        table = evaluation.MIDDLEGAME[code]
+        middlegame += table[sq2] - table[sq1]
+        table = evaluation.ENDGAME[code]
+        endgame += table[sq2] - table[sq1]
+        board[x1][y1] = ' '
+        board[x2][y2] = fig.label
+        fig.x = x2
+        fig.y = y2
+        if eated_figure is not None:
+            code = LABEL_CODES[eated_figure.label]
+            sq = eated_figure.y * 8 + eated_figure.x
+            key ^= zobrist.PIECE_KEYS[code][sq]
+            middlegame -= evaluation.MIDDLEGAME[code][sq]
+            endgame -= evaluation.ENDGAME[code][sq]
+            phase -= evaluation.PHASE[code]
+        if rook is not None:
+            code = LABEL_CODES[rook.label]
+            keys = zobrist.PIECE_KEYS[code]
+            sq = y1 * 8 + rook.x
+            key ^= keys[sq]
+            middlegame -= evaluation.MIDDLEGAME[code][sq]
+            endgame -= evaluation.ENDGAME[code][sq]
+            board[rook.x][y1] = ' '
+            rook.x = 5 if x2 == 6 else 3
+            board[rook.x][y1] = rook.label
+            sq = y1 * 8 + rook.x
+            key ^= keys[sq]
+            middlegame += evaluation.MIDDLEGAME[code][sq]
+            endgame += evaluation.ENDGAME[code][sq]
+        self.eval_terms = (middlegame, endgame, phase)
+
+        castling = self.castling & (bitboard.CASTLING_MASK[sq1]
+                                    & bitboard.CASTLING_MASK[sq2])
+        key ^= (zobrist.CASTLING_KEYS[self.castling]
+                ^ zobrist.CASTLING_KEYS[castling])
+        self.castling = castling
+        key ^= ep_key
+        if isinstance(fig, figures.Pawn) and abs(y2 - y1) == 2:
+            self.en_passant = (x2, (y1 + y2) // 2)
+            key ^= self._ep_key('b' if self.current_player == 'w' else 'w')
+        else:
+            self.en_passant = None
+        self.hash = key
+        repetitions = self.repetitions
+        repetitions[key] = repetitions.get(key, 0) + 1
+        if eated_figure is not None or isinstance(fig, figures.Pawn):
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
 
-        for fig in moving_figures:
-            if fig.x == x2 and fig.y == y2:
-                fig.x = x1
-                fig.y = y1
         if eated_figure is not None:
-            fixed_figures.append(eated_figure)
+            self.score += (eated_figure.value if self.current_player == 'w'
+                           else -eated_figure.value)
+        if self.current_player == 'b':
+            self.fullmove_number += 1
+        self.current_player = 'b' if self.current_player == 'w' else 'w'
 
-    def is_draw(self, moving_figures, fixed_figures):
+        changed = [sq1, sq2]
+        if eated_figure is not None:
+            changed.append(eated_figure.y * 8 + eated_figure.x)
+        if rook is not None:
+            changed += [y1 * 8 + (7 if x2 == 6 else 0), y1 * 8 + rook.x]
+            self.dirty_figures.add(rook)
+        self.dirty_squares.update(changed)
+        self.dirty_figures.add(fig)
+        attack_undo = None
+        if self.attacks is not None:
+            attack_undo = self._update_attacks(changed, (fig, rook),
+                                               eated_figure)
+        self.undo_stack.append(record + (attack_undo,))
+        if self.debug_hash:
+            self._verify_hash()
+        if self.debug_attacks:
+            self._verify_attacks()
+        return eated_figure
+
+    def make_packed_move(self, move):
         """
-        Check if it is draw situation now.
+        Moves figure of active player as make_move does.
 
         Parameters
         ----------
-        moving_figures : list
-            list of figures of active player
-        fixed_figures : list
-            list of figures of non-active player
+        move : int
+            packed move from_sq | to_sq << 6 (squares are y * 8 + x)
 
         Returns
         -------
-        bool
-            True if it is draw
-            False otherwise
+        Figure
+            Figure which was eated during the move (None if no figure
+            was eated)
         """
-        king_x = moving_figures[0].x
-        king_y = moving_figures[0].y
-
-        for fig in fixed_figures:
-            for (x, y) in fig.possible_moves:
-                if x == king_x and y == king_y:
-                    return False
-
-        for fig in moving_figures:
-            x = fig.x
-            y = fig.y
-            for (x2, y2) in fig.possible_moves[::-1]:
-                eated_figure = None
-                if self.board[x2][y2] != ' ':
-                    for i in range(len(fixed_figures)):
-                        if (fixed_figures[i].x == x2 and
-                                fixed_figures[i].y == y2):
-                            eated_figure = fixed_figures.pop(i)
-                            self.board[x2][y2] = ' '
-                            break
-                if self.move_from_server(figures.coordinates_to_human((x, y)),
-                                         figures.coordinates_to_human((x2,
-                                                                       y2))):
-                    self.cancel_move(x, y, x2, y2, moving_figures,
-                                     fixed_figures, eated_figure)
-                    self.update_board()
-                    self.update_possible_moves()
-                    return False
-                self.cancel_move(x, y, x2, y2, moving_figures,
-                                 fixed_figures, eated_figure)
-                self.update_board()
-                self.update_possible_moves()
-        return True
+        return self.make_move(move & 7, move >> 3 & 7,
+                              move >> 6 & 7, move >> 9 & 7)
 
-    def isDrawMove(self, coordinate_1, coordinate_2):
+    def unmake_move(self):
         """
-        Check if suggested move will lead to draw, doesn't make move.
-
-        Parameters
-        ----------
-        coordinate_1 : str
-            human-like coordinates of first cell of suggested move
-        coordinate_2 : str
-            human-like coordinates of first cell of suggested move
+        Takes back the last move made by make_move.
 
         Returns
         -------
-        bool
-            True if suggested move will lead to draw
-            False otherwise
+        tuple
+            coordinates (x1, y1, x2, y2) of the move which was taken back
         """
-        if self.current_player == 'w':
-            moving_figures = self.white_figures
-            fixed_figures = self.black_figures
-        else:
-            moving_figures = self.black_figures
-            fixed_figures = self.white_figures
-
-        if not self.isPossibleMove(coordinate_1, coordinate_2):
-            return False
-
-        x1, y1 = figures.coordinates_to_computer(coordinate_1)
-        x2, y2 = figures.coordinates_to_computer(coordinate_2)
-
-        white_king_has_moved = self.white_figures[0].has_moved
-        black_king_has_moved = self.black_figures[0].has_moved
-
-        eated_figure = None
-        if self.board[x2][y2] != ' ':
-            for i in range(len(fixed_figures)):
-                if fixed_figures[i].x == x2 and fixed_figures[i].y == y2:
-                    eated_figure = fixed_figures.pop(i)
-                    break
-
-        for m_fig in moving_figures:
-            if m_fig.x == x1 and m_fig.y == y1:
-                m_fig.x = x2
-                m_fig.y = y2
-                self.board[x2][y2] = self.board[x1][y1]
-                self.board[x1][y1] = ' '
-                break
-
-        if self.current_player == 'w':
-            self.current_player = 'b'
+        (fig, x1, y1, eated_figure, eated_index, rook, flag,
+         score, en_passant, castling, key, halfmove_clock, self.eval_terms,
+         attack_undo) = self.undo_stack.pop()
+        self.current_player = 'b' if self.current_player == 'w' else 'w'
+        if self.current_player == 'b':
+            self.fullmove_number -= 1
+        _, fixed_figures = self._side_figures(self.current_player)
+        board = self.board
+
+        x2, y2 = fig.x, fig.y
+        board[x2][y2] = ' '
+        board[x1][y1] = fig.label
+        fig.x = x1
+        fig.y = y1
+        if isinstance(fig, figures.Pawn):
+            fig.has_moved_two = flag
+        elif flag is not None:
+            fig.has_moved = flag
+        dirty_squares = self.dirty_squares
+        dirty_squares.add(y1 * 8 + x1)
+        dirty_squares.add(y2 * 8 + x2)
+        self.dirty_figures.add(fig)
+        if rook is not None:
+            board[rook.x][y1] = ' '
+            dirty_squares.add(y1 * 8 + rook.x)
+            rook.x = 7 if x2 == 6 else 0
+            board[rook.x][y1] = rook.label
+            dirty_squares.add(y1 * 8 + rook.x)
+            self.dirty_figures.add(rook)
+        if eated_figure is not None:
+            fixed_figures.insert(eated_index, eated_figure)
+            board[eated_figure.x][eated_figure.y] = eated_figure.label
+            dirty_squares.add(eated_figure.y * 8 + eated_figure.x)
+            self.dirty_figures.add(eated_figure)
+
+        self.score = score
+        self.en_passant = en_passant
+        self.castling = castling
+        repetitions = self.repetitions
+        if repetitions[self.hash] > 1:
+            repetitions[self.hash] -= 1
         else:
-            self.current_player = 'w'
-        ans = self.is_draw(fixed_figures, moving_figures)
+            del repetitions[self.hash]
+        self.hash = key
+        self.halfmove_clock = halfmove_clock
+        if attack_undo is not None:
+            for changed_figure, attacks in reversed(attack_undo):
+                self._set_attacks(changed_figure, attacks)
+        elif self.attacks is not None:
+            # maps were built after this move, so they can't be reverted
+            self.attacks = None
+        if self.debug_hash:
+            self._verify_hash()
+        if self.debug_attacks:
+            self._verify_attacks()
+        return x1, y1, x2, y2
+
+    def _build_attacks(self):
+        """Computes attack maps of the position from scratch."""
+        self.attacks = {}
+        self.attack_counts = {'w': [0] * 64, 'b': [0] * 64}
+        self.attack_map = [set() for sq in range(64)]
+        for fig in self.white_figures + self.black_figures:
+            self._set_attacks(fig, fig.get_attacks(self.board))
 
-        self.update_board()
-        self.update_possible_moves()
+    def _set_attacks(self, fig, attacks):
+        """
+        Replaces squares attacked by figure in attack maps.
 
-        self.cancel_move(x1, y1, x2, y2, moving_figures,
-                         fixed_figures, eated_figure)
+        Parameters
+        ----------
+        fig : Figure
+            figure whose attacks are replaced
+        attacks : list
+            new squares attacked by the figure (None removes the figure
+            from the maps)
 
-        self.white_figures[0].has_moved = white_king_has_moved
-        self.black_figures[0].has_moved = black_king_has_moved
+        Returns
+        -------
+        list
+            squares the figure attacked before (None if it wasn't
+            in the maps)
+        """
+        counts = self.attack_counts[fig.label[-1]]
+        attack_map = self.attack_map
+        old = self.attacks.pop(fig, None)
+        if old is not None:
+            for sq in old:
+                counts[sq] -= 1
+                attack_map[sq].discard(fig)
+        if attacks is not None:
+            for sq in attacks:
+                counts[sq] += 1
+                attack_map[sq].add(fig)
+            self.attacks[fig] = attacks
+        return old
+
+    def _update_attacks(self, changed, moved, removed):
+        """
+        Updates attack maps after a move.
 
-        self.update_board()
-        self.update_possible_moves()
+        Only the moved figures and sliding figures whose rays reach
+        changed squares are recomputed, the removed figure is dropped.
 
-        return ans
+        Parameters
+        ----------
+        changed : list
+            squares whose occupation changed
+        moved : tuple
+            figures which changed their squares (None items are skipped)
+        removed : Figure
+            figure eaten by the move (None if there is no such figure)
 
-    def isWinMove(self, coordinate_1, coordinate_2):
+        Returns
+        -------
+        list
+            list of tuples (figure, squares it attacked before) to undo
+            the update with _set_attacks in reverse order
         """
-        Check if suggested move will lead to checkmate, doesn't make move.
+        attack_map = self.attack_map
+        affected = {fig for fig in moved if fig is not None}
+        for sq in changed:
+            for fig in attack_map[sq]:
+                if fig.SLIDING:
+                    affected.add(fig)
+        affected.discard(removed)
+        undo = []
+        if removed is not None:
+            undo.append((removed, self._set_attacks(removed, None)))
+        board = self.board
+        for fig in affected:
+            undo.append((fig, self._set_attacks(fig, fig.get_attacks(board))))
+        return undo
+
+    def _verify_attacks(self):
+        """Raises RuntimeError if attack maps differ from rebuilt ones."""
+        if self.attacks is None:
+            return
+        counts = self.attack_counts
+        attack_map = self.attack_map
+        self._build_attacks()
+        if counts != self.attack_counts or attack_map != self.attack_map:
+            raise RuntimeError('attack maps differ from computed ones')
+
+    def is_attacked(self, square, side):
+        """
+        Check if figures of side attack the square.
 
         Parameters
         ----------
-        coordinate_1 : str
-            human-like coordinates of first cell of suggested move
-        coordinate_2 : str
-            human-like coordinates of first cell of suggested move
+        square : int
+            square y * 8 + x (0 to 63)
+        side : str
+            color of attacking figures ('w' - white, 'b' - black)
 
         Returns
         -------
         bool
-            True if suggested move will lead to checkmate
+            True if at least one figure of side attacks the square
             False otherwise
         """
-        if self.current_player == 'w':
-            moving_figures = self.white_figures
-            fixed_figures = self.black_figures
-        else:
-            moving_figures = self.black_figures
-            fixed_figures = self.white_figures
+        if self.attacks is None:
+            self._build_attacks()
+        return self.attack_counts[side][square] > 0
 
-        if not self.isPossibleMove(coordinate_1, coordinate_2):
-            return False
-
-        x1, y1 = figures.coordinates_to_computer(coordinate_1)
-        x2, y2 = figures.coordinates_to_computer(coordinate_2)
-
-        white_king_has_moved = self.white_figures[0].has_moved
-        black_king_has_moved = self.black_figures[0].has_moved
-
-        eated = None
-        if self.board[x2][y2] != ' ':
-            for i in range(len(fixed_figures)):
-                if fixed_figures[i].x == x2 and fixed_figures[i].y == y2:
-                    eated = fixed_figures.pop(i)
-                    break
-
-        for m_fig in moving_figures:
-            if m_fig.x == x1 and m_fig.y == y1:
-                m_fig.x = x2
-                m_fig.y = y2
-                self.board[x2][y2] = self.board[x1][y1]
-                self.board[x1][y1] = ' '
-                break
-
-        ans = self.is_checkmate()
-
-        self.cancel_move(x1, y1, x2, y2, moving_figures, fixed_figures, eated)
+    def attackers(self, square):
+        """
+        Finds figures of both colors attacking the square.
 
-        self.white_figures[0].has_moved = white_king_has_moved
-        self.black_figures[0].has_moved = black_king_has_moved
+        Parameters
+        ----------
+        square : int
+            square y * 8 + x (0 to 63)
 
-        self.update_board()
-        self.update_possible_moves()
+        Returns
+        -------
+        list
+            sorted list of squares of figures attacking the square
+        """
+        if self.attacks is None:
+            self._build_attacks()
+        return sorted(fig.y * 8 + fig.x for fig in self.attack_map[square])
 
-        return ans
+    def in_check(self):
+        """Returns True if King of active player is attacked."""
+        return self.is_king_attacked(self.current_player)
 
-    def is_checkmate(self):
+    def is_king_attacked(self, color):
         """
-        Check if King is under checkmate.
+        Check if King is under attack.
+
+        Parameters
+        ----------
+        color : str
+            color of the King ('w' - white, 'b' - black)
 
         Returns
         -------
         bool
-            True if King is under checkmate
-            False if King is not under checkmate
+            True if any figure of the opposite color attacks the King
+            False otherwise
         """
-        if self.current_player == 'w':
-            moving_figures = self.black_figures
-            fixed_figures = self.white_figures
-        else:
-            moving_figures = self.white_figures
-            fixed_figures = self.black_figures
-
-        king_position = (figures.coordinates_to_human((moving_figures[0].x,
-                                                       moving_figures[0].y)))
-
-        for moved_figure in moving_figures[1:]:
-            for (x, y) in moved_figure.possible_moves:
-                board = [line[:] for line in self.board]
-                board[moved_figure.x][moved_figure.y] = ' '
-                board[x][y] = moved_figure.label
-                under_attack = False
-                for fixed_figure in fixed_figures:
-                    if (king_position in
-                            fixed_figure.get_possible_moves(board)):
-                        under_attack = True
-                if not under_attack:
-                    return False
-
-        return True
+        king = self._side_figures(color)[0][0]
+        return self.is_attacked(king.y * 8 + king.x,
+                                'b' if color == 'w' else 'w')
 
-    def handle_roque(self, x1, y1, x2, y2, moving_figures):
+    def _generate_legal_moves(self, pseudo=None, square=None):
         """
-        Moves corresoponding figures to handle the roque.
+        Yields moves of active player which don't leave King attacked.
+
+        Checkers and pinned figures are found once, then each possible
+        move is accepted or rejected without making it. King moves and
+        roques are looked up in attack maps, only en passant captures
+        are checked by making the move.
 
         Parameters
         ----------
-        x1 : int
-            first coordinate of ceil where figure whould be moved from
-        y1 : int
-            second coordinate of ceil where figure should be moved from
-        x2 : int
-            first coordinate of ceil where figure should be moved to
-        y2 : int
-            second coordinate of ceil where figure should be moved to
-        moving_figures : list
-            list of figures of active player
+        pseudo : list
+            if given, tuples (square, list of target squares) of all
+            figures of active player are appended to it
+        square : int
+            if given, only moves of the figure at this square
+            (y * 8 + x) are generated
+
+        Yields
+        ------
+        int
+            packed move from_sq | to_sq << 6 (squares are y * 8 + x)
+        """
+        color = self.current_player
+        enemy = 'b' if color == 'w' else 'w'
+        moving_figures, _ = self._side_figures(color)
+        board = self.board
+        king = moving_figures[0]
+        king_sq = king.y * 8 + king.x
+        if self.attacks is None:
+            self._build_attacks()
+        attacked = self.attack_counts[enemy]
+
+        checkers = [fig for fig in self.attack_map[king_sq]
+                    if fig.label[-1] == enemy]
+        targets = None
+        behind = ()
+        if len(checkers) == 1:
+            checker_sq = checkers[0].y * 8 + checkers[0].x
+            targets = set(figures.BETWEEN[king_sq][checker_sq])
+            targets.add(checker_sq)
+        # King can't step back along the ray of a sliding checker
+        for checker in checkers:
+            if checker.SLIDING:
+                checker_sq = checker.y * 8 + checker.x
+                behind += tuple(figures.LINE[king_sq][checker_sq]
+                                - {checker_sq})
+        pins = figures.pins(board, king_sq)
+        line = figures.LINE[king_sq]
+
+        if square is not None:
+            moving_figures = [fig for fig in moving_figures
+                              if fig.y * 8 + fig.x == square]
+        for fig in moving_figures[:]:
+            sq1 = fig.y * 8 + fig.x
+            is_pawn = isinstance(fig, figures.Pawn)
+            fig_targets = fig.get_targets(board)
+            if pseudo is not None:
+                pseudo.append((sq1, fig_targets))
+            for sq2 in fig_targets:
+                move = sq1 | sq2 << 6
+                if fig is king:
+                    legal = not attacked[sq2] and (
+                            sq2 not in behind or abs(sq2 - sq1) == 2)
+                elif len(checkers) > 1:
+                    break
+                elif (is_pawn and (sq2 - sq1) & 7
+                        and board[sq2 & 7][sq2 >> 3] == ' '):
+                    legal = self._is_safe_move(move)
+                elif targets is not None and sq2 not in targets:
+                    legal = False
+                elif sq1 in pins:
+                    legal = sq2 in line[sq1]
+                else:
+                    legal = True
+                if legal:
+                    yield move
+
+    def _is_safe_move(self, move):
+        """Makes move, checks if own King isn't attacked, takes it back."""
+        color = self.current_player
+        self.make_packed_move(move)
+        safe = not self.is_king_attacked(color)
+        self.unmake_move()
+        return safe
+
+    def iter_legal_moves(self, square=None):
+        """
+        Yields moves of active player which don't leave King attacked.
+
+        Moves are taken from move_cache if the position is there,
+        otherwise they are generated one by one, so the caller can stop
+        as soon as it has the answer. Moves generated this way aren't
+        put into the cache.
+
+        Parameters
+        ----------
+        square : int
+            if given, only moves of the figure at this square
+            (y * 8 + x) are yielded
+
+        Yields
+        ------
+        int
+            packed move from_sq | to_sq << 6 (squares are y * 8 + x)
+        """
+        if self.move_cache is not None:
+            entry = self.move_cache.get(self.position_key())
+            if entry is not None:
+                for move in entry[0]:
+                    if square is None or move & 63 == square:
+                        yield move
+                return
+        yield from self._generate_legal_moves(square=square)
+
+    def has_legal_move(self):
+        """
+        Check if active player has a move which doesn't leave King attacked.
+
+        Generation stops at the first such move.
 
         Returns
         -------
-        int
-            -1 if the move is not roque
-        None
-            if the roque was made succesfully
-        """
-        if ((self.current_player == 'w' and self.board[x1][y1] == 'Kw'
-                or self.current_player == 'b' and self.board[x1][y1] == 'Kb')
-                and abs(x2 - x1) == 2 and (x2, y2)
-                in moving_figures[0].possible_moves):
-            for fig in moving_figures:
-                if ((self.current_player == 'w' and fig.label == 'Rw' or
-                    self.current_player == 'b' and fig.label == 'Rb') and
-                   (x2 == 2 and fig.x == 0 or x2 == 6 and fig.x == 7)):
-                    self.board[x2][y2] = self.board[x1][y1]
-                    self.board[x1][y1] = ' '
-                    self.board[0 if x2 == 2 else 7][y1] = ' '
-                    moving_figures[0].x = x2
-                    fig.x = 3 if x2 == 2 else 5
-                    moving_figures[0].update_possible_moves(self.board)
-                    self.update_board()
-                    break
-        else:
-            return -1
+        bool
+            True if there is such a move
+            False otherwise
+        """
+        for _ in self.iter_legal_moves():
+            return True
+        return False
 
-    def handle_en_passant(self, x1, y1, x2, y2, moving_figures, fixed_figures):
+    def legal_moves_from(self, coordinate):
         """
-        Moves and removes corresoponding figures to handle the en passant.
+        Yields ceils the figure of active player can legally move to.
 
         Parameters
         ----------
-        x1 : int
-            first coordinate of ceil where figure whould be moved from
-        y1 : int
-            second coordinate of ceil where figure should be moved from
-        x2 : int
-            first coordinate of ceil where figure should be moved to
-        y2 : int
-            second coordinate of ceil where figure should be moved to
-        moving_figures : list
-            list of figures of active player
-        fixed_figures : list
-            list of figures of the opposite player
+        coordinate : str
+            human-like coordinate of the ceil the figure stays at
+
+        Yields
+        ------
+        str
+            human-like coordinate of the ceil the figure can move to
+        """
+        square = figures.SQUARES.get(coordinate)
+        if square is None:
+            return
+        names = figures.SQUARE_NAMES
+        for move in self.iter_legal_moves(square):
+            yield names[move >> 6]
+
+    def position_key(self):
+        """
+        Returns key of the position for move_cache and search tables.
+
+        Besides the hash, the key contains has_moved flags of the Kings,
+        because the legacy roque depends on them and not on castling
+        rights.
 
         Returns
         -------
-        int
-            1 if black figure was eated during en passant
-        int
-            -1 if white figure was eated during en passant
-        int
-            0 if the move is not en passant
-        """
-        if ((self.current_player == 'w'
-                and self.board[x1][y1] == 'Pw' and y1 == 4
-                or self.current_player == 'b'
-                and self.board[x1][y1] == 'Pb' and y1 == 3)
-                and abs(x2 - x1) == 1 and abs(y2 - y1) == 1):
-            for moving_fig in moving_figures:
-                for i in range(len(fixed_figures)):
-                    fixed_fig = fixed_figures[i]
-                    if (moving_fig.x == x1 and moving_fig.y == y1
-                            and fixed_fig.x == x2
-                            and (y1 == 4 and fixed_fig.y == y2 - 1 or
-                                 y1 == 3 and fixed_fig.y == y2 + 1)):
-                        self.board[fixed_fig.x][fixed_fig.y] = ' '
-                        fixed_figures.pop(i)
-                        self.board[x1][y1] = ' '
-                        self.board[x2][y2] = moving_fig.label
-                        moving_fig.x = x2
-                        moving_fig.y = y2
-                        if y1 == 4:
-                            return 1
-                        else:
-                            return -1
+        tuple
+            hash and has_moved flags of white and black King
+        """
+        return (self.hash, self.white_figures[0].has_moved,
+                self.black_figures[0].has_moved)
+
+    def _analyse(self):
+        """
+        Returns legal moves, status and possible moves of active player.
+
+        The result is looked up in move_cache first by position_key().
+
+        Returns
+        -------
+        tuple
+            tuple of packed legal moves, status (MOVE_NORMAL, MOVE_CHECK,
+            MOVE_CHECKMATE or MOVE_STALEMATE) and dictionary with keys -
+            coordinates of figures of active player and values - tuples
+            of ceils where those figures can move
+        """
+        cache = self.move_cache
+        if cache is not None:
+            key = self.position_key()
+            entry = cache.get(key)
+            if entry is not None:
+                return entry
+
+        pseudo = []
+        moves = tuple(self._generate_legal_moves(pseudo))
+        if self.is_king_attacked(self.current_player):
+            status = MOVE_CHECK if moves else MOVE_CHECKMATE
         else:
-            return 0
+            status = MOVE_NORMAL if moves else MOVE_STALEMATE
+        names = figures.SQUARE_NAMES
+        possible = dict(sorted(
+                (names[sq], tuple(sorted([names[target]
+                                          for target in targets])))
+                for sq, targets in pseudo))
+        entry = (moves, status, possible)
+        if cache is not None:
+            cache.put(key, entry)
+        return entry
+
+    def position_status(self):
+        """
+        Returns status of active player.
+
+        Returns
+        -------
+        str
+            MOVE_CHECKMATE or MOVE_STALEMATE if active player has no legal
+            move, otherwise MOVE_REPETITION or MOVE_FIFTY_MOVES if the game
+            is drawn by these rules, otherwise MOVE_CHECK or MOVE_NORMAL
+        """
+        return draw_by_rules(self, self._analyse()[1])
+
+    def legal_moves(self):
+        """
+        Collects moves of active player which don't leave King attacked.
+
+        Returns
+        -------
+        list
+            list of packed moves from_sq | to_sq << 6
+            (squares are y * 8 + x)
+        """
+        return list(self._analyse()[0])
 
-    def handle_en_passant_roque(self, x1, y1, x2, y2,
-                                moving_figures, fixed_figures):
+    def perft(self, depth):
         """
-        Moves and removes corresoponding figures to handle roque or en passant.
+        Counts leaf nodes of the legal move tree.
 
         Parameters
         ----------
-        x1 : int
-            first coordinate of ceil where figure whould be moved from
-        y1 : int
-            second coordinate of ceil where figure should be moved from
-        x2 : int
-            first coordinate of ceil where figure should be moved to
-        y2 : int
-            second coordinate of ceil where figure should be moved to
-        moving_figures : list
-            list of figures of active player
-        fixed_figures : list
-            list of figures of the opposite player
+        depth : int
+            depth of the tree in plies
 
         Returns
         -------
         int
-            0 if roque or en passant was made successfully
-        int
-            -1 if the move is neither roque not en passant
+            number of positions reachable in exactly depth plies
         """
-        if not self.handle_roque(x1, y1, x2, y2, moving_figures):
-            return 0
-        if (t := self.handle_en_passant(x1, y1, x2, y2,
-                                        moving_figures, fixed_figures) != 0):
-            self.score += t
-            return 0
+        if depth == 0:
+            return 1
+        moves = list(self._generate_legal_moves())
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            self.make_packed_move(move)
+            nodes += self.perft(depth - 1)
+            self.unmake_move()
+        return nodes
+
+    def perft_divide(self, depth):
+        """
+        Counts leaf nodes of the legal move tree per first move.
+
+        Parameters
+        ----------
+        depth : int
+            depth of the tree in plies (at least 1)
+
+        Returns
+        -------
+        dictionary
+            dictionary with keys - moves in coordinate notation and
+            values - perft(depth - 1) of the position after the move
+        """
+        divide = {}
+        for move in self._generate_legal_moves():
+            self.make_packed_move(move)
+            divide[figures.SQUARE_NAMES[move & 63]
+                   + figures.SQUARE_NAMES[move >> 6]] = self.perft(depth - 1)
+            self.unmake_move()
+        return dict(sorted(divide.items()))
+
+    def is_repetition(self):
+        """Check if the position occured bitboard.REPETITION_COUNT times."""
+        return (self.repetitions.get(self.hash, 0)
+                >= bitboard.REPETITION_COUNT)
+
+    def is_fifty_moves(self):
+        """Check if halfmove clock reached bitboard.FIFTY_MOVES_PLIES."""
+        return self.halfmove_clock >= bitboard.FIFTY_MOVES_PLIES
+
+    def is_draw(self):
+        """
+        Check if it is draw situation now.
+
+        Returns
+        -------
+        bool
+            True if active player is not under check and has no move,
+            or the position is repeated or fifty moves passed and active
+            player isn't checkmated
+            False otherwise
+        """
+        in_check = self.is_king_attacked(self.current_player)
+        if self.is_repetition() or self.is_fifty_moves():
+            return not in_check or self.has_legal_move()
+        return not in_check and not self.has_legal_move()
+
+    def is_checkmate(self):
+        """
+        Check if King is under checkmate.
+
+        Returns
+        -------
+        bool
+            True if King of active player is under checkmate
+            False if King of active player is not under checkmate
+        """
+        return (self.is_king_attacked(self.current_player)
+                and not self.has_legal_move())
+
+    def _probe_move(self, coordinate_1, coordinate_2, check):
+        """Makes legal move, calls check() and takes the move back."""
+        if not self.isPossibleMove(coordinate_1, coordinate_2):
+            return False
+
+        x1, y1 = figures.coordinates_to_computer(coordinate_1)
+        x2, y2 = figures.coordinates_to_computer(coordinate_2)
+        self.make_move(x1, y1, x2, y2)
+        ans = check()
+        self.unmake_move()
+        return ans
+
+    def isDrawMove(self, coordinate_1, coordinate_2):
+        """
+        Check if suggested move will lead to draw, doesn't make move.
+
+        Parameters
+        ----------
+        coordinate_1 : str
+            human-like coordinates of first cell of suggested move
+        coordinate_2 : str
+            human-like coordinates of first cell of suggested move
+
+        Returns
+        -------
+        bool
+            True if suggested move will lead to draw
+            False otherwise
+        """
+        return self._probe_move(coordinate_1, coordinate_2, self.is_draw)
+
+    def isWinMove(self, coordinate_1, coordinate_2):
+        """
+        Check if suggested move will lead to checkmate, doesn't make move.
+
+        Parameters
+        ----------
+        coordinate_1 : str
+            human-like coordinates of first cell of suggested move
+        coordinate_2 : str
+            human-like coordinates of first cell of suggested move
+
+        Returns
+        -------
+        bool
+            True if suggested move will lead to checkmate
+            False otherwise
+        """
+        return self._probe_move(coordinate_1, coordinate_2, self.is_checkmate)
+
+    def classify_move(self, coordinate_1, coordinate_2):
+        """
+        Check if suggested move is legal and what it leads to.
+
+        The move is made and taken back once, so it is cheaper than
+        calling isPossibleMove, isWinMove and isDrawMove one by one.
+
+        Parameters
+        ----------
+        coordinate_1 : str
+            human-like coordinate of the ceil figure should be moved from
+        coordinate_2 : str
+            human-like coordinate of the ceil figure should be moved to
+
+        Returns
+        -------
+        tuple
+            kind of the move (MOVE_ILLEGAL if it is not the player's turn,
+            the move is impossible or leaves own King attacked, otherwise
+            MOVE_NORMAL, MOVE_CHECK, MOVE_CHECKMATE or one of DRAW_KINDS)
+            and value of the figure captured by the move (0 if none)
+        """
+        if not self.isPossibleMove(coordinate_1, coordinate_2):
+            return MOVE_ILLEGAL, 0
+
+        color = self.current_player
+        eated_figure = self.make_packed_move(
+                figures.SQUARES[coordinate_1]
+                | figures.SQUARES[coordinate_2] << 6)
+        if self.is_king_attacked(color):
+            kind = MOVE_ILLEGAL
         else:
-            return -1
+            kind = self.position_status()
+        self.unmake_move()
+        if kind == MOVE_ILLEGAL or eated_figure is None:
+            return kind, 0
+        return kind, eated_figure.value
 
-    def handle_move(self, x1, y1, x2, y2, moving_figures, fixed_figures):
+    def handle_move(self, x1, y1, x2, y2):
         """
         Handles move from (x1, y1) to (x2, y2) if it is possible move.
 
@@ -622,58 +1660,28 @@ class Game():
             first coordinate of ceil where figure should be moved to
         y2 : int
             second coordinate of ceil where figure should be moved to
-        moving_figures : list
-            list of figures of active player
-        fixed_figures : list
-            list of figures of the opposite player
 
         Returns
         -------
         str
             'IMPOSSIBLE MOVE' if proposed move is impossible
         int
-            0 if the move is roque or en passant and the move was made
-            successfully
-        str
-            'CHECK!' or 'CHECKMATE!' if move led to check or checkmate
-            respectively
-        int
-            score changes after successful neither roque not en passant move
+            score changes after successful move
         """
-        if self.handle_en_passant_roque(x1, y1, x2, y2,
-                                        moving_figures, fixed_figures) == 0:
-            return 0
-
-        score = 0
-#        eated_figure = None
-        for fig in moving_figures:
-            if fig.x == x1 and fig.y == y1:
-                if (x2, y2) in fig.possible_moves:
-                    if self.board[x2][y2] != ' ':
-                        for i in range(len(fixed_figures)):
-                            if (fixed_figures[i].x == x2
-                                    and fixed_figures[i].y == y2):
-                                score = fixed_figures[i].value
-#                                eated_figure = fixed_figures.pop(i)
-                                break
-                    fig.x = x2
-                    fig.y = y2
-                    self.board[x2][y2] = self.board[x1][y1]
-                    self.board[x1][y1] = ' '
-                    if isinstance(fig, figures.Pawn) and (abs(y2 - y1) == 2):
-                        fig.has_moved_two = True
-                    break
-        else:
+        moving_figures, _ = self._side_figures(self.current_player)
+        i = self._find_figure(moving_figures, x1, y1)
+        if i is None or (x2, y2) not in moving_figures[i].possible_moves:
             return 'IMPOSSIBLE MOVE'
 
-        ans = score
-#        ans = self.is_check_move(x1, y1, x2, y2,
-#                                 moving_figures, fixed_figures, eated_figure)
+        score = self.score
+        self.make_move(x1, y1, x2, y2)
+        self._refresh_possible_moves()
+        return self.score - score
 
-        if ans is not None:
-            return ans
-        else:
-            return score
+    def cancel_move(self):
+        """Takes back the last move and updates possible moves."""
+        self.unmake_move()
+        self._refresh_possible_moves()
 
     def move(self, coordinate_1, coordinate_2):
         """
@@ -688,40 +1696,13 @@ class Game():
 
         Returns
         -------
-        str
-            'IMPOSSIBLE MOVE' if proposed move is impossible
-        str
-            'It's your opponent's turn!' if now it is opponent's move
-        tuple
-            tuple of human-like coordinates - move-from and move-to ceils -
-            if the move was made successfully
+        bool
+            True if the move was made successfully
+            False otherwise
         """
-        self.update_possible_moves()
-        x1, y1 = figures.coordinates_to_computer(coordinate_1)
-        x2, y2 = figures.coordinates_to_computer(coordinate_2)
-
-        if self.current_player == 'w' and self.player == 'w':
-            ans = self.handle_move(
-                    x1, y1, x2, y2, self.white_figures, self.black_figures)
-            self.current_player = 'b'
-            if isinstance(ans, int):
-                self.score += ans
-            else:
-                return False
-        elif self.current_player == 'b' and self.player == 'b':
-            ans = self.handle_move(
-                    x1, y1, x2, y2, self.black_figures, self.white_figures)
-            self.current_player = 'w'
-            if isinstance(ans, int):
-                self.score -= ans
-            else:
-                return False
-        else:
+        if self.current_player != self.player:
             return False
-
-        self.moves_history.append((coordinate_1, coordinate_2))
-        self.update_possible_moves()
-        return True
+        return self.move_from_server(coordinate_1, coordinate_2)
 
     def move_from_server(self, coordinate_1, coordinate_2):
         """
@@ -736,39 +1717,1187 @@ class Game():
 
         Returns
         -------
-        tuple
-            tuple of human-like coordinates - move-from and move-to ceils
+        bool
+            True if the move was made successfully
+            False otherwise
         """
-        self.update_possible_moves()
         x1, y1 = figures.coordinates_to_computer(coordinate_1)
         x2, y2 = figures.coordinates_to_computer(coordinate_2)
 
-        if self.current_player == 'w':
-            ans = self.handle_move(
-                    x1, y1, x2, y2, self.white_figures, self.black_figures)
-            self.current_player = 'b'
-            if isinstance(ans, int):
-                self.score += ans
-            else:
-                return False
-        elif self.current_player == 'b':
-            ans = self.handle_move(
-                    x1, y1, x2, y2, self.black_figures, self.white_figures)
-            self.current_player = 'w'
-            if isinstance(ans, int):
-                self.score -= ans
-            else:
-                return False
-        else:
+        if not isinstance(self.handle_move(x1, y1, x2, y2), int):
             return False
 
         self.moves_history.append((coordinate_1, coordinate_2))
-        self.update_possible_moves()
         return True
 
+    def _make_trusted(self, coordinate_1, coordinate_2):
+        """Makes the move without checks and possible moves update."""
+        sq1 = figures.SQUARES[coordinate_1]
+        sq2 = figures.SQUARES[coordinate_2]
+        self.make_move(sq1 & 7, sq1 >> 3, sq2 & 7, sq2 >> 3)
+        self.moves_history.append((coordinate_1, coordinate_2))
+        return True
+
+    def _snapshot_trusted(self):
+        """Returns snapshot with possible moves of the position."""
+        self.update_possible_moves()
+        return self.snapshot()
+
+    def replay(self, moves, trusted=True, plies=()):
+        """
+        Makes recorded moves, e.g. a game story of the server.
+
+        Trusted moves are made by make_move alone: possible moves and
+        attack maps are updated once, after the last move, instead of
+        after each one. Untrusted moves are made by move_from_server.
+
+        Parameters
+        ----------
+        moves : iterable
+            moves accepted by parse_move, records which aren't moves
+            ('give_up', 'draw') are skipped
+        trusted : bool
+            if True, the moves are known to be possible and aren't
+            checked (default True)
+        plies : collection
+            numbers of moves made after which snapshot() is saved
+            (0 is the position before the first move, default no one)
+
+        Returns
+        -------
+        dict
+            dictionary with keys - plies and values - snapshots
+
+        Raises
+        ------
+        ValueError
+            if untrusted move is impossible
+        """
+        if not trusted:
+            return replay_moves(moves, self.move_from_server,
+                                self.snapshot, plies)
+        self.attacks = None
+        snapshots = replay_moves(moves, self._make_trusted,
+                                 self._snapshot_trusted, plies)
+        self.update_possible_moves()
+        return snapshots
+
     def get_score(self):
         """Returns score advantage of active player."""
         if self.player == 'w':
             return self.score
         else:
             return -self.score
+
+
+class BitboardGame():
+    """
+    A class used to present chess game on top of bitboard position.
+
+    Has the same public interface as Game, but keeps the position in
+    bitboard.Position instead of figure objects and generates only
+    legal moves. Pawns are promoted to Queen unless other figure is asked.
+
+    Attributes
+    ----------
+    position : bitboard.Position
+        current position of the game
+    hash : int
+        Zobrist key of the current position (equal to Game.hash
+        for the same position)
+    board : list
+        list (len 8) of lists (len 8) where each element is string
+        (' ' if there is no figure and figure label otherwise)
+    player : str
+        color of the figures the player plays with ('w' - white, 'b' - black)
+    current_player : str
+        color of the figures which turn now ('w' - white, 'b' - black)
+    score : int
+        score advantage if game (score > 0 for white and score < 0 for black)
+    moves_history : list
+        list of tuples of human-like coordinates of moves in game
+
+    Methods
+    -------
+    from_fen(fen, player)
+        return game set up to the position described by FEN string
+    to_fen()
+        return FEN string of the position
+    snapshot()
+        return immutable value describing the position
+    restore(snapshot)
+        set up the position saved by snapshot()
+    get_possible_moves()
+        return dictionary with keys - coordinates of figures on
+        player's side and values - list of ceils where those figures can move
+    get_board()
+        return board as string in "pretty" format
+    print_board()
+        print board in "pretty" format
+    isMyMove()
+        check if it is the player's turn
+    isPossibleMove(coordinate_1, coordinate_2)
+        check if suggested move is possible
+    legal_moves_from(coordinate)
+        yield ceils the figure can move to without leaving King attacked
+    isDrawMove(coordinate_1, coordinate_2)
+        check if suggested move will lead to draw
+    isWinMove(coordinate_1, coordinate_2)
+        check if suggested move will lead to checkmate
+    classify_move(coordinate_1, coordinate_2)
+        check if suggested move is legal and what it leads to
+    move(coordinate_1, coordinate_2, promotion)
+        make player's move
+    move_from_server(coordinate_1, coordinate_2, promotion)
+        make move of any side
+    replay(moves, trusted, plies)
+        make recorded moves
+    get_score()
+        return your score advantage
+    perft(depth)
+        return number of leaf nodes of legal move tree of given depth
+    perft_divide(depth)
+        return perft(depth - 1) after each legal move
+    """
+
+    def __init__(self, player, position=None):
+        """
+        Init of BitboardGame class.
+
+        Parameters
+        ----------
+        player : str
+            color of the figures the player plays with
+            ('w' - white, 'b' - black)
+        position : bitboard.Position
+            position to start from (default is the beginning of the game)
+        """
+        if position is None:
+            position = bitboard.Position.initial()
+        self.position = position
+        self.player = player
+        self.score = 0
+        self.moves_history = []
+
+    @classmethod
+    def from_fen(cls, fen, player='w'):
+        """
+        Creates game set up to the position described by FEN string.
+
+        Parameters
+        ----------
+        fen : str
+            FEN string of the position
+        player : str
+            color of the figures the player plays with
+            ('w' - white, 'b' - black, default 'w')
+
+        Returns
+        -------
+        BitboardGame
+            game at the position, score is material advantage of White
+
+        Raises
+        ------
+        ValueError
+            if fen is not valid FEN string
+        """
+        game = cls(player, bitboard.Position.from_fen(fen))
+        game.score = sum(bitboard.VALUES[code % 6] * (1 - code // 6 * 2)
+                         for code in game.position.squares
+                         if code != bitboard.EMPTY)
+        return game
+
+    def to_fen(self):
+        """Returns Forsyth-Edwards Notation string of the position."""
+        return self.position.to_fen()
+
+    def snapshot(self):
+        """
+        Returns immutable value describing the position.
+
+        Returns
+        -------
+        tuple
+            FEN string of the position and score, value to pass
+            to restore()
+        """
+        return self.position.to_fen(), self.score
+
+    def restore(self, snapshot):
+        """
+        Sets up the position saved by snapshot().
+
+        Parameters
+        ----------
+        snapshot : tuple
+            value returned by snapshot()
+        """
+        fen, self.score = snapshot
+        self.position = bitboard.Position.from_fen(fen)
+
+    @property
+    def current_player(self):
+        """Color of the figures which turn now ('w' or 'b')."""
+        return bitboard.COLORS[self.position.side]
+
+    @property
+    def board(self):
+        """Board as list of lists of figure labels."""
+        return self.position.to_board()
+
+    @property
+    def hash(self):
+        """Zobrist key of the current position."""
+        return self.position.hash
+
+    def find_move(self, coordinate_1, coordinate_2, promotion='Q'):
+        """
+        Returns packed legal move for human-like coordinates.
+
+        Parameters
+        ----------
+        coordinate_1 : str
+            human-like coordinate of the ceil figure should be moved from
+        coordinate_2 : str
+            human-like coordinate of the ceil figure should be moved to
+        promotion : str
+            figure the pawn is promoted to ('Q', 'R', 'B' or 'KN')
+
+        Returns
+        -------
+        int
+            packed legal move
+        None
+            if the move is impossible
+        """
+        try:
+            x1, y1 = figures.coordinates_to_computer(coordinate_1)
+            x2, y2 = figures.coordinates_to_computer(coordinate_2)
+        except (KeyError, IndexError):
+            return None
+        return self.position.find_move(
+                y1 * 8 + x1, y2 * 8 + x2,
+                bitboard.LABELS.index(promotion + 'w'))
+
+    def get_possible_moves(self):
+        """
+        Collects legal moves of the player into dictionary.
+
+        Returns
+        -------
+        dictionary
+            dictionary with keys - coordinates of figures on player's
+            side and values - list of ceils where those figures can move
+        """
+        if self.current_player != self.player:
+            return []
+
+        names = bitboard.SQUARE_NAMES
+        possible_moves = {names[sq]: set() for sq in bitboard.iter_squares(
+                self.position.occupancy[self.position.side])}
+        for move in self.position.legal_moves():
+            possible_moves[names[move & 63]].add(names[move >> 6 & 63])
+        return {square: sorted(targets)
+                for square, targets in sorted(possible_moves.items())}
+
+    def get_board(self):
+        """Returns board as string in "pretty" format."""
+        return format_board(self.board, self.player)
+
+    def print_board(self):
+        """Prints board in "pretty" format."""
+        print(format_board(self.board, self.player))
+
+    def isMyMove(self):
+        """Returns True if it is the player's turn, False otherwise."""
+        return self.player == self.current_player
+
+    def isPossibleMove(self, coordinate_1, coordinate_2):
+        """Returns True if suggested move is possible, False otherwise."""
+        return (self.isMyMove()
+                and self.find_move(coordinate_1, coordinate_2) is not None)
+
+    def legal_moves_from(self, coordinate):
+        """Yields ceils the figure of active player can move to."""
+        square = figures.SQUARES.get(coordinate)
+        if square is None:
+            return
+        names = bitboard.SQUARE_NAMES
+        targets = set()
+        for move in self.position.legal_moves(square):
+            if move >> 6 & 63 not in targets:
+                targets.add(move >> 6 & 63)
+                yield names[move >> 6 & 63]
+
+    def _probe(self, coordinate_1, coordinate_2, check):
+        """Makes player's move, calls check() and takes the move back."""
+        if not self.isMyMove():
+            return False
+        move = self.find_move(coordinate_1, coordinate_2)
+        if move is None:
+            return False
+        self.position.make_move(move)
+        ans = check()
+        self.position.unmake_move()
+        return ans
+
+    def isDrawMove(self, coordinate_1, coordinate_2):
+        """
+        Check if suggested move will lead to draw, doesn't make move.
+
+        Parameters
+        ----------
+        coordinate_1 : str
+            human-like coordinates of first cell of suggested move
+        coordinate_2 : str
+            human-like coordinates of first cell of suggested move
+
+        Returns
+        -------
+        bool
+            True if suggested move will lead to stalemate
+            False otherwise
+        """
+        return self._probe(coordinate_1, coordinate_2,
+                           self.position.is_draw)
+
+    def isWinMove(self, coordinate_1, coordinate_2):
+        """
+        Check if suggested move will lead to checkmate, doesn't make move.
+
+        Parameters
+        ----------
+        coordinate_1 : str
+            human-like coordinates of first cell of suggested move
+        coordinate_2 : str
+            human-like coordinates of first cell of suggested move
+
+        Returns
+        -------
+        bool
+            True if suggested move will lead to checkmate
+            False otherwise
+        """
+        return self._probe(coordinate_1, coordinate_2,
+                           self.position.is_checkmate)
+
+    def classify_move(self, coordinate_1, coordinate_2):
+        """
+        Check if suggested move is legal and what it leads to.
+
+        Parameters
+        ----------
+        coordinate_1 : str
+            human-like coordinate of the ceil figure should be moved from
+        coordinate_2 : str
+            human-like coordinate of the ceil figure should be moved to
+
+        Returns
+        -------
+        tuple
+            kind of the move (MOVE_ILLEGAL, MOVE_NORMAL, MOVE_CHECK,
+            MOVE_CHECKMATE or one of DRAW_KINDS) and value of the figure
+            captured by the move (0 if none)
+        """
+        if not self.isMyMove():
+            return MOVE_ILLEGAL, 0
+        move = self.find_move(coordinate_1, coordinate_2)
+        if move is None:
+            return MOVE_ILLEGAL, 0
+
+        position = self.position
+        captured = position.make_move(move)
+        if position.in_check():
+            kind = MOVE_CHECK if position.legal_moves() else MOVE_CHECKMATE
+        else:
+            kind = MOVE_NORMAL if position.legal_moves() else MOVE_STALEMATE
+        kind = draw_by_rules(position, kind)
+        position.unmake_move()
+        return kind, (0 if captured == bitboard.EMPTY
+                      else bitboard.VALUES[captured % 6])
+
+    def move(self, coordinate_1, coordinate_2, promotion='Q'):
+        """
+        Makes the move if it is players turn now.
+
+        Parameters
+        ----------
+        coordinate_1 : str
+            human-like coordinate of the ceil figure should be moved from
+        coordinate_2 : str
+            human-like coordinate of the ceil figure should be moved to
+        promotion : str
+            figure the pawn is promoted to (default 'Q')
+
+        Returns
+        -------
+        bool
+            True if the move was made successfully
+            False otherwise
+        """
+        if not self.isMyMove():
+            return False
+        return self.move_from_server(coordinate_1, coordinate_2, promotion)
+
+    def move_from_server(self, coordinate_1, coordinate_2, promotion='Q'):
+        """
+        Makes the move of any side.
+
+        Parameters
+        ----------
+        coordinate_1 : str
+            human-like coordinate of the ceil figure should be moved from
+        coordinate_2 : str
+            human-like coordinate of the ceil figure should be moved to
+        promotion : str
+            figure the pawn is promoted to (default 'Q')
+
+        Returns
+        -------
+        bool
+            True if the move was made successfully
+            False otherwise
+        """
+        move = self.find_move(coordinate_1, coordinate_2, promotion)
+        if move is None:
+            return False
+
+        sign = 1 if self.position.side == bitboard.WHITE else -1
+        captured = self.position.make_move(move)
+        if captured != bitboard.EMPTY:
+            self.score += sign * bitboard.VALUES[captured % 6]
+        if move >> 12 & 7:
+            self.score += sign * (bitboard.VALUES[move >> 12 & 7]
+                                  - bitboard.VALUES[bitboard.PAWN])
+        self.moves_history.append((coordinate_1, coordinate_2))
+        return True
+
+    def replay(self, moves, trusted=True, plies=()):
+        """
+        Makes recorded moves, see Game.
+
+        Each move is looked up among the moves of the position anyway,
+        so trusted moves are made the same way as untrusted ones.
+
+        Parameters
+        ----------
+        moves : iterable
+            moves accepted by parse_move
+        trusted : bool
+            if True, the moves are known to be possible (default True)
+        plies : collection
+            numbers of moves made after which snapshot() is saved
+
+        Returns
+        -------
+        dict
+            dictionary with keys - plies and values - snapshots
+
+        Raises
+        ------
+        ValueError
+            if the move is impossible
+        """
+        return replay_moves(moves, self.move_from_server, self.snapshot,
+                            plies)
+
+    def get_score(self):
+        """Returns score advantage of active player."""
+        if self.player == 'w':
+            return self.score
+        else:
+            return -self.score
+
+    def perft(self, depth):
+        """Returns number of leaf nodes of legal move tree of given depth."""
+        return self.position.perft(depth)
+
+    def perft_divide(self, depth):
+        """Returns perft(depth - 1) after each legal move."""
+        return self.position.perft_divide(depth)
+
+
+class MailboxGame():
+    """
+    A class used to present chess game on top of 0x88 mailbox position.
+
+    Has the same public interface and the same legacy rules as Game,
+    but keeps the position in mailbox88.Position, a flat array of
+    small integer codes, instead of figure objects and label strings.
+
+    Attributes
+    ----------
+    position : mailbox88.Position
+        current position of the game
+    board : list
+        list (len 8) of lists (len 8) where each element is string
+        (' ' if there is no figure and figure label otherwise),
+        read-only, built from the position
+    player : str
+        color of the figures the player plays with ('w' - white, 'b' - black)
+    current_player : str
+        color of the figures which turn now ('w' - white, 'b' - black)
+    score : int
+        score advantage if game (score > 0 for white and score < 0 for black)
+    hash : int
+        Zobrist key of the position, equal to Game.hash
+    moves_history : list
+        list of tuples of human-like coordinates of moves in game
+
+    Methods
+    -------
+    from_fen(fen, player)
+        return game set up to the position described by FEN string
+    to_fen()
+        return FEN string of the position
+    snapshot()
+        return immutable value describing the position
+    restore(snapshot)
+        set up the position saved by snapshot()
+    get_possible_moves()
+        return dictionary with keys - coordinates of figures on
+        player's side and values - list of ceils where those figures can move
+    get_board()
+        return board as string in "pretty" format
+    print_board()
+        print board in "pretty" format
+    isMyMove()
+        check if it is the player's turn
+    isPossibleMove(coordinate_1, coordinate_2)
+        check if suggested move is possible
+    legal_moves_from(coordinate)
+        yield ceils the figure can move to without leaving King attacked
+    isDrawMove(coordinate_1, coordinate_2)
+        check if suggested move will lead to draw
+    isWinMove(coordinate_1, coordinate_2)
+        check if suggested move will lead to checkmate
+    classify_move(coordinate_1, coordinate_2)
+        check if suggested move is legal and what it leads to
+    handle_move(x1, y1, x2, y2)
+        handle move from (x1, y1) to (x2, y2)
+    cancel_move()
+        cancel the last move
+    move(coordinate_1, coordinate_2)
+        make player's move
+    move_from_server(coordinate_1, coordinate_2)
+        make move of any side
+    replay(moves, trusted, plies)
+        make recorded moves
+    get_score()
+        return your score advantage
+    perft(depth)
+        return number of leaf nodes of legal move tree of given depth
+    perft_divide(depth)
+        return perft(depth - 1) after each legal move
+    """
+
+    def __init__(self, player, position=None):
+        """
+        Init of MailboxGame class.
+
+        Parameters
+        ----------
+        player : str
+            color of the figures the player plays with
+            ('w' - white, 'b' - black)
+        position : mailbox88.Position
+            position to start from (default is the beginning of the game)
+        """
+        if position is None:
+            position = mailbox88.Position.initial()
+        self.position = position
+        self.player = player
+        self.moves_history = []
+
+    @classmethod
+    def from_fen(cls, fen, player='w'):
+        """
+        Creates game set up to the position described by FEN string.
+
+        Parameters
+        ----------
+        fen : str
+            FEN string of the position
+        player : str
+            color of the figures the player plays with
+            ('w' - white, 'b' - black, default 'w')
+
+        Returns
+        -------
+        MailboxGame
+            game at the position, score is material advantage of White
+
+        Raises
+        ------
+        ValueError
+            if fen is not valid FEN string or a side has no King
+            or more than one King
+        """
+        return cls(player, mailbox88.Position.from_fen(fen))
+
+    def to_fen(self):
+        """Returns FEN string of the position."""
+        return self.position.to_fen()
+
+    def snapshot(self):
+        """
+        Returns immutable value describing the position.
+
+        Returns
+        -------
+        tuple
+            value to pass to restore()
+        """
+        return self.position.snapshot()
+
+    def restore(self, snapshot):
+        """
+        Sets up the position saved by snapshot().
+
+        Parameters
+        ----------
+        snapshot : tuple
+            value returned by snapshot()
+        """
+        self.position.restore(snapshot)
+
+    @property
+    def current_player(self):
+        """Color of the figures which turn now ('w' or 'b')."""
+        return mailbox88.COLORS[self.position.side]
+
+    @property
+    def board(self):
+        """Board in the Game.board format."""
+        return self.position.to_board()
+
+    @property
+    def score(self):
+        """Score advantage of White."""
+        return self.position.score
+
+    @property
+    def hash(self):
+        """Zobrist key of the position."""
+        return self.position.hash
+
+    def _find_move(self, coordinate_1, coordinate_2):
+        """Returns packed possible move of active player or None."""
+        try:
+            sq1 = figures.SQUARES[coordinate_1]
+            sq2 = figures.SQUARES[coordinate_2]
+        except KeyError:
+            return None
+        return self.position.find_move(figures.to_mailbox(sq1),
+                                       figures.to_mailbox(sq2))
+
+    def get_possible_moves(self):
+        """
+        Collects possible moves of the player into dictionary.
+
+        Returns
+        -------
+        dictionary
+            dictionary with keys - coordinates of figures on player's
+            side and values - list of ceils where those figures can move
+        """
+        if self.current_player != self.player:
+            return []
+
+        names = figures.SQUARE_NAMES
+        position = self.position
+        possible_moves = {}
+        for sq in mailbox88.BOARD_SQUARES:
+            code = position.squares[sq]
+            if code and code & figures.MAILBOX_BLACK == position.side:
+                possible_moves[names[figures.from_mailbox(sq)]] = sorted(
+                        names[figures.from_mailbox(target)]
+                        for target in position.targets(sq))
+        return dict(sorted(possible_moves.items()))
+
+    def get_board(self):
+        """Returns board as string in "pretty" format."""
+        return format_board(self.board, self.player)
+
+    def print_board(self):
+        """Prints board in "pretty" format."""
+        print(format_board(self.board, self.player))
+
+    def isMyMove(self):
+        """Returns True if it is the player's turn, False otherwise."""
+        return self.player == self.current_player
+
+    def isPossibleMove(self, coordinate_1, coordinate_2):
+        """Returns True if suggested move is legal, False otherwise."""
+        return (self.isMyMove()
+                and coordinate_2 in self.legal_moves_from(coordinate_1))
+
+    def legal_moves_from(self, coordinate):
+        """Yields ceils the figure of active player can legally move to."""
+        square = figures.SQUARES.get(coordinate)
+        if square is None:
+            return
+        names = figures.SQUARE_NAMES
+        for move in self.position.iter_legal_moves(
+                figures.to_mailbox(square)):
+            yield names[figures.from_mailbox(move >> 7)]
+
+    def _probe(self, coordinate_1, coordinate_2, check):
+        """Makes legal move, calls check() and takes the move back."""
+        if not self.isPossibleMove(coordinate_1, coordinate_2):
+            return False
+        move = self._find_move(coordinate_1, coordinate_2)
+        self.position.make_move(move)
+        ans = check()
+        self.position.unmake_move()
+        return ans
+
+    def isDrawMove(self, coordinate_1, coordinate_2):
+        """
+        Check if suggested move will lead to draw, doesn't make move.
+
+        Parameters
+        ----------
+        coordinate_1 : str
+            human-like coordinates of first cell of suggested move
+        coordinate_2 : str
+            human-like coordinates of first cell of suggested move
+
+        Returns
+        -------
+        bool
+            True if suggested move will lead to stalemate
+            False otherwise
+        """
+        return self._probe(coordinate_1, coordinate_2,
+                           self.position.is_draw)
+
+    def isWinMove(self, coordinate_1, coordinate_2):
+        """
+        Check if suggested move will lead to checkmate, doesn't make move.
+
+        Parameters
+        ----------
+        coordinate_1 : str
+            human-like coordinates of first cell of suggested move
+        coordinate_2 : str
+            human-like coordinates of first cell of suggested move
+
+        Returns
+        -------
+        bool
+            True if suggested move will lead to checkmate
+            False otherwise
+        """
+        return self._probe(coordinate_1, coordinate_2,
+                           self.position.is_checkmate)
+
+    def classify_move(self, coordinate_1, coordinate_2):
+        """
+        Check if suggested move is legal and what it leads to.
+
+        Parameters
+        ----------
+        coordinate_1 : str
+            human-like coordinate of the ceil figure should be moved from
+        coordinate_2 : str
+            human-like coordinate of the ceil figure should be moved to
+
+        Returns
+        -------
+        tuple
+            kind of the move (MOVE_ILLEGAL, MOVE_NORMAL, MOVE_CHECK,
+            MOVE_CHECKMATE or one of DRAW_KINDS) and value of the figure
+            captured by the move (0 if none)
+        """
+        if not self.isMyMove():
+            return MOVE_ILLEGAL, 0
+        move = self._find_move(coordinate_1, coordinate_2)
+        if move is None or not self.position.is_legal(move):
+            return MOVE_ILLEGAL, 0
+
+        position = self.position
+        captured = position.make_move(move)
+        if position.in_check():
+            kind = MOVE_CHECK if position.has_legal_move() else MOVE_CHECKMATE
+        else:
+            kind = (MOVE_NORMAL if position.has_legal_move()
+                    else MOVE_STALEMATE)
+        kind = draw_by_rules(position, kind)
+        position.unmake_move()
+        return kind, mailbox88.VALUES[captured & 7]
+
+    def handle_move(self, x1, y1, x2, y2):
+        """
+        Handles move from (x1, y1) to (x2, y2) if it is possible move.
+
+        Parameters
+        ----------
+        x1 : int
+            first coordinate of ceil where figure whould be moved from
+        y1 : int
+            second coordinate of ceil where figure should be moved from
+        x2 : int
+            first coordinate of ceil where figure should be moved to
+        y2 : int
+            second coordinate of ceil where figure should be moved to
+
+        Returns
+        -------
+        str
+            'IMPOSSIBLE MOVE' if proposed move is impossible
+        int
+            score changes after successful move
+        """
+        move = self.position.find_move(y1 * 16 + x1, y2 * 16 + x2)
+        if move is None:
+            return 'IMPOSSIBLE MOVE'
+
+        score = self.position.score
+        self.position.make_move(move)
+        return self.position.score - score
+
+    def cancel_move(self):
+        """Takes back the last move."""
+        self.position.unmake_move()
+
+    def move(self, coordinate_1, coordinate_2):
+        """
+        Calls handle_move method if it is players turn now.
+
+        Parameters
+        ----------
+        coordinate_1 : str
+            human-like coordinate of the ceil figure should be moved from
+        coordinate_2 : str
+            human-like coordinate of the ceil figure should be moved to
+
+        Returns
+        -------
+        bool
+            True if the move was made successfully
+            False otherwise
+        """
+        if not self.isMyMove():
+            return False
+        return self.move_from_server(coordinate_1, coordinate_2)
+
+    def move_from_server(self, coordinate_1, coordinate_2):
+        """
+        Calls handle_move forcedly.
+
+        Parameters
+        ----------
+        coordinate_1 : str
+            human-like coordinate of the ceil figure should be moved from
+        coordinate_2 : str
+            human-like coordinate of the ceil figure should be moved to
+
+        Returns
+        -------
+        bool
+            True if the move was made successfully
+            False otherwise
+        """
+        x1, y1 = figures.coordinates_to_computer(coordinate_1)
+        x2, y2 = figures.coordinates_to_computer(coordinate_2)
+
+        if not isinstance(self.handle_move(x1, y1, x2, y2), int):
+            return False
+
+        self.moves_history.append((coordinate_1, coordinate_2))
+        return True
+
+    def replay(self, moves, trusted=True, plies=()):
+        """
+        Makes recorded moves, see Game.
+
+        Each move is looked up among the moves of the position anyway,
+        so trusted moves are made the same way as untrusted ones.
+
+        Parameters
+        ----------
+        moves : iterable
+            moves accepted by parse_move
+        trusted : bool
+            if True, the moves are known to be possible (default True)
+        plies : collection
+            numbers of moves made after which snapshot() is saved
+
+        Returns
+        -------
+        dict
+            dictionary with keys - plies and values - snapshots
+
+        Raises
+        ------
+        ValueError
+            if the move is impossible
+        """
+        return replay_moves(moves, self.move_from_server, self.snapshot,
+                            plies)
+
+    def get_score(self):
+        """Returns score advantage of active player."""
+        if self.player == 'w':
+            return self.score
+        else:
+            return -self.score
+
+    def perft(self, depth):
+        """Returns number of leaf nodes of legal move tree of given depth."""
+        return self.position.perft(depth)
+
+    def perft_divide(self, depth):
+        """Returns perft(depth - 1) after each legal move."""
+        return self.position.perft_divide(depth)
+
+
+class DifferentialGame:
+    """
+    A class used to play game by two backends side by side.
+
+    Each call is passed to both games and the results are compared,
+    board, active player and score are compared after each move.
+    The result of the reference game is returned.
+
+    Attributes
+    ----------
+    reference : Game
+        game of the trusted backend
+    candidate : Game or BitboardGame
+        game of the backend checked against the reference one
+    player : str
+        color of the figures the player plays with, set in both games
+        ('w' - white, 'b' - black)
+
+    Methods
+    -------
+    get_possible_moves()
+        return dictionary with keys - coordinates of figures on
+        player's side and values - list of ceils where those figures can move
+    get_board()
+        return board as string in "pretty" format
+    print_board()
+        print board in "pretty" format
+    isMyMove()
+        check if it is the player's turn
+    isPossibleMove(coordinate_1, coordinate_2)
+        check if suggested move is possible
+    legal_moves_from(coordinate)
+        yield ceils the figure can move to without leaving King attacked
+    isDrawMove(coordinate_1, coordinate_2)
+        check if suggested move will lead to draw
+    isWinMove(coordinate_1, coordinate_2)
+        check if suggested move will lead to checkmate
+    classify_move(coordinate_1, coordinate_2)
+        check if suggested move is legal and what it leads to
+    move(coordinate_1, coordinate_2)
+        make player's move
+    move_from_server(coordinate_1, coordinate_2)
+        make move of any side
+    replay(moves, trusted, plies)
+        make recorded moves
+    get_score()
+        return your score advantage
+
+    Raises
+    ------
+    RuntimeError
+        from any method, if the backends give different results
+    """
+
+    def __init__(self, reference, candidate):
+        """
+        Init of DifferentialGame class.
+
+        Parameters
+        ----------
+        reference : Game
+            game of the trusted backend
+        candidate : Game or BitboardGame
+            game of the checked backend at the same position
+        """
+        self.reference = reference
+        self.candidate = candidate
+        self._check_state('start')
+
+    @property
+    def player(self):
+        """Color of the figures the player plays with."""
+        return self.reference.player
+
+    @player.setter
+    def player(self, color):
+        self.reference.player = color
+        self.candidate.player = color
+
+    @property
+    def current_player(self):
+        """Color of the figures which turn now."""
+        return self.reference.current_player
+
+    @property
+    def board(self):
+        """Board of the reference game."""
+        return self.reference.board
+
+    @property
+    def score(self):
+        """Score of the reference game."""
+        return self.reference.score
+
+    @property
+    def moves_history(self):
+        """Moves made in the reference game."""
+        return self.reference.moves_history
+
+    def _diverge(self, action, expected, got):
+        """Raises RuntimeError describing the divergence."""
+        if isinstance(expected, dict) and isinstance(got, dict):
+            keys = sorted(key for key in set(expected) | set(got)
+                          if expected.get(key) != got.get(key))
+            expected = {key: expected.get(key) for key in keys}
+            got = {key: got.get(key) for key in keys}
+        raise RuntimeError(
+                'backends diverged after {} moves at {}: {} gave {!r}, '
+                '{} gave {!r}'.format(len(self.reference.moves_history),
+                                      action,
+                                      type(self.reference).__name__,
+                                      expected,
+                                      type(self.candidate).__name__, got))
+
+    def _check_state(self, action):
+        """Compares board, active player and score of the games."""
+        for name in ('board', 'current_player', 'score'):
+            expected = getattr(self.reference, name)
+            got = getattr(self.candidate, name)
+            if expected != got:
+                self._diverge('{} ({})'.format(action, name), expected, got)
+
+    def _call(self, name, *args):
+        """Calls method of both games and compares the results."""
+        expected = getattr(self.reference, name)(*args)
+        got = getattr(self.candidate, name)(*args)
+        if expected != got:
+            self._diverge('{}{!r}'.format(name, args), expected, got)
+        return expected
+
+    def get_possible_moves(self):
+        """Returns possible moves of the player, see Game."""
+        return self._call('get_possible_moves')
+
+    def get_board(self):
+        """Returns board as string in "pretty" format."""
+        return self._call('get_board')
+
+    def print_board(self):
+        """Prints board in "pretty" format."""
+        print(self.get_board())
+
+    def isMyMove(self):
+        """Returns True if it is the player's turn, False otherwise."""
+        return self._call('isMyMove')
+
+    def isPossibleMove(self, coordinate_1, coordinate_2):
+        """Returns True if suggested move is possible, False otherwise."""
+        return self._call('isPossibleMove', coordinate_1, coordinate_2)
+
+    def legal_moves_from(self, coordinate):
+        """Yields ceils the figure can legally move to, see Game."""
+        expected = sorted(self.reference.legal_moves_from(coordinate))
+        got = sorted(self.candidate.legal_moves_from(coordinate))
+        if expected != got:
+            self._diverge('legal_moves_from({!r})'.format(coordinate),
+                          expected, got)
+        yield from expected
+
+    def isDrawMove(self, coordinate_1, coordinate_2):
+        """Returns True if suggested move will lead to draw."""
+        return self._call('isDrawMove', coordinate_1, coordinate_2)
+
+    def isWinMove(self, coordinate_1, coordinate_2):
+        """Returns True if suggested move will lead to checkmate."""
+        return self._call('isWinMove', coordinate_1, coordinate_2)
+
+    def classify_move(self, coordinate_1, coordinate_2):
+        """Returns kind of suggested move and value of captured figure."""
+        return self._call('classify_move', coordinate_1, coordinate_2)
+
+    def move(self, coordinate_1, coordinate_2):
+        """Makes the move if it is players turn now, see Game."""
+        ans = self._call('move', coordinate_1, coordinate_2)
+        self._check_state('move{!r}'.format((coordinate_1, coordinate_2)))
+        return ans
+
+    def move_from_server(self, coordinate_1, coordinate_2):
+        """Makes the move of any side, see Game."""
+        ans = self._call('move_from_server', coordinate_1, coordinate_2)
+        self._check_state('move_from_server{!r}'.format((coordinate_1,
+                                                         coordinate_2)))
+        return ans
+
+    def replay(self, moves, trusted=True, plies=()):
+        """Makes recorded moves in both games, see Game."""
+        moves = list(moves)
+        snapshots = self.reference.replay(moves, trusted, plies)
+        got = self.candidate.replay(moves, trusted, plies)
+        if sorted(snapshots) != sorted(got):
+            self._diverge('replay', sorted(snapshots), sorted(got))
+        self._check_state('replay')
+        return snapshots
+
+    def get_score(self):
+        """Returns score advantage of active player."""
+        return self._call('get_score')
+
+
+# game classes implementing the backend interface of Game: FEN and
+# snapshot methods, possible moves, move classification and moves
+BACKENDS = {
+    'figures': Game,
+    'bitboard': BitboardGame,
+    'mailbox': MailboxGame,
+}
+REFERENCE_BACKEND = 'figures'
+BACKEND_VARIABLE = 'CHESS_BACKEND'
+DIFFERENTIAL_PREFIX = 'diff:'
+
+
+def new_game(player, backend=None):
+    """
+    Creates game of the selected backend.
+
+    Parameters
+    ----------
+    player : str
+        color of the figures the player plays with
+        ('w' - white, 'b' - black)
+    backend : str
+        name of the backend from BACKENDS or DIFFERENTIAL_PREFIX and
+        the name to check the backend against the reference one
+        (default value of CHESS_BACKEND environment variable or
+        REFERENCE_BACKEND if it isn't set)
+
+    Returns
+    -------
+    Game, BitboardGame or DifferentialGame
+        game at the start position
+
+    Raises
+    ------
+    ValueError
+        if there is no such backend
+    """
+    if backend is None:
+        backend = os.environ.get(BACKEND_VARIABLE, REFERENCE_BACKEND)
+    name = backend
+    if name.startswith(DIFFERENTIAL_PREFIX):
+        name = name[len(DIFFERENTIAL_PREFIX):]
+    if name not in BACKENDS:
+        raise ValueError('unknown backend: {!r}'.format(backend))
+    if name != backend:
+        return DifferentialGame(BACKENDS[REFERENCE_BACKEND](player),
+                                BACKENDS[name](player))
+    return BACKENDS[name](player)
@@ -0,0 +1,211 @@
+"""Differential check of game backends against the reference one."""
+
+import argparse
+import random
+import sys
+import bitboard
+from chess_game import BACKENDS, REFERENCE_BACKEND, MOVE_ILLEGAL
+from chess_game import DifferentialGame
+
+# positions and moves of tests/test_game.py
+POSITIONS = (
+    ('opening', bitboard.START_FEN, ('e2e4', 'e7e5')),
+    ('capture', bitboard.START_FEN, ('e2e4', 'd7d5', 'e4d5')),
+    ('en passant', bitboard.START_FEN,
+     ('e2e4', 'd7d5', 'e4e5', 'g7g5', 'e5d6', 'g5g4', 'h2h4', 'g4h3')),
+    ('checkmate', bitboard.START_FEN, ('g2g4', 'e7e5', 'f2f3', 'd8h4')),
+    ('short roque', bitboard.START_FEN,
+     ('e2e4', 'e7e5', 'f1d3', 'f8d6', 'g1f3', 'g8f6', 'e1g1', 'e8g8')),
+    ('long roque', bitboard.START_FEN,
+     ('d2d4', 'd7d5', 'c1e3', 'c8e6', 'b1c3', 'b8c6', 'd1d2', 'd8d7',
+      'e1c1', 'e8c8')),
+    ('development', bitboard.START_FEN,
+     ('e2e4', 'd7d5', 'e4d5', 'd8d5', 'g1f3', 'c8g4', 'f1e2', 'b8c6',
+      'e1g1', 'e8c8', 'h2h4', 'g7g5')),
+    ('fen roques', 'r3k2r/8/8/3pP3/8/8/8/R3K1R1 w Qk d6 0 12',
+     ('e1c1', 'e8g8')),
+    ('roque in check', '4k3/8/8/8/8/8/8/1r2K2R w K - 0 1', ('e1g1',)),
+)
+
+
+def make_game(candidate, fen):
+    """
+    Creates differential game of the candidate backend.
+
+    Parameters
+    ----------
+    candidate : str
+        name of the backend from BACKENDS
+    fen : str
+        FEN string of the position
+
+    Returns
+    -------
+    DifferentialGame
+        game with fen position on the board
+    """
+    return DifferentialGame(BACKENDS[REFERENCE_BACKEND].from_fen(fen),
+                            BACKENDS[candidate].from_fen(fen))
+
+
+def check_move(game, coordinate_1, coordinate_2):
+    """
+    Checks queries about the move in both backends and makes it.
+
+    Parameters
+    ----------
+    game : DifferentialGame
+        game to make the move in
+    coordinate_1 : str
+        human-like coordinate of the ceil figure should be moved from
+    coordinate_2 : str
+        human-like coordinate of the ceil figure should be moved to
+
+    Returns
+    -------
+    bool
+        True if the move was made successfully
+        False otherwise
+    """
+    game.player = game.current_player
+    game.get_possible_moves()
+    game.isPossibleMove(coordinate_1, coordinate_2)
+    game.isDrawMove(coordinate_1, coordinate_2)
+    game.isWinMove(coordinate_1, coordinate_2)
+    game.classify_move(coordinate_1, coordinate_2)
+    return game.move(coordinate_1, coordinate_2)
+
+
+def play_position(candidate, fen, moves):
+    """
+    Plays the moves from the position in both backends.
+
+    Parameters
+    ----------
+    candidate : str
+        name of the backend from BACKENDS
+    fen : str
+        FEN string of the position
+    moves : tuple
+        moves in the form 'e2e4'
+
+    Returns
+    -------
+    int
+        number of moves made
+    """
+    game = make_game(candidate, fen)
+    for move in moves:
+        check_move(game, move[:2], move[2:])
+    game.get_possible_moves()
+    return len(moves)
+
+
+def play_random(candidate, seed, plies):
+    """
+    Plays random legal moves from the start position in both backends.
+
+    Parameters
+    ----------
+    candidate : str
+        name of the backend from BACKENDS
+    seed : int
+        seed of the random moves
+    plies : int
+        maximum number of moves
+
+    Returns
+    -------
+    int
+        number of moves made (less than plies if the game is over)
+    """
+    rng = random.Random(seed)
+    game = make_game(candidate, bitboard.START_FEN)
+    for ply in range(plies):
+        game.player = game.current_player
+        moves = [(start, end) for start, ends
+                 in sorted(game.get_possible_moves().items())
+                 for end in ends]
+        rng.shuffle(moves)
+        for start, end in moves:
+            if game.classify_move(start, end)[0] != MOVE_ILLEGAL:
+                check_move(game, start, end)
+                break
+        else:
+            return ply
+    return plies
+
+
+def run(candidate, games=10, plies=80, seed=0, out=sys.stdout):
+    """
+    Checks the candidate backend on POSITIONS and random games.
+
+    Parameters
+    ----------
+    candidate : str
+        name of the backend from BACKENDS
+    games : int
+        number of random games (default 10)
+    plies : int
+        maximum number of moves in random game (default 80)
+    seed : int
+        seed of the first random game, next games use next seeds
+        (default 0)
+    out : file
+        stream the report is printed to (default sys.stdout)
+
+    Returns
+    -------
+    list
+        list of tuples (name, description) of the first divergence in
+        each diverged game
+    """
+    checks = [(name, play_position, (candidate, fen, moves))
+              for name, fen, moves in POSITIONS]
+    checks += [('random {}'.format(seed + i), play_random,
+                (candidate, seed + i, plies)) for i in range(games)]
+    divergences = []
+    for name, check, args in checks:
+        try:
+            moves = check(*args)
+        except RuntimeError as error:
+            divergences.append((name, str(error)))
+            print('{:<14} DIVERGED {}'.format(name, error), file=out)
+        else:
+            print('{:<14} ok, {} moves'.format(name, moves), file=out)
+    return divergences
+
+
+def main(argv=None):
+    """
+    Runs differential check command line interface.
+
+    Parameters
+    ----------
+    argv : list
+        command line arguments (default sys.argv[1:])
+
+    Returns
+    -------
+    int
+        exit status - 0 if backends agree and 1 otherwise
+    """
+    parser = argparse.ArgumentParser(
+            description='Check game backend against the {} one.'
+                        .format(REFERENCE_BACKEND))
+    parser.add_argument('--candidate', choices=sorted(BACKENDS),
+                        default='bitboard',
+                        help='backend to check (default bitboard)')
+    parser.add_argument('--games', type=int, default=10,
+                        help='number of random games (default 10)')
+    parser.add_argument('--plies', type=int, default=80,
+                        help='maximum length of random game (default 80)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the first random game (default 0)')
+    args = parser.parse_args(argv)
+    divergences = run(args.candidate, args.games, args.plies, args.seed)
+    return 1 if divergences else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,590 @@
+"""Alpha-beta search of the best move for the computer opponent."""
+
+import argparse
+import collections
+import sys
+import time
+import bitboard
+import evaluation
+import figures
+from chess_game import Game, LABEL_CODES
+
+MATE = 32000
+# scores beyond MATE_BOUND mean mate in MATE - abs(score) plies
+MAX_PLY = 128
+MATE_BOUND = MATE - MAX_PLY
+DRAW = 0
+INFINITY = MATE + 1
+
+# bounds of scores stored in the transposition table
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# nodes searched between checks of the deadline
+CHECK_NODES = 1024
+# captures that can't lift the score this close to alpha are pruned
+DELTA_MARGIN = 200
+
+# move ordering: transposition table move, captures by MVV-LVA, killer
+# moves and the rest by history counters
+TABLE_MOVE_ORDER = 1 << 30
+CAPTURE_ORDER = 1 << 28
+KILLER_ORDER = 1 << 27
+
+# values of figures by label, used to order and prune captures
+VALUES = {label: evaluation.MIDDLEGAME_VALUES[code % 6]
+          for label, code in LABEL_CODES.items()}
+PAWN_VALUE = evaluation.MIDDLEGAME_VALUES[bitboard.PAWN]
+
+SearchResult = collections.namedtuple(
+        'SearchResult', ('move', 'score', 'depth', 'nodes', 'seconds', 'pv'))
+SearchResult.__doc__ = """
+Result of a completed iteration of Engine.search.
+
+Attributes
+----------
+move : str
+    best move in the form 'e2e4' (None if there is no legal move)
+score : int
+    score in centipawns for active player, beyond MATE_BOUND if there
+    is a forced mate
+depth : int
+    depth of the iteration in plies, 0 for a move of the opening
+    book or if there is no legal move
+nodes : int
+    number of nodes searched since the start of the search
+seconds : float
+    time spent since the start of the search
+pv : list
+    principal variation - expected moves in the form 'e2e4'
+"""
+
+
+class _Timeout(Exception):
+    """Raised inside the search when the time budget is spent."""
+
+
+def move_name(move):
+    """
+    Returns packed move in the form 'e2e4'.
+
+    Parameters
+    ----------
+    move : int
+        packed move from_sq | to_sq << 6 (squares are y * 8 + x)
+
+    Returns
+    -------
+    str
+        start and end coordinates of the move
+    """
+    return figures.SQUARE_NAMES[move & 63] + figures.SQUARE_NAMES[move >> 6]
+
+
+def _to_table(score, ply):
+    """Returns mate score relative to the node instead of the root."""
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def _from_table(score, ply):
+    """Returns mate score relative to the root instead of the node."""
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def _tablebase_score(result, distance, ply):
+    """Returns score of the tablebase result of the node at ply."""
+    if not result:
+        return DRAW
+    return result * (MATE - ply - distance)
+
+
+class Engine():
+    """
+    A class used to search the best move in the game position.
+
+    Negamax alpha-beta search with principal variation windows is run
+    by iterative deepening until the time budget or depth limit is
+    reached. Leaves are resolved by quiescence search of captures,
+    positions are evaluated by Game.evaluate. Moves are ordered by
+    the transposition table move, captures by MVV-LVA (most valuable
+    victim, least valuable attacker), killer moves and history counters.
+
+    If the engine has an opening book, the position is looked up in
+    it first and the move of the book is played without search. If it
+    has a tablebase, positions of the tables get exact scores instead of
+    the search, the move of the root position in the tables is chosen
+    by the tablebase.
+
+    The search runs on a copy of the game, so the game itself isn't
+    changed. The transposition table is kept between searches, so the
+    engine playing the whole game reuses the work done on the previous
+    moves.
+
+    Attributes
+    ----------
+    table : dict
+        transposition table with keys - Game.position_key() and values
+        - tuples (depth, score, bound, packed move)
+    max_entries : int
+        table is cleared when it has so many entries (default 1 << 18,
+        None if the table limits its size itself)
+    killers : list
+        two quiet moves per ply which caused the last beta cutoffs
+    history : list
+        list (len 4096) of counters of beta cutoffs by packed quiet move
+    nodes : int
+        number of nodes searched by the current or the last search
+    deadline : float
+        time.perf_counter() value the search stops at
+        (None if time isn't limited)
+    stop : callable
+        function called during the search, it is stopped as soon as
+        the function returns True (None if the search can't be stopped)
+    book : book.OpeningBook
+        opening book consulted before the search (None if there is no
+        book)
+    tablebase : tablebase.Tablebase
+        endgame tables probed during the search (None if there are no
+        tables)
+
+    Methods
+    -------
+    clear()
+        forget the transposition table and move ordering statistics
+    search(game, seconds, depth, on_iteration, stop)
+        return the result of the deepest completed iteration
+    """
+
+    def __init__(self, max_entries=1 << 18, table=None, book=None,
+                 tablebase=None):
+        """
+        Init of Engine class.
+
+        Parameters
+        ----------
+        max_entries : int
+            size of the transposition table the table is cleared at
+            (default 1 << 18, None - never cleared)
+        table : dict
+            transposition table to use, for example
+            parallel.SharedTable shared with other processes
+            (default None - new dictionary)
+        book : book.OpeningBook
+            opening book consulted before the search (default None -
+            no book)
+        tablebase : tablebase.Tablebase
+            endgame tables probed during the search (default None -
+            no tables)
+        """
+        self.max_entries = max_entries
+        self.table = {} if table is None else table
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self.history = [0] * 4096
+        self.nodes = 0
+        self.deadline = None
+        self.stop = None
+        self.game = None
+        self.book = book
+        self.tablebase = tablebase
+
+    def clear(self):
+        """Forgets the transposition table and move ordering statistics."""
+        self.table.clear()
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self.history = [0] * 4096
+
+    def search(self, game, seconds=None, depth=None, on_iteration=None,
+               stop=None, first_depth=1):
+        """
+        Searches the best move of active player.
+
+        At least the first iteration is always completed unless it is
+        deeper than 1 ply, so there is a move to play even if the time
+        budget is too small for it.
+
+        Parameters
+        ----------
+        game : Game
+            game to search the move in, it isn't changed
+        seconds : float
+            time budget of the search (default None - not limited)
+        depth : int
+            maximum depth in plies (default None - MAX_PLY if seconds
+            is given, 1 otherwise)
+        on_iteration : callable
+            if given, called with SearchResult of each completed
+            iteration, for analysis output
+        stop : callable
+            if given, called every CHECK_NODES nodes, the search is
+            abandoned as soon as it returns True, for example when the
+            opponent left the game
+        first_depth : int
+            depth of the first iteration, deeper ones start at once
+            (default 1)
+
+        Returns
+        -------
+        SearchResult
+            result of the deepest completed iteration (None if the
+            search was stopped before the first iteration completed),
+            the move of the opening book has score DRAW and depth 0,
+            the move of the tablebase has exact score and depth 0
+        """
+        if depth is None:
+            depth = MAX_PLY if seconds is not None else 1
+        depth = max(1, min(depth, MAX_PLY - 1))
+        start = time.perf_counter()
+        if self.book is not None:
+            move = self.book.choose(game)
+            if move is not None:
+                return SearchResult(move, DRAW, 0, 0,
+                                    time.perf_counter() - start, [move])
+        work = Game(game.player)
+        work.restore(game.snapshot())
+        work.repetitions = dict(game.repetitions)
+        work.move_cache = None
+        if self.tablebase is not None:
+            found = self.tablebase.best_move(work)
+            if found is not None and found[0] is not None:
+                move, outcome, distance = found
+                return SearchResult(move,
+                                    _tablebase_score(outcome, distance, 0),
+                                    0, 0, time.perf_counter() - start,
+                                    [move])
+        self.game = work
+        self.nodes = 0
+        self.deadline = None
+        self.stop = stop
+
+        moves = list(work.iter_legal_moves())
+        if not moves:
+            score = -MATE if work.in_check() else DRAW
+            return SearchResult(None, score, 0, 0,
+                                time.perf_counter() - start, [])
+        result = None
+        for iteration in range(max(1, min(first_depth, depth)), depth + 1):
+            if iteration > 1 and seconds is not None:
+                self.deadline = start + seconds
+            try:
+                score, moves = self._search_root(moves, iteration)
+            except _Timeout:
+                break
+            elapsed = time.perf_counter() - start
+            result = SearchResult(move_name(moves[0]), score, iteration,
+                                  self.nodes, elapsed, self._pv(iteration))
+            if on_iteration is not None:
+                on_iteration(result)
+            if abs(score) > MATE_BOUND and MATE - abs(score) <= iteration:
+                break
+            # the next iteration takes longer than all previous ones
+            if seconds is not None and elapsed * 2 > seconds:
+                break
+        self.game = None
+        self.stop = None
+        return result
+
+    def _check_time(self):
+        """Raises _Timeout if the deadline passed or search is stopped."""
+        if (self.deadline is not None
+                and time.perf_counter() > self.deadline
+                or self.stop is not None and self.stop()):
+            raise _Timeout()
+
+    def _search_root(self, moves, depth):
+        """
+        Searches moves of the root position to depth.
+
+        Returns
+        -------
+        tuple
+            score of the best move and moves sorted with the best one
+            first
+        """
+        game = self.game
+        alpha = -INFINITY
+        best = moves[0]
+        for i, move in enumerate(moves):
+            game.make_packed_move(move)
+            if i == 0:
+                score = -self._search(depth - 1, -INFINITY, -alpha, 1)
+            else:
+                score = -self._search(depth - 1, -alpha - 1, -alpha, 1)
+                if score > alpha:
+                    score = -self._search(depth - 1, -INFINITY, -alpha, 1)
+            game.unmake_move()
+            if score > alpha:
+                alpha = score
+                best = move
+        self._store(game.position_key(), depth, alpha, EXACT, best, 0)
+        moves.remove(best)
+        moves.insert(0, best)
+        return alpha, moves
+
+    def _search(self, depth, alpha, beta, ply):
+        """Returns negamax score of the position searched to depth."""
+        game = self.game
+        self.nodes += 1
+        if self.nodes % CHECK_NODES == 0:
+            self._check_time()
+        if (game.repetitions[game.hash] > 1
+                or game.halfmove_clock >= bitboard.FIFTY_MOVES_PLIES):
+            return DRAW
+        tablebase = self.tablebase
+        if (tablebase is not None and len(game.white_figures)
+                + len(game.black_figures) <= tablebase.max_men):
+            found = tablebase.probe(game)
+            if found is not None:
+                return _tablebase_score(found[0], found[1], ply)
+        if ply >= MAX_PLY - 1:
+            return game.evaluate()
+        in_check = game.in_check()
+        if in_check:
+            depth += 1
+        if depth <= 0:
+            return self._quiesce(alpha, beta, ply)
+
+        key = game.position_key()
+        entry = self.table.get(key)
+        table_move = 0
+        if entry is not None:
+            entry_depth, score, bound, table_move = entry
+            if entry_depth >= depth:
+                score = _from_table(score, ply)
+                if (bound == EXACT or bound == LOWER and score >= beta
+                        or bound == UPPER and score <= alpha):
+                    return score
+
+        moves = list(game.iter_legal_moves())
+        if not moves:
+            return -MATE + ply if in_check else DRAW
+        moves.sort(key=self._order_keys(table_move, ply), reverse=True)
+
+        board = game.board
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = moves[0]
+        for i, move in enumerate(moves):
+            quiet = board[move >> 6 & 7][move >> 9] == ' '
+            game.make_packed_move(move)
+            if i == 0:
+                score = -self._search(depth - 1, -beta, -alpha, ply + 1)
+            else:
+                score = -self._search(depth - 1, -alpha - 1, -alpha, ply + 1)
+                if alpha < score < beta:
+                    score = -self._search(depth - 1, -beta, -alpha, ply + 1)
+            game.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if score >= beta:
+                        if quiet:
+                            self._remember_cutoff(move, depth, ply)
+                        break
+
+        if best_score >= beta:
+            bound = LOWER
+        elif best_score > original_alpha:
+            bound = EXACT
+        else:
+            bound = UPPER
+        self._store(key, depth, best_score, bound, best_move, ply)
+        return best_score
+
+    def _quiesce(self, alpha, beta, ply):
+        """Returns score of the position after captures are resolved."""
+        game = self.game
+        self.nodes += 1
+        if self.nodes % CHECK_NODES == 0:
+            self._check_time()
+        score = game.evaluate()
+        if score >= beta or ply >= MAX_PLY - 1:
+            return score
+        if score > alpha:
+            alpha = score
+
+        board = game.board
+        captures = []
+        for move in game.iter_legal_moves():
+            victim = board[move >> 6 & 7][move >> 9]
+            if victim != ' ':
+                value = VALUES[victim]
+            elif (move ^ move >> 6) & 7 and board[move & 7][
+                    move >> 3 & 7][0] == 'P':
+                value = PAWN_VALUE
+            else:
+                continue
+            if score + value + DELTA_MARGIN <= alpha:
+                continue
+            attacker = VALUES[board[move & 7][move >> 3 & 7]]
+            captures.append((value * 16 - attacker // 16, move))
+        captures.sort(reverse=True)
+
+        for _, move in captures:
+            game.make_packed_move(move)
+            score = -self._quiesce(-beta, -alpha, ply + 1)
+            game.unmake_move()
+            if score > alpha:
+                if score >= beta:
+                    return score
+                alpha = score
+        return alpha
+
+    def _order_keys(self, table_move, ply):
+        """Returns key function sorting moves from the most promising."""
+        board = self.game.board
+        killers = self.killers[ply]
+        history = self.history
+
+        def order(move):
+            if move == table_move:
+                return TABLE_MOVE_ORDER
+            victim = board[move >> 6 & 7][move >> 9]
+            if victim != ' ':
+                return (CAPTURE_ORDER + VALUES[victim] * 16
+                        - VALUES[board[move & 7][move >> 3 & 7]] // 16)
+            if move == killers[0]:
+                return KILLER_ORDER + 1
+            if move == killers[1]:
+                return KILLER_ORDER
+            return history[move]
+        return order
+
+    def _remember_cutoff(self, move, depth, ply):
+        """Updates killer moves and history counters by quiet cutoff."""
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        history = self.history
+        history[move] += depth * depth
+        if history[move] >= KILLER_ORDER:
+            self.history = [value // 2 for value in history]
+
+    def _store(self, key, depth, score, bound, move, ply):
+        """Puts search result of the position into the table."""
+        if (self.max_entries is not None
+                and len(self.table) >= self.max_entries):
+            self.table.clear()
+        self.table[key] = (depth, _to_table(score, ply), bound, move)
+
+    def _pv(self, depth):
+        """Returns principal variation followed by table moves."""
+        game = self.game
+        pv = []
+        seen = set()
+        while len(pv) < depth:
+            key = game.position_key()
+            entry = self.table.get(key)
+            if entry is None or key in seen:
+                break
+            seen.add(key)
+            move = entry[3]
+            if move not in game.iter_legal_moves():
+                break
+            game.make_packed_move(move)
+            pv.append(move_name(move))
+        for _ in pv:
+            game.unmake_move()
+        return pv
+
+
+def best_move(game, seconds=1.0, depth=None, book=None, tablebase=None):
+    """
+    Searches the best move of active player by a new Engine.
+
+    Parameters
+    ----------
+    game : Game
+        game to search the move in, it isn't changed
+    seconds : float
+        time budget of the search (default 1.0)
+    depth : int
+        maximum depth in plies (default None - not limited)
+    book : book.OpeningBook
+        opening book consulted before the search (default None - no
+        book)
+    tablebase : tablebase.Tablebase
+        endgame tables probed during the search (default None - no
+        tables)
+
+    Returns
+    -------
+    str
+        best move in the form 'e2e4' (None if there is no legal move)
+    """
+    return Engine(book=book, tablebase=tablebase).search(game, seconds,
+                                                         depth).move
+
+
+def format_result(result):
+    """
+    Returns analysis line of the search iteration.
+
+    Parameters
+    ----------
+    result : SearchResult
+        result of completed iteration
+
+    Returns
+    -------
+    str
+        depth, score, nodes, nodes per second and principal variation
+    """
+    if abs(result.score) > MATE_BOUND:
+        plies = MATE - abs(result.score)
+        score = 'mate {}'.format((plies + 1) // 2 if result.score > 0
+                                 else -(plies // 2))
+    else:
+        score = 'cp {}'.format(result.score)
+    return 'depth {:>2} score {:<9} nodes {:>9} nps {:>7.0f} pv {}'.format(
+            result.depth, score, result.nodes,
+            result.nodes / max(result.seconds, 1e-9), ' '.join(result.pv))
+
+
+def main(argv=None):
+    """
+    Runs analysis command line interface.
+
+    Parameters
+    ----------
+    argv : list
+        command line arguments (default sys.argv[1:])
+
+    Returns
+    -------
+    int
+        exit status
+    """
+    parser = argparse.ArgumentParser(
+            description='Search the best move in the position.')
+    parser.add_argument('--fen', default=bitboard.START_FEN,
+                        help='FEN string of the position '
+                             '(default the start position)')
+    parser.add_argument('--seconds', type=float, default=5.0,
+                        help='time budget of the search (default 5.0)')
+    parser.add_argument('--depth', type=int,
+                        help='maximum depth in plies (default not limited)')
+    args = parser.parse_args(argv)
+    game = Game.from_fen(args.fen)
+    result = Engine().search(game, args.seconds, args.depth,
+                             lambda result: print(format_result(result)))
+    if result.move is None:
+        print('no legal moves')
+    else:
+        print('bestmove', result.move)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
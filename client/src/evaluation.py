@@ -0,0 +1,174 @@
+"""Material and piece-square tables evaluation of chess positions."""
+
+# figure types in bitboard order: Pawn, Knight, Bishop, Rook, Queen, King
+MIDDLEGAME_VALUES = (82, 337, 365, 477, 1025, 0)
+ENDGAME_VALUES = (94, 281, 297, 512, 936, 0)
+# weight of figure types in game phase, the start position has MAX_PHASE
+PHASE_WEIGHTS = (0, 1, 1, 2, 4, 0)
+MAX_PHASE = 24
+
+
+def _table(text):
+    """Returns tuple of 64 numbers written in text."""
+    return tuple(int(value) for value in text.split())
+
+
+# tables for White as they are seen from White's side: the first row
+# is the eighth rank, the last one is the first rank
+_PAWN = _table('''
+       0    0    0    0    0    0    0    0
+      50   50   50   50   50   50   50   50
+      10   10   20   30   30   20   10   10
+       5    5   10   25   25   10    5    5
+       0    0    0   20   20    0    0    0
+       5   -5  -10    0    0  -10   -5    5
+       5   10   10  -20  -20   10   10    5
+       0    0    0    0    0    0    0    0
+''')
+_PAWN_ENDGAME = _table('''
+       0    0    0    0    0    0    0    0
+      80   80   80   80   80   80   80   80
+      50   50   50   50   50   50   50   50
+      30   30   30   30   30   30   30   30
+      20   20   20   20   20   20   20   20
+      10   10   10   10   10   10   10   10
+       0    0    0    0    0    0    0    0
+       0    0    0    0    0    0    0    0
+''')
+_KNIGHT = _table('''
+     -50  -40  -30  -30  -30  -30  -40  -50
+     -40  -20    0    0    0    0  -20  -40
+     -30    0   10   15   15   10    0  -30
+     -30    5   15   20   20   15    5  -30
+     -30    0   15   20   20   15    0  -30
+     -30    5   10   15   15   10    5  -30
+     -40  -20    0    5    5    0  -20  -40
+     -50  -40  -30  -30  -30  -30  -40  -50
+''')
+_BISHOP = _table('''
+     -20  -10  -10  -10  -10  -10  -10  -20
+     -10    0    0    0    0    0    0  -10
+     -10    0    5   10   10    5    0  -10
+     -10    5    5   10   10    5    5  -10
+     -10    0   10   10   10   10    0  -10
+     -10   10   10   10   10   10   10  -10
+     -10    5    0    0    0    0    5  -10
+     -20  -10  -10  -10  -10  -10  -10  -20
+''')
+_ROOK = _table('''
+       0    0    0    0    0    0    0    0
+       5   10   10   10   10   10   10    5
+      -5    0    0    0    0    0    0   -5
+      -5    0    0    0    0    0    0   -5
+      -5    0    0    0    0    0    0   -5
+      -5    0    0    0    0    0    0   -5
+      -5    0    0    0    0    0    0   -5
+       0    0    0    5    5    0    0    0
+''')
+_QUEEN = _table('''
+     -20  -10  -10   -5   -5  -10  -10  -20
+     -10    0    0    0    0    0    0  -10
+     -10    0    5    5    5    5    0  -10
+      -5    0    5    5    5    5    0   -5
+       0    0    5    5    5    5    0   -5
+     -10    5    5    5    5    5    0  -10
+     -10    0    5    0    0    0    0  -10
+     -20  -10  -10   -5   -5  -10  -10  -20
+''')
+_KING = _table('''
+     -30  -40  -40  -50  -50  -40  -40  -30
+     -30  -40  -40  -50  -50  -40  -40  -30
+     -30  -40  -40  -50  -50  -40  -40  -30
+     -30  -40  -40  -50  -50  -40  -40  -30
+     -20  -30  -30  -40  -40  -30  -30  -20
+     -10  -20  -20  -20  -20  -20  -20  -10
+      20   20    0    0    0    0   20   20
+      20   30   10    0    0   10   30   20
+''')
+_KING_ENDGAME = _table('''
+     -50  -40  -30  -20  -20  -30  -40  -50
+     -30  -20  -10    0    0  -10  -20  -30
+     -30  -10   20   30   30   20  -10  -30
+     -30  -10   30   40   40   30  -10  -30
+     -30  -10   30   40   40   30  -10  -30
+     -30  -10   20   30   30   20  -10  -30
+     -30  -30    0    0    0    0  -30  -30
+     -50  -30  -30  -30  -30  -30  -30  -50
+''')
+
+MIDDLEGAME_TABLES = (_PAWN, _KNIGHT, _BISHOP, _ROOK, _QUEEN, _KING)
+ENDGAME_TABLES = (_PAWN_ENDGAME, _KNIGHT, _BISHOP, _ROOK, _QUEEN,
+                  _KING_ENDGAME)
+
+
+def _square_values(values, tables):
+    """Returns values with table bonuses by figure code and square."""
+    result = []
+    for code in range(12):
+        kind = code % 6
+        if code < 6:
+            # square y * 8 + x of White is row 7 - y of the table
+            result.append(tuple(values[kind] + tables[kind][sq ^ 56]
+                                for sq in range(64)))
+        else:
+            result.append(tuple(-values[kind] - tables[kind][sq]
+                                for sq in range(64)))
+    return tuple(result)
+
+
+# MIDDLEGAME[code][sq] and ENDGAME[code][sq] are terms of figure with
+# code (color * 6 + type) at square y * 8 + x, positive for White
+MIDDLEGAME = _square_values(MIDDLEGAME_VALUES, MIDDLEGAME_TABLES)
+ENDGAME = _square_values(ENDGAME_VALUES, ENDGAME_TABLES)
+PHASE = PHASE_WEIGHTS * 2
+
+
+def compute_terms(pieces):
+    """
+    Computes evaluation terms of position from scratch.
+
+    Parameters
+    ----------
+    pieces : iterable
+        pairs (code, sq) of figure code (color * 6 + type) and
+        square index (y * 8 + x) of each figure on the board
+
+    Returns
+    -------
+    tuple
+        middlegame and endgame scores for White and game phase
+    """
+    middlegame = endgame = phase = 0
+    for code, sq in pieces:
+        middlegame += MIDDLEGAME[code][sq]
+        endgame += ENDGAME[code][sq]
+        phase += PHASE[code]
+    return middlegame, endgame, phase
+
+
+def blend(middlegame, endgame, phase):
+    """
+    Blends middlegame and endgame scores by game phase.
+
+    Parameters
+    ----------
+    middlegame : int
+        middlegame score for White
+    endgame : int
+        endgame score for White
+    phase : int
+        game phase, MAX_PHASE or more at the start, 0 with Kings
+        and pawns only
+
+    Returns
+    -------
+    int
+        score for White in centipawns
+    """
+    if phase > MAX_PHASE:
+        phase = MAX_PHASE
+    score = middlegame * phase + endgame * (MAX_PHASE - phase)
+    # rounded towards zero, so colors are evaluated symmetrically
+    if score < 0:
+        return -(-score // MAX_PHASE)
+    return score // MAX_PHASE
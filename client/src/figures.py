@@ -53,6 +53,206 @@ def coordinates_to_computer(to_translate):
              HUMAN_TO_COMPUTER_TRANSLATOR[1][to_translate[1]]))
 
 
+SQUARE_NAMES = tuple(coordinates_to_human((sq % 8, sq // 8))
+                     for sq in range(64))
+SQUARE_COORDINATES = tuple((sq % 8, sq // 8) for sq in range(64))
+SQUARES = {name: sq for sq, name in enumerate(SQUARE_NAMES)}
+
+STRAIGHT_DIRECTIONS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+DIAGONAL_DIRECTIONS = ((1, 1), (1, -1), (-1, -1), (-1, 1))
+DIRECTIONS = STRAIGHT_DIRECTIONS + DIAGONAL_DIRECTIONS
+KNIGHT_JUMPS = ((2, 1), (2, -1), (-2, -1), (-2, 1),
+                (1, 2), (1, -2), (-1, -2), (-1, 2))
+
+
+def _targets(sq, steps):
+    """Returns ceils (x, y, square) reachable from square by single steps."""
+    x, y = sq % 8, sq // 8
+    return tuple((x + dx, y + dy, sq + dx + dy * 8) for dx, dy in steps
+                 if -1 < x + dx < 8 and -1 < y + dy < 8)
+
+
+def _ray(sq, dx, dy):
+    """Returns ceils (x, y, square) from square to the edge of the board."""
+    ray = []
+    x, y = sq % 8 + dx, sq // 8 + dy
+    while -1 < x < 8 and -1 < y < 8:
+        ray.append((x, y, y * 8 + x))
+        x += dx
+        y += dy
+    return tuple(ray)
+
+
+# tables are indexed by square y * 8 + x, x and y of each target ceil
+# are kept beside its square to index the board without arithmetic
+KNIGHT_TARGETS = tuple(_targets(sq, KNIGHT_JUMPS) for sq in range(64))
+KING_TARGETS = tuple(_targets(sq, DIRECTIONS) for sq in range(64))
+RAYS = tuple(tuple(_ray(sq, dx, dy) for dx, dy in DIRECTIONS)
+             for sq in range(64))
+STRAIGHT_RAYS = tuple(rays[:4] for rays in RAYS)
+DIAGONAL_RAYS = tuple(rays[4:] for rays in RAYS)
+# squares of pawns whose moves depend on the ceil not only through
+# attacks: pushes to the ceil and legacy en passant from the ceil beside
+PAWN_WATCHERS = tuple(tuple(ceil[2] for ceil in _targets(
+                          sq, ((0, 1), (0, 2), (0, -1), (0, -2),
+                               (1, 0), (-1, 0))))
+                      for sq in range(64))
+
+BETWEEN = [[() for sq2 in range(64)] for sq1 in range(64)]
+LINE = [[frozenset() for sq2 in range(64)] for sq1 in range(64)]
+for _sq in range(64):
+    for _i, _ray_ceils in enumerate(RAYS[_sq]):
+        _opposite = RAYS[_sq][_i + 2 if _i % 4 < 2 else _i - 2]
+        _line = frozenset([_sq] + [ceil[2] for ceil in
+                                   _ray_ceils + _opposite])
+        for _j, _ceil in enumerate(_ray_ceils):
+            BETWEEN[_sq][_ceil[2]] = tuple(ceil[2]
+                                           for ceil in _ray_ceils[:_j])
+            LINE[_sq][_ceil[2]] = _line
+
+
+# 0x88 mailbox: flat array of 128 small integer codes indexed by
+# x + y * 16, a square is off the board if it has a bit of MAILBOX_OFF
+MAILBOX_OFF = 0x88
+MAILBOX_BLACK = 8
+STRAIGHT_OFFSETS = (16, 1, -16, -1)
+DIAGONAL_OFFSETS = (17, -15, -17, 15)
+KNIGHT_OFFSETS = (33, 18, -14, -31, -33, -18, 14, 31)
+
+
+def to_mailbox(sq):
+    """Returns 0x88 square of square y * 8 + x."""
+    return sq + (sq & 56)
+
+
+def from_mailbox(sq):
+    """Returns square y * 8 + x of 0x88 square."""
+    return (sq + (sq & 7)) >> 1
+
+
+def _slide(board, rays, color):
+    """Returns squares color figure can reach along the rays."""
+    reachable = []
+    for ray in rays:
+        for x, y, sq in ray:
+            if board[x][y] == ' ':
+                reachable.append(sq)
+            else:
+                if board[x][y][-1] != color:
+                    reachable.append(sq)
+                break
+    return reachable
+
+
+def _reach(board, rays):
+    """Returns squares attacked along the rays up to the first figure."""
+    reachable = []
+    for ray in rays:
+        for x, y, sq in ray:
+            reachable.append(sq)
+            if board[x][y] != ' ':
+                break
+    return reachable
+
+
+def attackers(board, sq, color):
+    """
+    Finds figures attacking the ceil.
+
+    Parameters
+    ----------
+    board : list of lists
+        a board the figures stay at
+    sq : int
+        square y * 8 + x of the ceil (0 to 63)
+    color : str
+        color of attacking figures ('w' - white, 'b' - black)
+
+    Returns
+    -------
+    list
+        list of squares of color figures attacking the ceil
+    """
+    result = []
+    x, y = sq % 8, sq // 8
+    pawn_y = y - 1 if color == 'w' else y + 1
+    if -1 < pawn_y < 8:
+        for x1 in (x - 1, x + 1):
+            if -1 < x1 < 8 and board[x1][pawn_y] == 'P' + color:
+                result.append(pawn_y * 8 + x1)
+    for label, targets in (('KN' + color, KNIGHT_TARGETS[sq]),
+                           ('K' + color, KING_TARGETS[sq])):
+        for x1, y1, sq1 in targets:
+            if board[x1][y1] == label:
+                result.append(sq1)
+    for labels, rays in ((('R' + color, 'Q' + color), STRAIGHT_RAYS[sq]),
+                         (('B' + color, 'Q' + color), DIAGONAL_RAYS[sq])):
+        for ray in rays:
+            for x1, y1, sq1 in ray:
+                if board[x1][y1] != ' ':
+                    if board[x1][y1] in labels:
+                        result.append(sq1)
+                    break
+    return result
+
+
+def pins(board, sq):
+    """
+    Finds figures pinned to the King.
+
+    Parameters
+    ----------
+    board : list of lists
+        a board the figures stay at
+    sq : int
+        square y * 8 + x of the King (0 to 63)
+
+    Returns
+    -------
+    dictionary
+        dictionary with keys - squares of figures of the King color
+        which can't leave the line to the King and values - direction
+        (dx, dy) of the line from the King
+    """
+    color = board[sq % 8][sq // 8][-1]
+    enemy = 'b' if color == 'w' else 'w'
+    straight = ('R' + enemy, 'Q' + enemy)
+    diagonal = ('B' + enemy, 'Q' + enemy)
+    result = {}
+    for i, ray in enumerate(RAYS[sq]):
+        labels = straight if i < 4 else diagonal
+        pinned = None
+        for x1, y1, sq1 in ray:
+            if board[x1][y1] != ' ':
+                if pinned is None and board[x1][y1][-1] == color:
+                    pinned = sq1
+                else:
+                    if pinned is not None and board[x1][y1] in labels:
+                        result[pinned] = DIRECTIONS[i]
+                    break
+    return result
+
+
+def between(sq1, sq2):
+    """
+    Returns ceils between two ceils on one line.
+
+    Parameters
+    ----------
+    sq1 : int
+        square y * 8 + x of the first ceil
+    sq2 : int
+        square y * 8 + x of the second ceil
+
+    Returns
+    -------
+    list
+        list of squares strictly between the ceils
+        (empty if they are not on one line, row or diagonal)
+    """
+    return list(BETWEEN[sq1][sq2])
+
+
 class Figure():
     """
     A class used to present any chess figure.
@@ -64,11 +264,54 @@ class Figure():
     y : int
         second coordinate of figure (0 to 7)
     color : str
-        present side which figure is on ('w' -white or 'b' - black)
+        present side which figure is on ('w' -white or 'b' - black),
+        read-only, taken from the last letter of label
+    label : str
+        name of the figure as it have to be printed on the board
     possible_moves : list
         list of figure possible moves
+    value : int
+        value of a figure, class constant (default 0)
+    SLIDING : bool
+        class constant, True for figures moving along rays
+    LABELS : dictionary
+        class constant, label of the figure for each color
+    FIELDS : tuple
+        class constant, names of all instance attributes (slots)
+    CODE : int
+        class constant, code of the white figure in 0x88 mailbox
+        (MAILBOX_BLACK is added for the black one)
+    MAILBOX_OFFSETS : tuple
+        class constant, steps of the figure on 0x88 mailbox
+
+    Methods
+    -------
+    get_mailbox_targets(squares, sq)
+        return list of 0x88 squares the figure at sq can move to
+    copy()
+        return independent copy of the figure
+    get_state()
+        return immutable tuple describing the figure
+    from_state(state)
+        return figure described by get_state() tuple
+    get_targets(board)
+        return list of squares (y * 8 + x) the figure can move to
+    get_attacks(board)
+        return list of squares the figure attacks
+    get_possible_moves(board)
+        return list of human-like possible positions to move on the board
+    update_possible_moves(board)
+        update possible moves attribute based on get_targets
     """
 
+    __slots__ = ('x', 'y', 'label', 'possible_moves')
+    FIELDS = __slots__
+    LABELS = {'w': 'w', 'b': 'b'}
+    value = 0
+    SLIDING = False
+    CODE = 0
+    MAILBOX_OFFSETS = ()
+
     def __init__(self, x, y, color):
         """
         Init of Figure class.
@@ -84,9 +327,168 @@ class Figure():
         """
         self.x = x
         self.y = y
-        self.color = color
+        self.label = self.LABELS[color]
         self.possible_moves = []
 
+    @property
+    def color(self):
+        """Side which figure is on ('w' - white or 'b' - black)."""
+        return self.label[-1]
+
+    def copy(self):
+        """
+        Returns independent copy of the figure.
+
+        Much cheaper than copy.deepcopy: attributes listed in FIELDS
+        are copied shallowly and only possible_moves list is duplicated.
+
+        Returns
+        -------
+        Figure
+            figure of the same class with the same attributes
+        """
+        fig = object.__new__(type(self))
+        for name in self.FIELDS:
+            setattr(fig, name, getattr(self, name))
+        fig.possible_moves = self.possible_moves[:]
+        return fig
+
+    def get_state(self):
+        """
+        Returns immutable description of the figure.
+
+        Returns
+        -------
+        tuple
+            class of the figure followed by values of its FIELDS
+            (possible_moves is turned into tuple)
+        """
+        return ((type(self), self.x, self.y, self.label,
+                 tuple(self.possible_moves))
+                + tuple(getattr(self, name) for name in self.FIELDS[4:]))
+
+    @staticmethod
+    def from_state(state):
+        """
+        Creates figure from its description.
+
+        Parameters
+        ----------
+        state : tuple
+            tuple returned by get_state()
+
+        Returns
+        -------
+        Figure
+            new figure equal to the described one
+        """
+        fig = object.__new__(state[0])
+        for name, value in zip(state[0].FIELDS, state[1:]):
+            setattr(fig, name, value)
+        fig.possible_moves = list(fig.possible_moves)
+        return fig
+
+    def get_targets(self, board):
+        """
+        Returns squares where figure can move.
+
+        Parameters
+        ----------
+        board : list of lists
+            a board the figure stay at
+
+        Returns
+        -------
+        list
+            list of squares (y * 8 + x) where figure can move, unsorted
+        """
+        return []
+
+    @classmethod
+    def get_mailbox_targets(cls, squares, sq):
+        """
+        Returns squares where figure standing on 0x88 mailbox can move.
+
+        Works on the codes directly, no figure object is needed.
+
+        Parameters
+        ----------
+        squares : array
+            0x88 mailbox, codes of figures indexed by x + y * 16
+        sq : int
+            0x88 square of the figure
+
+        Returns
+        -------
+        list
+            list of 0x88 squares where figure can move, unsorted
+        """
+        color = squares[sq] & MAILBOX_BLACK
+        targets = []
+        for offset in cls.MAILBOX_OFFSETS:
+            target = sq + offset
+            while not target & MAILBOX_OFF:
+                code = squares[target]
+                if code:
+                    if code & MAILBOX_BLACK != color:
+                        targets.append(target)
+                    break
+                targets.append(target)
+                if not cls.SLIDING:
+                    break
+                target += offset
+        return targets
+
+    def get_attacks(self, board):
+        """
+        Returns squares the figure attacks.
+
+        Squares with figures of both colors are attacked (defended),
+        for Pawn only diagonal squares are attacked.
+
+        Parameters
+        ----------
+        board : list of lists
+            a board the figure stay at
+
+        Returns
+        -------
+        list
+            list of squares (y * 8 + x) the figure attacks
+        """
+        return []
+
+    def get_possible_moves(self, board):
+        """
+        Returns list of ceils where figure can move.
+
+        Parameters
+        ----------
+        board : list of lists
+            a board the figure stay at
+
+        Returns
+        -------
+        list
+            sorted list of human-like ceils where figure can move
+        """
+        return sorted([SQUARE_NAMES[sq] for sq in self.get_targets(board)])
+
+    def update_possible_moves(self, board):
+        """
+        Updates the possible_moves class attribute.
+
+        Updates the possible_moves class attribute -
+        list of ceils where figure can move.
+
+        Parameters
+        ----------
+        board : list of lists
+            a board the figure stay at
+        """
+        self.possible_moves = sorted([SQUARE_COORDINATES[sq]
+                                      for sq in self.get_targets(board)])
+
 
 class King(Figure):
     """
@@ -105,7 +507,7 @@ class King(Figure):
     possible_moves : list
         list of figure possible moves
     value : int
-        value of a figure (default 0)
+        value of a figure, class constant (default 0)
     has_moved : bool
         indicator of moving since begginning of the game (used for roque)
     is_under_attack : bool
@@ -113,16 +515,30 @@ class King(Figure):
 
     Methods
     -------
+    get_mailbox_targets(squares, sq, has_moved)
+        return list of 0x88 squares the King at sq can move to
+    get_roque_targets(board)
+        return list of squares the King can move to by roque
     get_possible_roques(board)
         return list of human-like possible positions to move on the board
         (only roques)
+    get_targets(board)
+        return list of squares the King can move to
+    get_attacks(board)
+        return list of squares the figure attacks
     get_possible_moves(board)
         return list of human-like possible positions to move on the board
     update_possible_moves(board)
-        update possible moves attribute based on get_possible_roques
-        and get_possible_moves returning lists
+        update possible moves attribute based on get_targets
     """
 
+    __slots__ = ('has_moved', 'is_under_attack')
+    FIELDS = Figure.FIELDS + __slots__
+    LABELS = {'w': 'Kw', 'b': 'Kb'}
+    value = 0
+    CODE = 1
+    MAILBOX_OFFSETS = STRAIGHT_OFFSETS + DIAGONAL_OFFSETS
+
     def __init__(self, x, y, color):
         """
         Init of King class.
@@ -137,14 +553,36 @@ class King(Figure):
             present side which figure is on ('w' -white or 'b' - black)
         """
         super().__init__(x, y, color)
-        self.value = 0
-        if color == 'w':
-            self.label = 'Kw'
-        elif color == 'b':
-            self.label = 'Kb'
         self.has_moved = False
         self.is_under_attack = False
 
+    def get_roque_targets(self, board):
+        """
+        Returns squares where figure can move by roque.
+
+        Parameters
+        ----------
+        board : list of lists
+            a board the figure staying at
+
+        Returns
+        -------
+        list
+            list of squares (y * 8 + x) where figure can move (roques only)
+        """
+        targets = []
+        if self.has_moved:
+            return targets
+
+        y = self.y
+        rook = 'R' + self.label[-1]
+        if (board[1][y] == ' ' and board[2][y] == ' ' and board[3][y] == ' '
+                and board[0][y] == rook):
+            targets.append(y * 8 + 2)
+        if board[5][y] == ' ' and board[6][y] == ' ' and board[7][y] == rook:
+            targets.append(y * 8 + 6)
+        return targets
+
     def get_possible_roques(self, board):
         """
         Returns list of ceils where figure can move (roques only).
@@ -159,36 +597,11 @@ class King(Figure):
         list
             list of ceils where figure can move (roques only)
         """
-        possible_moves = []
-
-        if not self.has_moved:
-            for dx in [-3, -2, -1]:
-                x = self.x + dx
-                y = self.y
-                if board[x][y] != ' ':
-                    break
-            else:
-                if self.label == 'Kw' and board[0][0] == 'Rw':
-                    possible_moves.append(coordinates_to_human((2, 0)))
-                elif self.label == 'Kb' and board[0][7] == 'Rb':
-                    possible_moves.append(coordinates_to_human((2, 7)))
-
-            for dx in [1, 2]:
-                x = self.x + dx
-                y = self.y
-                if board[x][y] != ' ':
-                    break
-            else:
-                if self.label == 'Kw' and board[7][0] == 'Rw':
-                    possible_moves.append(coordinates_to_human((6, 0)))
-                elif self.label == 'Kb' and board[7][7] == 'Rb':
-                    possible_moves.append(coordinates_to_human((6, 7)))
-
-        return possible_moves
+        return [SQUARE_NAMES[sq] for sq in self.get_roque_targets(board)]
 
-    def get_possible_moves(self, board):
+    def get_targets(self, board):
         """
-        Returns list of ceils where figure can move.
+        Returns squares where figure can move.
 
         Parameters
         ----------
@@ -198,40 +611,66 @@ class King(Figure):
         Returns
         -------
         list
-            list of ceils where figure can move
+            list of squares (y * 8 + x) where figure can move, unsorted
         """
         if (self.x != 4 or self.label == 'Kw' and self.y != 0
                 or self.label == 'Kb' and self.y != 7):
             self.has_moved = True
 
-        possible_moves = []
-
-        for dx, dy in ([0, 1], [1, 1], [1, 0], [1, -1],
-                       [0, -1], [-1, -1], [-1, 0], [-1, 1]):
-            x = self.x + dx
-            y = self.y + dy
-            if (-1 < x < 8 and -1 < y < 8 and (board[x][y] == ' '
-               or board[x][y][-1] != self.label[-1])):
-                possible_moves.append(coordinates_to_human((x, y)))
+        color = self.label[-1]
+        targets = [sq for x, y, sq in KING_TARGETS[self.y * 8 + self.x]
+                   if board[x][y] == ' ' or board[x][y][-1] != color]
+        targets += self.get_roque_targets(board)
+        return targets
 
-        possible_moves += self.get_possible_roques(board)
+    def get_attacks(self, board):
+        """
+        Returns squares the figure attacks.
 
-        return sorted(possible_moves)
+        Parameters
+        ----------
+        board : list of lists
+            a board the figure stay at
 
-    def update_possible_moves(self, board):
+        Returns
+        -------
+        list
+            list of squares (y * 8 + x) the figure attacks
         """
-        Updates the possible_moves class attribute.
+        return [sq for x, y, sq in KING_TARGETS[self.y * 8 + self.x]]
 
-        Updates the possible_moves class attribute -
-        list of ceils where figure can move.
+    @classmethod
+    def get_mailbox_targets(cls, squares, sq, has_moved=True):
+        """
+        Returns squares where King standing on 0x88 mailbox can move.
 
         Parameters
         ----------
-        board : list of lists
-            a board the figure stay at
+        squares : array
+            0x88 mailbox, codes of figures indexed by x + y * 16
+        sq : int
+            0x88 square of the King
+        has_moved : bool
+            indicator of moving since begginning of the game, roques
+            are added if it is False (default True)
+
+        Returns
+        -------
+        list
+            list of 0x88 squares where King can move, unsorted
         """
-        self.possible_moves = [coordinates_to_computer(coordinate)
-                               for coordinate in self.get_possible_moves(board)]
+        targets = super().get_mailbox_targets(squares, sq)
+        if has_moved:
+            return targets
+        row = sq & 0x70
+        rook = Rook.CODE | squares[sq] & MAILBOX_BLACK
+        if (not squares[row + 1] and not squares[row + 2]
+                and not squares[row + 3] and squares[row] == rook):
+            targets.append(row + 2)
+        if (not squares[row + 5] and not squares[row + 6]
+                and squares[row + 7] == rook):
+            targets.append(row + 6)
+        return targets
 
 
 class Queen(Figure):
@@ -251,40 +690,30 @@ class Queen(Figure):
     possible_moves : list
         list of figure possible moves
     value : int
-        value of a figure (default 8)
+        value of a figure, class constant (default 8)
 
     Methods
     -------
+    get_targets(board)
+        return list of squares the figure can move to
+    get_attacks(board)
+        return list of squares the figure attacks
     get_possible_moves(board)
         return list of human-like possible positions to move on the board
     update_possible_moves(board)
-        update possible moves attribute based on
-        get_possible_moves returning lists
+        update possible moves attribute based on get_targets
     """
 
-    def __init__(self, x, y, color):
-        """
-        Init of Queen class.
+    __slots__ = ()
+    LABELS = {'w': 'Qw', 'b': 'Qb'}
+    value = 8
+    SLIDING = True
+    CODE = 2
+    MAILBOX_OFFSETS = STRAIGHT_OFFSETS + DIAGONAL_OFFSETS
 
-        Parameters
-        ----------
-        x : int
-            first coordinate of figure (0 to 7)
-        y : int
-            second coordinate of figure (0 to 7)
-        color : str
-            present side which figure is on ('w' -white or 'b' - black)
-        """
-        super().__init__(x, y, color)
-        self.value = 8
-        if color == 'w':
-            self.label = 'Qw'
-        elif color == 'b':
-            self.label = 'Qb'
-
-    def get_possible_moves(self, board):
+    def get_targets(self, board):
         """
-        Returns list of ceils where figure can move.
+        Returns squares where figure can move.
 
         Parameters
         ----------
@@ -294,42 +723,25 @@ class Queen(Figure):
         Returns
         -------
         list
-            list of ceils where figure can move
+            list of squares (y * 8 + x) where figure can move, unsorted
         """
-        possible_moves = []
-
-        for dx, dy in ([1, 0], [0, -1], [-1, 0], [0, 1],
-                       [1, 1], [1, -1], [-1, -1], [-1, 1]):
-            for length in range(1, 8):
-                x = self.x + dx * length
-                y = self.y + dy * length
-                if not -1 < x < 8 or not -1 < y < 8:
-                    break
-                elif board[x][y] == ' ':
-                    possible_moves.append(
-                            coordinates_to_human((x, y)))
-                elif board[x][y][-1] != self.label[-1]:
-                    possible_moves.append(coordinates_to_human((x, y)))
-                    break
-                else:
-                    break
-
-        return sorted(possible_moves)
+        return _slide(board, RAYS[self.y * 8 + self.x], self.label[-1])
 
-    def update_possible_moves(self, board):
+    def get_attacks(self, board):
         """
-        Updates the possible_moves class attribute.
-
-        Updates the possible_moves class attribute -
-        list of ceils where figure can move.
+        Returns squares the figure attacks.
 
         Parameters
         ----------
         board : list of lists
             a board the figure stay at
+
+        Returns
+        -------
+        list
+            list of squares (y * 8 + x) the figure attacks
         """
-        self.possible_moves = [coordinates_to_computer(coordinate)
-                               for coordinate in self.get_possible_moves(board)]
+        return _reach(board, RAYS[self.y * 8 + self.x])
 
 
 class Rook(Figure):
@@ -349,17 +761,28 @@ class Rook(Figure):
     possible_moves : list
         list of figure possible moves
     value : int
-        value of a figure (default 5)
+        value of a figure, class constant (default 5)
 
     Methods
     -------
+    get_targets(board)
+        return list of squares the figure can move to
+    get_attacks(board)
+        return list of squares the figure attacks
     get_possible_moves(board)
         return list of human-like possible positions to move on the board
     update_possible_moves(board)
-        update possible moves attribute based on
-        get_possible_moves returning lists
+        update possible moves attribute based on get_targets
     """
 
+    __slots__ = ('has_moved',)
+    FIELDS = Figure.FIELDS + __slots__
+    LABELS = {'w': 'Rw', 'b': 'Rb'}
+    value = 5
+    SLIDING = True
+    CODE = 3
+    MAILBOX_OFFSETS = STRAIGHT_OFFSETS
+
     def __init__(self, x, y, color):
         """
         Init of Rook class.
@@ -374,16 +797,11 @@ class Rook(Figure):
             present side which figure is on ('w' -white or 'b' - black)
         """
         super().__init__(x, y, color)
-        self.value = 5
-        if color == 'w':
-            self.label = 'Rw'
-        elif color == 'b':
-            self.label = 'Rb'
         self.has_moved = False
 
-    def get_possible_moves(self, board):
+    def get_targets(self, board):
         """
-        Returns list of ceils where figure can move.
+        Returns squares where figure can move.
 
         Parameters
         ----------
@@ -393,40 +811,25 @@ class Rook(Figure):
         Returns
         -------
         list
-            list of ceils where figure can move
+            list of squares (y * 8 + x) where figure can move, unsorted
         """
-        possible_moves = []
-
-        for dx, dy in [1, 0], [0, -1], [-1, 0], [0, 1]:
-            for length in range(1, 8):
-                x = self.x + dx * length
-                y = self.y + dy * length
-                if not -1 < x < 8 or not -1 < y < 8:
-                    break
-                elif board[x][y] == ' ':
-                    possible_moves.append(coordinates_to_human((x, y)))
-                elif board[x][y][-1] != self.label[-1]:
-                    possible_moves.append(coordinates_to_human((x, y)))
-                    break
-                else:
-                    break
-
-        return sorted(possible_moves)
+        return _slide(board, STRAIGHT_RAYS[self.y * 8 + self.x], self.label[-1])
 
-    def update_possible_moves(self, board):
+    def get_attacks(self, board):
         """
-        Updates the possible_moves class attribute.
-
-        Updates the possible_moves class attribute -
-        list of ceils where figure can move.
+        Returns squares the figure attacks.
 
         Parameters
         ----------
         board : list of lists
             a board the figure stay at
+
+        Returns
+        -------
+        list
+            list of squares (y * 8 + x) the figure attacks
         """
-        self.possible_moves = [coordinates_to_computer(coordinate)
-                               for coordinate in self.get_possible_moves(board)]
+        return _reach(board, STRAIGHT_RAYS[self.y * 8 + self.x])
 
 
 class Knight(Figure):
@@ -447,40 +850,29 @@ class Knight(Figure):
     possible_moves : list
         list of figure possible moves
     value : int
-        value of a figure (default 3)
+        value of a figure, class constant (default 3)
 
     Methods
     -------
+    get_targets(board)
+        return list of squares the figure can move to
+    get_attacks(board)
+        return list of squares the figure attacks
     get_possible_moves(board)
         return list of human-like possible positions to move on the board
     update_possible_moves(board)
-        update possible moves attribute based on
-        get_possible_moves returning lists
+        update possible moves attribute based on get_targets
     """
 
-    def __init__(self, x, y, color):
-        """
-        Init of Knight class.
-
-        Parameters
-        ----------
-        x : int
-            first coordinate of figure (0 to 7)
-        y : int
-            second coordinate of figure (0 to 7)
-        color : str
-            present side which figure is on ('w' -white or 'b' - black)
-        """
-        super().__init__(x, y, color)
-        self.value = 3
-        if color == 'w':
-            self.label = 'KNw'
-        elif color == 'b':
-            self.label = 'KNb'
+    __slots__ = ()
+    LABELS = {'w': 'KNw', 'b': 'KNb'}
+    value = 3
+    CODE = 4
+    MAILBOX_OFFSETS = KNIGHT_OFFSETS
 
-    def get_possible_moves(self, board):
+    def get_targets(self, board):
         """
-        Returns list of ceils where figure can move.
+        Returns squares where figure can move.
 
         Parameters
         ----------
@@ -490,35 +882,27 @@ class Knight(Figure):
         Returns
         -------
         list
-            list of ceils where figure can move
+            list of squares (y * 8 + x) where figure can move, unsorted
         """
-        possible_moves = []
-
-        for dx, dy in ([2, 1], [2, -1], [-2, -1], [-2, 1],
-                       [1, 2], [1, -2], [-1, -2], [-1, 2]):
-            x = self.x + dx
-            y = self.y + dy
-            if (-1 < x < 8 and -1 < y < 8
-                    and (board[x][y] == ' ' or board[x][y][-1]
-                         != self.label[-1])):
-                possible_moves.append(coordinates_to_human((x, y)))
+        color = self.label[-1]
+        return [sq for x, y, sq in KNIGHT_TARGETS[self.y * 8 + self.x]
+                if board[x][y] == ' ' or board[x][y][-1] != color]
 
-        return sorted(possible_moves)
-
-    def update_possible_moves(self, board):
+    def get_attacks(self, board):
         """
-        Updates the possible_moves class attribute.
-
-        Updates the possible_moves class attribute -
-        list of ceils where figure can move.
+        Returns squares the figure attacks.
 
         Parameters
         ----------
         board : list of lists
             a board the figure stay at
+
+        Returns
+        -------
+        list
+            list of squares (y * 8 + x) the figure attacks
         """
-        self.possible_moves = [coordinates_to_computer(coordinate)
-                               for coordinate in self.get_possible_moves(board)]
+        return [sq for x, y, sq in KNIGHT_TARGETS[self.y * 8 + self.x]]
 
 
 class Bishop(Figure):
@@ -538,40 +922,30 @@ class Bishop(Figure):
     possible_moves : list
         list of figure possible moves
     value : int
-        value of a figure (default 3)
+        value of a figure, class constant (default 3)
 
     Methods
     -------
+    get_targets(board)
+        return list of squares the figure can move to
+    get_attacks(board)
+        return list of squares the figure attacks
     get_possible_moves(board)
         return list of human-like possible positions to move on the board
     update_possible_moves(board)
-        update possible moves attribute based on
-        get_possible_moves returning lists
+        update possible moves attribute based on get_targets
     """
 
-    def __init__(self, x, y, color):
-        """
-        Init of Bishop class.
+    __slots__ = ()
+    LABELS = {'w': 'Bw', 'b': 'Bb'}
+    value = 3
+    SLIDING = True
+    CODE = 5
+    MAILBOX_OFFSETS = DIAGONAL_OFFSETS
 
-        Parameters
-        ----------
-        x : int
-            first coordinate of figure (0 to 7)
-        y : int
-            second coordinate of figure (0 to 7)
-        color : str
-            present side which figure is on ('w' -white or 'b' - black)
-        """
-        super().__init__(x, y, color)
-        self.value = 3
-        if color == 'w':
-            self.label = 'Bw'
-        elif color == 'b':
-            self.label = 'Bb'
-
-    def get_possible_moves(self, board):
+    def get_targets(self, board):
         """
-        Returns list of ceils where figure can move.
+        Returns squares where figure can move.
 
         Parameters
         ----------
@@ -581,40 +955,25 @@ class Bishop(Figure):
         Returns
         -------
         list
-            list of ceils where figure can move
+            list of squares (y * 8 + x) where figure can move, unsorted
         """
-        possible_moves = []
-
-        for dx, dy in [1, 1], [1, -1], [-1, -1], [-1, 1]:
-            for length in range(1, 8):
-                x = self.x + dx * length
-                y = self.y + dy * length
-                if not -1 < x < 8 or not -1 < y < 8:
-                    break
-                elif board[x][y] == ' ':
-                    possible_moves.append(coordinates_to_human((x, y)))
-                elif board[x][y][-1] != self.label[-1]:
-                    possible_moves.append(coordinates_to_human((x, y)))
-                    break
-                else:
-                    break
+        return _slide(board, DIAGONAL_RAYS[self.y * 8 + self.x], self.label[-1])
 
-        return sorted(possible_moves)
-
-    def update_possible_moves(self, board):
+    def get_attacks(self, board):
         """
-        Updates the possible_moves class attribute.
-
-        Updates the possible_moves class attribute -
-        list of ceils where figure can move.
+        Returns squares the figure attacks.
 
         Parameters
         ----------
         board : list of lists
             a board the figure stay at
+
+        Returns
+        -------
+        list
+            list of squares (y * 8 + x) the figure attacks
         """
-        self.possible_moves = [coordinates_to_computer(coordinate)
-                               for coordinate in self.get_possible_moves(board)]
+        return _reach(board, DIAGONAL_RAYS[self.y * 8 + self.x])
 
 
 class Pawn(Figure):
@@ -634,7 +993,7 @@ class Pawn(Figure):
     possible_moves : list
         list of figure possible moves
     value : int
-        value of a figure (default 1)
+        value of a figure, class constant (default 1)
     has_moved_two : bool
         indicator of moving for 2 cells since begginning of the game
         (used for en passant)
@@ -647,13 +1006,22 @@ class Pawn(Figure):
     get_possible_moves_black_pawn(board)
         return list of human-like possible positions
         to move on the board for black pawn
+    get_targets(board)
+        return list of squares the figure can move to
+    get_attacks(board)
+        return list of squares the figure attacks
     get_possible_moves(board)
         return list of human-like possible positions to move on the board
     update_possible_moves(board)
-        update possible moves attribute based on
-        get_possible_moves returning lists
+        update possible moves attribute based on get_targets
     """
 
+    __slots__ = ('has_moved_two',)
+    FIELDS = Figure.FIELDS + __slots__
+    LABELS = {'w': 'Pw', 'b': 'Pb'}
+    value = 1
+    CODE = 6
+
     def __init__(self, x, y, color):
         """
         Init of Pawn class.
@@ -668,13 +1036,33 @@ class Pawn(Figure):
             present side which figure is on ('w' -white or 'b' - black)
         """
         super().__init__(x, y, color)
-        self.value = 1
-        if color == 'w':
-            self.label = 'Pw'
-        elif color == 'b':
-            self.label = 'Pb'
         self.has_moved_two = False
 
+    def _pawn_targets(self, board, color):
+        """Returns squares where pawn can move in the color direction."""
+        x, y = self.x, self.y
+        if color == 'w':
+            dy, start, passant, enemy = 1, 1, 4, 'Pb'
+        else:
+            dy, start, passant, enemy = -1, 6, 3, 'Pw'
+        targets = []
+        y1 = y + dy
+        if not -1 < y1 < 8:
+            return targets
+
+        for x1 in (x - 1, x + 1):
+            if -1 < x1 < 8:
+                if board[x1][y1] != ' ':
+                    if board[x1][y1][-1] != self.label[-1]:
+                        targets.append(y1 * 8 + x1)
+                elif y == passant and board[x1][y] == enemy:
+                    targets.append(y1 * 8 + x1)
+        if board[x][y1] == ' ':
+            targets.append(y1 * 8 + x)
+            if y == start and board[x][y1 + dy] == ' ':
+                targets.append((y1 + dy) * 8 + x)
+        return targets
+
     def possible_moves_white_pawn(self, board):
         """
         Returns list of ceils where white figure can move.
@@ -689,39 +1077,8 @@ class Pawn(Figure):
         list
             list of ceils where white figure can move
         """
-        possible_moves = []
-
-        if self.y + 1 < 8:
-            if (self.x - 1 > -1
-                    and board[self.x - 1][self.y + 1] != ' '
-                    and board[self.x - 1][self.y + 1][-1]
-                    != self.label[-1]):
-                possible_moves.append(
-                        coordinates_to_human((self.x - 1, self.y + 1)))
-
-            if (self.x + 1 < 8
-                    and board[self.x + 1][self.y + 1] != ' '
-                    and board[self.x + 1][self.y + 1][-1]
-                    != self.label[-1]):
-                possible_moves.append(
-                        coordinates_to_human((self.x + 1, self.y + 1)))
-
-            if board[self.x][self.y + 1] == ' ':
-                possible_moves.append(
-                        coordinates_to_human((self.x, self.y + 1)))
-                if self.y == 1 and board[self.x][self.y + 2] == ' ':
-                    possible_moves.append(
-                            coordinates_to_human((self.x, self.y + 2)))
-
-            if self.y == 4:
-                if self.x - 1 > 0 and board[self.x - 1][self.y] == 'Pb':
-                    possible_moves.append(
-                        coordinates_to_human((self.x - 1, self.y + 1)))
-                if self.x + 1 < 8 and board[self.x + 1][self.y] == 'Pb':
-                    possible_moves.append(
-                        coordinates_to_human((self.x + 1, self.y + 1)))
-
-        return sorted(possible_moves)
+        return sorted([SQUARE_NAMES[sq]
+                       for sq in self._pawn_targets(board, 'w')])
 
     def possible_moves_black_pawn(self, board):
         """
@@ -737,43 +1094,12 @@ class Pawn(Figure):
         list
             list of ceils where black figure can move
         """
-        possible_moves = []
-
-        if self.y - 1 > -1:
-            if (self.x - 1 > -1
-                    and board[self.x - 1][self.y - 1] != ' '
-                    and board[self.x - 1][self.y - 1][-1]
-                    != self.label[-1]):
-                possible_moves.append(
-                        coordinates_to_human((self.x - 1, self.y - 1)))
-
-            if (self.x + 1 < 8
-                    and board[self.x + 1][self.y - 1] != ' '
-                    and board[self.x + 1][self.y - 1][-1] !=
-                    self.label[-1]):
-                possible_moves.append(
-                        coordinates_to_human((self.x + 1, self.y - 1)))
-
-            if board[self.x][self.y - 1] == ' ':
-                possible_moves.append(
-                        coordinates_to_human((self.x, self.y - 1)))
-                if self.y == 6 and board[self.x][self.y - 2] == ' ':
-                    possible_moves.append(
-                            coordinates_to_human((self.x, self.y - 2)))
-
-            if self.y == 3:
-                if self.x - 1 > 0 and board[self.x - 1][self.y] == 'Pw':
-                    possible_moves.append(
-                        coordinates_to_human((self.x - 1, self.y - 1)))
-                if self.x + 1 < 8 and board[self.x + 1][self.y] == 'Pw':
-                    possible_moves.append(
-                        coordinates_to_human((self.x + 1, self.y - 1)))
-
-        return sorted(possible_moves)
+        return sorted([SQUARE_NAMES[sq]
+                       for sq in self._pawn_targets(board, 'b')])
 
-    def get_possible_moves(self, board):
+    def get_targets(self, board):
         """
-        Returns list of ceils where figure can move.
+        Returns squares where figure can move.
 
         Parameters
         ----------
@@ -783,24 +1109,125 @@ class Pawn(Figure):
         Returns
         -------
         list
-            list of ceils where figure can move
+            list of squares (y * 8 + x) where figure can move, unsorted
         """
-        if self.label[-1] == 'w':
-            return self.possible_moves_white_pawn(board)
-        else:
-            return self.possible_moves_black_pawn(board)
+        return self._pawn_targets(board, self.label[-1])
 
-    def update_possible_moves(self, board):
+    def get_attacks(self, board):
         """
-        Updates the possible_moves class attribute.
-
-        Updates the possible_moves class attribute -
-        list of ceils where figure can move.
+        Returns squares the figure attacks.
 
         Parameters
         ----------
         board : list of lists
             a board the figure stay at
+
+        Returns
+        -------
+        list
+            list of diagonal squares (y * 8 + x) in front of the pawn
         """
-        self.possible_moves = [coordinates_to_computer(coordinate)
-                               for coordinate in self.get_possible_moves(board)]
+        y = self.y + (1 if self.label[-1] == 'w' else -1)
+        if not -1 < y < 8:
+            return []
+        return [y * 8 + x for x in (self.x - 1, self.x + 1) if -1 < x < 8]
+
+    @classmethod
+    def get_mailbox_targets(cls, squares, sq):
+        """
+        Returns squares where pawn standing on 0x88 mailbox can move.
+
+        Parameters
+        ----------
+        squares : array
+            0x88 mailbox, codes of figures indexed by x + y * 16
+        sq : int
+            0x88 square of the pawn
+
+        Returns
+        -------
+        list
+            list of 0x88 squares where pawn can move, unsorted
+        """
+        code = squares[sq]
+        if code & MAILBOX_BLACK:
+            step, start, passant, enemy = -16, 6, 3, cls.CODE
+        else:
+            step, start, passant, enemy = 16, 1, 4, cls.CODE | MAILBOX_BLACK
+        targets = []
+        front = sq + step
+        if front & MAILBOX_OFF:
+            return targets
+
+        for target in (front - 1, front + 1):
+            if not target & MAILBOX_OFF:
+                if squares[target]:
+                    if (squares[target] ^ code) & MAILBOX_BLACK:
+                        targets.append(target)
+                elif sq >> 4 == passant and squares[target - step] == enemy:
+                    targets.append(target)
+        if not squares[front]:
+            targets.append(front)
+            if sq >> 4 == start and not squares[front + step]:
+                targets.append(front + step)
+        return targets
+
+
+# figure classes indexed by mailbox code without MAILBOX_BLACK
+MAILBOX_CLASSES = (None, King, Queen, Rook, Knight, Bishop, Pawn)
+MAILBOX_CODES = {' ': 0}
+for _cls in MAILBOX_CLASSES[1:]:
+    MAILBOX_CODES[_cls.LABELS['w']] = _cls.CODE
+    MAILBOX_CODES[_cls.LABELS['b']] = _cls.CODE | MAILBOX_BLACK
+MAILBOX_LABELS = tuple(dict((code, label) for label, code
+                            in MAILBOX_CODES.items()).get(code, ' ')
+                       for code in range(16))
+
+
+def mailbox_attacked(squares, sq, color):
+    """
+    Checks if the ceil of 0x88 mailbox is attacked by figures of color.
+
+    Parameters
+    ----------
+    squares : array
+        0x88 mailbox, codes of figures indexed by x + y * 16
+    sq : int
+        0x88 square of the ceil
+    color : int
+        0 for white attackers or MAILBOX_BLACK for black ones
+
+    Returns
+    -------
+    bool
+        True if any figure of color attacks the ceil, False otherwise
+    """
+    pawn = Pawn.CODE | color
+    behind = sq - 16 if color == 0 else sq + 16
+    for target in (behind - 1, behind + 1):
+        if not target & MAILBOX_OFF and squares[target] == pawn:
+            return True
+    knight = Knight.CODE | color
+    for offset in KNIGHT_OFFSETS:
+        target = sq + offset
+        if not target & MAILBOX_OFF and squares[target] == knight:
+            return True
+    king = King.CODE | color
+    queen = Queen.CODE | color
+    for offsets, slider in ((STRAIGHT_OFFSETS, Rook.CODE | color),
+                            (DIAGONAL_OFFSETS, Bishop.CODE | color)):
+        for offset in offsets:
+            target = sq + offset
+            if target & MAILBOX_OFF:
+                continue
+            code = squares[target]
+            if code == king:
+                return True
+            while not code:
+                target += offset
+                if target & MAILBOX_OFF:
+                    break
+                code = squares[target]
+            if code == slider or code == queen:
+                return True
+    return False
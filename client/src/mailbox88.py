@@ -0,0 +1,740 @@
+"""0x88 mailbox position backend with the legacy rules of Game."""
+
+from array import array
+import bitboard
+import figures
+import zobrist
+from figures import MAILBOX_BLACK, MAILBOX_CLASSES, MAILBOX_LABELS
+from figures import to_mailbox, from_mailbox
+
+WHITE = 0
+BLACK = MAILBOX_BLACK
+COLORS = {WHITE: 'w', BLACK: 'b'}
+
+OFF = figures.MAILBOX_OFF
+KING = figures.King.CODE
+ROOK = figures.Rook.CODE
+PAWN = figures.Pawn.CODE
+# values of figures indexed by code without MAILBOX_BLACK (0 if empty)
+VALUES = tuple(cls.value if cls else 0 for cls in MAILBOX_CLASSES)
+# offsets and SLIDING flag of figure classes indexed by code
+STEPS = tuple(cls and (cls.MAILBOX_OFFSETS, cls.SLIDING)
+              for cls in MAILBOX_CLASSES)
+
+# True at difference of two 0x88 squares plus 119 if the squares are
+# on one line (rank, file or diagonal)
+LINES = [False] * 239
+for _offset in figures.STRAIGHT_OFFSETS + figures.DIAGONAL_OFFSETS:
+    for _distance in range(1, 8):
+        LINES[_offset * _distance + 119] = True
+# 0x88 squares of the board in a1, b1, ..., h8 order
+BOARD_SQUARES = tuple(to_mailbox(sq) for sq in range(64))
+# Zobrist keys of figures indexed by mailbox code and 0x88 square
+PIECE_KEYS = tuple(
+        None if label == ' ' else tuple(
+            zobrist.PIECE_KEYS[bitboard.LABELS.index(label)][from_mailbox(sq)]
+            if not sq & OFF else 0 for sq in range(128))
+        for label in MAILBOX_LABELS)
+
+
+def move_to_text(move):
+    """
+    Returns move in coordinate notation.
+
+    Parameters
+    ----------
+    move : int
+        packed move from_sq | to_sq << 7 (0x88 squares)
+
+    Returns
+    -------
+    str
+        move like 'e2e4'
+    """
+    return (figures.SQUARE_NAMES[from_mailbox(move & 127)]
+            + figures.SQUARE_NAMES[from_mailbox(move >> 7)])
+
+
+class Position():
+    """
+    A class used to present chess position as 0x88 mailbox.
+
+    Follows the legacy rules of Game: pawns aren't promoted, pawn on
+    the fifth rank can take any pawn beside it en passant and King
+    which hasn't moved can roque while there are only empty ceils
+    between it and its Rook in the corner.
+
+    Attributes
+    ----------
+    squares : array
+        array('b') of 128 figure codes indexed by x + y * 16 (0 - empty,
+        figures.MAILBOX_CODES otherwise), half of it is off the board
+    side : int
+        color to move (WHITE or BLACK)
+    pieces : list
+        two lists (white, black) of 0x88 squares of the figures
+    kings : list
+        0x88 squares of the white and the black King
+    king_moved : list
+        has_moved flags of the white and the black King
+    castling : int
+        castling rights (combination of bitboard.CASTLE_* constants),
+        kept for FEN and hash only
+    en_passant : int
+        0x88 square passed by the last two-ceil pawn move (-1 if none)
+    score : int
+        material advantage of White
+    fullmove_number : int
+        number of the move, starts at 1 and grows after Black's move
+    halfmove_clock : int
+        number of plies since last capture or pawn move
+    hash : int
+        Zobrist key of the position, equal to Game.hash
+    history : list
+        stack of undo records used by unmake_move
+    repetitions : dict
+        dictionary with keys - hashes of the positions since the start
+        (or restore) and values - how many times they occured
+
+    Methods
+    -------
+    initial()
+        return position at the beginning of the game
+    from_fen(fen)
+        return position described by FEN string
+    to_fen()
+        return FEN string of the position
+    to_board()
+        return board as list of lists of figure labels
+    compute_hash()
+        return Zobrist key of the position computed from scratch
+    snapshot()
+        return immutable value describing the position
+    restore(snapshot)
+        set up the position saved by snapshot()
+    is_attacked(sq, color)
+        check if 0x88 square is attacked by color figures
+    in_check()
+        check if King of the side to move is under attack
+    generate_moves()
+        return list of pseudo-legal moves
+    targets(sq)
+        return list of 0x88 squares the figure at sq can move to
+    find_move(from_sq, to_sq)
+        return pseudo-legal move between 0x88 squares (None if none)
+    make_move(move)
+        make move and push undo record
+    unmake_move()
+        take back the last move
+    is_legal(move)
+        check if move doesn't leave own King attacked
+    legal_moves()
+        return list of legal moves
+    iter_legal_moves(from_sq)
+        yield legal moves, of the figure at from_sq if it is given
+    has_legal_move()
+        check if the side to move has any legal move
+    is_checkmate()
+        check if the side to move is checkmated
+    is_stalemate()
+        check if the side to move is stalemated
+    is_repetition()
+        check if the position occured bitboard.REPETITION_COUNT times
+    is_fifty_moves()
+        check if halfmove clock reached bitboard.FIFTY_MOVES_PLIES
+    is_draw()
+        check if the game is drawn by stalemate, repetition or fifty-move
+        rule
+    perft(depth)
+        return number of leaf nodes of legal move tree of given depth
+    perft_divide(depth)
+        return perft(depth - 1) after each legal move
+    """
+
+    def __init__(self):
+        """Init of Position class (empty board, white to move)."""
+        self.squares = array('b', bytes(128))
+        self.side = WHITE
+        self.pieces = [[], []]
+        self.kings = [-1, -1]
+        self.king_moved = [True, True]
+        self.castling = 0
+        self.en_passant = -1
+        self.score = 0
+        self.fullmove_number = 1
+        self.halfmove_clock = 0
+        self.hash = 0
+        self.history = []
+        self.repetitions = {}
+
+    @classmethod
+    def initial(cls):
+        """Returns position at the beginning of the game."""
+        return cls.from_fen(bitboard.START_FEN)
+
+    @classmethod
+    def from_fen(cls, fen):
+        """
+        Returns position described by Forsyth-Edwards Notation string.
+
+        King hasn't moved if it stays at its start ceil and its side
+        has any castling right, as in Game.from_fen.
+
+        Parameters
+        ----------
+        fen : str
+            FEN string
+
+        Returns
+        -------
+        Position
+            position described by fen
+
+        Raises
+        ------
+        ValueError
+            if fen is not valid FEN string or a side has no King
+            or more than one King
+        """
+        parsed = bitboard.Position.from_fen(fen)
+        position = cls()
+        squares = position.squares
+        kings = [[], []]
+        for sq, code in enumerate(parsed.squares):
+            if code == bitboard.EMPTY:
+                continue
+            code = figures.MAILBOX_CODES[bitboard.LABELS[code]]
+            squares[to_mailbox(sq)] = code
+            position.pieces[code >> 3].append(to_mailbox(sq))
+            value = VALUES[code & 7]
+            position.score += -value if code & BLACK else value
+            if code & 7 == KING:
+                kings[code >> 3].append(to_mailbox(sq))
+        if len(kings[0]) != 1 or len(kings[1]) != 1:
+            raise ValueError('invalid FEN: {!r}'.format(fen))
+
+        position.kings = [kings[0][0], kings[1][0]]
+        position.king_moved = [
+                position.kings[0] != 4 or not parsed.castling & 3,
+                position.kings[1] != 0x74 or not parsed.castling & 12]
+        position.side = BLACK if parsed.side == bitboard.BLACK else WHITE
+        position.castling = parsed.castling
+        position.en_passant = (-1 if parsed.ep_square < 0
+                               else to_mailbox(parsed.ep_square))
+        position.fullmove_number = parsed.fullmove_number
+        position.halfmove_clock = parsed.halfmove_clock
+        position.hash = position.compute_hash()
+        position.repetitions = {position.hash: 1}
+        return position
+
+    def to_fen(self):
+        """Returns FEN string of the position."""
+        squares = [bitboard.EMPTY] * 64
+        for sq, sq88 in enumerate(BOARD_SQUARES):
+            if self.squares[sq88]:
+                squares[sq] = bitboard.LABELS.index(
+                        MAILBOX_LABELS[self.squares[sq88]])
+        return bitboard.format_fen(
+                squares, bitboard.BLACK if self.side else bitboard.WHITE,
+                self.castling,
+                -1 if self.en_passant < 0 else from_mailbox(self.en_passant),
+                self.halfmove_clock, self.fullmove_number)
+
+    def to_board(self):
+        """
+        Returns board in the Game.board format.
+
+        Returns
+        -------
+        list
+            list (len 8) of lists (len 8) where each element is string
+            (' ' if there is no figure and figure label otherwise)
+        """
+        squares = self.squares
+        return [[MAILBOX_LABELS[squares[y * 16 + x]] for y in range(8)]
+                for x in range(8)]
+
+    def compute_hash(self):
+        """Returns Zobrist key of the position computed from scratch."""
+        key = zobrist.SIDE_KEY if self.side else 0
+        for sq in BOARD_SQUARES:
+            if self.squares[sq]:
+                key ^= PIECE_KEYS[self.squares[sq]][sq]
+        key ^= zobrist.CASTLING_KEYS[self.castling]
+        return key ^ self._ep_key(self.side)
+
+    def _ep_key(self, side):
+        """Returns zobrist.ep_key of en passant square for side to move."""
+        if self.en_passant < 0:
+            return 0
+        pushed = (self.en_passant + 16 if self.en_passant < 0x40
+                  else self.en_passant - 16)
+        pawns = 0
+        for sq in (pushed - 1, pushed + 1):
+            if not sq & OFF and self.squares[sq] == PAWN | side:
+                pawns |= 1 << from_mailbox(sq)
+        return zobrist.ep_key(from_mailbox(self.en_passant), pawns)
+
+    def snapshot(self):
+        """
+        Returns immutable value describing the position.
+
+        Returns
+        -------
+        tuple
+            value to pass to restore()
+        """
+        return (self.squares.tobytes(), self.side, tuple(self.kings),
+                tuple(self.king_moved), self.castling, self.en_passant,
+                self.score, self.fullmove_number, self.halfmove_clock,
+                self.hash)
+
+    def restore(self, snapshot):
+        """
+        Sets up the position saved by snapshot().
+
+        History is cleared and repetitions start anew from the position.
+
+        Parameters
+        ----------
+        snapshot : tuple
+            value returned by snapshot()
+        """
+        (squares, self.side, kings, king_moved, self.castling,
+         self.en_passant, self.score, self.fullmove_number,
+         self.halfmove_clock, self.hash) = snapshot
+        self.squares = array('b', squares)
+        self.pieces = [[sq for sq in BOARD_SQUARES
+                        if self.squares[sq]
+                        and self.squares[sq] >> 3 == i]
+                       for i in range(2)]
+        self.kings = list(kings)
+        self.king_moved = list(king_moved)
+        self.history = []
+        self.repetitions = {self.hash: 1}
+
+    def is_attacked(self, sq, color):
+        """Returns True if 0x88 square is attacked by color figures."""
+        return figures.mailbox_attacked(self.squares, sq, color)
+
+    def in_check(self):
+        """Returns True if King of the side to move is under attack."""
+        return figures.mailbox_attacked(
+                self.squares, self.kings[self.side >> 3], self.side ^ BLACK)
+
+    def targets(self, sq):
+        """
+        Returns squares where figure can move (pseudo-legal moves).
+
+        Parameters
+        ----------
+        sq : int
+            0x88 square of the figure
+
+        Returns
+        -------
+        list
+            list of 0x88 squares, unsorted
+        """
+        code = self.squares[sq]
+        if code & 7 == KING:
+            return figures.King.get_mailbox_targets(
+                    self.squares, sq, self.king_moved[code >> 3])
+        return MAILBOX_CLASSES[code & 7].get_mailbox_targets(self.squares,
+                                                             sq)
+
+    def generate_moves(self):
+        """
+        Returns pseudo-legal moves of the side to move.
+
+        Loops of Figure.get_mailbox_targets and Pawn.get_mailbox_targets
+        are inlined here, only King moves are generated by the call.
+
+        Returns
+        -------
+        list
+            list of packed moves from_sq | to_sq << 7 (0x88 squares)
+        """
+        squares = self.squares
+        side = self.side
+        moves = []
+        append = moves.append
+        if side:
+            step, start, passant, enemy = -16, 6, 3, PAWN
+        else:
+            step, start, passant, enemy = 16, 1, 4, PAWN | BLACK
+        for sq in self.pieces[side >> 3]:
+            kind = squares[sq] & 7
+            if kind == PAWN:
+                front = sq + step
+                if front & OFF:
+                    continue
+                for target in (front - 1, front + 1):
+                    if not target & OFF:
+                        other = squares[target]
+                        if other:
+                            if other & BLACK != side:
+                                append(sq | target << 7)
+                        elif (sq >> 4 == passant
+                              and squares[target - step] == enemy):
+                            append(sq | target << 7)
+                if not squares[front]:
+                    append(sq | front << 7)
+                    if sq >> 4 == start and not squares[front + step]:
+                        append(sq | (front + step) << 7)
+            elif kind == KING:
+                moves += [sq | target << 7 for target in self.targets(sq)]
+            else:
+                offsets, sliding = STEPS[kind]
+                for offset in offsets:
+                    target = sq + offset
+                    while not target & OFF:
+                        other = squares[target]
+                        if other:
+                            if other & BLACK != side:
+                                append(sq | target << 7)
+                            break
+                        append(sq | target << 7)
+                        if not sliding:
+                            break
+                        target += offset
+        return moves
+
+    def find_move(self, from_sq, to_sq):
+        """
+        Returns pseudo-legal move of the side to move.
+
+        Parameters
+        ----------
+        from_sq : int
+            0x88 square the figure moves from
+        to_sq : int
+            0x88 square the figure moves to
+
+        Returns
+        -------
+        int
+            packed move (None if there is no such move)
+        """
+        code = self.squares[from_sq]
+        if not code or code & BLACK != self.side:
+            return None
+        if to_sq not in self.targets(from_sq):
+            return None
+        return from_sq | to_sq << 7
+
+    def make_move(self, move):
+        """
+        Makes pseudo-legal move and pushes undo record to history.
+
+        Parameters
+        ----------
+        move : int
+            packed move from_sq | to_sq << 7 (0x88 squares)
+
+        Returns
+        -------
+        int
+            code of captured figure (0 if nothing was captured)
+        """
+        from_sq = move & 127
+        to_sq = move >> 7
+        squares = self.squares
+        side = self.side
+        code = squares[from_sq]
+        kind = code & 7
+        ep_key = self._ep_key(side)
+
+        captured_sq = to_sq
+        captured = squares[to_sq]
+        if not captured and kind == PAWN and (from_sq ^ to_sq) & 7:
+            captured_sq = from_sq & 0x70 | to_sq & 7
+            captured = squares[captured_sq]
+        self.history.append((move, captured, captured_sq,
+                             self.king_moved[side >> 3], self.castling,
+                             self.en_passant, self.score,
+                             self.halfmove_clock, self.hash))
+
+        pieces = self.pieces[side >> 3]
+        pieces[pieces.index(from_sq)] = to_sq
+        keys = PIECE_KEYS[code]
+        key = self.hash ^ zobrist.SIDE_KEY ^ keys[from_sq] ^ keys[to_sq]
+        if captured:
+            squares[captured_sq] = 0
+            self.pieces[captured >> 3].remove(captured_sq)
+            key ^= PIECE_KEYS[captured][captured_sq]
+            value = VALUES[captured & 7]
+            self.score += -value if side else value
+        squares[from_sq] = 0
+        squares[to_sq] = code
+        if kind == KING:
+            self.kings[side >> 3] = to_sq
+            self.king_moved[side >> 3] = True
+            if to_sq - from_sq in (2, -2):
+                rook_from = to_sq + 1 if to_sq > from_sq else to_sq - 2
+                rook_to = (from_sq + to_sq) >> 1
+                squares[rook_to] = squares[rook_from]
+                squares[rook_from] = 0
+                pieces[pieces.index(rook_from)] = rook_to
+                keys = PIECE_KEYS[ROOK | side]
+                key ^= keys[rook_from] ^ keys[rook_to]
+
+        castling = self.castling & (
+                bitboard.CASTLING_MASK[from_mailbox(from_sq)]
+                & bitboard.CASTLING_MASK[from_mailbox(to_sq)])
+        key ^= (zobrist.CASTLING_KEYS[self.castling]
+                ^ zobrist.CASTLING_KEYS[castling])
+        self.castling = castling
+        key ^= ep_key
+        if kind == PAWN and to_sq - from_sq in (32, -32):
+            self.en_passant = (from_sq + to_sq) >> 1
+            key ^= self._ep_key(side ^ BLACK)
+        else:
+            self.en_passant = -1
+        self.hash = key
+        self.repetitions[key] = self.repetitions.get(key, 0) + 1
+        if captured or kind == PAWN:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if side:
+            self.fullmove_number += 1
+        self.side = side ^ BLACK
+        return captured
+
+    def unmake_move(self):
+        """
+        Takes back the last made move.
+
+        Returns
+        -------
+        int
+            packed move which was taken back
+        """
+        if self.repetitions[self.hash] > 1:
+            self.repetitions[self.hash] -= 1
+        else:
+            del self.repetitions[self.hash]
+        (move, captured, captured_sq, king_moved, self.castling,
+         self.en_passant, self.score, self.halfmove_clock,
+         self.hash) = self.history.pop()
+        from_sq = move & 127
+        to_sq = move >> 7
+        squares = self.squares
+        side = self.side ^ BLACK
+        self.side = side
+        if side:
+            self.fullmove_number -= 1
+
+        code = squares[to_sq]
+        squares[to_sq] = 0
+        squares[from_sq] = code
+        pieces = self.pieces[side >> 3]
+        pieces[pieces.index(to_sq)] = from_sq
+        if code & 7 == KING:
+            self.kings[side >> 3] = from_sq
+            self.king_moved[side >> 3] = king_moved
+            if to_sq - from_sq in (2, -2):
+                rook_from = to_sq + 1 if to_sq > from_sq else to_sq - 2
+                rook_to = (from_sq + to_sq) >> 1
+                squares[rook_from] = squares[rook_to]
+                squares[rook_to] = 0
+                pieces[pieces.index(rook_to)] = rook_from
+        if captured:
+            squares[captured_sq] = captured
+            self.pieces[captured >> 3].append(captured_sq)
+        return move
+
+    def is_legal(self, move):
+        """
+        Checks if pseudo-legal move doesn't leave own King attacked.
+
+        Only the figures are moved on the board and put back, flags,
+        hash and history aren't touched.
+
+        Parameters
+        ----------
+        move : int
+            packed move from_sq | to_sq << 7 (0x88 squares)
+
+        Returns
+        -------
+        bool
+            True if the move is legal, False otherwise
+        """
+        from_sq = move & 127
+        to_sq = move >> 7
+        squares = self.squares
+        code = squares[from_sq]
+        captured_sq = to_sq
+        if code & 7 == PAWN and not squares[to_sq] and (from_sq ^ to_sq) & 7:
+            captured_sq = from_sq & 0x70 | to_sq & 7
+        captured = squares[captured_sq]
+        squares[captured_sq] = 0
+        squares[from_sq] = 0
+        squares[to_sq] = code
+        king = self.kings[self.side >> 3]
+        rook_from = -1
+        if code & 7 == KING:
+            king = to_sq
+            if to_sq - from_sq in (2, -2):
+                rook_from = to_sq + 1 if to_sq > from_sq else to_sq - 2
+                rook_to = (from_sq + to_sq) >> 1
+                squares[rook_to] = squares[rook_from]
+                squares[rook_from] = 0
+        legal = not figures.mailbox_attacked(squares, king,
+                                             self.side ^ BLACK)
+        if rook_from >= 0:
+            squares[rook_from] = squares[rook_to]
+            squares[rook_to] = 0
+        squares[to_sq] = 0
+        squares[from_sq] = code
+        squares[captured_sq] = captured
+        return legal
+
+    def _needs_check(self):
+        """
+        Returns filter of moves which can leave own King attacked.
+
+        Unless the King is in check, only its own moves, en passant and
+        moves of figures on a line with it (possibly pinned) can do it.
+
+        Returns
+        -------
+        callable
+            function of packed move returning True if is_legal(move)
+            has to be called
+        """
+        if self.in_check():
+            return lambda move: True
+        squares = self.squares
+        king = self.kings[self.side >> 3]
+
+        def needs_check(move):
+            from_sq = move & 127
+            return (from_sq == king or LINES[from_sq - king + 119]
+                    or squares[from_sq] & 7 == PAWN
+                    and not squares[move >> 7] and (from_sq ^ move >> 7) & 7)
+        return needs_check
+
+    def legal_moves(self):
+        """
+        Returns moves of the side to move which don't leave King attacked.
+
+        Returns
+        -------
+        list
+            list of packed moves from_sq | to_sq << 7 (0x88 squares)
+        """
+        needs_check = self._needs_check()
+        return [move for move in self.generate_moves()
+                if not needs_check(move) or self.is_legal(move)]
+
+    def iter_legal_moves(self, from_sq=None):
+        """
+        Yields moves of the side to move which don't leave King attacked.
+
+        Parameters
+        ----------
+        from_sq : int
+            if given, only moves of the figure of the side to move at
+            this 0x88 square are yielded
+
+        Yields
+        ------
+        int
+            packed move from_sq | to_sq << 7 (0x88 squares)
+        """
+        if from_sq is None:
+            moves = self.generate_moves()
+        else:
+            code = self.squares[from_sq]
+            if not code or code & BLACK != self.side:
+                return
+            moves = [from_sq | to_sq << 7 for to_sq in self.targets(from_sq)]
+        needs_check = self._needs_check()
+        for move in moves:
+            if not needs_check(move) or self.is_legal(move):
+                yield move
+
+    def has_legal_move(self):
+        """Returns True if the side to move has any legal move."""
+        for _ in self.iter_legal_moves():
+            return True
+        return False
+
+    def is_checkmate(self):
+        """Returns True if the side to move is checkmated."""
+        return self.in_check() and not self.has_legal_move()
+
+    def is_stalemate(self):
+        """Returns True if the side to move is stalemated."""
+        return not self.in_check() and not self.has_legal_move()
+
+    def is_repetition(self):
+        """Returns True if the position occured REPETITION_COUNT times."""
+        return (self.repetitions.get(self.hash, 0)
+                >= bitboard.REPETITION_COUNT)
+
+    def is_fifty_moves(self):
+        """Returns True if halfmove clock reached FIFTY_MOVES_PLIES."""
+        return self.halfmove_clock >= bitboard.FIFTY_MOVES_PLIES
+
+    def is_draw(self):
+        """
+        Returns True if the game is drawn in the position.
+
+        It is drawn if the side to move is stalemated, or the position
+        is repeated or fifty moves passed and it isn't checkmated.
+        """
+        if self.is_repetition() or self.is_fifty_moves():
+            return not self.is_checkmate()
+        return self.is_stalemate()
+
+    def perft(self, depth):
+        """
+        Counts leaf nodes of the legal move tree.
+
+        Parameters
+        ----------
+        depth : int
+            depth of the tree in plies
+
+        Returns
+        -------
+        int
+            number of positions reachable in exactly depth plies
+        """
+        if depth == 0:
+            return 1
+        moves = self.legal_moves()
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            self.make_move(move)
+            nodes += self.perft(depth - 1)
+            self.unmake_move()
+        return nodes
+
+    def perft_divide(self, depth):
+        """
+        Counts leaf nodes of the legal move tree per first move.
+
+        Parameters
+        ----------
+        depth : int
+            depth of the tree in plies (at least 1)
+
+        Returns
+        -------
+        dictionary
+            dictionary with keys - moves in coordinate notation and
+            values - perft(depth - 1) of the position after the move
+        """
+        divide = {}
+        for move in self.legal_moves():
+            self.make_move(move)
+            divide[move_to_text(move)] = self.perft(depth - 1)
+            self.unmake_move()
+        return dict(sorted(divide.items()))
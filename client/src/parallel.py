@@ -0,0 +1,400 @@
+"""Parallel search of the engine by several processes (Lazy SMP)."""
+
+import argparse
+import multiprocessing
+import os
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+import bitboard
+import engine
+from chess_game import Game
+from zobrist import table_key
+
+# slot of the table: key ^ data and data, 64 bits each
+SLOT = struct.Struct('<QQ')
+# search scores are stored with this offset to be non-negative
+SCORE_OFFSET = 1 << 31
+
+# worker i starts iterative deepening at depth 1 + i % DEPTH_CYCLE
+DEPTH_CYCLE = 4
+# depth of the search timed by scaling_report
+SCALING_DEPTH = 4
+
+# shared tables attached by the worker process, by name of the memory
+_attached = {}
+# stop flag of the search shared with the parent process, set in the
+# worker process by _init_worker
+_stop_flag = None
+
+
+class SharedTable():
+    """
+    A class used to share transposition table between processes.
+
+    The table is an array of slots in shared memory, the slot is
+    chosen by the low bits of the key and always replaced. Slots are
+    written without locks: each one keeps key ^ data and data, so a slot
+    torn by two processes writing at once doesn't match any key and is
+    ignored by get.
+
+    Attributes
+    ----------
+    memory : SharedMemory
+        shared memory block of the table
+    entries : int
+        number of slots, power of two
+
+    Methods
+    -------
+    create(entries)
+        return table in new shared memory block
+    attach(name)
+        return table in shared memory block created by parent process
+    get(key)
+        return entry of the position (None if there is no entry)
+    clear()
+        empty all slots
+    close()
+        stop using the memory in this process
+    unlink()
+        free the memory, called by the creator after all processes
+        closed it
+    """
+
+    def __init__(self, memory):
+        """
+        Init of SharedTable class.
+
+        Parameters
+        ----------
+        memory : SharedMemory
+            shared memory block of the table
+        """
+        self.memory = memory
+        self.entries = 1 << ((memory.size // SLOT.size).bit_length() - 1)
+        self._mask = self.entries - 1
+        self._buffer = memory.buf
+
+    @classmethod
+    def create(cls, entries=1 << 20):
+        """
+        Creates table in new shared memory block.
+
+        Parameters
+        ----------
+        entries : int
+            number of slots, rounded down to power of two
+            (default 1 << 20, 16 MiB)
+
+        Returns
+        -------
+        SharedTable
+            empty table
+        """
+        entries = 1 << (max(entries, 1).bit_length() - 1)
+        return cls(shared_memory.SharedMemory(create=True,
+                                              size=entries * SLOT.size))
+
+    @classmethod
+    def attach(cls, name):
+        """
+        Attaches to table created by the parent process.
+
+        Child processes share the resource tracker with the parent, so
+        the block stays registered once and is freed by the creator.
+
+        Parameters
+        ----------
+        name : str
+            name of the shared memory block (memory.name of the table)
+
+        Returns
+        -------
+        SharedTable
+            table sharing slots with the original one
+        """
+        return cls(shared_memory.SharedMemory(name=name))
+
+    def get(self, key):
+        """
+        Returns entry of the position.
+
+        Parameters
+        ----------
+        key : tuple
+            Game.position_key() of the position
+
+        Returns
+        -------
+        tuple
+            depth, score, bound and packed move as Engine stores them
+            (None if there is no entry)
+        """
+        value = table_key(key)
+        check, data = SLOT.unpack_from(self._buffer,
+                                       (value & self._mask) * SLOT.size)
+        if check ^ data != value or not data:
+            return None
+        return (data >> 32 & 0xff, (data & 0xffffffff) - SCORE_OFFSET,
+                data >> 40 & 0xff, data >> 48)
+
+    def __setitem__(self, key, entry):
+        """Puts entry (depth, score, bound, move) of the position."""
+        depth, score, bound, move = entry
+        value = table_key(key)
+        data = (score + SCORE_OFFSET | min(depth, 0xff) << 32
+                | bound << 40 | move << 48)
+        SLOT.pack_into(self._buffer, (value & self._mask) * SLOT.size,
+                       value ^ data, data)
+
+    def clear(self):
+        """Empties all slots."""
+        self._buffer[:] = bytes(len(self._buffer))
+
+    def close(self):
+        """Stops using the memory in this process."""
+        self._buffer.release()
+        self.memory.close()
+
+    def unlink(self):
+        """Frees the memory, called by the creator of the table."""
+        self.memory.unlink()
+
+
+def _init_worker(stop_flag):
+    """Init worker process of the pool with the shared stop flag."""
+    global _stop_flag
+    _stop_flag = stop_flag
+
+
+def _stopped():
+    """Returns True if another worker completed the search."""
+    return _stop_flag.value != 0
+
+
+def _search_worker(task):
+    """
+    Runs Engine.search in the worker process with shared table.
+
+    The worker starts at its own depth, so workers search different
+    iterations at once. The worker completing the maximum depth stops
+    the others.
+    """
+    name, snapshot, player, repetitions, seconds, depth, index = task
+    table = _attached.get(name)
+    if table is None:
+        table = _attached[name] = SharedTable.attach(name)
+    game = Game(player)
+    game.restore(snapshot)
+    game.repetitions = repetitions
+    result = engine.Engine(None, table).search(
+            game, seconds, depth, stop=_stopped,
+            first_depth=1 + index % DEPTH_CYCLE)
+    if result is not None and depth is not None and result.depth >= depth:
+        _stop_flag.value = 1
+    return result
+
+
+class ParallelEngine():
+    """
+    A class used to search the best move by several processes.
+
+    Lazy SMP: each worker process runs iterative deepening search of
+    the root position and they share only the transposition table.
+    Worker i starts at depth 1 + i % DEPTH_CYCLE, so the workers search
+    different iterations and fill the table for each other instead of
+    repeating the same work. The first worker completing the maximum
+    depth stops the others. The deepest completed result is returned.
+
+    Attributes
+    ----------
+    workers : int
+        number of worker processes
+    table : SharedTable
+        transposition table shared by the workers
+    stop_flag : multiprocessing.RawValue
+        set by the worker completing the maximum depth
+    pool : Pool
+        pool of the worker processes
+
+    Methods
+    -------
+    search(game, seconds, depth)
+        return the deepest result completed by the workers
+    clear()
+        forget the shared transposition table
+    close()
+        stop the workers and free the table
+    """
+
+    def __init__(self, workers=None, entries=1 << 20):
+        """
+        Init of ParallelEngine class.
+
+        Parameters
+        ----------
+        workers : int
+            number of worker processes (default None - number of CPUs)
+        entries : int
+            number of slots of the shared table (default 1 << 20)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.table = SharedTable.create(entries)
+        self.stop_flag = multiprocessing.RawValue('b', 0)
+        self.pool = multiprocessing.Pool(self.workers,
+                                         initializer=_init_worker,
+                                         initargs=(self.stop_flag,))
+
+    def __enter__(self):
+        """Returns the engine itself for with statement."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Closes the engine at the end of with statement."""
+        self.close()
+
+    def search(self, game, seconds=None, depth=None):
+        """
+        Searches the best move of active player by all workers.
+
+        Parameters
+        ----------
+        game : Game
+            game to search the move in, it isn't changed
+        seconds : float
+            time budget of the search (default None - not limited)
+        depth : int
+            maximum depth in plies (default None - not limited if
+            seconds is given, 1 otherwise)
+
+        Returns
+        -------
+        engine.SearchResult
+            deepest result completed by the workers, with nodes of
+            the workers which completed an iteration and time of the
+            whole search (None if no worker completed an iteration)
+        """
+        start = time.perf_counter()
+        task = (self.table.memory.name, game.snapshot(), game.player,
+                dict(game.repetitions), seconds, depth)
+        self.stop_flag.value = 0
+        results = [result for result in self.pool.map(
+                       _search_worker,
+                       [task + (index,) for index in range(self.workers)])
+                   if result is not None]
+        if not results:
+            return None
+        best = max(results, key=lambda result: result.depth)
+        return best._replace(nodes=sum(result.nodes for result in results),
+                             seconds=time.perf_counter() - start)
+
+    def clear(self):
+        """Forgets the shared transposition table."""
+        self.table.clear()
+
+    def close(self):
+        """Stops the workers and frees the shared table."""
+        self.pool.close()
+        self.pool.join()
+        self.table.close()
+        self.table.unlink()
+
+
+def scaling_report(fen=bitboard.START_FEN, depth=SCALING_DEPTH,
+                   max_workers=None, out=sys.stdout):
+    """
+    Measures time to depth of the search by 1 to max_workers processes.
+
+    Nodes per second of all workers grow with their number even if
+    they repeat each other's work, so the speedup is the time the
+    search takes to complete the same depth.
+
+    Parameters
+    ----------
+    fen : str
+        FEN string of the position (default the start position)
+    depth : int
+        depth of each search in plies (default SCALING_DEPTH)
+    max_workers : int
+        the largest number of workers (default None - number of CPUs)
+    out : file
+        stream the report is printed to (default sys.stdout)
+
+    Returns
+    -------
+    dictionary
+        dictionary with keys - numbers of workers and values - tuples of
+        seconds to the depth and nodes per second, numbers of workers
+        which completed no iteration are left out
+    """
+    game = Game.from_fen(fen)
+    times = {}
+    for workers in range(1, (max_workers or os.cpu_count() or 1) + 1):
+        with ParallelEngine(workers) as search:
+            result = search.search(game, depth=depth)
+        if result is None:
+            print('{:>2} workers completed no iteration'.format(workers),
+                  file=out)
+            continue
+        seconds = max(result.seconds, 1e-9)
+        times[workers] = (seconds, result.nodes / seconds)
+        speedup = ('x{:<5.2f}'.format(times[1][0] / seconds)
+                   if 1 in times else 'x-    ')
+        print('{:>2} workers depth {} in {:>8.3f} s  {} {:>10.0f} nodes/s'
+              .format(workers, result.depth, seconds, speedup,
+                      times[workers][1]),
+              file=out)
+    return times
+
+
+def main(argv=None):
+    """
+    Runs parallel analysis command line interface.
+
+    Parameters
+    ----------
+    argv : list
+        command line arguments (default sys.argv[1:])
+
+    Returns
+    -------
+    int
+        exit status
+    """
+    parser = argparse.ArgumentParser(
+            description='Search the best move by several processes.')
+    parser.add_argument('--fen', default=bitboard.START_FEN,
+                        help='FEN string of the position '
+                             '(default the start position)')
+    parser.add_argument('--seconds', type=float, default=5.0,
+                        help='time budget of the search (default 5.0)')
+    parser.add_argument('--depth', type=int,
+                        help='maximum depth in plies (default not limited, '
+                             '{} for --scaling)'.format(SCALING_DEPTH))
+    parser.add_argument('--workers', type=int,
+                        help='number of processes (default number of CPUs)')
+    parser.add_argument('--scaling', action='store_true',
+                        help='report time to --depth of 1 to --workers '
+                             'processes')
+    args = parser.parse_args(argv)
+    if args.scaling:
+        scaling_report(args.fen, args.depth or SCALING_DEPTH, args.workers)
+        return 0
+    with ParallelEngine(args.workers) as search:
+        result = search.search(Game.from_fen(args.fen), args.seconds,
+                               args.depth)
+    if result is None:
+        print('no completed iteration')
+        return 1
+    print(engine.format_result(result))
+    if result.move is None:
+        print('no legal moves')
+    else:
+        print('bestmove', result.move)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""Perft benchmark and correctness suite for the move generators."""
+
+import argparse
+import sys
+import time
+import bitboard
+from chess_game import Game, BitboardGame, MailboxGame
+
+POSITIONS = (
+    ('startpos', bitboard.START_FEN,
+     (20, 400, 8902, 197281, 4865609)),
+    ('kiwipete',
+     'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     (48, 2039, 97862, 4085603)),
+    ('position3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     (14, 191, 2812, 43238, 674624)),
+    ('position4',
+     'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     (6, 264, 9467, 422333)),
+    ('position5',
+     'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     (44, 1486, 62379, 2103487)),
+    ('position6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/'
+     '1PP1QPPP/R4RK1 w - - 0 10',
+     (46, 2079, 89890, 3894594)),
+)
+
+BACKENDS = ('bitboard', 'figures', 'mailbox')
+
+# legacy rules of Game and MailboxGame (no promotion, en passant of any
+# adjacent pawn, castling through attacked ceils) give the standard
+# counts up to depth 3 only, their own counts of the positions where
+# they are checked
+LEGACY_BACKENDS = ('figures', 'mailbox')
+LEGACY_COUNTS = {
+    'startpos': (20, 400, 8902, 197281, 4865908),
+    'position3': (14, 191, 2812, 43377, 677805),
+    'position6': (46, 2079, 89890, 3894716),
+}
+LEGACY_POSITIONS = tuple(LEGACY_COUNTS)
+
+
+def make_game(backend, fen):
+    """
+    Creates game of the backend set up to the position.
+
+    Parameters
+    ----------
+    backend : str
+        'bitboard' for BitboardGame, 'figures' for Game or 'mailbox'
+        for MailboxGame
+    fen : str
+        FEN string of the position
+
+    Returns
+    -------
+    Game, BitboardGame or MailboxGame
+        game with fen position on the board
+
+    Raises
+    ------
+    ValueError
+        if fen is not valid FEN string
+    """
+    if backend == 'bitboard':
+        return BitboardGame('w', bitboard.Position.from_fen(fen))
+    if backend == 'mailbox':
+        return MailboxGame.from_fen(fen)
+    return Game.from_fen(fen)
+
+
+def timed_perft(game, depth):
+    """
+    Runs perft and measures its time.
+
+    Parameters
+    ----------
+    game : Game, BitboardGame or MailboxGame
+        game to run perft in
+    depth : int
+        depth of the tree in plies
+
+    Returns
+    -------
+    tuple
+        number of leaf nodes and time spent in seconds
+    """
+    start = time.perf_counter()
+    nodes = game.perft(depth)
+    return nodes, time.perf_counter() - start
+
+
+def run_suite(backend, depth, names=None, out=sys.stdout):
+    """
+    Runs perft of the standard positions and compares node counts.
+
+    Parameters
+    ----------
+    backend : str
+        'bitboard', 'figures' or 'mailbox'
+    depth : int
+        maximum depth, positions are checked at depths 1 to depth
+        (while the expected count is known)
+    names : list
+        names of POSITIONS to run (default all), LEGACY_BACKENDS
+        run only LEGACY_POSITIONS and expect LEGACY_COUNTS
+    out : file
+        stream the report is printed to (default sys.stdout)
+
+    Returns
+    -------
+    list
+        list of tuples (name, depth, nodes, expected) for each divergence
+    """
+    failures = []
+    for name, fen, counts in POSITIONS:
+        if names and name not in names:
+            continue
+        if backend in LEGACY_BACKENDS and name not in LEGACY_POSITIONS:
+            print('{:<10} skipped, legacy rules of {} backend differ here'
+                  .format(name, backend), file=out)
+            continue
+        if backend in LEGACY_BACKENDS:
+            counts = LEGACY_COUNTS[name]
+        game = make_game(backend, fen)
+        for d in range(1, min(depth, len(counts)) + 1):
+            nodes, seconds = timed_perft(game, d)
+            expected = counts[d - 1]
+            print('{:<10} depth {} nodes {:>9} expected {:>9} '
+                  '{:>8.3f} s {:>9.0f} nodes/s {}'
+                  .format(name, d, nodes, expected, seconds,
+                          nodes / seconds if seconds else 0,
+                          'ok' if nodes == expected else 'FAILED'),
+                  file=out)
+            if nodes != expected:
+                failures.append((name, d, nodes, expected))
+    return failures
+
+
+def main(argv=None):
+    """
+    Runs perft command line interface.
+
+    Parameters
+    ----------
+    argv : list
+        command line arguments (default sys.argv[1:])
+
+    Returns
+    -------
+    int
+        exit status - 0 if all counts match and 1 otherwise
+    """
+    parser = argparse.ArgumentParser(
+            description='Perft benchmark and correctness suite.')
+    parser.add_argument('--backend', choices=BACKENDS, default='bitboard',
+                        help='move generator to check (default bitboard)')
+    parser.add_argument('--depth', type=int, default=3,
+                        help='maximum depth in plies (default 3)')
+    parser.add_argument('--position', action='append',
+                        choices=[name for name, _, _ in POSITIONS],
+                        help='run only this position (may be repeated)')
+    parser.add_argument('--divide', metavar='FEN',
+                        help='print perft_divide of the position instead '
+                             'of running the suite')
+    args = parser.parse_args(argv)
+
+    if args.divide is not None:
+        try:
+            game = make_game(args.backend, args.divide)
+        except ValueError as error:
+            parser.error(str(error))
+        start = time.perf_counter()
+        divide = game.perft_divide(args.depth)
+        seconds = time.perf_counter() - start
+        for move, nodes in divide.items():
+            print('{} {}'.format(move, nodes))
+        total = sum(divide.values())
+        print('total {} in {:.3f} s, {:.0f} nodes/s'.format(
+                total, seconds, total / seconds if seconds else 0))
+        return 0
+
+    failures = run_suite(args.backend, args.depth, args.position)
+    for name, depth, nodes, expected in failures:
+        print('{} depth {}: {} nodes instead of {}'.format(
+                name, depth, nodes, expected), file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,6 +27,8 @@ server_answer = {
     "start_game": "Start game, color: {}",
     "send_game_request": "Send game request",
     "send_you_game_request": "{} send you game request",
+    "computer_busy": "Computer is busy, try again later",
+    "computer_error": "Computer can't continue the game, game is stopped",
     # for move
     "you_dont_play_now": "You dont play now",
     "move_opponent_refused_draw": "Opponent refused a draw",
@@ -83,6 +85,8 @@ def mock_for_i18n() -> None:
     _("Start game, color: {}")
     _("Send game request")
     _("{} send you game request")
+    _("Computer is busy, try again later")
+    _("Computer can't continue the game, game is stopped")
     # for move
     _("You dont play now")
     _("Opponent refused a draw")
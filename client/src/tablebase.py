@@ -0,0 +1,886 @@
+"""Endgame tablebases generated by retrograde analysis."""
+
+import argparse
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+import bitboard
+import engine
+from bitboard import (KING_ATTACKS, KNIGHT_ATTACKS, PAWN_ATTACKS,
+                      bishop_attacks, rook_attacks)
+from chess_game import Game
+
+# header of the table file: magic, signature and number of positions
+HEADER = struct.Struct('>8s8sQ')
+MAGIC = b'CHSTB001'
+# tables of more figures take too long to generate in Python
+MAX_MEN = 4
+
+# codes of positions in the table file: draw, or distance to mate in
+# plies plus one (the side to move mates if the distance is odd and is
+# mated if it is even), illegal positions and ones stored as the
+# symmetric position have ILLEGAL
+DRAW = 0
+MAX_DISTANCE = 250
+UNKNOWN = 254
+ILLEGAL = 255
+# code of the position without captures during generation
+NO_CAPTURE = 255
+
+# results of the probe for the side to move
+WIN = 1
+LOSS = -1
+
+# order of figures after the King in signatures, e.g. KBNK
+PIECES = 'QRBNP'
+PIECE_VALUES = {'Q': 9, 'R': 5, 'B': 3, 'N': 3, 'P': 1}
+# letters of the figures by their labels in Game.board
+LETTERS = {'K': 'K', 'Q': 'Q', 'R': 'R', 'B': 'B', 'KN': 'N', 'P': 'P'}
+
+# Pawns don't promote in the game, so tables with Pawns don't give
+# results of chess and aren't generated by default
+DEFAULT_SIGNATURES = ('KQK', 'KRK', 'KBNK', 'KBBK', 'KQKQ', 'KQKR', 'KQKB',
+                      'KQKN', 'KRKR', 'KRKB', 'KRKN')
+TABLEBASES_VARIABLE = 'CHESS_TABLEBASES'
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(__file__), 'tablebases')
+
+
+def _transform(sq, symmetry):
+    """Returns square mirrored by symmetry (bits: files, ranks, diagonal)."""
+    x, y = sq % 8, sq // 8
+    if symmetry & 4:
+        x, y = y, x
+    if symmetry & 1:
+        x = 7 - x
+    if symmetry & 2:
+        y = 7 - y
+    return y * 8 + x
+
+
+# squares by symmetry of the board, the first one is identity
+TRANSFORMS = tuple(tuple(_transform(sq, symmetry) for sq in range(64))
+                   for symmetry in range(8))
+
+# figures set by the generator in worker processes
+_generator = None
+
+
+def split_signature(name):
+    """
+    Returns figures of white and black but Kings of the signature.
+
+    Parameters
+    ----------
+    name : str
+        signature - figures of white and of black starting with Kings,
+        e.g. 'KBNK' for King, Bishop and Knight against King
+
+    Returns
+    -------
+    tuple
+        letters of white and black figures in PIECES order
+
+    Raises
+    ------
+    ValueError
+        if the signature is invalid or can't be generated
+    """
+    white, king, black = name.upper()[1:].partition('K')
+    if (not name.upper().startswith('K') or not king
+            or set(white + black) - set(PIECES)):
+        raise ValueError('invalid signature: {!r}'.format(name))
+    if len(white + black) + 2 > MAX_MEN:
+        raise ValueError('{} has more than {} figures'.format(name, MAX_MEN))
+    if 'P' in white and 'P' in black:
+        # en passant captures aren't stored in the tables
+        raise ValueError('{} has Pawns of both sides'.format(name))
+    return (''.join(sorted(white, key=PIECES.index)),
+            ''.join(sorted(black, key=PIECES.index)))
+
+
+def table_name(white, black):
+    """
+    Returns signature of the table storing the figures.
+
+    The stronger side is white in the tables, positions where it is
+    black are looked up with colors swapped and the board mirrored.
+
+    Parameters
+    ----------
+    white : str
+        letters of white figures but King in PIECES order
+    black : str
+        letters of black figures but King in PIECES order
+
+    Returns
+    -------
+    tuple
+        signature and True if colors are swapped in the table
+    """
+    def strength(side):
+        return (sum(PIECE_VALUES[letter] for letter in side), len(side),
+                [-PIECES.index(letter) for letter in side])
+
+    if strength(black) > strength(white):
+        return 'K' + black + 'K' + white, True
+    return 'K' + white + 'K' + black, False
+
+
+def requirements(name):
+    """
+    Returns signatures of the tables captures lead to.
+
+    Parameters
+    ----------
+    name : str
+        signature of the table
+
+    Returns
+    -------
+    list
+        signatures with one figure less, without repetitions
+    """
+    white, black = split_signature(name)
+    names = []
+    for i in range(len(white)):
+        names.append(table_name(white[:i] + white[i + 1:], black)[0])
+    for i in range(len(black)):
+        names.append(table_name(white, black[:i] + black[i + 1:])[0])
+    return sorted({sub for sub in names if sub != 'KK'})
+
+
+def _attacks(kind, color, sq, occupied):
+    """Returns bitboard of squares attacked by the figure."""
+    if kind == 'K':
+        return KING_ATTACKS[sq]
+    if kind == 'N':
+        return KNIGHT_ATTACKS[sq]
+    if kind == 'P':
+        return PAWN_ATTACKS[color][sq]
+    if kind == 'B':
+        return bishop_attacks(sq, occupied)
+    if kind == 'R':
+        return rook_attacks(sq, occupied)
+    return rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+
+
+class Layout():
+    """
+    A class used to number positions of the figures in the table.
+
+    White King is brought to a1-d1-d4 triangle (to files a-d if there
+    are Pawns) by a symmetry of the board, the other figures are
+    mirrored with it. If the King is at a1-d4 diagonal, the position
+    mirrored by the diagonal is stored in its place too, so the smaller
+    index of the two is used. The index is made of the side to move,
+    the number of the white King square and the squares of the other
+    figures.
+
+    Attributes
+    ----------
+    name : str
+        signature of the table
+    kinds : list
+        letters of the figures: Kings of white and black, white figures
+        and black figures in PIECES order
+    colors : list
+        colors of the figures (0 - white, 1 - black)
+    side_size : int
+        number of positions with one side to move
+    size : int
+        number of positions in the table
+
+    Methods
+    -------
+    index(squares, stm)
+        return index of the position
+    decode(index)
+        return squares of the figures and the side to move
+    """
+
+    def __init__(self, name):
+        """
+        Init of Layout class.
+
+        Parameters
+        ----------
+        name : str
+            signature of the table
+        """
+        white, black = split_signature(name)
+        self.name = name
+        self.kinds = ['K', 'K'] + list(white) + list(black)
+        self.colors = [0, 1] + [0] * len(white) + [1] * len(black)
+        symmetries = range(2) if 'P' in self.kinds else range(8)
+        self._diagonal = 'P' not in self.kinds
+        self._king_squares = [sq for sq in range(64) if sq % 8 < 4 and (
+                              'P' in self.kinds or sq // 8 <= sq % 8)]
+        self._king_numbers = [-1] * 64
+        for number, sq in enumerate(self._king_squares):
+            self._king_numbers[sq] = number
+        self._king_transforms = [
+                TRANSFORMS[next(symmetry for symmetry in symmetries
+                                if self._king_numbers[
+                                    TRANSFORMS[symmetry][sq]] >= 0)]
+                for sq in range(64)]
+        self.side_size = len(self._king_squares) * 64 ** (len(self.kinds)
+                                                          - 1)
+        self.size = 2 * self.side_size
+
+    def index(self, squares, stm):
+        """
+        Returns index of the position.
+
+        Parameters
+        ----------
+        squares : list
+            squares of the figures in the order of kinds
+        stm : int
+            side to move (0 - white, 1 - black)
+
+        Returns
+        -------
+        int
+            index of the position or the symmetric one, the same for
+            all symmetric positions
+        """
+        transform = self._king_transforms[squares[0]]
+        index = self._king_numbers[transform[squares[0]]]
+        king = transform[squares[0]]
+        for sq in squares[1:]:
+            index = index * 64 + transform[sq]
+        if self._diagonal and king % 8 == king // 8:
+            # the mirrored position has the King at the same square
+            other = self._king_numbers[king]
+            for sq in squares[1:]:
+                other = other * 64 + TRANSFORMS[4][transform[sq]]
+            index = min(index, other)
+        return stm * self.side_size + index
+
+    def decode(self, index):
+        """
+        Returns squares of the figures and the side to move.
+
+        Parameters
+        ----------
+        index : int
+            index of the position
+
+        Returns
+        -------
+        tuple
+            list of squares in the order of kinds and side to move
+        """
+        stm, index = divmod(index, self.side_size)
+        squares = [0] * len(self.kinds)
+        for i in range(len(squares) - 1, 0, -1):
+            index, squares[i] = divmod(index, 64)
+        squares[0] = self._king_squares[index]
+        return squares, stm
+
+
+class Tablebase():
+    """
+    A class used to probe tables of the endgames.
+
+    Each table is a file of codes of positions (see DRAW, ILLEGAL),
+    one byte per position, mapped to memory when it is probed first.
+    Processes probing one table share its pages in the page cache.
+
+    Tables don't know about repetitions, fifty-move rule and roques, so
+    positions where the King which hasn't moved has a Rook aren't
+    probed. Pawns of the tables never promote, as in the game, so
+    positions with Pawns aren't probed either: the results would be
+    wrong for chess.
+
+    Attributes
+    ----------
+    directory : str
+        directory of the table files
+    signatures : set
+        signatures of the tables in the directory
+    max_men : int
+        number of figures of the largest table (2 if there are none)
+
+    Methods
+    -------
+    probe(game)
+        return result and distance to mate of the game position
+    probe_pieces(pieces, stm)
+        return result and distance to mate of the figures
+    best_move(game)
+        return the move keeping the best result
+    close()
+        unmap the tables
+    """
+
+    def __init__(self, directory):
+        """
+        Init of Tablebase class.
+
+        Parameters
+        ----------
+        directory : str
+            directory of the table files
+        """
+        self.directory = directory
+        self.signatures = set()
+        if os.path.isdir(directory):
+            self.signatures = {name[:-3] for name in os.listdir(directory)
+                               if name.endswith('.tb')}
+        self.max_men = max((len(name) for name in self.signatures),
+                           default=2)
+        self._tables = {}
+
+    def __enter__(self):
+        """Returns the tablebase itself for with statement."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Closes the tablebase at the end of with statement."""
+        self.close()
+
+    def _table(self, name):
+        """Returns layout and mapped file of the table (None if absent)."""
+        if name not in self._tables:
+            if name not in self.signatures:
+                return None
+            path = os.path.join(self.directory, name + '.tb')
+            layout = Layout(name)
+            with open(path, 'rb') as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            if (len(data) != HEADER.size + layout.size
+                    or HEADER.unpack_from(data) != (
+                        MAGIC, name.encode().ljust(8, b'\0'), layout.size)):
+                data.close()
+                raise ValueError('{} is not a table of {}'.format(path,
+                                                                  name))
+            self._tables[name] = (layout, data)
+        return self._tables[name]
+
+    def probe_pieces(self, pieces, stm):
+        """
+        Returns result and distance to mate of the figures.
+
+        Parameters
+        ----------
+        pieces : list
+            tuples of letter, color (0 - white, 1 - black) and square
+            (y * 8 + x) of each figure
+        stm : int
+            side to move (0 - white, 1 - black)
+
+        Returns
+        -------
+        tuple
+            WIN, LOSS or 0 for a draw and distance to mate in plies
+            (0 for a draw), None if there is no table or the position
+            is illegal
+        """
+        white = ''.join(sorted((kind for kind, color, _ in pieces
+                                if color == 0 and kind != 'K'),
+                               key=PIECES.index))
+        black = ''.join(sorted((kind for kind, color, _ in pieces
+                                if color == 1 and kind != 'K'),
+                               key=PIECES.index))
+        if not white and not black:
+            return 0, 0
+        name, swapped = table_name(white, black)
+        table = self._table(name)
+        if table is None:
+            return None
+        layout, data = table
+        if swapped:
+            pieces = [(kind, 1 - color, sq ^ 56)
+                      for kind, color, sq in pieces]
+            stm = 1 - stm
+        squares = [0, 0]
+        others = []
+        for kind, color, sq in pieces:
+            if kind == 'K':
+                squares[color] = sq
+            else:
+                others.append((color, PIECES.index(kind), sq))
+        squares += [sq for _, _, sq in sorted(others)]
+        code = data[HEADER.size + layout.index(squares, stm)]
+        if code == ILLEGAL:
+            return None
+        if code == DRAW:
+            return 0, 0
+        return (WIN if (code - 1) % 2 else LOSS), code - 1
+
+    def probe(self, game):
+        """
+        Returns result and distance to mate of the game position.
+
+        Parameters
+        ----------
+        game : Game
+            game to look up the position of
+
+        Returns
+        -------
+        tuple
+            WIN, LOSS or 0 for a draw and distance to mate in plies
+            (0 for a draw) for active player, None if the position
+            isn't in the tables
+        """
+        sides = (game.white_figures, game.black_figures)
+        if len(sides[0]) + len(sides[1]) > self.max_men:
+            return None
+        pieces = []
+        for color, side in enumerate(sides):
+            for fig in side:
+                kind = LETTERS[fig.label[:-1]]
+                if kind == 'P' or kind == 'R' and not side[0].has_moved:
+                    return None
+                pieces.append((kind, color, fig.y * 8 + fig.x))
+        return self.probe_pieces(pieces,
+                                 0 if game.current_player == 'w' else 1)
+
+    def best_move(self, game):
+        """
+        Returns the move keeping the best result of the position.
+
+        The shortest mate is chosen if the position is won and the
+        longest one if it is lost.
+
+        Parameters
+        ----------
+        game : Game
+            game to look up the position of, moves are made and taken
+            back
+
+        Returns
+        -------
+        tuple
+            move in the form 'e2e4' (None if there is no legal move),
+            result and distance to mate for active player, None if the
+            position isn't in the tables
+        """
+        result = self.probe(game)
+        if result is None:
+            return None
+        best = None
+        for move in list(game.iter_legal_moves()):
+            game.make_packed_move(move)
+            child = self.probe(game)
+            game.unmake_move()
+            if child is None:
+                return None
+            if best is None or _rank(-child[0], child[1]) > _rank(*best[1:]):
+                best = (move, -child[0], child[1] + 1 if child[0] else 0)
+        if best is None:
+            return (None,) + result
+        return (engine.move_name(best[0]),) + best[1:]
+
+    def close(self):
+        """Unmaps the tables."""
+        for _, data in self._tables.values():
+            data.close()
+        self._tables = {}
+
+
+def _rank(result, distance):
+    """Returns value of the result to compare moves."""
+    if result == WIN:
+        return 2 * MAX_DISTANCE - distance
+    if result == LOSS:
+        return distance - 2 * MAX_DISTANCE
+    return 0
+
+
+def _code_rank(code):
+    """Returns value of the capture code to compare captures."""
+    if code == NO_CAPTURE:
+        return -4 * MAX_DISTANCE
+    if code == DRAW:
+        return 0
+    return _rank(WIN if (code - 1) % 2 else LOSS, code - 1)
+
+
+def open_tablebase(directory=None):
+    """
+    Opens the tablebase if there are tables.
+
+    Parameters
+    ----------
+    directory : str
+        directory of the table files (default value of CHESS_TABLEBASES
+        environment variable or DEFAULT_DIRECTORY if it isn't set)
+
+    Returns
+    -------
+    Tablebase
+        the tablebase (None if there are no tables)
+    """
+    if directory is None:
+        directory = os.environ.get(TABLEBASES_VARIABLE, DEFAULT_DIRECTORY)
+    tablebase = Tablebase(directory)
+    if not tablebase.signatures:
+        return None
+    return tablebase
+
+
+class _Generator():
+    """Examines positions of the table in a worker process."""
+
+    def __init__(self, name, directory):
+        """Init of _Generator class for the table in the directory."""
+        self.layout = Layout(name)
+        self.kinds = self.layout.kinds
+        self.sides = tuple([i for i, color in enumerate(self.layout.colors)
+                            if color == side] for side in (0, 1))
+        self.tablebase = Tablebase(directory)
+
+    def attacked(self, target, by, squares, occupied):
+        """Returns True if the square is attacked by figures of by."""
+        bit = 1 << target
+        kinds = self.kinds
+        for i in self.sides[by]:
+            sq = squares[i]
+            if sq >= 0 and _attacks(kinds[i], by, sq, occupied) & bit:
+                return True
+        return False
+
+    def capture(self, squares, stm):
+        """Returns code of the capture for the side which made it."""
+        pieces = [(self.kinds[i], self.layout.colors[i], sq)
+                  for i, sq in enumerate(squares) if sq >= 0]
+        result = self.tablebase.probe_pieces(pieces, stm)
+        if result is None:
+            raise RuntimeError('no table for the capture in {}'
+                               .format(self.layout.name))
+        if not result[0]:
+            return DRAW
+        return result[1] + 2
+
+    def examine(self, index):
+        """
+        Returns code, number of children in the table and best capture.
+
+        Children are counted once per position they are stored as, the
+        same way predecessors finds them.
+        """
+        squares, stm = self.layout.decode(index)
+        occupied = 0
+        for sq in squares:
+            occupied |= 1 << sq
+        if (occupied.bit_count() != len(squares)
+                or self.layout.index(squares, stm) != index):
+            # the symmetric position is stored in place of this one
+            return ILLEGAL, 0, NO_CAPTURE
+        for i, kind in enumerate(self.kinds):
+            if kind == 'P' and squares[i] // 8 == 7 * self.layout.colors[i]:
+                return ILLEGAL, 0, NO_CAPTURE
+        if self.attacked(squares[1 - stm], stm, squares, occupied):
+            return ILLEGAL, 0, NO_CAPTURE
+        own = 0
+        for i in self.sides[stm]:
+            own |= 1 << squares[i]
+        children = set()
+        capture = NO_CAPTURE
+        moves = 0
+        for i in self.sides[stm]:
+            start = squares[i]
+            kind = self.kinds[i]
+            if kind == 'P':
+                step = 8 if stm == 0 else -8
+                targets = PAWN_ATTACKS[stm][start] & (occupied ^ own)
+                end = start + step
+                if 0 <= end < 64 and not occupied >> end & 1:
+                    targets |= 1 << end
+                    if (start // 8 == 1 + 5 * stm
+                            and not occupied >> (end + step) & 1):
+                        targets |= 1 << (end + step)
+            else:
+                targets = _attacks(kind, stm, start, occupied) & ~own
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                end = bit.bit_length() - 1
+                child = list(squares)
+                child[i] = end
+                captured = -1
+                if occupied & bit:
+                    captured = squares.index(end)
+                    child[captured] = -1
+                if self.attacked(child[stm], 1 - stm, child,
+                                 occupied ^ 1 << start | bit):
+                    continue
+                moves += 1
+                if captured < 0:
+                    children.add(self.layout.index(child, 1 - stm))
+                else:
+                    code = self.capture(child, 1 - stm)
+                    if _code_rank(code) > _code_rank(capture):
+                        capture = code
+        if not moves:
+            if self.attacked(squares[stm], 1 - stm, squares, occupied):
+                return UNKNOWN, 0, NO_CAPTURE
+            return DRAW, 0, NO_CAPTURE
+        return UNKNOWN, len(children), capture
+
+    def predecessors(self, index):
+        """Returns indexes of positions the move to index is made from."""
+        squares, stm = self.layout.decode(index)
+        mover = 1 - stm
+        occupied = 0
+        for sq in squares:
+            occupied |= 1 << sq
+        result = set()
+        for i in self.sides[mover]:
+            end = squares[i]
+            kind = self.kinds[i]
+            if kind == 'P':
+                step = 8 if mover == 0 else -8
+                sources = 0
+                start = end - step
+                if 8 <= start < 56 and not occupied >> start & 1:
+                    sources |= 1 << start
+                    if (start // 8 == 2 + 3 * mover
+                            and not occupied >> (start - step) & 1):
+                        sources |= 1 << (start - step)
+            else:
+                sources = _attacks(kind, mover, end, occupied) & ~occupied
+            while sources:
+                bit = sources & -sources
+                sources ^= bit
+                parent = list(squares)
+                parent[i] = bit.bit_length() - 1
+                if self.attacked(parent[stm], mover, parent,
+                                 occupied ^ 1 << end | bit):
+                    continue
+                result.add(self.layout.index(parent, mover))
+        return result
+
+
+def _init_generator(name, directory):
+    """Creates the generator of the table in the worker process."""
+    global _generator
+    _generator = _Generator(name, directory)
+
+
+def _examine_chunk(bounds):
+    """Examines positions from start to end in the worker process."""
+    start, end = bounds
+    codes = bytearray(end - start)
+    counts = bytearray(end - start)
+    captures = bytearray(end - start)
+    pending = []
+    examine = _generator.examine
+    for index in range(start, end):
+        code, count, capture = examine(index)
+        offset = index - start
+        captures[offset] = capture
+        counts[offset] = count
+        if code != UNKNOWN:
+            codes[offset] = code
+            continue
+        codes[offset] = UNKNOWN
+        if not count and capture == NO_CAPTURE:
+            pending.append((index, 0))
+        elif capture not in (NO_CAPTURE, DRAW) and (capture % 2 == 0
+                                                    or not count):
+            pending.append((index, capture - 1))
+        elif not count:
+            codes[offset] = DRAW
+    return start, bytes(codes), bytes(counts), bytes(captures), pending
+
+
+def _predecessors_chunk(indexes):
+    """Returns predecessors of each position in the worker process."""
+    predecessors = _generator.predecessors
+    result = []
+    for index in indexes:
+        result.extend(predecessors(index))
+    return result
+
+
+def _chunks(items, number):
+    """Splits the sequence into about number slices."""
+    size = max(1, -(-len(items) // number))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def generate(name, directory=DEFAULT_DIRECTORY, workers=None,
+             out=sys.stdout):
+    """
+    Generates the table and tables its captures lead to.
+
+    Positions are examined by worker processes: mates are found and
+    moves to positions of the table are counted. Then positions are
+    resolved by retrograde analysis in the order of distance to mate:
+    the positions mate in n + 1 plies are found by workers as
+    predecessors of the positions mated in n plies, and the position
+    is mated in n + 1 plies when all its moves lead to positions
+    resolved as won by then. Captures are looked up in the smaller
+    tables. Positions left unresolved are draws.
+
+    Pawns move as in the game, without promotion, so tables with Pawns
+    aren't probed by Tablebase.probe.
+
+    Parameters
+    ----------
+    name : str
+        signature of the table, e.g. 'KBNK'
+    directory : str
+        directory of the table files (default DEFAULT_DIRECTORY)
+    workers : int
+        number of worker processes (default None - number of CPUs)
+    out : file
+        stream the report is printed to (default sys.stdout)
+
+    Returns
+    -------
+    str
+        path of the table file
+
+    Raises
+    ------
+    ValueError
+        if the signature is invalid or can't be generated
+    """
+    name = table_name(*split_signature(name))[0]
+    path = os.path.join(directory, name + '.tb')
+    if os.path.isfile(path):
+        return path
+    for sub in requirements(name):
+        generate(sub, directory, workers, out)
+    os.makedirs(directory, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    layout = Layout(name)
+    codes = bytearray(layout.size)
+    counts = bytearray(layout.size)
+    captures = bytearray(layout.size)
+    pending = {}
+    pool = None
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, _init_generator,
+                                    (name, directory))
+        run = pool.imap_unordered
+    else:
+        _init_generator(name, directory)
+        run = map
+    try:
+        bounds = [(first, min(first + 4096, layout.size))
+                  for first in range(0, layout.size, 4096)]
+        for first, chunk_codes, chunk_counts, chunk_captures, chunk_pending \
+                in run(_examine_chunk, bounds):
+            last = first + len(chunk_codes)
+            codes[first:last] = chunk_codes
+            counts[first:last] = chunk_counts
+            captures[first:last] = chunk_captures
+            for index, distance in chunk_pending:
+                pending.setdefault(distance, []).append(index)
+
+        distance = 0
+        frontier = []
+        while frontier or pending:
+            if distance > MAX_DISTANCE:
+                raise ValueError('{} has mates longer than {} plies'
+                                 .format(name, MAX_DISTANCE))
+            resolved = []
+            for predecessors in run(_predecessors_chunk,
+                                    _chunks(frontier, workers * 4)):
+                for index in predecessors:
+                    if codes[index] != UNKNOWN:
+                        continue
+                    if distance % 2:
+                        codes[index] = distance + 1
+                        resolved.append(index)
+                        continue
+                    counts[index] -= 1
+                    if counts[index]:
+                        continue
+                    capture = captures[index]
+                    if capture == NO_CAPTURE:
+                        level = distance
+                    elif capture == DRAW or capture % 2 == 0:
+                        # draw or win by the capture
+                        continue
+                    else:
+                        level = max(distance, capture - 1)
+                    if level == distance:
+                        codes[index] = distance + 1
+                        resolved.append(index)
+                    else:
+                        pending.setdefault(level, []).append(index)
+            for index in pending.pop(distance, ()):
+                if codes[index] == UNKNOWN:
+                    codes[index] = distance + 1
+                    resolved.append(index)
+            frontier = resolved
+            distance += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    codes = codes.replace(bytes([UNKNOWN]), bytes([DRAW]))
+    with open(path + '.tmp', 'wb') as file:
+        file.write(HEADER.pack(MAGIC, name.encode(), layout.size))
+        file.write(codes)
+    os.replace(path + '.tmp', path)
+    longest = max((code - 1 for code in set(codes)
+                   if code not in (DRAW, ILLEGAL)), default=0)
+    print('{:<5} {:>9} positions  longest mate {:>3} plies  {:.1f} s'
+          .format(name, layout.size, longest, time.perf_counter() - start),
+          file=out)
+    return path
+
+
+def main(argv=None):
+    """
+    Runs tablebase command line interface.
+
+    Parameters
+    ----------
+    argv : list
+        command line arguments (default sys.argv[1:])
+
+    Returns
+    -------
+    int
+        exit status
+    """
+    parser = argparse.ArgumentParser(
+            description='Generate or probe endgame tablebases.')
+    parser.add_argument('--directory', default=DEFAULT_DIRECTORY,
+                        help='directory of the tables (default {})'
+                             .format(DEFAULT_DIRECTORY))
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='generate tables')
+    build.add_argument('signatures', nargs='*',
+                       default=list(DEFAULT_SIGNATURES),
+                       help='signatures of the tables, e.g. KBNK '
+                            '(default {})'.format(' '.join(
+                                DEFAULT_SIGNATURES)))
+    build.add_argument('--workers', type=int,
+                       help='number of processes (default number of CPUs)')
+    probe = commands.add_parser('probe', help='probe the position')
+    probe.add_argument('--fen', default=bitboard.START_FEN,
+                       help='FEN string of the position')
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        for name in args.signatures:
+            generate(name, args.directory, args.workers)
+        return 0
+    with Tablebase(args.directory) as tablebase:
+        result = tablebase.best_move(Game.from_fen(args.fen))
+    if result is None:
+        print('not in the tablebase')
+    elif not result[1]:
+        print('draw bestmove', result[0])
+    else:
+        print('{} in {} plies bestmove {}'.format(
+                'win' if result[1] == WIN else 'loss', result[2], result[0]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Zobrist keys for hashing chess positions."""
+
+import random
+
+_random = random.Random(20240520)
+
+PIECE_KEYS = [[_random.getrandbits(64) for sq in range(64)]
+              for code in range(12)]
+SIDE_KEY = _random.getrandbits(64)
+EP_KEYS = [_random.getrandbits(64) for x in range(8)]
+
+_RIGHT_KEYS = [_random.getrandbits(64) for bit in range(4)]
+CASTLING_KEYS = [0] * 16
+for _rights in range(16):
+    for _bit in range(4):
+        if _rights >> _bit & 1:
+            CASTLING_KEYS[_rights] ^= _RIGHT_KEYS[_bit]
+
+# squares next to the square on its rank
+ADJACENT = [(1 << _sq - 1 if _sq % 8 else 0)
+            | (1 << _sq + 1 if _sq % 8 < 7 else 0) for _sq in range(64)]
+
+# keys of has_moved flags of white and black King, they make the legacy
+# roque part of the key of position in tables outside of Game: the
+# table shared between processes and the opening book
+KING_MOVED_KEYS = (_random.getrandbits(64), _random.getrandbits(64))
+
+
+def compute_hash(pieces, black_to_move, castling, ep_square):
+    """
+    Computes Zobrist key of position from scratch.
+
+    Parameters
+    ----------
+    pieces : iterable
+        pairs (code, sq) of figure code (color * 6 + type) and
+        square index (y * 8 + x) of each figure on the board
+    black_to_move : bool
+        True if it is black turn
+    castling : int
+        castling rights (combination of bitboard.CASTLE_* constants)
+    ep_square : int
+        square passed by the last two-ceil pawn move (-1 if none),
+        hashed as ep_key does
+
+    Returns
+    -------
+    int
+        64-bit Zobrist key
+    """
+    key = CASTLING_KEYS[castling]
+    pawn = 6 if black_to_move else 0
+    pawns = 0
+    for code, sq in pieces:
+        key ^= PIECE_KEYS[code][sq]
+        if code == pawn:
+            pawns |= 1 << sq
+    if black_to_move:
+        key ^= SIDE_KEY
+    return key ^ ep_key(ep_square, pawns)
+
+
+def ep_key(ep_square, pawns):
+    """
+    Returns key of the en passant square of position.
+
+    The square is hashed only if a pawn of the player to move stands
+    next to the pawn which made the two-ceil move. Otherwise nothing
+    can take it, so the position repeats the one without the square.
+
+    Parameters
+    ----------
+    ep_square : int
+        square passed by the last two-ceil pawn move (-1 if none)
+    pawns : int
+        bitboard (bit y * 8 + x) of pawns of the player to move
+
+    Returns
+    -------
+    int
+        key of the file of the square (0 if it isn't hashed)
+    """
+    if ep_square < 0:
+        return 0
+    pushed = ep_square + 8 if ep_square < 32 else ep_square - 8
+    return EP_KEYS[ep_square % 8] if pawns & ADJACENT[pushed] else 0
+
+
+def table_key(key):
+    """
+    Returns 64-bit key of the position for tables outside of Game.
+
+    Parameters
+    ----------
+    key : tuple
+        Game.position_key() - hash and has_moved flags of the Kings
+
+    Returns
+    -------
+    int
+        hash with has_moved flags of the Kings mixed in
+    """
+    value, white_moved, black_moved = key
+    if white_moved:
+        value ^= KING_MOVED_KEYS[0]
+    if black_moved:
+        value ^= KING_MOVED_KEYS[1]
+    return value
@@ -73,6 +73,46 @@ def task_mo():
            }
 
 
+def task_perft():
+    """Check move generators against perft node counts."""
+    return {
+            'actions': ['python client/src/perft.py --depth 3',
+                        'python client/src/perft.py --backend figures '
+                        '--depth 3',
+                        'python client/src/perft.py --backend mailbox '
+                        '--depth 3'],
+            'verbosity': 2,
+           }
+
+
+def task_benchmark():
+    """Measure speed of construction, move generation, evaluation, search."""
+    return {
+            'actions': ['python client/src/benchmark.py'],
+            'verbosity': 2,
+           }
+
+
+def task_book():
+    """Build the opening book of the games played on the server."""
+    return {
+            'actions': ['python client/src/book.py build '
+                        '--history server/dump/game_history_dump'],
+            'file_dep': ['server/dump/game_history_dump'],
+            'targets': ['client/src/opening.book'],
+            'verbosity': 2,
+           }
+
+
+def task_tablebases():
+    """Generate the endgame tables of the engine."""
+    return {
+            'actions': ['python client/src/tablebase.py build'],
+            'file_dep': ['client/src/tablebase.py'],
+            'verbosity': 2,
+           }
+
+
 def task_check():
     """Perform all checks."""
     return {
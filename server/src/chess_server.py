@@ -6,6 +6,7 @@ from user_info import UserInfo
 from clients_info import ClientsInfo
 from games import GamesDict
 from game_history import GameHistory
+from computer import ComputerOpponent, COMPUTER_NAME, parse_seconds
 import random
 from dump_load import dump_user_info, load_user_info
 from dump_load import dump_game_history, load_game_history
@@ -16,6 +17,7 @@ users = {}  # user_name to user_info, need load from memory
 game_request = {}  # player1 -> player2
 games = GamesDict()
 game_history = GameHistory()
+computer = ComputerOpponent()
 
 
 def isOnline(me: str) -> bool:
@@ -35,6 +37,26 @@ def isOnline(me: str) -> bool:
     return me in clients and clients[me].user_name != ""
 
 
+def stop_play(user1: str, user2: str) -> None:
+    """
+    Sets play status of both players to false.
+
+    The search of the computer is stopped if it is one of the players.
+
+    Parameters
+    ----------
+    user1 : str
+        User who played
+    user2 : str
+        User who played
+    """
+    for user_name, opponent in ((user1, user2), (user2, user1)):
+        if user_name == COMPUTER_NAME:
+            computer.cancel(opponent)
+        else:
+            users[user_name].isPlay = False
+
+
 async def send_msg(
         writer: asyncio.streams.StreamWriter, ids: int, msg: str) -> None:
     """
@@ -90,7 +112,7 @@ async def registre(user_name: str, writer: asyncio.streams.StreamWriter,
     command_num : int
         Ids user's request
     """
-    if user_name not in users:
+    if user_name not in users and user_name != COMPUTER_NAME:
         users[user_name] = UserInfo(user_name)
         dump_user_info(users)
         await send_msg(writer, command_num, "registre_ok")
@@ -150,11 +172,11 @@ async def logout(me: str, writer: asyncio.streams.StreamWriter = None,
             opponent = game.get_opponent(clients[me].user_name)
             if writer is not None and command_num is not None:
                 await send_msg(writer, 0, "success_logout_give_up")
-            await clients[users[opponent].IP].queue.put(
-                "opponent_give_up_logout")
+            if opponent != COMPUTER_NAME:
+                await clients[users[opponent].IP].queue.put(
+                    "opponent_give_up_logout")
             game.move(clients[me].user_name, "give_up")
-            users[clients[me].user_name].isPlay = False
-            users[opponent].isPlay = False
+            stop_play(clients[me].user_name, opponent)
             game_story = game.get_game_story()
             games.stop_game(clients[me].user_name, opponent)
             game_result = opponent
@@ -325,6 +347,78 @@ async def play(user_name: str, me: str, writer: asyncio.streams.StreamWriter,
             "send_you_game_request " + clients[me].user_name)
 
 
+async def play_computer(me: str, writer: asyncio.streams.StreamWriter,
+                        command_num: int, seconds: str = "") -> None:
+    """
+    A coroutine for starting a game with the computer.
+
+    Parameters
+    ----------
+    me : str
+        IP
+    writer : asyncio.streams.StreamWriter
+        For send responses to requests
+    command_num : int
+        Ids user's request
+    seconds : str
+        time budget of computer move, empty for the default one
+    """
+    if not isOnline(me):
+        await send_msg(writer, command_num, "you_dont_login")
+    elif users[clients[me].user_name].isPlay:
+        await send_msg(writer, command_num, "now_you_play")
+    elif not computer.start(clients[me].user_name, parse_seconds(seconds),
+                            computer_move):
+        await send_msg(writer, command_num, "computer_busy")
+    else:
+        user_name = clients[me].user_name
+        users[user_name].isPlay = True
+        color_player = random.randint(0, 1)
+        games.add_game(user_name, COMPUTER_NAME)
+        if color_player == 1 and not computer.request_move(user_name, []):
+            stop_play(user_name, COMPUTER_NAME)
+            games.stop_game(user_name, COMPUTER_NAME)
+            await send_msg(writer, command_num, "computer_busy")
+            return
+        print("start game, player {} {}, computer".format(
+              user_name, color_player))
+        await send_msg(writer, command_num, "start_game " + str(color_player))
+
+
+async def computer_move(user_name: str, move: str) -> None:
+    """
+    A coroutine for sending move of the computer to its opponent.
+
+    Parameters
+    ----------
+    user_name : str
+        Opponent of the computer
+    move : str
+        Move of the computer in the form e2e4:ok, None if the computer
+        can't continue the game
+    """
+    game = games[user_name]
+    if move is None:
+        print("end game error")
+        await clients[users[user_name].IP].queue.put("computer_error")
+        stop_play(user_name, COMPUTER_NAME)
+        games.stop_game(user_name, COMPUTER_NAME)
+        return
+    game.move(COMPUTER_NAME, move)
+    await clients[users[user_name].IP].queue.put("opponent_get_move " + move)
+    if move.endswith("win") or move.endswith("draw"):
+        print("end game ", move.split(":")[1])
+        stop_play(user_name, COMPUTER_NAME)
+        game_story = game.get_game_story()
+        games.stop_game(user_name, COMPUTER_NAME)
+        game_result = "draw"
+        if move.endswith("win"):
+            game_result = COMPUTER_NAME
+        game_history.add_game(user_name, COMPUTER_NAME,
+                              game_result, game_story)
+        dump_game_history(game_history)
+
+
 async def move_command(me: str, writer: asyncio.streams.StreamWriter,
                        move: str, command_num: int) -> None:
     """
@@ -348,6 +442,11 @@ async def move_command(me: str, writer: asyncio.streams.StreamWriter,
         await send_msg(writer, command_num, "you_dont_play_now")
         return
     opponent = games[clients[me].user_name].get_opponent(clients[me].user_name)
+    if (opponent == COMPUTER_NAME
+            and computer.is_thinking(clients[me].user_name)):
+        # the move of the computer is awaited
+        await send_msg(writer, command_num, "computer_busy")
+        return
     if games[clients[me].user_name].get_draw_request() == clients[me].user_name:
         print("Error with draw request!")
     if not games[clients[me].user_name].get_draw_request() is None:
@@ -355,13 +454,21 @@ async def move_command(me: str, writer: asyncio.streams.StreamWriter,
         await clients[users[opponent].IP].queue.put(
             "move_opponent_refused_draw")
 
+    game_over = move.endswith("win") or move.endswith("draw")
+    if (opponent == COMPUTER_NAME and not game_over
+            and not computer.request_move(clients[me].user_name, [
+                game_move for _, game_move
+                in games[clients[me].user_name].get_game_story()] + [move])):
+        await send_msg(writer, command_num, "computer_busy")
+        return
     games[clients[me].user_name].move(clients[me].user_name, move)
     await send_msg(writer, command_num, "you_get_move")
-    await clients[users[opponent].IP].queue.put("opponent_get_move " + move)
-    if move.endswith("win") or move.endswith("draw"):
+    if opponent != COMPUTER_NAME:
+        await clients[users[opponent].IP].queue.put(
+            "opponent_get_move " + move)
+    if game_over:
         print("end game ", move.split(":")[1])
-        users[clients[me].user_name].isPlay = False
-        users[opponent].isPlay = False
+        stop_play(clients[me].user_name, opponent)
         game_story = games[clients[me].user_name].get_game_story()
         games.stop_game(clients[me].user_name, opponent)
         game_result = "draw"
@@ -396,7 +503,28 @@ async def draw(me: str, writer: asyncio.streams.StreamWriter,
         return
     game = games[clients[me].user_name]
     opponent = game.get_opponent(clients[me].user_name)
-    if game.get_draw_request() is None:
+    if opponent == COMPUTER_NAME:
+        # computer plays to the end unless endgame tables prove a draw
+        if msg == "ok":
+            story = [game_move for _, game_move in game.get_game_story()]
+            result = await computer.adjudicate(story)
+            if (result != "draw" or not users[clients[me].user_name].isPlay
+                    or len(game.get_game_story()) != len(story)):
+                await send_msg(writer, command_num, "opponent_refused_draw")
+                return
+            print("end game draw")
+            await send_msg(writer, command_num, "draw")
+            game.move(clients[me].user_name, "draw")
+            stop_play(clients[me].user_name, opponent)
+            game_story = game.get_game_story()
+            games.stop_game(clients[me].user_name, opponent)
+            game_history.add_game(clients[me].user_name, opponent,
+                                  "draw", game_story)
+            dump_game_history(game_history)
+        elif msg == "not":
+            await send_msg(writer, command_num,
+                           "opponent_dont_send_draw_request")
+    elif game.get_draw_request() is None:
         if msg == "ok":
             game.set_draw_request(clients[me].user_name)
             await send_msg(writer, command_num, "send_draw_request")
@@ -421,8 +549,7 @@ async def draw(me: str, writer: asyncio.streams.StreamWriter,
             await send_msg(writer, command_num, "draw")
             await clients[users[opponent].IP].queue.put("draw")
             game.move(clients[me].user_name, "draw")
-            users[clients[me].user_name].isPlay = False
-            users[opponent].isPlay = False
+            stop_play(clients[me].user_name, opponent)
             game_story = game.get_game_story()
             games.stop_game(clients[me].user_name, opponent)
             game_result = "draw"
@@ -455,10 +582,10 @@ async def give_up(me: str, writer: asyncio.streams.StreamWriter,
     game = games[clients[me].user_name]
     opponent = game.get_opponent(clients[me].user_name)
     await send_msg(writer, command_num, "you_success_give_up")
-    await clients[users[opponent].IP].queue.put("opponent_give_up")
+    if opponent != COMPUTER_NAME:
+        await clients[users[opponent].IP].queue.put("opponent_give_up")
     game.move(clients[me].user_name, "give_up")
-    users[clients[me].user_name].isPlay = False
-    users[opponent].isPlay = False
+    stop_play(clients[me].user_name, opponent)
     game_story = game.get_game_story()
     games.stop_game(clients[me].user_name, opponent)
     game_result = opponent
@@ -511,6 +638,10 @@ async def chess_server(reader: asyncio.streams.StreamReader,
                         await get_game_request(me, writer, command_num)
                     case ["play", user_name]:
                         await play(user_name, me, writer, command_num)
+                    case ["play_computer"]:
+                        await play_computer(me, writer, command_num)
+                    case ["play_computer", seconds]:
+                        await play_computer(me, writer, command_num, seconds)
                     case ["remove_game_request"]:
                         await remove_game_request(me, writer, command_num)
                     case ["statistic"]:
@@ -546,7 +677,10 @@ async def main() -> None:
     """Coroutine that runs the chess server."""
     server = await asyncio.start_server(chess_server, '0.0.0.0', 1337)
     async with server:
-        await server.serve_forever()
+        try:
+            await server.serve_forever()
+        finally:
+            computer.close()
 
 
 if __name__ == "__main__":
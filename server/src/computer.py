@@ -0,0 +1,438 @@
+"""Module for the computer opponent thinking in worker processes."""
+
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+import time
+try:
+    # the client distribution puts its modules on sys.path
+    import client  # noqa: F401
+except ImportError:
+    import chess.client.src  # noqa: F401
+import book
+import engine
+import tablebase
+from chess_game import Game, MOVE_CHECKMATE, DRAW_KINDS
+
+COMPUTER_NAME = "computer"
+DEFAULT_SECONDS = 2.0
+MIN_SECONDS = 0.1
+MAX_SECONDS = 30.0
+MAX_GAMES = 32
+
+# stop flags of the games, the opening book and the endgame tables,
+# set in worker processes by _init_worker
+_stop_flags = None
+_book = None
+_tablebase = None
+
+
+def _init_worker(stop_flags) -> None:
+    """
+    Init worker process of the pool.
+
+    The opening book and the endgame tables are mapped to memory by
+    each worker, so they share their pages.
+
+    Parameters
+    ----------
+    stop_flags : multiprocessing.RawArray
+        Stop flags of the games shared with the server process
+    """
+    global _stop_flags, _book, _tablebase
+    _stop_flags = stop_flags
+    if _book is None:
+        _book = book.open_book()
+    if _tablebase is None:
+        _tablebase = tablebase.open_tablebase()
+
+
+def think(moves: list, seconds: float, slot: int = None) -> str:
+    """
+    Searches move of the computer after the moves of the game.
+
+    Runs in the worker process. The moves come from the client, so they
+    are checked while replayed. The move of the opening book is played
+    at once if there is one, the endgames of the tables are played
+    perfectly.
+
+    Parameters
+    ----------
+    moves : list
+        Moves of the game in the form e2e4:ok
+    seconds : float
+        Time budget of the search
+    slot : int
+        Index of the stop flag of the game (default is None)
+
+    Returns
+    -------
+    str
+        Move in the form e2e4:ok, e2e4:win or e2e4:draw, None if the
+        search was stopped
+
+    Raises
+    ------
+    ValueError
+        if the move of the game is impossible
+    """
+    game = Game("w")
+    game.replay(moves, trusted=False)
+    stop = None
+    if slot is not None and _stop_flags is not None:
+        def stop():
+            return _stop_flags[slot] != 0
+    result = engine.Engine(book=_book, tablebase=_tablebase).search(
+            game, seconds, stop=stop)
+    if result is None or result.move is None or stop and stop():
+        return None
+    game.player = game.current_player
+    kind = game.classify_move(result.move[:2], result.move[2:])[0]
+    if kind == MOVE_CHECKMATE:
+        return result.move + ":win"
+    if kind in DRAW_KINDS:
+        return result.move + ":draw"
+    return result.move + ":ok"
+
+
+def adjudicate(moves: list) -> str:
+    """
+    Returns result of the game position with perfect play.
+
+    Runs in the worker process.
+
+    Parameters
+    ----------
+    moves : list
+        Moves of the game in the form e2e4:ok
+
+    Returns
+    -------
+    str
+        Winner "w" or "b" or "draw", None if the position isn't in the
+        endgame tables or the moves are impossible
+    """
+    if _tablebase is None:
+        return None
+    game = Game("w")
+    try:
+        game.replay(moves, trusted=False)
+    except ValueError:
+        return None
+    found = _tablebase.probe(game)
+    if found is None:
+        return None
+    if not found[0]:
+        return "draw"
+    if (found[0] == tablebase.WIN) == (game.current_player == "w"):
+        return "w"
+    return "b"
+
+
+def parse_seconds(text: str) -> float:
+    """
+    Returns time budget of computer move given by user.
+
+    Parameters
+    ----------
+    text : str
+        Seconds per move, empty or incorrect for DEFAULT_SECONDS
+
+    Returns
+    -------
+    float
+        Seconds per move between MIN_SECONDS and MAX_SECONDS
+    """
+    try:
+        seconds = float(text)
+    except ValueError:
+        return DEFAULT_SECONDS
+    if seconds != seconds:
+        return DEFAULT_SECONDS
+    return min(max(seconds, MIN_SECONDS), MAX_SECONDS)
+
+
+class Job:
+    """
+    Request of the computer move in the game.
+
+    Parameters
+    ----------
+    user : str
+        Human opponent of the computer
+    moves : list
+        Moves of the game in the form e2e4:ok
+    deadline : float
+        time.monotonic() value the move must be found by
+    slot : int
+        Index of the stop flag of the game
+    """
+
+    def __init__(self, user: str, moves: list, deadline: float,
+                 slot: int) -> None:
+        """
+        Init Job.
+
+        Parameters
+        ----------
+        user : str
+            Human opponent of the computer
+        moves : list
+            Moves of the game in the form e2e4:ok
+        deadline : float
+            time.monotonic() value the move must be found by
+        slot : int
+            Index of the stop flag of the game
+        """
+        self.user = user
+        self.moves = moves
+        self.deadline = deadline
+        self.slot = slot
+        self.cancelled = False
+
+
+class ComputerOpponent:
+    """
+    Computer opponent playing many games at once.
+
+    The search runs in ProcessPoolExecutor, so the asyncio loop of the
+    server keeps serving other clients. Requested moves wait in the
+    bounded jobs queue and are passed to the pool in order, one at a
+    time per worker process. The time budget of the move is counted
+    from the request, so the time spent in the queue is taken from the
+    search. When the game is over the stop flag of its job is set and
+    the search in the worker process ends at once.
+
+    Parameters
+    ----------
+    workers : int
+        Number of worker processes (default is None, CPUs but one)
+    max_games : int
+        Number of games played at once (default is MAX_GAMES)
+
+    Methods
+    -------
+    is_full(self) -> bool
+        return True if no more games can be started
+    start(self, user: str, seconds: float, on_move) -> bool
+        start game with user
+    is_thinking(self, user: str) -> bool
+        return True if the computer move in the game is requested
+    request_move(self, user: str, moves: list) -> bool
+        put request of the computer move to the queue
+    cancel(self, user: str) -> None
+        stop the game with user and its search
+    adjudicate(self, moves: list) -> str
+        return result of the game position by the endgame tables
+    close(self) -> None
+        stop all games and worker processes
+    """
+
+    def __init__(self, workers: int = None,
+                 max_games: int = MAX_GAMES) -> None:
+        """
+        Init ComputerOpponent.
+
+        Worker processes and dispatching tasks are started by the first
+        request_move.
+
+        Parameters
+        ----------
+        workers : int
+            Number of worker processes (default is None, CPUs but one)
+        max_games : int
+            Number of games played at once (default is MAX_GAMES)
+        """
+        self.workers = workers or max(1, (os.cpu_count() or 1) - 1)
+        self.max_games = max_games
+        self.games = {}  # user to (seconds, on_move, slot)
+        self.active = {}  # user to requested Job
+        self.jobs = asyncio.Queue(max_games)
+        self.free_slots = list(range(max_games - 1, -1, -1))
+        self.stop_flags = multiprocessing.RawArray("b", max_games)
+        self.executor = None
+        self.dispatchers = []
+
+    def is_full(self) -> bool:
+        """
+        Returns True if no more games can be started.
+
+        Returns
+        -------
+        bool
+            True if all stop flags are used by games or their stopped
+            searches
+        """
+        return not self.free_slots
+
+    def start(self, user: str, seconds: float, on_move) -> bool:
+        """
+        Start game with user.
+
+        Parameters
+        ----------
+        user : str
+            Human opponent of the computer
+        seconds : float
+            Time budget of each computer move
+        on_move : coroutine function
+            Called with user and the move in the form e2e4:ok when the
+            computer made it, with user and None if the computer can't
+            continue the game
+
+        Returns
+        -------
+        bool
+            True if the game is started, False if the computer is busy
+        """
+        if self.is_full() or user in self.games:
+            return False
+        self.games[user] = (seconds, on_move, self.free_slots.pop())
+        return True
+
+    def is_thinking(self, user: str) -> bool:
+        """
+        Returns True if the computer move in the game is requested.
+
+        Parameters
+        ----------
+        user : str
+            Human opponent of the computer
+
+        Returns
+        -------
+        bool
+            True if the move is waiting in the queue or searched
+        """
+        return user in self.active
+
+    def request_move(self, user: str, moves: list) -> bool:
+        """
+        Put request of the computer move to the queue.
+
+        Parameters
+        ----------
+        user : str
+            Human opponent of the computer
+        moves : list
+            Moves of the game in the form e2e4:ok
+
+        Returns
+        -------
+        bool
+            True if the move is requested, False if the computer is
+            already thinking in the game or the queue is full
+        """
+        if self.is_thinking(user):
+            return False
+        seconds, _, slot = self.games[user]
+        job = Job(user, list(moves), time.monotonic() + seconds, slot)
+        try:
+            self.jobs.put_nowait(job)
+        except asyncio.QueueFull:
+            return False
+        self.stop_flags[slot] = 0
+        self.active[user] = job
+        if not self.dispatchers:
+            self.dispatchers = [asyncio.create_task(self._dispatch())
+                                for _ in range(self.workers)]
+        return True
+
+    def cancel(self, user: str) -> None:
+        """
+        Stop the game with user and its search.
+
+        Parameters
+        ----------
+        user : str
+            Human opponent of the computer
+        """
+        if user not in self.games:
+            return
+        _, _, slot = self.games.pop(user)
+        job = self.active.pop(user, None)
+        if job is None:
+            self.free_slots.append(slot)
+        else:
+            # the job is queued or searched, the slot is freed when the
+            # dispatcher drops it
+            job.cancelled = True
+            self.stop_flags[slot] = 1
+
+    async def adjudicate(self, moves: list) -> str:
+        """
+        Return result of the game position by the endgame tables.
+
+        The tables are probed by a worker process.
+
+        Parameters
+        ----------
+        moves : list
+            Moves of the game in the form e2e4:ok
+
+        Returns
+        -------
+        str
+            Winner "w" or "b" or "draw", None if the position isn't in
+            the endgame tables
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), adjudicate,
+                                          list(moves))
+
+    def close(self) -> None:
+        """Stop all games and worker processes."""
+        for user in list(self.games):
+            self.cancel(user)
+        for task in self.dispatchers:
+            task.cancel()
+        self.dispatchers = []
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _get_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        """Returns the pool of worker processes, creates it at first."""
+        if self.executor is None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                self.workers, initializer=_init_worker,
+                initargs=(self.stop_flags,))
+        return self.executor
+
+    def _finish(self, job: Job) -> None:
+        """Forget the job of the game, its search isn't in flight."""
+        if self.active.get(job.user) is job:
+            del self.active[job.user]
+
+    async def _dispatch(self) -> None:
+        """Pass jobs from the queue to worker processes one by one."""
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.jobs.get()
+            try:
+                if not job.cancelled:
+                    seconds = max(job.deadline - time.monotonic(), 0.0)
+                    move = await loop.run_in_executor(
+                        self._get_executor(), think, job.moves, seconds,
+                        job.slot)
+                    self._finish(job)
+                    if not job.cancelled:
+                        # None stops the game the computer can't go on
+                        _, on_move, _ = self.games[job.user]
+                        await on_move(job.user, move)
+            except Exception as error:
+                print("Computer move error", job.user, error)
+                self._finish(job)
+                if not job.cancelled and job.user in self.games:
+                    # the game can't go on, its opponent is told to stop
+                    _, on_move, _ = self.games[job.user]
+                    try:
+                        await on_move(job.user, None)
+                    except Exception as error:
+                        print("Computer move error", job.user, error)
+            finally:
+                self._finish(job)
+                if job.cancelled:
+                    self.free_slots.append(job.slot)
+                self.jobs.task_done()
@@ -0,0 +1,79 @@
+"""Test of benchmark module"""
+
+import io
+import unittest
+import sys
+import os
+sys.path.insert(1, os.path.dirname(__file__) + '/../client/src')
+import benchmark
+from chess_game import Game
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_deepcopy_game(self):
+        game = benchmark.deepcopy_game('w')
+        self.assertEqual(game.board, Game('w').board)
+        self.assertEqual(game.hash, Game('w').hash)
+        self.assertEqual(game.get_possible_moves(),
+                         Game('w').get_possible_moves())
+
+    def test_construction_report(self):
+        out = io.StringIO()
+        rates = benchmark.construction_report(0.01, out)
+        self.assertEqual(list(rates), [name for name, _
+                                       in benchmark.CONSTRUCTORS])
+        self.assertTrue(all(rate > 0 for rate in rates.values()))
+        self.assertEqual(out.getvalue().count('games/s'),
+                         len(benchmark.CONSTRUCTORS))
+
+    def test_memory_report(self):
+        out = io.StringIO()
+        report = benchmark.memory_report(out)
+        self.assertGreater(report['game'], report['figures'])
+        self.assertGreater(report['access'], 0)
+        self.assertIn('bytes', out.getvalue())
+        self.assertEqual(benchmark.deep_sizeof([1, 1]),
+                         sys.getsizeof([1, 1]) + sys.getsizeof(1))
+
+    def test_movegen_report(self):
+        out = io.StringIO()
+        rates = benchmark.movegen_report(0.01, out)
+        self.assertIn('startpos', rates)
+        self.assertTrue(all(list_rate > 0 and mailbox_rate > 0
+                            for list_rate, mailbox_rate in rates.values()))
+        self.assertEqual(out.getvalue().count('mailbox'), len(rates))
+        self.assertEqual(sum(len(targets) for _, targets
+                             in benchmark.list_board_moves(Game('w'))), 20)
+
+    def test_replay_report(self):
+        story = benchmark.record_game(20, seed=1)
+        self.assertEqual(len(story), 20)
+        self.assertEqual(story, benchmark.record_game(20, seed=1))
+        out = io.StringIO()
+        rates = benchmark.replay_report(0.01, out)
+        self.assertEqual(list(rates), ['move_from_server', 'untrusted',
+                                       'trusted'])
+        self.assertEqual(out.getvalue().count('games/s'), 3)
+
+    def test_evaluation_report(self):
+        out = io.StringIO()
+        rates = benchmark.evaluation_report(0.01, out)
+        self.assertIn('kiwipete', rates)
+        self.assertTrue(all(incremental > 0 and scratch > 0
+                            for incremental, scratch in rates.values()))
+        self.assertEqual(out.getvalue().count('scratch'), len(rates))
+
+    def test_search_report(self):
+        out = io.StringIO()
+        rates = benchmark.search_report(0.01, out)
+        self.assertIn('kiwipete', rates)
+        self.assertTrue(all(nodes > 0 and depth >= 1
+                            for nodes, depth in rates.values()))
+        self.assertEqual(out.getvalue().count('nodes/s'), len(rates))
+
+    def tearDown(self):
+        pass
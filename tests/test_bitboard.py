@@ -0,0 +1,231 @@
+"""Test of bitboard module"""
+
+import unittest
+import sys
+import os
+sys.path.insert(1, os.path.dirname(__file__) + '/../client/src')
+import bitboard
+from chess_game import Game, BitboardGame
+
+
+def count_nodes(position, depth):
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in position.legal_moves():
+        position.make_move(move)
+        nodes += count_nodes(position, depth - 1)
+        position.unmake_move()
+    return nodes
+
+
+class TestPosition(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_initial(self):
+        position = bitboard.Position.initial()
+        self.assertEqual(bin(position.occupied).count('1'), 32)
+        self.assertEqual(position.king_square(bitboard.WHITE), 4)
+        self.assertEqual(position.king_square(bitboard.BLACK), 60)
+        self.assertEqual(len(position.legal_moves()), 20)
+        self.assertEqual(position.to_board(), Game('w').board)
+
+    def test_count_nodes(self):
+        position = bitboard.Position.initial()
+        self.assertEqual(count_nodes(position, 1), 20)
+        self.assertEqual(count_nodes(position, 2), 400)
+        self.assertEqual(count_nodes(position, 3), 8902)
+
+    def test_make_unmake(self):
+        position = bitboard.Position.initial()
+        board = position.to_board()
+        pieces = [line[:] for line in position.pieces]
+        for move in position.legal_moves():
+            position.make_move(move)
+            for reply in position.legal_moves():
+                position.make_move(reply)
+                position.unmake_move()
+            position.unmake_move()
+        self.assertEqual(position.to_board(), board)
+        self.assertEqual(position.pieces, pieces)
+        self.assertEqual(position.castling, bitboard.CASTLE_ALL)
+        self.assertEqual(position.ep_square, -1)
+        self.assertEqual(position.history, [])
+
+    def test_hash(self):
+        position = bitboard.Position.initial()
+        position.debug_hash = True
+        start = position.hash
+        count_nodes(position, 3)
+        self.assertEqual(position.hash, start)
+        for move in position.legal_moves():
+            position.make_move(move)
+            self.assertNotEqual(position.hash, start)
+            position.unmake_move()
+
+    def test_attacks(self):
+        position = bitboard.Position()
+        position.put_piece(4, bitboard.KING)
+        position.put_piece(60, 6 + bitboard.KING)
+        position.put_piece(36, 6 + bitboard.ROOK)
+        self.assertTrue(position.is_attacked(4, bitboard.BLACK))
+        self.assertTrue(position.in_check())
+        self.assertEqual(position.attackers(4, bitboard.BLACK), 1 << 36)
+        position.put_piece(20, bitboard.KNIGHT)
+        self.assertFalse(position.in_check())
+        self.assertTrue(position.is_attacked(37, bitboard.WHITE))
+        self.assertEqual(sorted(move & 63
+                                for move in position.legal_moves()),
+                         [4, 4, 4, 4, 4])
+
+    def test_tables(self):
+        self.assertEqual(bitboard.BETWEEN[4][60],
+                         sum(1 << sq for sq in range(12, 60, 8)))
+        self.assertEqual(bitboard.BETWEEN[0][63],
+                         sum(1 << sq for sq in range(9, 63, 9)))
+        self.assertEqual(bitboard.BETWEEN[4][21], 0)
+        self.assertEqual(bitboard.BETWEEN[4][5], 0)
+        self.assertEqual(bitboard.LINE[9][18], bitboard.LINE[63][0])
+        self.assertEqual(bitboard.LINE[4][21], 0)
+        self.assertEqual(bin(bitboard.ROOK_MASKS[27]).count('1'), 14)
+        self.assertEqual(bin(bitboard.BISHOP_MASKS[27]).count('1'), 13)
+        occupied = 1 << 3 | 1 << 35 | 1 << 30 | 1 << 54
+        self.assertEqual(bitboard.rook_attacks(27, occupied),
+                         1 << 19 | 1 << 11 | 1 << 3 | 1 << 35
+                         | 1 << 24 | 1 << 25 | 1 << 26
+                         | 1 << 28 | 1 << 29 | 1 << 30)
+        self.assertEqual(bitboard.bishop_attacks(0, occupied),
+                         1 << 9 | 1 << 18 | 1 << 27 | 1 << 36 | 1 << 45
+                         | 1 << 54)
+
+    def test_pins_checks(self):
+        position = bitboard.Position.from_fen(
+                '4k3/8/8/8/8/5n2/Q7/r3K3 w - - 0 1')
+        self.assertEqual(position.attackers(4, bitboard.BLACK),
+                         1 << 0 | 1 << 21)
+        self.assertEqual(sorted(position.perft_divide(1)), ['e1e2', 'e1f2'])
+
+        position = bitboard.Position.from_fen(
+                '4k3/8/8/8/1b6/8/3N4/4K3 w - - 0 1')
+        self.assertEqual(position.pins(4), {11: 1 << 11 | 1 << 18 | 1 << 25})
+        self.assertEqual(sorted(position.perft_divide(1)),
+                         ['e1d1', 'e1e2', 'e1f1', 'e1f2'])
+
+        position = bitboard.Position.from_fen(
+                '8/8/8/K2pP2r/8/8/8/7k w - d6 0 1')
+        moves = position.perft_divide(1)
+        self.assertNotIn('e5d6', moves)
+        self.assertIn('e5e6', moves)
+
+    def test_legal_moves_from(self):
+        for fen in ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/'
+                    'R3K2R w KQkq - 0 1',
+                    '8/8/8/K2pP2r/8/8/8/7k w - d6 0 1',
+                    '4k3/1P6/8/8/1b6/8/3N4/4K3 w - - 0 1'):
+            position = bitboard.Position.from_fen(fen)
+            moves = position.legal_moves()
+            for sq in range(64):
+                self.assertEqual(position.legal_moves(sq),
+                                 [move for move in moves if move & 63 == sq])
+        position = bitboard.Position.from_fen(
+                '4k3/1P6/8/8/1b6/8/3N4/4K3 w - - 0 1')
+        self.assertIsNone(position.find_move(11, 17))
+        self.assertEqual(position.find_move(49, 57, bitboard.KNIGHT) >> 12 & 7,
+                         bitboard.KNIGHT)
+
+    def tearDown(self):
+        pass
+
+
+class TestBitboardGame(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_game_beginning(self):
+        game = BitboardGame("w")
+        self.assertEqual(game.get_possible_moves(),
+                         Game("w").get_possible_moves())
+        self.assertTrue(game.isMyMove())
+        self.assertFalse(game.isDrawMove("e2", "e4"))
+        self.assertFalse(game.isWinMove("e2", "e4"))
+        self.assertTrue(game.isPossibleMove("e2", "e4"))
+        self.assertFalse(game.isPossibleMove("e2", "e5"))
+        self.assertTrue(game.move("e2", "e4"))
+        self.assertFalse(game.isMyMove())
+        self.assertFalse(game.move("e7", "e5"))
+        self.assertEqual(game.get_possible_moves(), [])
+        self.assertTrue(game.move_from_server("e7", "e5"))
+        self.assertEqual(game.get_possible_moves()["e4"], [])
+        self.assertEqual(game.board[4], ['Kw', ' ', ' ', 'Pw',
+                                         'Pb', ' ', ' ', 'Kb'])
+        self.assertEqual(game.get_board(),
+                         Game("w").get_board().replace(
+                             '2│ Pw │ Pw │ Pw │ Pw │ Pw │',
+                             '2│ Pw │ Pw │ Pw │ Pw │    │').replace(
+                             '4│    │    │    │    │    │',
+                             '4│    │    │    │    │ Pw │').replace(
+                             '7│ Pb │ Pb │ Pb │ Pb │ Pb │',
+                             '7│ Pb │ Pb │ Pb │ Pb │    │').replace(
+                             '5│    │    │    │    │    │',
+                             '5│    │    │    │    │ Pb │'))
+
+    def test_win(self):
+        game = BitboardGame("b")
+        game.move_from_server("g2", "g4")
+        game.move("e7", "e5")
+        game.move_from_server("f2", "f3")
+        self.assertFalse(game.isDrawMove("d8", "h4"))
+        self.assertTrue(game.isWinMove("d8", "h4"))
+        self.assertTrue(game.move("d8", "h4"))
+        self.assertTrue(game.position.is_checkmate())
+        self.assertEqual(game.board,
+                         [['Rw', 'Pw', ' ', ' ', ' ', ' ', 'Pb', 'Rb'],
+                          ['KNw', 'Pw', ' ', ' ', ' ', ' ', 'Pb', 'KNb'],
+                          ['Bw', 'Pw', ' ', ' ', ' ', ' ', 'Pb', 'Bb'],
+                          ['Qw', 'Pw', ' ', ' ', ' ', ' ', 'Pb', ' '],
+                          ['Kw', 'Pw', ' ', ' ', 'Pb', ' ', ' ', 'Kb'],
+                          ['Bw', ' ', 'Pw', ' ', ' ', ' ', 'Pb', 'Bb'],
+                          ['KNw', ' ', ' ', 'Pw', ' ', ' ', 'Pb', 'KNb'],
+                          ['Rw', 'Pw', ' ', 'Qb', ' ', ' ', 'Pb', 'Rb']])
+
+    def test_draw(self):
+        game = BitboardGame("w")
+        for move in ("e2e3", "a7a5", "d1h5", "a8a6", "h5a5", "h7h5",
+                     "h2h4", "a6h6", "a5c7", "f7f6", "c7d7", "e8f7",
+                     "d7b7", "d8d3", "b7b8", "d3h7", "b8c8", "f7g6"):
+            self.assertTrue(game.move_from_server(move[:2], move[2:]))
+        self.assertTrue(game.isDrawMove("c8", "e6"))
+        self.assertFalse(game.isWinMove("c8", "e6"))
+        self.assertEqual(game.get_score(), 10)
+
+    def test_roque_en_passant_promotion(self):
+        game = BitboardGame("w")
+        for move in ("e2e4", "e7e5", "f1d3", "f8d6", "g1f3", "g8f6",
+                     "e1g1", "e8g8"):
+            self.assertTrue(game.move_from_server(move[:2], move[2:]))
+        self.assertEqual(game.board[5][0], 'Rw')
+        self.assertEqual(game.board[6][7], 'Kb')
+
+        game = BitboardGame("w")
+        for move in ("e2e4", "d7d5", "e4e5", "f7f5", "e5f6"):
+            self.assertTrue(game.move_from_server(move[:2], move[2:]))
+        self.assertEqual(game.board[5][4], ' ')
+        self.assertEqual(game.score, 1)
+
+        game = BitboardGame("w")
+        for move in ("e2e4", "d7d5", "e4e5", "g7g6"):
+            self.assertTrue(game.move_from_server(move[:2], move[2:]))
+        self.assertFalse(game.isPossibleMove("e5", "d6"))
+
+        game = BitboardGame("w")
+        for move in ("h2h4", "g7g5", "h4g5", "h7h6", "g5h6", "f8g7",
+                     "h6g7", "e7e6"):
+            self.assertTrue(game.move_from_server(move[:2], move[2:]))
+        self.assertTrue(game.move_from_server("g7", "h8", "KN"))
+        self.assertEqual(game.board[7][7], 'KNw')
+
+    def tearDown(self):
+        pass
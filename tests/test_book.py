@@ -0,0 +1,140 @@
+"""Test of book module"""
+
+import io
+import os
+import pickle
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+sys.path.insert(1, os.path.dirname(__file__) + '/../client/src')
+import book
+import engine
+from chess_game import Game
+
+GAMES = ['1. e2e4 e7e5 2. g1f3 b8c6 1-0',
+         'e2e4 c7c5 0-1',
+         '# comment',
+         '',
+         'd2d4 d7d5 1/2-1/2',
+         'e2e4 e7e5 f1c4 *',
+         'e2e5 e7e5']
+
+
+class TestBuild(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'test.book')
+
+    def test_read_games(self):
+        games = book.read_games(GAMES)
+        self.assertEqual(games[0], (['e2e4', 'e7e5', 'g1f3', 'b8c6'], 'w'))
+        self.assertEqual([result for _, result in games],
+                         ['w', 'b', 'draw', None, None])
+
+    def test_history_games(self):
+        history = [['1', '2', '2', [['2', 'e2e4:ok'], ['1', 'e7e5:ok'],
+                                    ['1', 'give_up']]],
+                   ['1', '2', 'draw', [['1', 'd2d4:ok'], ['2', 'draw']]],
+                   ['1', '2', '1', []]]
+        self.assertEqual(book.history_games(history),
+                         [(['e2e4:ok', 'e7e5:ok', 'give_up'], 'w'),
+                          (['d2d4:ok', 'draw'], 'draw')])
+
+    def test_count_moves(self):
+        counts = book.count_moves(book.read_games(GAMES))
+        self.assertEqual(len(counts), 8)
+        self.assertEqual(book.count_moves(book.read_games(GAMES), 1),
+                         {key: value for key, value in counts.items()
+                          if key[0] == book.table_key(
+                              Game('w').position_key())})
+        self.assertEqual(sorted(value for key, value in counts.items()
+                                if engine.move_name(key[1]) == 'e2e4'),
+                         [[3, 3]])
+
+    def test_write_book(self):
+        self.assertEqual(book.write_book(
+                self.path, book.count_moves(book.read_games(GAMES))), 7)
+        self.assertEqual(os.path.getsize(self.path),
+                         book.HEADER.size + 7 * book.ENTRY.size)
+
+    def test_main(self):
+        games = os.path.join(self.folder, 'games.txt')
+        history = os.path.join(self.folder, 'history')
+        with open(games, 'w') as file:
+            file.write('\n'.join(GAMES))
+        with open(history, 'wb') as file:
+            pickle.dump([['1', '2', '1', [['1', 'g1f3:ok']]]], file)
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(book.main(['--book', self.path, 'build',
+                                        '--games', games,
+                                        '--history', history]), 0)
+            self.assertEqual(book.main(['--book', self.path, 'probe',
+                                        'e2e4']), 0)
+        self.assertEqual(out.getvalue().splitlines(),
+                         ['6 games, 8 entries',
+                          'c7c5 weight     2 games     1',
+                          'e7e5 weight     1 games     2'])
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+
+class TestOpeningBook(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'test.book')
+        book.write_book(self.path, book.count_moves(book.read_games(GAMES)))
+        self.book = book.OpeningBook(self.path)
+
+    def test_probe(self):
+        game = Game('w')
+        self.assertEqual(len(self.book), 7)
+        self.assertEqual(self.book.probe(game),
+                         [('e2e4', 3, 3), ('d2d4', 1, 1)])
+        game.move_from_server('e2', 'e4')
+        self.assertEqual(self.book.probe(game),
+                         [('c7c5', 2, 1), ('e7e5', 1, 2)])
+        game.move_from_server('a7', 'a6')
+        self.assertEqual(self.book.probe(game), [])
+        self.assertIsNone(self.book.choose(game))
+
+    def test_choose(self):
+        game = Game('w')
+        rng = random.Random(1)
+        moves = {self.book.choose(game, rng) for _ in range(50)}
+        self.assertEqual(moves, {'e2e4', 'd2d4'})
+
+    def test_engine(self):
+        game = Game('w')
+        game.move_from_server('d2', 'd4')
+        result = engine.Engine(book=self.book).search(game, 5.0)
+        self.assertEqual(result.move, 'd7d5')
+        self.assertEqual(result.depth, 0)
+        self.assertEqual(engine.best_move(game, depth=1, book=self.book),
+                         'd7d5')
+        game.move_from_server('d7', 'd5')
+        result = engine.Engine(book=self.book).search(game, depth=1)
+        self.assertEqual(result.depth, 1)
+
+    def test_open_book(self):
+        self.assertIsNone(book.open_book(self.path + '.missing'))
+        with book.open_book(self.path) as other:
+            self.assertEqual(len(other), 7)
+        path = os.path.join(self.folder, 'bad.book')
+        with open(self.path, 'rb') as file:
+            data = file.read()
+        for bad in (b'', b'NOTABOOK' + data[8:], data[:-1]):
+            with open(path, 'wb') as file:
+                file.write(bad)
+            with self.assertRaises(ValueError):
+                book.OpeningBook(path)
+
+    def tearDown(self):
+        self.book.close()
+        shutil.rmtree(self.folder)
@@ -9,7 +9,7 @@ from unittest.mock import MagicMock
 import chess_client
 import locale
 import internationalization
-from chess_game import Game
+from chess_game import Game, new_game
 from server_answer import mock_for_i18n
 
 
@@ -23,6 +23,7 @@ def setUpModule():
         self.name = ""
         self.game = None
         self.draw_request = False
+        self.book = None
 
     chess_client.chess_client.__init__ = __init__
     locale.setlocale(locale.LC_ALL, ("en_US", "UTF-8"))
@@ -251,6 +252,23 @@ class TestPlay(unittest.TestCase):
                          ["1", "2", "3"])
         self.client.write_to_server.assert_called_with("online_users", 4)
 
+    def test_do_play_computer(self):
+        self.client.do_play_computer("1 1")
+        chess_client.print.assert_called_with("More arguments")
+        self.client.do_play_computer("fast")
+        chess_client.print.assert_called_with("Incorrect argument")
+
+        self.client.do_play_computer("0.5")
+        self.client.write_to_server.assert_called_with("play_computer 0.5",
+                                                       3)
+        chess_client.print.assert_called_with("Send game request")
+
+        self.client.do_play_computer("")
+        self.client.write_to_server.assert_called_with("play_computer", 5)
+        self.assertEqual(chess_client.print.mock_calls[-2].args[0],
+                         "Start game, color: w")
+        self.assertEqual(self.client.game.player, "w")
+
 
 class TestMove(unittest.TestCase):
 
@@ -292,24 +310,52 @@ class TestMove(unittest.TestCase):
         self.client.do_move("e2toe4")
         chess_client.print.assert_called_with("Incorrect move")
 
+    def test_do_hint(self):
+        self.client.game = None
+        self.client.do_hint("")
+        chess_client.print.assert_called_with("You dont play now")
+
+        self.client.game = Game("b")
+        self.client.do_hint("")
+        chess_client.print.assert_called_with("Now not you move")
+
+        self.client.game = Game("w")
+        self.client.do_hint("1 1")
+        chess_client.print.assert_called_with("More arguments")
+        self.client.do_hint("fast")
+        chess_client.print.assert_called_with("Incorrect argument")
+
+        self.client.book = MagicMock()
+        self.client.book.choose.return_value = "d2d4"
+        self.client.do_hint("")
+        chess_client.print.assert_called_with("Hint: d2d4")
+
+        self.client.book = None
+        self.client.game = new_game("w", "bitboard")
+        self.client.game.move("e2", "e4")
+        self.client.game.move_from_server("f7", "f6")
+        self.client.game.move("b1", "c3")
+        self.client.game.move_from_server("g7", "g5")
+        self.client.do_hint("0.5")
+        chess_client.print.assert_called_with("Hint: d1h5")
+
     def test_do_move(self):
 
-        self.client.game.isPossibleMove = MagicMock(return_value=False)
+        self.client.game.classify_move = MagicMock(
+                return_value=("illegal", 0))
         self.client.do_move("e2e4")
         chess_client.print.assert_called_with("It is impossiple move")
 
         self.client.game = Game("w")
-        self.client.game.isPossibleMove = MagicMock(return_value=True)
-        self.client.game.isWinMove = MagicMock(return_value=False)
-        self.client.game.isDrawMove = MagicMock(return_value=False)
+        self.client.game.classify_move = MagicMock(
+                return_value=("normal", 0))
         self.client.do_move("e2e4")
         self.client.write_to_server.assert_called_with("move e2e4:ok", 3)
         chess_client.print.assert_called_with("You get move")
 
         self.client.game = Game("w")
-        self.client.game.isPossibleMove = MagicMock(return_value=True)
-        self.client.game.isWinMove = MagicMock(return_value=True)
-        self.client.game.isDrawMove = MagicMock(return_value=False)
+        self.client.game.classify_move = MagicMock(
+                return_value=("checkmate", 0))
         self.client.do_move("e2e4")
         self.assertEqual(self.client.write_to_server.mock_calls[-1].args,
                          ("move e2e4:win", 5))
@@ -320,9 +366,8 @@ class TestMove(unittest.TestCase):
         self.assertIsNone(self.client.game)
 
         self.client.game = Game("w")
-        self.client.game.isPossibleMove = MagicMock(return_value=True)
-        self.client.game.isWinMove = MagicMock(return_value=False)
-        self.client.game.isDrawMove = MagicMock(return_value=True)
+        self.client.game.classify_move = MagicMock(
+                return_value=("stalemate", 0))
         self.client.do_move("e2e4")
         self.assertEqual(self.client.write_to_server.mock_calls[-1].args,
                          ("move e2e4:draw", 7))
@@ -332,9 +377,25 @@ class TestMove(unittest.TestCase):
                          "Stop game, draw")
         self.assertIsNone(self.client.game)
 
+        self.client.game = Game("w")
+        self.client.game.classify_move = MagicMock(
+                return_value=("repetition", 0))
+        self.client.do_move("e2e4")
+        self.assertEqual(self.client.write_to_server.mock_calls[-1].args,
+                         ("move e2e4:draw", 9))
+        self.assertEqual(chess_client.print.mock_calls[-1].args[0],
+                         "Stop game, draw")
+        self.assertIsNone(self.client.game)
+
     def test_complet_move(self):
         self.assertEqual(self.client.complete_move("e", "move e", 6, 6),
                          ["e2e3", "e2e4"])
+        self.assertEqual(self.client.complete_move("g1", "move g1", 7, 7),
+                         ["g1f3", "g1h3"])
+        self.assertEqual(self.client.complete_move("", "move ", 5, 5)[:3],
+                         ["a2a3", "a2a4", "b1a3"])
+        self.client.game.player = "b"
+        self.assertEqual(self.client.complete_move("e", "move e", 6, 6), [])
 
 
 class TestDraw(unittest.TestCase):
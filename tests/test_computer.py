@@ -0,0 +1,171 @@
+"""Tests for computer opponent of the server."""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+sys.path.insert(1, os.path.dirname(__file__) + '/../server/src/')
+sys.path.insert(1, os.path.dirname(__file__) + '/../client/src')
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+import server.src.computer as computer
+
+SCHOLAR_MATE = ["e2e4:ok", "e7e5:ok", "f1c4:ok", "b8c6:ok", "d1h5:ok",
+                "g8f6:ok"]
+FOOL_MATE = ["f2f3:ok", "e7e5:ok", "g2g4:ok", "d8h4:win"]
+
+
+class TestThink(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_think(self):
+        self.assertEqual(computer.think(SCHOLAR_MATE, 0.5), "h5f7:win")
+        move = computer.think(["e2e4:ok", "give_up"], 0.1)
+        self.assertRegex(move, "^[a-h][1-8][a-h][1-8]:ok$")
+
+    def test_impossible_move(self):
+        with self.assertRaises(ValueError):
+            computer.think(["e2e4:ok", "e2e4:ok"], 0.1)
+
+    def test_stop(self):
+        flags = multiprocessing.RawArray("b", 2)
+        computer._init_worker(flags)
+        try:
+            flags[1] = 1
+            start = time.monotonic()
+            self.assertIsNone(computer.think([], 5.0, 1))
+            self.assertLess(time.monotonic() - start, 1.0)
+            self.assertIsNotNone(computer.think([], 0.1, 0))
+        finally:
+            computer._init_worker(None)
+
+    def test_adjudicate(self):
+        self.assertIsNone(computer.adjudicate(SCHOLAR_MATE))
+        computer._tablebase = MagicMock()
+        try:
+            computer._tablebase.probe.return_value = (0, 0)
+            self.assertIsNone(computer.adjudicate(["e2e5:ok"]))
+            computer._tablebase.probe.return_value = (0, 0)
+            self.assertEqual(computer.adjudicate(SCHOLAR_MATE), "draw")
+            computer._tablebase.probe.return_value = (1, 3)
+            self.assertEqual(computer.adjudicate(SCHOLAR_MATE), "w")
+            computer._tablebase.probe.return_value = (-1, 2)
+            self.assertEqual(computer.adjudicate(SCHOLAR_MATE), "b")
+            computer._tablebase.probe.return_value = None
+            self.assertIsNone(computer.adjudicate(SCHOLAR_MATE))
+        finally:
+            computer._tablebase = None
+
+    def test_parse_seconds(self):
+        self.assertEqual(computer.parse_seconds("1.5"), 1.5)
+        self.assertEqual(computer.parse_seconds(""), computer.DEFAULT_SECONDS)
+        self.assertEqual(computer.parse_seconds("nan"),
+                         computer.DEFAULT_SECONDS)
+        self.assertEqual(computer.parse_seconds("0"), computer.MIN_SECONDS)
+        self.assertEqual(computer.parse_seconds("1e9"), computer.MAX_SECONDS)
+
+    def tearDown(self):
+        pass
+
+
+class TestComputerOpponent(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        pass
+
+    async def asyncSetUp(self):
+        self.computer = computer.ComputerOpponent(workers=1, max_games=2)
+        self.on_move = AsyncMock()
+
+    async def test_start(self):
+        self.assertTrue(self.computer.start("1", 0.2, self.on_move))
+        self.assertFalse(self.computer.start("1", 0.2, self.on_move))
+        self.assertTrue(self.computer.start("2", 0.2, self.on_move))
+        self.assertTrue(self.computer.is_full())
+        self.assertFalse(self.computer.start("3", 0.2, self.on_move))
+        self.computer.cancel("1")
+        self.computer.cancel("1")
+        self.assertTrue(self.computer.start("3", 0.2, self.on_move))
+
+    async def test_move(self):
+        self.computer.start("1", 0.5, self.on_move)
+        start = time.monotonic()
+        self.computer.request_move("1", SCHOLAR_MATE)
+        # the loop isn't blocked while the computer thinks
+        self.assertLess(time.monotonic() - start, 0.1)
+        await asyncio.wait_for(self.computer.jobs.join(), 10)
+        self.on_move.assert_awaited_once_with("1", "h5f7:win")
+        self.assertEqual(self.computer.active, {})
+
+    async def test_thinking(self):
+        self.computer.start("1", 0.2, self.on_move)
+        self.assertTrue(self.computer.request_move("1", []))
+        self.assertTrue(self.computer.is_thinking("1"))
+        self.assertFalse(self.computer.request_move("1", ["e2e4:ok"]))
+        await asyncio.wait_for(self.computer.jobs.join(), 10)
+        self.on_move.assert_awaited_once()
+        self.assertFalse(self.computer.is_thinking("1"))
+
+    async def test_queue_full(self):
+        self.computer.start("1", 0.2, self.on_move)
+        self.computer.jobs.put_nowait(None)
+        self.computer.jobs.put_nowait(None)
+        self.assertFalse(self.computer.request_move("1", []))
+        self.assertFalse(self.computer.is_thinking("1"))
+
+    async def test_latency(self):
+        self.computer.start("1", 1.0, self.on_move)
+        self.computer.request_move("1", [])
+        await asyncio.sleep(0.1)
+        delays = []
+        for _ in range(10):
+            start = time.monotonic()
+            await asyncio.sleep(0.01)
+            delays.append(time.monotonic() - start)
+        self.assertLess(max(delays), 0.1)
+        await asyncio.wait_for(self.computer.jobs.join(), 10)
+        self.on_move.assert_awaited_once()
+
+    async def test_cancel(self):
+        self.computer.start("1", 10.0, self.on_move)
+        self.computer.request_move("1", [])
+        await asyncio.sleep(0.3)
+        start = time.monotonic()
+        self.computer.cancel("1")
+        await asyncio.wait_for(self.computer.jobs.join(), 10)
+        self.assertLess(time.monotonic() - start, 2.0)
+        self.on_move.assert_not_awaited()
+        self.assertEqual(sorted(self.computer.free_slots), [0, 1])
+
+    async def test_no_move(self):
+        self.computer.start("1", 0.2, self.on_move)
+        self.computer.request_move("1", FOOL_MATE)
+        await asyncio.wait_for(self.computer.jobs.join(), 10)
+        self.on_move.assert_awaited_once_with("1", None)
+        self.assertEqual(self.computer.active, {})
+        self.computer.cancel("1")
+        self.assertEqual(sorted(self.computer.free_slots), [0, 1])
+
+    async def test_impossible_move(self):
+        self.computer.start("1", 0.2, self.on_move)
+        self.computer.request_move("1", ["e2e4:ok", "e2e4:ok"])
+        await asyncio.wait_for(self.computer.jobs.join(), 10)
+        self.on_move.assert_awaited_once_with("1", None)
+        self.assertEqual(self.computer.active, {})
+
+    async def test_cancel_queued(self):
+        self.computer.start("1", 0.3, self.on_move)
+        self.computer.start("2", 0.3, self.on_move)
+        self.computer.request_move("1", [])
+        self.computer.request_move("2", [])
+        self.computer.cancel("2")
+        await asyncio.wait_for(self.computer.jobs.join(), 10)
+        self.assertEqual(self.on_move.await_count, 1)
+        self.assertEqual(self.on_move.await_args.args[0], "1")
+        self.assertEqual(len(self.computer.free_slots), 1)
+
+    async def asyncTearDown(self):
+        self.computer.close()
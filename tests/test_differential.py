@@ -0,0 +1,88 @@
+"""Test of differential module"""
+
+import io
+import unittest
+import sys
+import os
+sys.path.insert(1, os.path.dirname(__file__) + '/../client/src')
+import chess_game
+import differential
+from chess_game import Game, BitboardGame, DifferentialGame
+from chess_game import MailboxGame
+
+
+class TestBackends(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = os.environ.pop(chess_game.BACKEND_VARIABLE, None)
+
+    def test_new_game(self):
+        self.assertIsInstance(chess_game.new_game('w'), Game)
+        self.assertIsInstance(chess_game.new_game('b', 'bitboard'),
+                              BitboardGame)
+        os.environ[chess_game.BACKEND_VARIABLE] = 'bitboard'
+        self.assertIsInstance(chess_game.new_game('w'), BitboardGame)
+        os.environ[chess_game.BACKEND_VARIABLE] = 'diff:figures'
+        game = chess_game.new_game('b')
+        self.assertIsInstance(game, DifferentialGame)
+        self.assertIsInstance(game.candidate, Game)
+        self.assertEqual(game.player, 'b')
+        self.assertIsInstance(chess_game.new_game('w', 'mailbox'),
+                              MailboxGame)
+        with self.assertRaises(ValueError):
+            chess_game.new_game('w', 'unknown')
+
+    def test_differential_game(self):
+        game = chess_game.new_game('w', 'diff:bitboard')
+        self.assertTrue(game.move('e2', 'e4'))
+        self.assertFalse(game.move('e7', 'e5'))
+        self.assertTrue(game.move_from_server('d7', 'd5'))
+        self.assertEqual(game.classify_move('e4', 'd5'),
+                         (chess_game.MOVE_NORMAL, 1))
+        self.assertTrue(game.move('e4', 'e5'))
+        self.assertEqual(game.moves_history[-1], ('e4', 'e5'))
+        self.assertTrue(game.move_from_server('f7', 'f5'))
+        self.assertTrue(game.isPossibleMove('e5', 'f6'))
+        self.assertEqual(game.board, Game('w').board[:3]
+                         + game.candidate.board[3:])
+        game.move_from_server('a2', 'a3')
+        game.move_from_server('g7', 'g5')
+        with self.assertRaises(RuntimeError) as context:
+            game.isPossibleMove('e5', 'f6')
+        self.assertIn("isPossibleMove('e5', 'f6')", str(context.exception))
+
+    def tearDown(self):
+        os.environ.pop(chess_game.BACKEND_VARIABLE, None)
+        if self.backend is not None:
+            os.environ[chess_game.BACKEND_VARIABLE] = self.backend
+
+
+class TestDifferential(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_run(self):
+        out = io.StringIO()
+        self.assertEqual(differential.run('figures', 2, 40, out=out), [])
+        self.assertEqual(out.getvalue().count(' ok'),
+                         len(differential.POSITIONS) + 2)
+
+        out = io.StringIO()
+        self.assertEqual(differential.run('mailbox', 2, 40, out=out), [])
+
+        out = io.StringIO()
+        divergences = differential.run('bitboard', 0, out=out)
+        self.assertEqual([name for name, _ in divergences],
+                         ['en passant', 'fen roques', 'roque in check'])
+        self.assertIn("after 4 moves at get_possible_moves(): "
+                      "Game gave {'e5': ['d6', 'e6']}, "
+                      "BitboardGame gave {'e5': ['e6']}", out.getvalue())
+
+    def test_main(self):
+        self.assertEqual(differential.main(['--candidate', 'figures',
+                                            '--games', '1',
+                                            '--plies', '10']), 0)
+
+    def tearDown(self):
+        pass
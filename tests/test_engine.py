@@ -0,0 +1,132 @@
+"""Test of engine module"""
+
+import io
+import time
+import unittest
+import sys
+import os
+from contextlib import redirect_stdout
+sys.path.insert(1, os.path.dirname(__file__) + '/../client/src')
+import engine
+from chess_game import Game
+
+
+class TestSearch(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_mate_in_one(self):
+        game = Game.from_fen('r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/'
+                             'PPPP1PPP/RNB1K1NR w KQkq - 4 4')
+        fen = game.to_fen()
+        result = engine.Engine().search(game, depth=3)
+        self.assertEqual(result.move, 'h5f7')
+        self.assertEqual(result.score, engine.MATE - 1)
+        self.assertEqual(result.pv, ['h5f7'])
+        self.assertEqual(game.to_fen(), fen)
+        self.assertEqual(game.undo_stack, [])
+
+    def test_back_rank_mate(self):
+        game = Game.from_fen('6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1')
+        self.assertEqual(engine.best_move(game, depth=2), 'd1d8')
+        game = Game.from_fen('k7/8/8/8/8/1r6/r7/7K w - - 0 1')
+        result = engine.Engine().search(game, depth=3)
+        self.assertEqual(result.score, -(engine.MATE - 2))
+        self.assertEqual(result.pv, ['h1g1', 'b3b1'])
+
+    def test_capture(self):
+        # hanging queen, and en passant as the only capture of a pawn
+        game = Game.from_fen('4k3/8/8/3q4/8/8/8/3RK3 w - - 0 1')
+        self.assertEqual(engine.best_move(game, depth=3), 'd1d5')
+        game = Game.from_fen('4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 2')
+        result = engine.Engine().search(game, depth=1)
+        self.assertEqual(result.move, 'e5d6')
+
+    def test_no_moves(self):
+        game = Game.from_fen('7k/5Q2/6K1/8/8/8/8/8 b - - 0 1')
+        result = engine.Engine().search(game, seconds=1.0)
+        self.assertIsNone(result.move)
+        self.assertEqual(result.score, engine.DRAW)
+        game = Game.from_fen('7k/6Q1/6K1/8/8/8/8/8 b - - 0 1')
+        self.assertEqual(engine.Engine().search(game).score, -engine.MATE)
+
+    def test_repetition(self):
+        # Black without the queen is glad to repeat the position
+        game = Game.from_fen('rnb1kbnr/pppppppp/8/8/8/8/PPPPPPPP/'
+                             'RNBQKBNR w KQkq - 0 1')
+        for move in ('g1f3', 'g8f6', 'f3g1', 'f6g8', 'g1f3', 'g8f6',
+                     'f3g1'):
+            game.move_from_server(move[:2], move[2:])
+        result = engine.Engine().search(game, depth=3)
+        self.assertEqual(result.move, 'f6g8')
+        self.assertEqual(result.score, engine.DRAW)
+        # any move of White draws by fifty-move rule
+        game = Game.from_fen('4k3/8/8/8/8/8/8/3QK3 w - - 99 80')
+        self.assertEqual(engine.Engine().search(game, depth=3).score,
+                         engine.DRAW)
+
+    def test_time_budget(self):
+        game = Game('w')
+        results = []
+        start = time.perf_counter()
+        result = engine.Engine().search(game, 0.3,
+                                        on_iteration=results.append)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertGreaterEqual(result.depth, 2)
+        self.assertEqual(result, results[-1])
+        self.assertEqual([item.depth for item in results],
+                         list(range(1, result.depth + 1)))
+        self.assertEqual(game.to_fen(), Game('w').to_fen())
+        # the first iteration is completed whatever the budget is
+        result = engine.Engine().search(game, 0.0)
+        self.assertEqual(result.depth, 1)
+        self.assertIsNotNone(result.move)
+        # deeper first iteration keeps the budget
+        results = []
+        result = engine.Engine().search(game, depth=3, first_depth=2,
+                                        on_iteration=results.append)
+        self.assertEqual([item.depth for item in results], [2, 3])
+
+    def test_table(self):
+        game = Game('w')
+        search = engine.Engine(max_entries=100)
+        result = search.search(game, depth=3)
+        self.assertGreater(len(search.table), 0)
+        self.assertLessEqual(len(search.table), 100)
+        self.assertEqual(search.search(game, depth=3).move, result.move)
+        search.clear()
+        self.assertEqual(search.table, {})
+
+    def tearDown(self):
+        pass
+
+
+class TestOutput(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_move_name(self):
+        self.assertEqual(engine.move_name(12 | 28 << 6), 'e2e4')
+
+    def test_format_result(self):
+        result = engine.SearchResult('h5f7', engine.MATE - 1, 2, 100, 0.5,
+                                     ['h5f7'])
+        self.assertEqual(engine.format_result(result),
+                         'depth  2 score mate 1    nodes       100 '
+                         'nps     200 pv h5f7')
+        result = result._replace(score=-engine.MATE + 2)
+        self.assertIn('mate -1', engine.format_result(result))
+        result = result._replace(score=-35)
+        self.assertIn('cp -35', engine.format_result(result))
+
+    def test_main(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(engine.main(['--depth', '2']), 0)
+        self.assertIn('depth  2', out.getvalue())
+        self.assertIn('bestmove', out.getvalue())
+
+    def tearDown(self):
+        pass
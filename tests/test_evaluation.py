@@ -0,0 +1,90 @@
+"""Test of evaluation module"""
+
+import random
+import unittest
+import sys
+import os
+sys.path.insert(1, os.path.dirname(__file__) + '/../client/src')
+import evaluation
+from chess_game import Game, LABEL_CODES
+
+
+class TestTables(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_tables(self):
+        for table in evaluation.MIDDLEGAME_TABLES + evaluation.ENDGAME_TABLES:
+            self.assertEqual(len(table), 64)
+        for code in range(6):
+            for sq in range(64):
+                self.assertEqual(evaluation.MIDDLEGAME[code][sq],
+                                 -evaluation.MIDDLEGAME[code + 6][sq ^ 56])
+                self.assertEqual(evaluation.ENDGAME[code][sq],
+                                 -evaluation.ENDGAME[code + 6][sq ^ 56])
+        # white pawn e2 and knight g1, black King e8
+        self.assertEqual(evaluation.MIDDLEGAME[LABEL_CODES['Pw']][12], 62)
+        self.assertEqual(evaluation.MIDDLEGAME[LABEL_CODES['KNw']][6], 297)
+        self.assertEqual(evaluation.ENDGAME[LABEL_CODES['Kb']][60], 30)
+
+    def test_blend(self):
+        self.assertEqual(evaluation.blend(100, 0, evaluation.MAX_PHASE), 100)
+        self.assertEqual(evaluation.blend(100, 0, 40), 100)
+        self.assertEqual(evaluation.blend(100, 40, 0), 40)
+        self.assertEqual(evaluation.blend(100, 0, 6), 25)
+        self.assertEqual(evaluation.blend(7, 0, 5), 1)
+        self.assertEqual(evaluation.blend(-7, 0, 5), -1)
+
+    def tearDown(self):
+        pass
+
+
+class TestGameEvaluation(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_start(self):
+        game = Game('w')
+        self.assertEqual(game.eval_terms, (0, 0, evaluation.MAX_PHASE))
+        self.assertEqual(game.evaluate(), 0)
+        game.move_from_server('e2', 'e4')
+        self.assertEqual(game.evaluate(), -40)
+        game.move_from_server('d7', 'd5')
+        game.move_from_server('e4', 'd5')
+        self.assertLess(game.evaluate(), -82)
+
+    def test_incremental(self):
+        rng = random.Random(7)
+        game = Game('w')
+        terms = [game.eval_terms]
+        for _ in range(120):
+            moves = game.legal_moves()
+            if not moves:
+                break
+            game.make_packed_move(rng.choice(moves))
+            self.assertEqual(game.eval_terms, game.compute_eval_terms())
+            terms.append(game.eval_terms)
+        self.assertLess(terms[-1][2], evaluation.MAX_PHASE)
+        while game.undo_stack:
+            game.unmake_move()
+            terms.pop()
+            self.assertEqual(game.eval_terms, terms[-1])
+
+    def test_roque_and_fen(self):
+        fen = 'r3k2r/8/8/3pP3/8/8/8/R3K1R1 w Qk d6 0 12'
+        game = Game.from_fen(fen)
+        self.assertEqual(game.eval_terms, game.compute_eval_terms())
+        snapshot = game.snapshot()
+        game.make_move(4, 0, 2, 0)
+        self.assertEqual(game.eval_terms, game.compute_eval_terms())
+        game.make_move(4, 7, 6, 7)
+        self.assertEqual(game.eval_terms, game.compute_eval_terms())
+        game.restore(snapshot)
+        self.assertEqual(game.eval_terms, Game.from_fen(fen).eval_terms)
+        mirrored = Game.from_fen('r3k1r1/8/8/8/3Pp3/8/8/R3K2R b Kq d3 0 12')
+        self.assertEqual(mirrored.evaluate(), game.evaluate())
+
+    def tearDown(self):
+        pass
@@ -327,5 +327,186 @@ class TestPawn(unittest.TestCase):
         board[5][3] = 'Pw'
         self.assertEqual(figure2.get_possible_moves(board), ['d3', 'e3', 'f3'])
 
+        figure1 = figures.Pawn(4, 4, 'w')
+        board = [[' ' for i in range(8)] for j in range(8)]
+        board[3][4] = 'Pb'
+        board[3][5] = 'Bw'
+        board[5][4] = 'Pb'
+        board[5][5] = 'Pb'
+        self.assertEqual(figure1.get_possible_moves(board), ['e6', 'f6'])
+
+    def tearDown(self):
+        pass
+
+
+class TestSlots(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_slots(self):
+        king = figures.King(4, 0, 'b')
+        self.assertFalse(hasattr(king, '__dict__'))
+        self.assertEqual(king.label, 'Kb')
+        self.assertEqual(king.color, 'b')
+        self.assertEqual(king.value, 0)
+        with self.assertRaises(AttributeError):
+            king.score = 1
+        self.assertEqual(figures.Queen(0, 0, 'w').value, 8)
+        self.assertEqual(figures.Knight(0, 0, 'w').label, 'KNw')
+
+        king.has_moved = True
+        king.possible_moves = [(3, 0)]
+        copy = king.copy()
+        self.assertIsInstance(copy, figures.King)
+        self.assertEqual((copy.x, copy.y, copy.label, copy.has_moved),
+                         (4, 0, 'Kb', True))
+        self.assertEqual(copy.possible_moves, [(3, 0)])
+        self.assertIsNot(copy.possible_moves, king.possible_moves)
+
+        state = king.get_state()
+        self.assertEqual(state, (figures.King, 4, 0, 'Kb', ((3, 0),),
+                                 True, False))
+        restored = figures.Figure.from_state(state)
+        self.assertIsInstance(restored, figures.King)
+        self.assertEqual(restored.get_state(), state)
+        self.assertEqual(restored.possible_moves, [(3, 0)])
+
+    def tearDown(self):
+        pass
+
+
+class TestAttacks(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_get_attacks(self):
+        board = [[' ' for i in range(8)] for j in range(8)]
+        board[0][0] = 'Rw'
+        board[0][3] = 'Pw'
+        board[3][0] = 'Kb'
+        self.assertEqual(sorted(figures.Rook(0, 0, 'w').get_attacks(board)),
+                         [1, 2, 3, 8, 16, 24])
+        self.assertEqual(sorted(figures.Pawn(0, 3, 'w').get_attacks(board)),
+                         [33])
+        self.assertEqual(sorted(figures.Pawn(4, 3, 'b').get_attacks(board)),
+                         [19, 21])
+        self.assertEqual(figures.Pawn(4, 7, 'w').get_attacks(board), [])
+        self.assertEqual(len(figures.Knight(4, 4, 'b').get_attacks(board)), 8)
+        self.assertEqual(len(figures.King(0, 0, 'w').get_attacks(board)), 3)
+        self.assertEqual(sorted(figures.Bishop(2, 2, 'b').get_attacks(board)),
+                         [0, 4, 9, 11, 25, 27, 32, 36, 45, 54, 63])
+        self.assertEqual(len(figures.Queen(3, 3, 'w').get_attacks(board)), 27)
+        self.assertTrue(figures.Queen.SLIDING)
+        self.assertFalse(figures.Knight.SLIDING)
+
+    def test_attackers(self):
+        board = [[' ' for i in range(8)] for j in range(8)]
+        board[4][0] = 'Kw'
+        board[4][7] = 'Rb'
+        board[3][1] = 'Pb'
+        board[5][2] = 'KNb'
+        board[0][4] = 'Bb'
+        board[7][3] = 'Qb'
+        self.assertEqual(sorted(figures.attackers(board, 4, 'b')),
+                         [11, 21, 31, 60])
+        self.assertEqual(figures.attackers(board, 4, 'w'), [])
+        board[5][1] = 'Pw'
+        board[4][4] = 'Bw'
+        self.assertEqual(sorted(figures.attackers(board, 4, 'b')), [11, 21])
+        self.assertEqual(figures.attackers(board, 12, 'w'), [4])
+
+    def test_pins(self):
+        board = [[' ' for i in range(8)] for j in range(8)]
+        board[4][0] = 'Kw'
+        board[4][3] = 'Bw'
+        board[4][7] = 'Rb'
+        board[2][2] = 'KNw'
+        board[0][4] = 'Qb'
+        board[5][0] = 'Rw'
+        board[7][0] = 'Bb'
+        self.assertEqual(figures.pins(board, 4), {28: (0, 1), 18: (-1, 1)})
+        board[3][1] = 'Pb'
+        self.assertEqual(figures.pins(board, 4), {28: (0, 1)})
+
+    def test_tables(self):
+        self.assertEqual(figures.KNIGHT_TARGETS[0],
+                         ((2, 1, 10), (1, 2, 17)))
+        self.assertEqual(len(figures.KING_TARGETS[36]), 8)
+        self.assertEqual(figures.RAYS[0][0][-1], (0, 7, 56))
+        self.assertEqual(len(figures.DIAGONAL_RAYS[0][0]), 7)
+        self.assertEqual(figures.STRAIGHT_RAYS[63][1], ())
+        self.assertIn(63, figures.LINE[9][27])
+        self.assertEqual(figures.LINE[9][19], frozenset())
+        self.assertEqual(figures.SQUARE_NAMES[12], 'e2')
+        self.assertEqual(figures.SQUARES['e2'], 12)
+        self.assertEqual(figures.SQUARE_COORDINATES[12], (4, 1))
+
+    def test_between(self):
+        self.assertEqual(figures.between(4, 28), [12, 20])
+        self.assertEqual(figures.between(4, 25), [11, 18])
+        self.assertEqual(figures.between(4, 21), [])
+        self.assertEqual(figures.between(4, 13), [])
+
+    def tearDown(self):
+        pass
+
+
+class TestMailbox(unittest.TestCase):
+
+    def setUp(self):
+        self.board = [[' ' for i in range(8)] for j in range(8)]
+        for x, y, label in ((4, 0, 'Kw'), (0, 0, 'Rw'), (7, 0, 'Rw'),
+                            (3, 3, 'Qw'), (4, 4, 'Pw'), (3, 4, 'Pb'),
+                            (5, 5, 'KNb'), (2, 6, 'Bb'), (4, 7, 'Kb'),
+                            (6, 1, 'Pw'), (7, 6, 'Pb')):
+            self.board[x][y] = label
+        self.squares = [0] * 128
+        for sq in range(64):
+            self.squares[figures.to_mailbox(sq)] = figures.MAILBOX_CODES[
+                    self.board[sq % 8][sq // 8]]
+
+    def test_codes(self):
+        self.assertEqual(figures.to_mailbox(12), 0x14)
+        self.assertEqual(figures.from_mailbox(0x77), 63)
+        self.assertEqual(figures.MAILBOX_CODES['KNb'],
+                         figures.Knight.CODE | figures.MAILBOX_BLACK)
+        self.assertEqual(figures.MAILBOX_LABELS[figures.Pawn.CODE], 'Pw')
+        self.assertEqual(figures.MAILBOX_LABELS[0], ' ')
+        self.assertIs(figures.MAILBOX_CLASSES[figures.Rook.CODE],
+                      figures.Rook)
+
+    def test_get_mailbox_targets(self):
+        for sq in range(64):
+            x, y = sq % 8, sq // 8
+            label = self.board[x][y]
+            if label == ' ':
+                continue
+            cls = figures.MAILBOX_CLASSES[figures.MAILBOX_CODES[label] & 7]
+            fig = cls(x, y, label[-1])
+            targets = cls.get_mailbox_targets(self.squares,
+                                              figures.to_mailbox(sq))
+            if cls is figures.King:
+                fig.has_moved = True
+            self.assertEqual(sorted(figures.from_mailbox(target)
+                                    for target in targets),
+                             sorted(fig.get_targets(self.board)), label)
+        king = figures.King.get_mailbox_targets(self.squares, 4, False)
+        self.assertIn(2, king)
+        self.assertIn(6, king)
+        self.assertIn(0x53, figures.Pawn.get_mailbox_targets(self.squares,
+                                                             0x44))
+
+    def test_mailbox_attacked(self):
+        for sq in range(64):
+            for color in ('w', 'b'):
+                self.assertEqual(
+                        figures.mailbox_attacked(
+                            self.squares, figures.to_mailbox(sq),
+                            figures.MAILBOX_BLACK if color == 'b' else 0),
+                        bool(figures.attackers(self.board, sq, color)),
+                        (sq, color))
+
     def tearDown(self):
         pass
@@ -4,7 +4,8 @@ import unittest
 import sys
 import os
 sys.path.insert(1, os.path.dirname(__file__) + '/../client/src')
-from chess_game import Game
+from chess_game import Game, BitboardGame
+import chess_game
 
 
 class TestGameBeginning(unittest.TestCase):
@@ -43,6 +44,19 @@ class TestGameBeginning(unittest.TestCase):
         self.assertTrue(game.isMyMove())
         self.assertEqual(game.get_possible_moves()["e4"], [])
 
+    def test_start_template(self):
+        game = Game("w")
+        game.move("e2", "e4")
+        other = Game("b")
+        self.assertEqual(other.board[4][1], 'Pw')
+        self.assertEqual(other.white_figures[12].y, 1)
+        self.assertEqual(other.white_figures[12].possible_moves,
+                         [(4, 2), (4, 3)])
+        self.assertIsNot(other.white_figures[12],
+                         chess_game.WHITE_START_FIGURES[12])
+        self.assertEqual(other.hash, other.compute_hash())
+        self.assertEqual(other.board, Game("w").board)
+
     def tearDown(self):
         pass
 
@@ -143,8 +157,10 @@ class TestEat(unittest.TestCase):
                           ['Bw', 'Pw', ' ', ' ', ' ', ' ', 'Pb', 'Bb'],
                           ['KNw', 'Pw', ' ', ' ', ' ', ' ', 'Pb', 'KNb'],
                           ['Rw', 'Pw', ' ', ' ', ' ', ' ', 'Pb', 'Rb']])
-#        self.assertEqual(len(game1.white_figures), 16)
-#        self.assertEqual(len(game1.black_figures), 15)
+        self.assertEqual(len(game1.white_figures), 16)
+        self.assertEqual(len(game1.black_figures), 15)
+        self.assertEqual(game1.score, 1)
+        self.assertEqual(game2.get_score(), -1)
 
     def tearDown(self):
         pass
@@ -216,8 +232,28 @@ class TestEnPassant(unittest.TestCase):
                           ['Bw', 'Pw', ' ', ' ', ' ', ' ', 'Pb', 'Bb'],
                           ['KNw', 'Pw', ' ', ' ', ' ', ' ', ' ', 'KNb'],
                           ['Rw', ' ', 'Pb', ' ', ' ', ' ', 'Pb', 'Rb']])
-#        self.assertEqual(len(game1.white_figures), 15)
-#        self.assertEqual(len(game1.black_figures), 15)
+        self.assertEqual(len(game1.white_figures), 15)
+        self.assertEqual(len(game1.black_figures), 15)
+        self.assertEqual(game1.score, 0)
+
+    def test_edge_files(self):
+        # captures onto and from the a and h files
+        for fen, move in (("4k3/8/8/pP6/8/8/8/4K3 w - a6 0 1", "b5a6"),
+                          ("4k3/8/8/Pp6/8/8/8/4K3 w - b6 0 1", "a5b6"),
+                          ("4k3/8/8/6Pp/8/8/8/4K3 w - h6 0 1", "g5h6"),
+                          ("4k3/8/8/6pP/8/8/8/4K3 w - g6 0 1", "h5g6"),
+                          ("4k3/8/8/8/Pp6/8/8/4K3 b - a3 0 1", "b4a3"),
+                          ("4k3/8/8/8/6pP/8/8/4K3 b - h3 0 1", "g4h3")):
+            game = Game.from_fen(fen, fen.split()[1])
+            self.assertTrue(game.isPossibleMove(move[:2], move[2:]))
+            game.move_from_server(move[:2], move[2:])
+            self.assertEqual(len(game.white_figures)
+                             + len(game.black_figures), 3)
+        # the ceil behind the pawn is taken by a figure
+        game = Game.from_fen("4k3/8/3N4/3pP3/8/8/8/4K3 w - - 0 1")
+        self.assertEqual(sorted(game.legal_moves_from("e5")), ["e6"])
+        game = Game.from_fen("4k3/8/3n4/3pP3/8/8/8/4K3 w - - 0 1")
+        self.assertEqual(sorted(game.legal_moves_from("e5")), ["d6", "e6"])
 
     def tearDown(self):
         pass
@@ -422,3 +458,598 @@ class TestLeftRoque(unittest.TestCase):
 
     def tearDown(self):
         pass
+
+
+class TestMakeUnmakeMove(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_make_unmake_move(self):
+        game = Game("w")
+        for move in ("e2e4", "d7d5", "e4d5", "d8d5", "g1f3", "c8g4",
+                     "f1e2", "b8c6"):
+            self.assertTrue(game.move_from_server(move[:2], move[2:]))
+        board = [line[:] for line in game.board]
+        white = [(fig.label, fig.x, fig.y) for fig in game.white_figures]
+        black = [(fig.label, fig.x, fig.y) for fig in game.black_figures]
+        score = game.score
+
+        self.assertIsNotNone(game.make_move(4, 1, 6, 3))
+        self.assertEqual(len(game.black_figures), 14)
+        self.assertEqual(game.current_player, 'b')
+        self.assertEqual(game.score, score + 3)
+        game.make_move(3, 4, 5, 2)
+        self.assertEqual(len(game.white_figures), 14)
+        game.make_move(4, 0, 6, 0)
+        self.assertEqual(game.board[5][0], 'Rw')
+        self.assertEqual(game.undo_stack[-1][0].label, 'Kw')
+        for i in range(3):
+            game.unmake_move()
+
+        self.assertEqual(game.board, board)
+        self.assertEqual([(fig.label, fig.x, fig.y)
+                          for fig in game.white_figures], white)
+        self.assertEqual([(fig.label, fig.x, fig.y)
+                          for fig in game.black_figures], black)
+        self.assertEqual(game.score, score)
+        self.assertEqual(game.current_player, 'w')
+        self.assertFalse(game.white_figures[0].has_moved)
+
+        self.assertTrue(game.move("e1", "g1"))
+        self.assertEqual(game.board[5][0], 'Rw')
+        self.assertEqual(game.moves_history[-1], ("e1", "g1"))
+        game.cancel_move()
+        self.assertEqual(game.board, board)
+
+    def tearDown(self):
+        pass
+
+
+class TestHash(unittest.TestCase):
+
+    def setUp(self):
+        Game.debug_hash = True
+
+    def test_hash(self):
+        game = Game("w")
+        bitboard_game = BitboardGame("w")
+        start = game.hash
+        self.assertEqual(start, bitboard_game.hash)
+        for move in ("e2e4", "d7d5", "e4d5", "d8d5", "g1f3", "c8g4",
+                     "f1e2", "b8c6", "e1g1", "e8c8", "h2h4", "g7g5"):
+            self.assertTrue(game.move_from_server(move[:2], move[2:]))
+            self.assertTrue(bitboard_game.move_from_server(move[:2],
+                                                           move[2:]))
+            self.assertEqual(game.hash, bitboard_game.hash)
+        for move in game.moves_history:
+            game.cancel_move()
+        self.assertEqual(game.hash, start)
+
+        game1 = Game("w")
+        game2 = Game("w")
+        for move in ("g1f3", "g8f6", "b1c3"):
+            game1.move_from_server(move[:2], move[2:])
+        for move in ("b1c3", "g8f6", "g1f3"):
+            game2.move_from_server(move[:2], move[2:])
+        self.assertEqual(game1.hash, game2.hash)
+        game1.move_from_server("e7", "e5")
+        game2.move_from_server("e7", "e6")
+        game2.move_from_server("a2", "a3")
+        game2.move_from_server("e6", "e5")
+        self.assertNotEqual(game1.hash, game2.hash)
+
+    def test_debug_hash(self):
+        game = Game("w")
+        game.move_from_server("e2", "e4")
+        game.hash ^= 1
+        self.assertRaises(RuntimeError, game.move_from_server, "e7", "e5")
+
+    def tearDown(self):
+        Game.debug_hash = False
+
+
+class TestFen(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_from_fen(self):
+        game = Game.from_fen(chess_game.bitboard.START_FEN, "b")
+        start = Game("b")
+        self.assertEqual(game.board, start.board)
+        self.assertEqual([fig.label for fig in game.black_figures],
+                         [fig.label for fig in start.black_figures])
+        self.assertEqual(game.hash, start.hash)
+        self.assertEqual(game.to_fen(), chess_game.bitboard.START_FEN)
+        self.assertEqual(game.perft(2), 400)
+
+        fen = 'r3k2r/8/8/3pP3/8/8/8/R3K1R1 w Qk d6 0 12'
+        game = Game.from_fen(fen)
+        self.assertEqual(game.to_fen(), fen)
+        self.assertEqual(game.en_passant, (3, 5))
+        self.assertEqual(game.current_player, 'w')
+        self.assertEqual(game.score, 0)
+        king, rook_a, rook_g = game.white_figures[:3]
+        self.assertFalse(king.has_moved)
+        self.assertFalse(rook_a.has_moved)
+        self.assertTrue(rook_g.has_moved)
+        self.assertEqual([fig.has_moved for fig in game.black_figures[1:3]],
+                         [True, False])
+        self.assertTrue(game.black_figures[3].has_moved_two)
+        self.assertTrue(game.isPossibleMove('e5', 'd6'))
+        self.assertTrue(game.move('e1', 'c1'))
+        self.assertEqual(game.to_fen(),
+                         'r3k2r/8/8/3pP3/8/8/8/2KR2R1 b k - 1 12')
+        game.move_from_server('e8', 'g8')
+        self.assertEqual(game.fullmove_number, 13)
+        game.cancel_move()
+        self.assertEqual(game.fullmove_number, 12)
+
+        for fen in ('8/8/8/8/8/8/8/8 w - -', 'k7/8/8/8/8/8/8/K6K w - -',
+                    'k7/8/8/8/8/8/8/8 w - -'):
+            with self.assertRaises(ValueError):
+                Game.from_fen(fen)
+
+        game = BitboardGame.from_fen('4k3/8/8/8/8/8/8/RQ2K3 b - - 0 7')
+        self.assertEqual(game.score, 13)
+        self.assertEqual(game.current_player, 'b')
+        self.assertEqual(game.to_fen(), '4k3/8/8/8/8/8/8/RQ2K3 b - - 0 7')
+
+    def test_snapshot(self):
+        for game_class in (Game, BitboardGame):
+            game = game_class("w")
+            for move in ("e2e4", "d7d5", "e4d5"):
+                game.move_from_server(move[:2], move[2:])
+            snapshot = game.snapshot()
+            fen = game.to_fen()
+            hash_key = game.hash
+            for move in ("d8d5", "b1c3", "d5e5"):
+                game.move_from_server(move[:2], move[2:])
+            game.restore(snapshot)
+            self.assertEqual(game.to_fen(), fen)
+            self.assertEqual(game.hash, hash_key)
+            self.assertEqual(game.score, 1)
+            other = game_class("b")
+            other.restore(snapshot)
+            self.assertEqual(other.board, game.board)
+            self.assertEqual(other.get_possible_moves()["d8"],
+                             ["d5", "d6", "d7"])
+            self.assertTrue(other.move("d8", "d5"))
+            self.assertEqual(game.to_fen(), fen)
+
+        game = Game("w")
+        snapshot = game.snapshot()
+        self.assertEqual(hash(snapshot), hash(Game("w").snapshot()))
+        game.move_from_server("e2", "e4")
+        game.restore(snapshot)
+        self.assertEqual(game.undo_stack, [])
+        self.assertEqual(game.white_figures[12].possible_moves,
+                         [(4, 2), (4, 3)])
+        self.assertIsNot(game.white_figures[12].possible_moves,
+                         Game("w").white_figures[12].possible_moves)
+
+    def tearDown(self):
+        pass
+
+
+class TestMoveCache(unittest.TestCase):
+
+    def setUp(self):
+        chess_game.MOVE_CACHE.clear()
+
+    def test_lru(self):
+        cache = chess_game.MoveCache(max_bytes=1000)
+        cache.ENTRY_OVERHEAD = 300
+        self.assertIsNone(cache.get(1))
+        cache.put(1, ((1, 2),))
+        cache.put(2, ((3, 4),))
+        self.assertEqual(cache.get(1), ((1, 2),))
+        cache.put(3, ((5, 6),))
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(1), ((1, 2),))
+        self.assertEqual(cache.stats()['hits'], 2)
+        self.assertEqual(cache.stats()['misses'], 2)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertLessEqual(cache.size, 1000)
+        cache.clear()
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_game_cache(self):
+        cache = chess_game.MOVE_CACHE
+        game = Game("w")
+        moves = game.get_possible_moves()
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertEqual(Game("w").get_possible_moves(), moves)
+        self.assertTrue(game.isPossibleMove("e2", "e4"))
+        # isPossibleMove takes legal moves of the position from the cache
+        self.assertEqual(cache.stats()['hits'], 2)
+        self.assertEqual(cache.stats()['misses'], 1)
+        moves["e2"].append("e5")
+        self.assertFalse(game.isPossibleMove("e2", "e5"))
+
+        game.move_from_server("e2", "e4")
+        game.move_from_server("e7", "e5")
+        self.assertEqual(game.position_status(), chess_game.MOVE_NORMAL)
+        game.cancel_move()
+        game.cancel_move()
+        self.assertEqual(game.get_possible_moves()["e2"], ["e3", "e4"])
+
+        game = Game("b")
+        for move in ("f2f3", "e7e5", "g2g4"):
+            game.move_from_server(move[:2], move[2:])
+        Game.move_cache = None
+        try:
+            uncached = (game.legal_moves(), game.is_checkmate(),
+                        game.isWinMove("d8", "h4"))
+        finally:
+            Game.move_cache = cache
+        self.assertEqual((game.legal_moves(), game.is_checkmate(),
+                          game.isWinMove("d8", "h4")), uncached)
+        self.assertTrue(uncached[2])
+
+    def tearDown(self):
+        chess_game.MOVE_CACHE.clear()
+
+
+class TestAttackMaps(unittest.TestCase):
+
+    def setUp(self):
+        Game.debug_attacks = True
+
+    def test_attack_maps(self):
+        game = Game("w")
+        self.assertTrue(game.is_attacked(20, 'w'))
+        self.assertFalse(game.is_attacked(28, 'w'))
+        self.assertEqual(game.attackers(21), [6, 12, 14])
+        self.assertEqual(game.attackers(4), [3])
+        self.assertFalse(game.in_check())
+
+        for move in ("e2e4", "f7f6", "d1h5"):
+            game.move_from_server(move[:2], move[2:])
+        self.assertTrue(game.in_check())
+        self.assertTrue(game.is_attacked(60, 'w'))
+        self.assertEqual(game.attackers(60), [39, 59])
+        self.assertEqual(sorted(game.legal_moves()), [54 | 46 << 6])
+        game.move_from_server("g7", "g6")
+        self.assertTrue(game.is_attacked(46, 'w'))
+        self.assertFalse(game.is_attacked(60, 'w'))
+        while game.moves_history:
+            game.moves_history.pop()
+            game.cancel_move()
+        self.assertEqual(game.attackers(21), [6, 12, 14])
+
+        game = Game("w")
+        game.move_from_server("e2", "e4")
+        game.in_check()
+        game.cancel_move()
+        self.assertEqual(game.attackers(28), [])
+        game.move_from_server("e2", "e4")
+        game.attack_counts['w'][0] += 1
+        self.assertRaises(RuntimeError, game.move_from_server, "e7", "e5")
+
+    def test_roque_through_attack(self):
+        game = Game.from_fen('4k3/8/8/8/8/8/8/1r2K2R w K - 0 1')
+        self.assertTrue(game.in_check())
+        self.assertIn(4 | 6 << 6, game.legal_moves())
+        self.assertNotIn(4 | 5 << 6, game.legal_moves())
+        game = Game.from_fen('4k3/8/8/8/8/8/6r1/4K2R w K - 0 1')
+        self.assertNotIn(4 | 6 << 6, game.legal_moves())
+
+    def tearDown(self):
+        Game.debug_attacks = False
+
+
+class TestDirtyMoves(unittest.TestCase):
+
+    def setUp(self):
+        Game.debug_moves = True
+
+    def test_dirty_moves(self):
+        game = Game("w")
+        for move in ("e2e4", "d7d5", "e4e5", "f7f5", "g1f3", "b8c6",
+                     "f1c4", "g8f6", "e1g1", "d5c4", "e5f6"):
+            self.assertTrue(game.move_from_server(move[:2], move[2:]))
+        self.assertEqual(game.dirty_squares, set())
+        self.assertEqual(game.black_figures[0].possible_moves,
+                         [(3, 6), (5, 6)])
+        while game.undo_stack:
+            game.cancel_move()
+        self.assertEqual(
+                {(fig.x, fig.y): fig.possible_moves
+                 for fig in game.white_figures + game.black_figures},
+                {(fig.x, fig.y): fig.possible_moves
+                 for fig in Game("w").white_figures
+                 + Game("w").black_figures})
+
+        game.make_move(1, 0, 2, 2)
+        self.assertEqual(game.dirty_squares, {1, 18})
+        self.assertEqual(game.update_dirty_possible_moves(), 7)
+        game.make_move(1, 6, 1, 4)
+        game.white_figures[-1].possible_moves = []
+        self.assertRaises(RuntimeError, game.update_dirty_possible_moves)
+
+    def tearDown(self):
+        Game.debug_moves = False
+
+
+class TestLegalMoves(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_legal_moves(self):
+        game = Game("w")
+        for move in ("e2e4", "e7e5", "d2d4", "f8b4"):
+            game.move_from_server(move[:2], move[2:])
+        self.assertTrue(game.is_king_attacked("w"))
+        self.assertEqual(sorted(game.legal_moves()),
+                         [1 | 11 << 6, 2 | 11 << 6, 3 | 11 << 6,
+                          4 | 12 << 6, 1 | 18 << 6, 10 | 18 << 6])
+        game.move_from_server("b1", "c3")
+        game.move_from_server("a7", "a6")
+        self.assertFalse(game.is_king_attacked("w"))
+        moves = game.legal_moves()
+        self.assertNotIn(18 | 33 << 6, moves)
+        self.assertIn(9 | 17 << 6, moves)
+        self.assertEqual(len(moves), 33)
+
+        for move in moves:
+            game.make_packed_move(move)
+            self.assertFalse(game.is_king_attacked("w"))
+            game.unmake_move()
+
+    def tearDown(self):
+        pass
+
+
+class TestClassifyMove(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_classify_move(self):
+        for game_class in (Game, BitboardGame):
+            game = game_class("w")
+            self.assertEqual(game.classify_move("e2", "e5"),
+                             (chess_game.MOVE_ILLEGAL, 0))
+            self.assertEqual(game.classify_move("e7", "e5"),
+                             (chess_game.MOVE_ILLEGAL, 0))
+            self.assertEqual(game.classify_move("z2", "e4"),
+                             (chess_game.MOVE_ILLEGAL, 0))
+            self.assertEqual(game.classify_move("e2", "e4"),
+                             (chess_game.MOVE_NORMAL, 0))
+            for move in ("e2e4", "d7d5", "f1b5"):
+                game.move_from_server(move[:2], move[2:])
+            game.player = "b"
+            self.assertEqual(game.classify_move("d5", "e4"),
+                             (chess_game.MOVE_ILLEGAL, 0))
+            self.assertEqual(game.classify_move("c7", "c6"),
+                             (chess_game.MOVE_NORMAL, 0))
+            game.player = "w"
+            game.move_from_server("c7", "c6")
+            self.assertEqual(game.classify_move("b5", "c6"),
+                             (chess_game.MOVE_CHECK, 1))
+            self.assertEqual(game.board[1][4], "Bw")
+
+            game = game_class("b")
+            for move in ("g2g4", "e7e5", "f2f3"):
+                game.move_from_server(move[:2], move[2:])
+            self.assertEqual(game.classify_move("d8", "h4"),
+                             (chess_game.MOVE_CHECKMATE, 0))
+
+            game = game_class("w")
+            for move in ("e2e3", "a7a5", "d1h5", "a8a6", "h5a5", "h7h5",
+                         "h2h4", "a6h6", "a5c7", "f7f6", "c7d7", "e8f7",
+                         "d7b7", "d8d3", "b7b8", "d3h7", "b8c8", "f7g6"):
+                game.move_from_server(move[:2], move[2:])
+            self.assertEqual(game.classify_move("c8", "e6"),
+                             (chess_game.MOVE_STALEMATE, 0))
+
+    def tearDown(self):
+        pass
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.story = ["e2e4:", "d7d5:", "e4d5:", "d8d5:", "g1f3:", "c8g4:",
+                      "f1e2:", "b8c6:", "e1g1:", "e8c8:", "h2h4:", "g7g5:"]
+
+    def test_parse_move(self):
+        self.assertEqual(chess_game.parse_move("e2e4:"), ("e2", "e4"))
+        self.assertEqual(chess_game.parse_move("d8h4:win"), ("d8", "h4"))
+        self.assertEqual(chess_game.parse_move(("e7", "e5")), ("e7", "e5"))
+        self.assertIsNone(chess_game.parse_move("give_up"))
+        self.assertIsNone(chess_game.parse_move("draw"))
+
+    def test_replay(self):
+        expected = Game("w")
+        for move in self.story:
+            expected.move_from_server(move[:2], move[2:4])
+        for trusted in (True, False):
+            game = Game("w")
+            snapshots = game.replay(self.story + ["give_up"], trusted,
+                                    plies=(0, 4, 12, 20))
+            self.assertEqual(sorted(snapshots), [0, 4, 12])
+            self.assertEqual(game.board, expected.board)
+            self.assertEqual(game.snapshot(), expected.snapshot())
+            self.assertEqual(game.moves_history, expected.moves_history)
+            self.assertEqual(game.get_possible_moves(),
+                             expected.get_possible_moves())
+            self.assertEqual(snapshots[0], Game("w").snapshot())
+
+            game = Game("w")
+            game.restore(snapshots[4])
+            game.replay(self.story[4:])
+            self.assertEqual(game.snapshot(), expected.snapshot())
+            game.cancel_move()
+            self.assertEqual(game.board[6][6], "Pb")
+            self.assertTrue(game.move_from_server("g7", "g6"))
+
+    def test_untrusted(self):
+        game = Game("w")
+        with self.assertRaises(ValueError):
+            game.replay(["e2e4", "e7e5", "e4e5"], trusted=False)
+        self.assertEqual(game.moves_history, [("e2", "e4"), ("e7", "e5")])
+
+    def test_backends(self):
+        expected = Game("w")
+        expected.replay(self.story)
+        for backend in ("bitboard", "mailbox", "diff:mailbox"):
+            game = chess_game.new_game("w", backend)
+            self.assertEqual(sorted(game.replay(self.story, plies=(1,))),
+                             [1])
+            self.assertEqual(game.board, expected.board)
+            self.assertEqual(game.moves_history, expected.moves_history)
+
+    def tearDown(self):
+        pass
+
+
+class TestLazyMoves(unittest.TestCase):
+
+    def setUp(self):
+        chess_game.MOVE_CACHE.clear()
+
+    def test_iter_legal_moves(self):
+        for cache in (None, chess_game.MOVE_CACHE):
+            Game.move_cache = cache
+            try:
+                game = Game("w")
+                moves = game.iter_legal_moves()
+                first = next(moves)
+                self.assertEqual(len(chess_game.MOVE_CACHE), 0)
+                self.assertIn(first, game.legal_moves())
+                self.assertEqual(sorted(game.iter_legal_moves()),
+                                 sorted(game.legal_moves()))
+                self.assertEqual(list(game.iter_legal_moves(12)),
+                                 [12 | 20 << 6, 12 | 28 << 6])
+                self.assertEqual(list(game.iter_legal_moves(4)), [])
+                self.assertTrue(game.has_legal_move())
+            finally:
+                Game.move_cache = chess_game.MOVE_CACHE
+
+    def test_legal_moves_from(self):
+        game = Game.from_fen("4k3/8/8/8/8/8/4r3/4K2R w K - 0 1")
+        self.assertEqual(sorted(game.legal_moves_from("e1")),
+                         ["d1", "e2", "f1", "g1"])
+        self.assertEqual(list(game.legal_moves_from("h1")), [])
+        self.assertEqual(list(game.legal_moves_from("e2")), [])
+        self.assertEqual(list(game.legal_moves_from("z9")), [])
+        for backend in ("bitboard", "mailbox", "diff:mailbox"):
+            other = chess_game.new_game("w", backend)
+            self.assertEqual(sorted(other.legal_moves_from("g1")),
+                             ["f3", "h3"])
+            self.assertEqual(list(other.legal_moves_from("g8")), [])
+
+    def test_is_possible_move(self):
+        # the Rook is pinned, roque goes through the attacked ceil
+        fen = "4k3/4r3/8/8/8/8/4R3/4K2R w K - 0 1"
+        for game_class in chess_game.BACKENDS.values():
+            game = game_class.from_fen(fen)
+            self.assertTrue(game.isPossibleMove("e2", "e7"))
+            self.assertFalse(game.isPossibleMove("e2", "d2"))
+            self.assertFalse(game.isWinMove("e2", "d2"))
+            self.assertTrue(game.isPossibleMove("e1", "g1"))
+        game = Game.from_fen("4k3/8/8/8/8/8/6r1/4K2R w K - 0 1")
+        self.assertFalse(game.isPossibleMove("e1", "g1"))
+
+    def test_is_draw(self):
+        game = Game("w")
+        for move in ("e2e3", "a7a5", "d1h5", "a8a6", "h5a5", "h7h5",
+                     "h2h4", "a6h6", "a5c7", "f7f6", "c7d7", "e8f7",
+                     "d7b7", "d8d3", "b7b8", "d3h7", "b8c8", "f7g6",
+                     "c8e6"):
+            self.assertFalse(game.is_draw())
+            game.move_from_server(move[:2], move[2:])
+        self.assertTrue(game.is_draw())
+        self.assertFalse(game.has_legal_move())
+        self.assertFalse(game.is_checkmate())
+        self.assertEqual(game.position_status(), chess_game.MOVE_STALEMATE)
+
+    def tearDown(self):
+        Game.move_cache = chess_game.MOVE_CACHE
+        chess_game.MOVE_CACHE.clear()
+
+
+class TestDrawRules(unittest.TestCase):
+
+    def setUp(self):
+        self.shuffle = ("g1f3", "g8f6", "f3g1", "f6g8",
+                        "g1f3", "g8f6", "f3g1")
+
+    def test_repetition(self):
+        for backend in ("figures", "bitboard", "mailbox", "diff:mailbox"):
+            game = chess_game.new_game("b", backend)
+            game.replay(self.shuffle)
+            self.assertFalse(game.isDrawMove("f6", "h5"))
+            self.assertTrue(game.isDrawMove("f6", "g8"))
+            self.assertEqual(game.classify_move("f6", "g8"),
+                             (chess_game.MOVE_REPETITION, 0))
+            self.assertEqual(game.classify_move("f6", "h5"),
+                             (chess_game.MOVE_NORMAL, 0))
+
+        # en passant nobody can make doesn't change the position
+        for backend in ("figures", "bitboard", "mailbox", "diff:mailbox"):
+            game = chess_game.new_game("w", backend)
+            game.replay(("e2e4", "g8f6", "g1f3", "f6g8", "f3g1",
+                         "g8f6", "g1f3", "f6g8"))
+            self.assertEqual(game.classify_move("f3", "g1"),
+                             (chess_game.MOVE_REPETITION, 0))
+        for game_class in chess_game.BACKENDS.values():
+            fen = "4k3/8/8/8/3pP3/8/8/4K3 b - {} 0 1"
+            self.assertNotEqual(game_class.from_fen(fen.format("e3")).hash,
+                                game_class.from_fen(fen.format("-")).hash)
+            fen = "4k3/8/8/8/4P3/8/8/4K3 b - {} 0 1"
+            self.assertEqual(game_class.from_fen(fen.format("e3")).hash,
+                             game_class.from_fen(fen.format("-")).hash)
+
+        game = Game("w")
+        game.replay(self.shuffle + ("f6g8",))
+        self.assertTrue(game.is_repetition())
+        self.assertTrue(game.is_draw())
+        self.assertEqual(game.position_status(), chess_game.MOVE_REPETITION)
+        self.assertEqual(game.repetitions[game.hash], 3)
+        self.assertEqual(game.halfmove_clock, 8)
+        game.cancel_move()
+        self.assertFalse(game.is_draw())
+        self.assertEqual(sorted(game.repetitions.values()), [2, 2, 2, 2])
+        self.assertEqual(game.repetitions[Game("w").hash], 2)
+        game.replay(["f6e4", "e2e3"])
+        self.assertEqual(game.halfmove_clock, 0)
+
+    def test_fifty_moves(self):
+        fen = "7k/8/5K2/8/8/8/8/6Q1 w - - 99 80"
+        for backend in ("figures", "bitboard", "mailbox"):
+            game = chess_game.BACKENDS[backend].from_fen(fen)
+            self.assertEqual(game.to_fen(), fen)
+            self.assertEqual(game.classify_move("g1", "g2"),
+                             (chess_game.MOVE_FIFTY_MOVES, 0))
+            self.assertTrue(game.isDrawMove("g1", "g2"))
+            self.assertEqual(game.classify_move("g1", "g7"),
+                             (chess_game.MOVE_CHECKMATE, 0))
+            self.assertFalse(game.isDrawMove("g1", "g7"))
+
+        game = Game.from_fen(fen)
+        game.make_move(6, 0, 6, 6)
+        self.assertTrue(game.is_fifty_moves())
+        self.assertTrue(game.is_checkmate())
+        self.assertFalse(game.is_draw())
+        self.assertEqual(game.position_status(), chess_game.MOVE_CHECKMATE)
+        game.unmake_move()
+        self.assertEqual(game.halfmove_clock, 99)
+        self.assertEqual(game.repetitions, {game.hash: 1})
+
+    def test_snapshot(self):
+        game = Game("w")
+        game.replay(self.shuffle)
+        snapshot = game.snapshot()
+        game.restore(snapshot)
+        self.assertEqual(game.halfmove_clock, 7)
+        self.assertEqual(game.repetitions, {game.hash: 1})
+        self.assertEqual(game.snapshot(), snapshot)
+
+    def tearDown(self):
+        pass
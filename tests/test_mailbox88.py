@@ -0,0 +1,125 @@
+"""Test of mailbox88 module"""
+
+import unittest
+import sys
+import os
+sys.path.insert(1, os.path.dirname(__file__) + '/../client/src')
+import figures
+import mailbox88
+from chess_game import Game, MailboxGame
+
+
+class TestPosition(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_initial(self):
+        position = mailbox88.Position.initial()
+        game = Game('w')
+        self.assertEqual(position.to_board(), game.board)
+        self.assertEqual(position.hash, game.hash)
+        self.assertEqual(position.kings, [0x04, 0x74])
+        self.assertEqual(len(position.squares), 128)
+        self.assertEqual(sorted(position.pieces[1]),
+                         list(range(0x60, 0x68)) + list(range(0x70, 0x78)))
+        self.assertEqual(len(position.legal_moves()), 20)
+        self.assertEqual(position.perft(3), 8902)
+
+    def test_make_unmake(self):
+        position = mailbox88.Position.initial()
+        squares = position.squares.tobytes()
+        for move in position.legal_moves():
+            position.make_move(move)
+            self.assertEqual(position.hash, position.compute_hash())
+            for reply in position.legal_moves():
+                position.make_move(reply)
+                self.assertEqual(position.hash, position.compute_hash())
+                position.unmake_move()
+            position.unmake_move()
+        self.assertEqual(position.squares.tobytes(), squares)
+        self.assertEqual(position.hash, Game('w').hash)
+        self.assertEqual(position.history, [])
+
+    def test_legacy_rules(self):
+        fen = 'r3k2r/8/8/3pP3/8/8/8/R3K1R1 w Qk d6 0 12'
+        position = mailbox88.Position.from_fen(fen)
+        self.assertEqual(position.to_fen(), fen)
+        self.assertEqual(position.perft_divide(2),
+                         Game.from_fen(fen).perft_divide(2))
+        self.assertEqual(position.king_moved, [False, False])
+
+        position = mailbox88.Position.from_fen(
+                '4k3/8/8/8/8/8/8/1r2K2R w K - 0 1')
+        self.assertTrue(position.in_check())
+        self.assertIn('e1g1', position.perft_divide(1))
+        self.assertNotIn('e1f1', position.perft_divide(1))
+
+        position = mailbox88.Position.from_fen(
+                '4k3/8/8/3pP3/8/8/8/4K3 w - - 0 1')
+        move = position.find_move(0x44, 0x53)
+        self.assertEqual(position.make_move(move),
+                         figures.MAILBOX_CODES['Pb'])
+        self.assertEqual(position.squares[0x43], 0)
+        self.assertEqual(position.score, 1)
+        self.assertEqual(position.pieces[1], [0x74])
+        position.unmake_move()
+        self.assertEqual(position.squares[0x43], figures.MAILBOX_CODES['Pb'])
+
+        for fen in ('8/8/8/8/8/8/8/8 w - -', 'k7/8/8/8/8/8/8/K6K w - -'):
+            with self.assertRaises(ValueError):
+                mailbox88.Position.from_fen(fen)
+
+    def test_snapshot(self):
+        position = mailbox88.Position.initial()
+        position.make_move(position.find_move(0x14, 0x34))
+        snapshot = position.snapshot()
+        position.make_move(position.find_move(0x64, 0x44))
+        position.restore(snapshot)
+        self.assertEqual(position.snapshot(), snapshot)
+        self.assertEqual(sorted(position.pieces[0]),
+                         sorted(mailbox88.Position.initial().pieces[0][:12]
+                                + [0x34] + [0x15, 0x16, 0x17]))
+        self.assertEqual(position.history, [])
+
+    def tearDown(self):
+        pass
+
+
+class TestMailboxGame(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_game_beginning(self):
+        game = MailboxGame('w')
+        self.assertEqual(game.get_possible_moves(),
+                         Game('w').get_possible_moves())
+        self.assertTrue(game.isPossibleMove('e2', 'e4'))
+        self.assertFalse(game.isPossibleMove('e2', 'e5'))
+        self.assertTrue(game.move('e2', 'e4'))
+        self.assertFalse(game.move('e7', 'e5'))
+        self.assertEqual(game.get_possible_moves(), [])
+        self.assertEqual(game.handle_move(4, 6, 4, 3), 'IMPOSSIBLE MOVE')
+        self.assertEqual(game.handle_move(3, 6, 3, 4), 0)
+        self.assertEqual(game.handle_move(4, 3, 3, 4), 1)
+        self.assertEqual(game.get_score(), 1)
+        game.cancel_move()
+        self.assertEqual(game.score, 0)
+        self.assertEqual(game.current_player, 'w')
+        self.assertEqual(game.board[3][4], 'Pb')
+
+    def test_win(self):
+        game = MailboxGame('b')
+        for move in ('g2g4', 'e7e5', 'f2f3'):
+            game.move_from_server(move[:2], move[2:])
+        self.assertFalse(game.isDrawMove('d8', 'h4'))
+        self.assertTrue(game.isWinMove('d8', 'h4'))
+        self.assertEqual(game.classify_move('d8', 'h4'), ('checkmate', 0))
+        self.assertTrue(game.move('d8', 'h4'))
+        self.assertTrue(game.position.is_checkmate())
+        self.assertEqual(game.to_fen(), 'rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/'
+                         'PPPPP2P/RNBQKBNR w KQkq - 1 3')
+
+    def tearDown(self):
+        pass
@@ -0,0 +1,109 @@
+"""Test of parallel module"""
+
+import io
+import unittest
+import sys
+import os
+from contextlib import redirect_stdout
+from unittest.mock import MagicMock, patch
+sys.path.insert(1, os.path.dirname(__file__) + '/../client/src')
+import engine
+import parallel
+from chess_game import Game
+
+
+class TestSharedTable(unittest.TestCase):
+
+    def setUp(self):
+        self.table = parallel.SharedTable.create(1000)
+
+    def test_entries(self):
+        self.assertEqual(self.table.entries, 512)
+        key = (0x123456789abcdef0, False, True)
+        self.assertIsNone(self.table.get(key))
+        self.table[key] = (5, -engine.MATE + 3, engine.UPPER, 4095)
+        self.assertEqual(self.table.get(key),
+                         (5, -engine.MATE + 3, engine.UPPER, 4095))
+        self.assertIsNone(self.table.get((key[0], False, False)))
+        self.table[key] = (300, 17, engine.EXACT, 0)
+        self.assertEqual(self.table.get(key), (255, 17, engine.EXACT, 0))
+        self.table.clear()
+        self.assertIsNone(self.table.get(key))
+
+    def test_torn_slot(self):
+        key = (12345, True, True)
+        self.table[key] = (1, 2, engine.LOWER, 3)
+        offset = (parallel.table_key(key) & 511) * parallel.SLOT.size
+        self.table.memory.buf[offset + 8] ^= 1
+        self.assertIsNone(self.table.get(key))
+
+    def test_attach(self):
+        other = parallel.SharedTable.attach(self.table.memory.name)
+        try:
+            self.table[(7, False, False)] = (2, 0, engine.EXACT, 1)
+            self.assertEqual(other.get((7, False, False)),
+                             (2, 0, engine.EXACT, 1))
+        finally:
+            other.close()
+
+    def test_engine(self):
+        game = Game.from_fen('r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/'
+                             'PPPP1PPP/RNB1K1NR w KQkq - 4 4')
+        result = engine.Engine(None, self.table).search(game, depth=2)
+        self.assertEqual(result.move, 'h5f7')
+        self.assertEqual(result.pv, ['h5f7'])
+
+    def tearDown(self):
+        self.table.close()
+        self.table.unlink()
+
+
+class TestParallelEngine(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_search(self):
+        game = Game.from_fen('6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1')
+        with parallel.ParallelEngine(2, 1 << 12) as search:
+            result = search.search(game, depth=3)
+            self.assertEqual(result.move, 'd1d8')
+            self.assertEqual(result.score, engine.MATE - 1)
+            search.clear()
+            result = search.search(Game('w'), 0.2)
+            self.assertGreaterEqual(result.depth, 1)
+        # workers start at different depths, the first one at depth 1
+        with parallel.ParallelEngine(3, 1 << 12) as search:
+            result = search.search(Game('w'), depth=3)
+            self.assertEqual(result.depth, 3)
+            self.assertEqual(search.stop_flag.value, 1)
+            result = search.search(Game('w'), 0.1)
+            self.assertGreaterEqual(result.depth, 1)
+            self.assertEqual(search.stop_flag.value, 0)
+        self.assertEqual(game.to_fen(), '6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - '
+                                        '0 1')
+
+    def test_no_iteration(self):
+        with parallel.ParallelEngine(1, 1 << 12) as search:
+            search.pool.map = MagicMock(return_value=[None])
+            self.assertIsNone(search.search(Game('w'), 0.1))
+        out = io.StringIO()
+        with patch.object(parallel.ParallelEngine, 'search',
+                          return_value=None):
+            self.assertEqual(parallel.scaling_report(max_workers=1,
+                                                     out=out), {})
+            with redirect_stdout(out):
+                self.assertEqual(parallel.main(['--workers', '1']), 1)
+        self.assertEqual(out.getvalue(), ' 1 workers completed no '
+                                         'iteration\nno completed '
+                                         'iteration\n')
+
+    def test_scaling_report(self):
+        out = io.StringIO()
+        times = parallel.scaling_report(depth=2, max_workers=2, out=out)
+        self.assertEqual(list(times), [1, 2])
+        self.assertTrue(all(nodes > 0 for _, nodes in times.values()))
+        self.assertEqual(out.getvalue().count('depth 2 in'), 2)
+
+    def tearDown(self):
+        pass
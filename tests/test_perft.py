@@ -0,0 +1,94 @@
+"""Test of perft module"""
+
+import io
+import unittest
+import sys
+import os
+sys.path.insert(1, os.path.dirname(__file__) + '/../client/src')
+import bitboard
+import perft
+from chess_game import Game, BitboardGame
+
+
+class TestPerft(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_game_perft(self):
+        game = Game('w')
+        self.assertEqual(game.perft(1), 20)
+        self.assertEqual(game.perft(2), 400)
+        self.assertEqual(game.perft_divide(2),
+                         BitboardGame('w').perft_divide(2))
+        self.assertEqual(game.board, Game('w').board)
+        self.assertEqual(game.undo_stack, [])
+
+    def test_from_fen(self):
+        position = bitboard.Position.from_fen(bitboard.START_FEN)
+        initial = bitboard.Position.initial()
+        self.assertEqual(position.squares, initial.squares)
+        self.assertEqual(position.hash, initial.hash)
+        position = bitboard.Position.from_fen(perft.POSITIONS[1][1])
+        self.assertEqual(position.castling, bitboard.CASTLE_ALL)
+        self.assertEqual(position.squares[4], bitboard.KING)
+        position = bitboard.Position.from_fen(
+                '8/8/8/3pP3/8/8/8/K6k w - d6 0 1')
+        self.assertEqual(position.ep_square, 43)
+        self.assertEqual(position.perft_divide(1)['e5d6'], 1)
+        for fen in ('', '8/8/8/8/8/8/8 w - -', '9/8/8/8/8/8/8/8 w - -',
+                    '8/8/8/8/8/8/8/8 x - -', '8/8/8/8/8/8/8/8 w X -',
+                    '8/8/8/8/8/8/8/8 w - z9', '8/8/8/8/8/8/8/8 w - - 0 0'):
+            with self.assertRaises(ValueError):
+                bitboard.Position.from_fen(fen)
+
+    def test_to_fen(self):
+        for _, fen, _ in perft.POSITIONS:
+            self.assertEqual(bitboard.Position.from_fen(fen).to_fen(), fen)
+        position = bitboard.Position.initial()
+        position.make_move(position.find_move(12, 28))
+        self.assertEqual(position.to_fen(), 'rnbqkbnr/pppppppp/8/8/4P3/8/'
+                         'PPPP1PPP/RNBQKBNR b KQkq e3 0 1')
+        position.make_move(position.find_move(62, 45))
+        self.assertEqual(position.to_fen(), 'rnbqkb1r/pppppppp/5n2/8/4P3/8/'
+                         'PPPP1PPP/RNBQKBNR w KQkq - 1 2')
+        position.unmake_move()
+        self.assertEqual(position.fullmove_number, 1)
+
+    def test_suite(self):
+        out = io.StringIO()
+        self.assertEqual(perft.run_suite('bitboard', 2, out=out), [])
+        self.assertEqual(out.getvalue().count(' ok'), 2 * len(perft.POSITIONS))
+        out = io.StringIO()
+        self.assertEqual(perft.run_suite('figures', 2,
+                                         ['startpos', 'kiwipete',
+                                          'position3', 'position6'],
+                                         out=out), [])
+        self.assertIn('kiwipete   skipped', out.getvalue())
+        self.assertEqual(out.getvalue().count(' ok'), 6)
+        out = io.StringIO()
+        self.assertEqual(perft.run_suite('mailbox', 2,
+                                         ['startpos', 'kiwipete',
+                                          'position3', 'position6'],
+                                         out=out), [])
+        self.assertIn('kiwipete   skipped', out.getvalue())
+        self.assertEqual(out.getvalue().count(' ok'), 6)
+        # legacy rules differ from the standard ones at depth 4
+        self.assertEqual(perft.run_suite('mailbox', 4, ['position3'],
+                                         out=io.StringIO()), [])
+        self.assertEqual(perft.LEGACY_COUNTS['position3'][:3],
+                         perft.POSITIONS[2][2][:3])
+
+    def test_divergence(self):
+        positions = perft.POSITIONS
+        perft.POSITIONS = (('startpos', bitboard.START_FEN, (20, 401)),)
+        try:
+            out = io.StringIO()
+            self.assertEqual(perft.run_suite('bitboard', 2, out=out),
+                             [('startpos', 2, 400, 401)])
+            self.assertIn('FAILED', out.getvalue())
+        finally:
+            perft.POSITIONS = positions
+
+    def tearDown(self):
+        pass
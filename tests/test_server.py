@@ -4,13 +4,16 @@
 import os
 import sys
 sys.path.insert(1, os.path.dirname(__file__) + '/../server/src/')
+sys.path.insert(1, os.path.dirname(__file__) + '/../client/src')
 import server.src.chess_server as chess_server
+import asyncio
 import unittest
 from unittest.mock import AsyncMock, MagicMock
 from server.src.clients_info import ClientsInfo
 from server.src.user_info import UserInfo
 from server.src.games import GamesDict
 from server.src.game_history import GameHistory
+from server.src.computer import ComputerOpponent, COMPUTER_NAME
 
 
 class TestGetMsgNum(unittest.TestCase):
@@ -663,3 +666,179 @@ class TestGiveUpCommand(unittest.IsolatedAsyncioTestCase):
             "opponent_give_up")
         self.assertFalse(chess_server.users["5"].isPlay)
         self.assertFalse(chess_server.users["6"].isPlay)
+
+
+class TestComputerCommands(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        pass
+
+    async def asyncSetUp(self):
+        chess_server.send_msg = AsyncMock()
+        chess_server.dump_game_history = MagicMock()
+        chess_server.users = {}
+        chess_server.clients = {}
+        chess_server.games = GamesDict()
+        chess_server.game_history = GameHistory()
+        chess_server.computer = ComputerOpponent(workers=1, max_games=1)
+
+        chess_server.clients["me1"] = ClientsInfo()
+        for name in ("5", "6"):
+            chess_server.users[name] = UserInfo(name)
+            chess_server.users[name].IP = "me" + name
+            chess_server.users[name].isOnline = True
+            chess_server.clients["me" + name] = ClientsInfo()
+            chess_server.clients["me" + name].user_name = name
+
+        chess_server.random.randint = MagicMock(return_value=0)
+        chess_server.print = MagicMock()
+
+    async def get_message(self, me):
+        return await asyncio.wait_for(chess_server.clients[me].queue.get(),
+                                      10)
+
+    async def test_registre_computer(self):
+        await chess_server.registre(COMPUTER_NAME, "writer", "command_num")
+        chess_server.send_msg.assert_called_with(
+            "writer", "command_num", "registre_not")
+        self.assertNotIn(COMPUTER_NAME, chess_server.users)
+
+    async def test_start_game(self):
+        await chess_server.play_computer("me1", "writer", "comand_num")
+        chess_server.send_msg.assert_called_with(
+            "writer", "comand_num", "you_dont_login")
+
+        await chess_server.play_computer("me5", "writer", "comand_num", "1")
+        chess_server.send_msg.assert_called_with(
+            "writer", "comand_num", "start_game 0")
+        self.assertTrue(chess_server.users["5"].isPlay)
+        self.assertEqual(chess_server.games["5"].get_opponent("5"),
+                         COMPUTER_NAME)
+        self.assertEqual(chess_server.computer.games["5"][0], 1.0)
+
+        await chess_server.play_computer("me5", "writer", "comand_num")
+        chess_server.send_msg.assert_called_with(
+            "writer", "comand_num", "now_you_play")
+        await chess_server.play_computer("me6", "writer", "comand_num")
+        chess_server.send_msg.assert_called_with(
+            "writer", "comand_num", "computer_busy")
+        self.assertFalse(chess_server.users["6"].isPlay)
+
+    async def test_computer_moves_first(self):
+        chess_server.random.randint = MagicMock(return_value=1)
+        await chess_server.play_computer("me5", "writer", "comand_num",
+                                         "0.2")
+        chess_server.send_msg.assert_called_with(
+            "writer", "comand_num", "start_game 1")
+        message = await self.get_message("me5")
+        self.assertRegex(message, "^opponent_get_move [a-h][1-8][a-h][1-8]"
+                                  ":ok$")
+        self.assertEqual(chess_server.games["5"].get_game_story(),
+                         [[COMPUTER_NAME, message.split()[1]]])
+
+    async def test_computer_moves_first_busy(self):
+        chess_server.random.randint = MagicMock(return_value=1)
+        chess_server.computer.request_move = MagicMock(return_value=False)
+        await chess_server.play_computer("me5", "writer", "comand_num",
+                                         "0.2")
+        chess_server.send_msg.assert_called_once_with(
+            "writer", "comand_num", "computer_busy")
+        self.assertFalse(chess_server.users["5"].isPlay)
+        self.assertEqual(chess_server.computer.games, {})
+        self.assertFalse(chess_server.computer.is_full())
+        with self.assertRaises(KeyError):
+            chess_server.games["5"]
+
+    async def test_move(self):
+        await chess_server.play_computer("me5", "writer", "comand_num",
+                                         "0.2")
+        await chess_server.move_command("me5", "writer", "e2e4:ok",
+                                        "comand_num")
+        chess_server.send_msg.assert_called_with(
+            "writer", "comand_num", "you_get_move")
+        message = await self.get_message("me5")
+        self.assertTrue(message.startswith("opponent_get_move "))
+        story = chess_server.games["5"].get_game_story()
+        self.assertEqual(story[0], ["5", "e2e4:ok"])
+        self.assertEqual(story[1][0], COMPUTER_NAME)
+
+    async def test_move_while_computer_thinks(self):
+        await chess_server.play_computer("me5", "writer", "comand_num", "10")
+        await chess_server.move_command("me5", "writer", "e2e4:ok",
+                                        "comand_num")
+        await chess_server.move_command("me5", "writer", "d2d4:ok",
+                                        "comand_num")
+        chess_server.send_msg.assert_called_with(
+            "writer", "comand_num", "computer_busy")
+        self.assertEqual(chess_server.games["5"].get_game_story(),
+                         [["5", "e2e4:ok"]])
+        self.assertEqual(chess_server.computer.active["5"].moves,
+                         ["e2e4:ok"])
+
+    async def test_computer_error(self):
+        await chess_server.play_computer("me5", "writer", "comand_num", "10")
+        await chess_server.move_command("me5", "writer", "e2e5:ok",
+                                        "comand_num")
+        self.assertEqual(await self.get_message("me5"), "computer_error")
+        self.assertFalse(chess_server.users["5"].isPlay)
+        self.assertEqual(chess_server.computer.games, {})
+        self.assertEqual(chess_server.game_history.history, [])
+        await asyncio.wait_for(chess_server.computer.jobs.join(), 10)
+        self.assertFalse(chess_server.computer.is_full())
+
+    async def test_computer_win(self):
+        await chess_server.play_computer("me5", "writer", "comand_num")
+        await chess_server.computer_move("5", "h5f7:win")
+        self.assertEqual(await self.get_message("me5"),
+                         "opponent_get_move h5f7:win")
+        self.assertFalse(chess_server.users["5"].isPlay)
+        self.assertEqual(chess_server.computer.games, {})
+        self.assertEqual(chess_server.game_history.history[-1][:3],
+                         ["5", COMPUTER_NAME, COMPUTER_NAME])
+
+    async def test_draw_and_give_up(self):
+        await chess_server.play_computer("me5", "writer", "comand_num", "10")
+        await chess_server.draw("me5", "writer", "comand_num", "ok")
+        chess_server.send_msg.assert_called_with(
+            "writer", "comand_num", "opponent_refused_draw")
+        await chess_server.move_command("me5", "writer", "e2e4:ok",
+                                        "comand_num")
+        await asyncio.sleep(0.3)
+        await chess_server.give_up("me5", "writer", "comand_num")
+        chess_server.send_msg.assert_called_with(
+            "writer", "comand_num", "you_success_give_up")
+        self.assertFalse(chess_server.users["5"].isPlay)
+        self.assertEqual(chess_server.game_history.history[-1][2],
+                         COMPUTER_NAME)
+        await asyncio.wait_for(chess_server.computer.jobs.join(), 10)
+        self.assertTrue(chess_server.clients["me5"].queue.empty())
+        self.assertFalse(chess_server.computer.is_full())
+
+    async def test_adjudicated_draw(self):
+        await chess_server.play_computer("me5", "writer", "comand_num", "10")
+        chess_server.computer.adjudicate = AsyncMock(return_value="w")
+        await chess_server.draw("me5", "writer", "comand_num", "ok")
+        chess_server.send_msg.assert_called_with(
+            "writer", "comand_num", "opponent_refused_draw")
+        chess_server.computer.adjudicate = AsyncMock(return_value="draw")
+        await chess_server.draw("me5", "writer", "comand_num", "ok")
+        chess_server.computer.adjudicate.assert_called_with([])
+        chess_server.send_msg.assert_called_with(
+            "writer", "comand_num", "draw")
+        self.assertFalse(chess_server.users["5"].isPlay)
+        self.assertEqual(chess_server.computer.games, {})
+        self.assertEqual(chess_server.game_history.history[-1][:3],
+                         ["5", COMPUTER_NAME, "draw"])
+
+    async def test_logout(self):
+        await chess_server.play_computer("me5", "writer", "comand_num", "10")
+        await chess_server.move_command("me5", "writer", "e2e4:ok",
+                                        "comand_num")
+        await chess_server.logout("me5")
+        self.assertFalse(chess_server.users["5"].isOnline)
+        await asyncio.wait_for(chess_server.computer.jobs.join(), 10)
+        self.assertTrue(chess_server.clients["me5"].queue.empty())
+        self.assertFalse(chess_server.computer.is_full())
+
+    async def asyncTearDown(self):
+        chess_server.computer.close()
@@ -0,0 +1,188 @@
+"""Test of tablebase module"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import MagicMock
+sys.path.insert(1, os.path.dirname(__file__) + '/../client/src')
+import engine
+import tablebase
+from chess_game import Game
+
+FOLDER = None
+
+
+def setUpModule():
+    global FOLDER
+    FOLDER = tempfile.mkdtemp()
+    out = io.StringIO()
+    tablebase.generate('KQK', FOLDER, workers=2, out=out)
+    tablebase.generate('KRK', FOLDER, workers=1, out=out)
+
+
+def tearDownModule():
+    shutil.rmtree(FOLDER)
+
+
+class TestSignature(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_split_signature(self):
+        self.assertEqual(tablebase.split_signature('KNBK'), ('BN', ''))
+        self.assertEqual(tablebase.split_signature('kqkr'), ('Q', 'R'))
+        for name in ('QK', 'KQ', 'KXK', 'KQRKR', 'KPKP'):
+            with self.assertRaises(ValueError):
+                tablebase.split_signature(name)
+
+    def test_table_name(self):
+        self.assertEqual(tablebase.table_name('', 'Q'), ('KQK', True))
+        self.assertEqual(tablebase.table_name('R', 'R'), ('KRKR', False))
+        self.assertEqual(tablebase.table_name('N', 'B'), ('KBKN', True))
+        self.assertEqual(tablebase.requirements('KQKR'), ['KQK', 'KRK'])
+        self.assertEqual(tablebase.requirements('KPK'), [])
+
+    def tearDown(self):
+        pass
+
+
+class TestLayout(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_symmetry(self):
+        layout = tablebase.Layout('KRK')
+        self.assertEqual(layout.size, 2 * 10 * 64 * 64)
+        squares = [10, 45, 3]
+        index = layout.index(squares, 1)
+        for transform in tablebase.TRANSFORMS:
+            self.assertEqual(layout.index([transform[sq] for sq in squares],
+                                          1), index)
+        self.assertEqual(layout.index(*layout.decode(index)), index)
+        # King at the diagonal
+        index = layout.index([18, 40, 7], 0)
+        self.assertEqual(layout.index([18, 5, 56], 0), index)
+        self.assertEqual(layout.decode(index), ([18, 5, 56], 0))
+
+    def test_pawns(self):
+        layout = tablebase.Layout('KPK')
+        self.assertEqual(layout.size, 2 * 32 * 64 * 64)
+        index = layout.index([7, 60, 15], 0)
+        self.assertEqual(layout.index([0, 59, 8], 0), index)
+        self.assertNotEqual(layout.index([56, 4, 48], 0), index)
+
+    def tearDown(self):
+        pass
+
+
+class TestTablebase(unittest.TestCase):
+
+    def setUp(self):
+        self.tablebase = tablebase.Tablebase(FOLDER)
+
+    def test_tables(self):
+        self.assertEqual(self.tablebase.signatures, {'KQK', 'KRK'})
+        self.assertEqual(self.tablebase.max_men, 3)
+        for name, longest in (('KQK', 19), ('KRK', 31)):
+            layout, data = self.tablebase._table(name)
+            codes = data[tablebase.HEADER.size:]
+            self.assertEqual(max(codes[:layout.side_size]
+                                 .replace(b'\xff', b'')) - 1, longest)
+            self.assertEqual(max(codes[layout.side_size:]
+                                 .replace(b'\xff', b'')) - 1, longest + 1)
+
+    def test_probe(self):
+        game = Game.from_fen('k7/8/1K6/8/8/8/7Q/8 w - - 0 1')
+        self.assertEqual(self.tablebase.probe(game), (tablebase.WIN, 1))
+        self.assertEqual(self.tablebase.best_move(game),
+                         ('h2h8', tablebase.WIN, 1))
+        # black is the stronger side
+        game = Game.from_fen('K7/8/1k6/8/8/8/7q/8 b - - 0 1')
+        self.assertEqual(self.tablebase.probe(game), (tablebase.WIN, 1))
+        # stalemate
+        game = Game.from_fen('K7/8/1k6/8/8/8/7q/8 w - - 0 1')
+        self.assertEqual(self.tablebase.probe(game), (0, 0))
+        # the king in check of the player to move
+        game = Game.from_fen('k7/8/1K6/8/8/8/8/7Q w - - 0 1')
+        self.assertIsNone(self.tablebase.probe(game))
+        game = Game.from_fen('k7/1Q6/1K6/8/8/8/8/8 b - - 0 1')
+        self.assertEqual(self.tablebase.probe(game), (tablebase.LOSS, 0))
+        self.assertEqual(self.tablebase.best_move(game),
+                         (None, tablebase.LOSS, 0))
+
+    def test_not_probed(self):
+        # roque is possible
+        game = Game.from_fen('4k3/8/8/8/8/8/8/R3K3 w Q - 0 1')
+        self.assertIsNone(self.tablebase.probe(game))
+        game = Game.from_fen('4k3/8/8/8/8/8/8/R3K3 w - - 0 1')
+        self.assertEqual(self.tablebase.probe(game)[0], tablebase.WIN)
+        game = Game.from_fen('4k3/8/8/8/8/8/8/R2QK3 w - - 0 1')
+        self.assertIsNone(self.tablebase.probe(game))
+        self.assertIsNone(self.tablebase.probe(Game('w')))
+        # Pawns don't promote in the tables
+        self.tablebase.probe_pieces = MagicMock(return_value=(0, 0))
+        game = Game.from_fen('4k3/8/8/8/8/8/4P3/4K3 w - - 0 1')
+        self.assertIsNone(self.tablebase.probe(game))
+        self.tablebase.probe_pieces.assert_not_called()
+        self.assertNotIn('KPK', tablebase.DEFAULT_SIGNATURES)
+
+    def test_moves(self):
+        # results agree with moves of Game
+        for fen in ('8/8/3k4/8/8/8/8/R3K3 w - - 0 1',
+                    '8/8/3k4/8/8/8/8/R3K3 b - - 0 1',
+                    '7k/8/5K2/8/8/8/8/6Q1 b - - 0 1',
+                    '8/8/8/8/2K5/8/1Q6/k7 b - - 0 1'):
+            game = Game.from_fen(fen)
+            result = self.tablebase.probe(game)
+            best = None
+            for move in list(game.iter_legal_moves()):
+                game.make_packed_move(move)
+                child = self.tablebase.probe(game)
+                game.unmake_move()
+                value = tablebase._rank(-child[0], child[1] + 1
+                                        if child[0] else 0)
+                best = value if best is None else max(best, value)
+            self.assertEqual(tablebase._rank(*result), best)
+
+    def test_engine(self):
+        game = Game.from_fen('8/8/3k4/8/8/8/8/R3K3 w - - 0 1')
+        result = engine.Engine(tablebase=self.tablebase).search(game, 5.0)
+        distance = self.tablebase.probe(game)[1]
+        self.assertEqual(result.depth, 0)
+        self.assertEqual(result.score, engine.MATE - distance)
+        # the capture leads to the table
+        game = Game.from_fen('k7/8/8/8/8/8/8/K2n2Q1 w - - 0 1')
+        result = engine.Engine(tablebase=self.tablebase).search(game,
+                                                                depth=1)
+        self.assertEqual(result.move, 'g1d1')
+        game.move_from_server('g1', 'd1')
+        distance = self.tablebase.probe(game)[1]
+        self.assertEqual(result.score, engine.MATE - 1 - distance)
+
+    def test_open_tablebase(self):
+        self.assertIsNone(tablebase.open_tablebase(FOLDER + '.missing'))
+        with tablebase.open_tablebase(FOLDER) as other:
+            self.assertEqual(other.signatures, {'KQK', 'KRK'})
+
+    def test_main(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(tablebase.main(
+                    ['--directory', FOLDER, 'probe', '--fen',
+                     'k7/8/1K6/8/8/8/7Q/8 w - - 0 1']), 0)
+            self.assertEqual(tablebase.main(
+                    ['--directory', FOLDER, 'probe']), 0)
+            self.assertEqual(tablebase.main(
+                    ['--directory', FOLDER, 'build', 'KQK']), 0)
+        self.assertRegex(out.getvalue(),
+                         '^win in 1 plies bestmove h2h8\n'
+                         'not in the tablebase\n$')
+
+    def tearDown(self):
+        self.tablebase.close()